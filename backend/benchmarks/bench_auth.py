@@ -0,0 +1,89 @@
+"""
+Benchmark: custo de autenticação por requisição (AuthMiddleware + get_current_user).
+
+Compara:
+- antes: verificação HMAC completa do jose duas vezes por requisição
+  (middleware e dependency)
+- depois: middleware com LRU de tokens verificados + dependency
+  reaproveitando scope["user"]
+
+Uso:
+    python -m benchmarks.bench_auth [requisicoes] [usuarios]
+"""
+
+import asyncio
+import sys
+import time
+
+from fastapi import Request
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+from core import auth
+from core.auth import AuthMiddleware, CacheTokensVerificados, create_access_token, get_current_user
+from core.config import Settings
+
+SETTINGS = Settings(jwt_secret_key="segredo-benchmark")
+
+
+def gerar_tokens(usuarios: int):
+    return [
+        create_access_token(
+            {"user_id": f"u-{i}", "loja_id": f"loja-{i % 5}", "perfil": "VENDEDOR", "email": f"u{i}@loja.com"},
+            SETTINGS
+        )
+        for i in range(usuarios)
+    ]
+
+
+def scope_para(token: str):
+    return {"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]}
+
+
+async def app_vazio(scope, receive, send):
+    pass
+
+
+def medir_antes(tokens, requisicoes: int) -> float:
+    inicio = time.perf_counter()
+    for i in range(requisicoes):
+        token = tokens[i % len(tokens)]
+        for _ in range(2):
+            jwt.decode(token, SETTINGS.jwt_secret_key, algorithms=[SETTINGS.jwt_algorithm])
+    return (time.perf_counter() - inicio) / requisicoes * 1e6
+
+
+async def medir_depois(tokens, requisicoes: int) -> float:
+    middleware = AuthMiddleware(app_vazio)
+    inicio = time.perf_counter()
+    for i in range(requisicoes):
+        token = tokens[i % len(tokens)]
+        scope = scope_para(token)
+        await middleware(scope, None, None)
+        await get_current_user(
+            Request(scope),
+            HTTPAuthorizationCredentials(scheme="Bearer", credentials=token),
+            SETTINGS
+        )
+    return (time.perf_counter() - inicio) / requisicoes * 1e6
+
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    usuarios = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    auth.get_settings = lambda: SETTINGS
+    auth._cache_tokens = CacheTokensVerificados(max_entradas=10000)
+    tokens = gerar_tokens(usuarios)
+
+    antes = medir_antes(tokens, requisicoes)
+    depois = asyncio.run(medir_depois(tokens, requisicoes))
+
+    print(f"{requisicoes} requisições, {usuarios} tokens distintos")
+    print(f"antes  (2x jose.decode)            {antes:8.1f} µs/req")
+    print(f"depois (LRU + scope['user'])       {depois:8.1f} µs/req")
+    print(f"cache: {auth._cache_tokens.stats()}")
+
+
+if __name__ == "__main__":
+    main()
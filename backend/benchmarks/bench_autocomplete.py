@@ -0,0 +1,46 @@
+"""
+Benchmark: autocomplete de clientes (typeahead) em uma loja grande.
+
+Mede, em memória, para N clientes sintéticos:
+- carga do índice de prefixos (uma vez por loja/TTL)
+- sugestões por tecla digitada ('j', 'jo', 'joa', ...) e por telefone
+- atualização incremental (criar/atualizar/excluir cliente)
+
+Uso:
+    python -m benchmarks.bench_autocomplete [clientes] [repeticoes]
+"""
+
+import sys
+import time
+
+from benchmarks.bench_busca import gerar_clientes
+from core.autocomplete import IndicePrefixos
+
+TECLAS = ["j", "jo", "joa", "joao", "joao r", "joao ram", "ramo", "9876", "1198765"]
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    clientes = gerar_clientes(quantidade)
+
+    inicio = time.perf_counter()
+    indice = IndicePrefixos(max_documentos=quantidade)
+    indice.adicionar_lote(clientes)
+    print(f"{quantidade} clientes, {repeticoes} repetições por termo")
+    print(f"carga do índice: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    for termo in TECLAS:
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            sugestoes = indice.sugerir(termo, 10)
+        print(f"{termo!r:12} {(time.perf_counter() - inicio) / repeticoes * 1000:7.3f} ms  {len(sugestoes)} sugestões")
+
+    inicio = time.perf_counter()
+    for cliente in clientes[:repeticoes]:
+        indice.adicionar(cliente["id"], {**cliente, "nome": cliente["nome"] + " Filho"})
+    print(f"atualização incremental: {(time.perf_counter() - inicio) / repeticoes * 1000:.3f} ms/cliente")
+
+
+if __name__ == "__main__":
+    main()
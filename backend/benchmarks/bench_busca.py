@@ -0,0 +1,93 @@
+"""
+Benchmark: custo da busca ranqueada (q=) na aplicação.
+
+O filtro roda no banco (colunas normalizadas com índice GIN pg_trgm, ver
+core.busca); a aplicação só ranqueia até BUSCA_MAX_CANDIDATOS candidatos.
+Mede, em memória (sem rede), para cada termo:
+- filtro: o que o banco faz (todas as palavras em busca_texto ou os dígitos
+  em busca_digitos), por varredura de N clientes sintéticos; serve só de
+  referência, o pg_trgm não varre a tabela
+- ranqueamento: ranquear() sobre os primeiros BUSCA_MAX_CANDIDATOS candidatos
+
+Uso:
+    python -m benchmarks.bench_busca [clientes] [repeticoes] [max_candidatos]
+"""
+
+import random
+import sys
+import time
+
+from core.busca import MIN_DIGITOS, apenas_digitos, normalizar, ranquear
+
+NOMES = ["João", "Maria", "José", "Antônio", "Ana", "Francisco", "Luíza", "Paulo", "Márcia", "Carlos",
+         "Fernanda", "Raimundo", "Sebastião", "Patrícia", "Luciana", "Jéssica", "Rodrigo", "Cláudia", "Mônica", "Gustavo"]
+SILABAS = ["ra", "mo", "li", "be", "tu", "cá", "no", "gue", "lha", "ço", "ri", "pe", "dã", "vi", "so", "má", "te", "qui"]
+CIDADES = ["São Paulo", "Curitiba", "Belém", "Goiânia", "Maceió", "Florianópolis", "Ribeirão Preto", "Cuiabá"]
+TERMOS = ["joao", "sebastiao ramoli", "cuiaba", "98765", "ribeirao", "patricia gue", "mo"]
+
+
+def sobrenome(aleatorio: random.Random) -> str:
+    return "".join(aleatorio.choice(SILABAS) for _ in range(aleatorio.randint(2, 4))).capitalize()
+
+
+def gerar_clientes(quantidade: int):
+    aleatorio = random.Random(42)
+    return [
+        {
+            "id": str(i),
+            "nome": f"{aleatorio.choice(NOMES)} {sobrenome(aleatorio)} {sobrenome(aleatorio)}",
+            "cidade": aleatorio.choice(CIDADES),
+            "telefone": f"(11) 9{aleatorio.randint(1000, 9999)}-{aleatorio.randint(1000, 9999)}",
+            "cpf_cnpj": f"{aleatorio.randint(100, 999)}.{aleatorio.randint(100, 999)}.{aleatorio.randint(100, 999)}-{aleatorio.randint(10, 99)}"
+        }
+        for i in range(quantidade)
+    ]
+
+
+def preparar_colunas(clientes):
+    """Equivalente às colunas geradas busca_texto/busca_digitos"""
+    return [
+        (c, normalizar(f"{c['nome']} {c['cidade']}"), f"{apenas_digitos(c['telefone'])} {apenas_digitos(c['cpf_cnpj'])}")
+        for c in clientes
+    ]
+
+
+def filtrar(linhas, termo: str, limite: int):
+    palavras, digitos = normalizar(termo).split(), apenas_digitos(termo)
+    candidatos = []
+    for cliente, texto, numeros in linhas:
+        if (palavras and all(p in texto for p in palavras)) or (len(digitos) >= MIN_DIGITOS and digitos in numeros):
+            candidatos.append(cliente)
+            if len(candidatos) == limite:
+                break
+    return candidatos
+
+
+def medir(funcao, termo: str, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao(termo)
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    max_candidatos = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    linhas = preparar_colunas(gerar_clientes(quantidade))
+    campos_texto, campos_digitos = {"nome": 1.0, "cidade": 0.4}, {"telefone": 1.0, "cpf_cnpj": 1.0}
+
+    print(f"{quantidade} clientes, até {max_candidatos} candidatos, {repeticoes} repetições por termo")
+    print(f"{'termo':20} {'filtro':>12} {'ranqueamento':>14} {'candidatos':>12}")
+    total_filtro = total_ranking = 0.0
+    for termo in TERMOS:
+        candidatos = filtrar(linhas, termo, max_candidatos)
+        filtro = medir(lambda t: filtrar(linhas, t, max_candidatos), termo, repeticoes)
+        ranking = medir(lambda t: ranquear(candidatos, t, campos_texto, campos_digitos), termo, repeticoes)
+        total_filtro, total_ranking = total_filtro + filtro, total_ranking + ranking
+        print(f"{termo:20} {filtro:9.2f} ms {ranking:11.2f} ms {len(candidatos):12}")
+    print(f"{'média':20} {total_filtro / len(TERMOS):9.2f} ms {total_ranking / len(TERMOS):11.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
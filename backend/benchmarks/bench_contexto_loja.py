@@ -0,0 +1,132 @@
+"""
+Teste de carga: isolamento do contexto de loja entre requisições concorrentes.
+
+O "PostgREST" simulado responde com a loja_id da claim do JWT recebido
+(como o RLS faria) após `latencia_ms`. Compara três formas de levar o
+contexto da loja ao banco:
+
+- set_config:     RPC set_config + query (dois round-trips) no cliente global
+- sessao_global:  token do usuário gravado nos headers da sessão compartilhada
+- cliente_loja:   ClienteLoja (token nos headers de cada query)
+
+Vazamento = resposta com loja diferente da loja da requisição. No caso
+set_config, o is_local vale só para a transação do próprio RPC: a query
+seguinte chega ao banco sem loja e toda resposta conta como vazamento.
+
+Uso:
+    python -m benchmarks.bench_contexto_loja [latencia_ms] [requisicoes] [lojas]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from jose import jwt
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+
+from core.auth import create_access_token
+from core.config import Settings
+from core.database import ClienteLoja, QueryExecutor, criar_token_postgrest
+
+SETTINGS = Settings(jwt_secret_key="segredo-benchmark", supabase_jwt_secret="segredo-supabase-benchmark")
+CONCORRENCIA = 50
+
+
+class SupabaseSimulado:
+    def __init__(self, latencia: float):
+        def responder(request):
+            time.sleep(latencia)
+            token = request.headers["authorization"].split(" ")[1]
+            claims = jwt.get_unverified_claims(token) if token.count(".") == 2 else {}
+            return httpx.Response(200, json=[{"loja_id": claims.get("loja_id")}])
+
+        self.postgrest = SyncPostgrestClient("http://postgrest", headers={"Authorization": "Bearer anon", "apikey": "anon"})
+        self.postgrest.session = SyncClient(
+            base_url="http://postgrest",
+            headers=self.postgrest.session.headers,
+            transport=httpx.MockTransport(responder)
+        )
+
+    def table(self, nome):
+        return self.postgrest.from_(nome)
+
+    def rpc(self, fn, params):
+        return self.postgrest.rpc(fn, params)
+
+
+async def carga(estrategia, supabase, executor, tokens, requisicoes: int):
+    semaforo = asyncio.Semaphore(CONCORRENCIA)
+    latencias, vazamentos = [], 0
+
+    async def requisicao(n):
+        nonlocal vazamentos
+        loja_id = f"loja-{n % len(tokens)}"
+        async with semaforo:
+            inicio = time.perf_counter()
+            recebida = await estrategia(supabase, executor, tokens[loja_id], loja_id)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if recebida != loja_id:
+                vazamentos += 1
+
+    await asyncio.gather(*(requisicao(n) for n in range(requisicoes)))
+    latencias.sort()
+    return statistics.median(latencias), latencias[int(len(latencias) * 0.95) - 1], vazamentos
+
+
+async def via_set_config(supabase, executor, token, loja_id):
+    await executor.run(supabase.rpc("set_config", {
+        "setting_name": "app.current_loja_id", "setting_value": loja_id, "is_local": True
+    }))
+    result = await executor.run(supabase.table("c_orcamentos").select("*"))
+    return result.data[0]["loja_id"]
+
+
+async def via_sessao_global(supabase, executor, token, loja_id):
+    supabase.postgrest.session.headers["Authorization"] = f"Bearer {token}"
+    query = supabase.table("c_orcamentos").select("*")
+    await asyncio.sleep(0)  # outra requisição pode trocar o header antes do execute
+    result = await executor.run(query)
+    return result.data[0]["loja_id"]
+
+
+async def via_cliente_loja(supabase, executor, token, loja_id):
+    usuario = {"user_id": jwt.get_unverified_claims(token)["sub"], "loja_id": loja_id, "perfil": "VENDEDOR"}
+    cliente = ClienteLoja(supabase, criar_token_postgrest(usuario, SETTINGS), loja_id)
+    result = await executor.run(cliente.table("c_orcamentos").select("*"))
+    return result.data[0]["loja_id"]
+
+
+async def executar(latencia_ms: float, requisicoes: int, lojas: int):
+    tokens = {
+        f"loja-{i}": create_access_token(
+            {"user_id": f"u-{i}", "loja_id": f"loja-{i}", "perfil": "VENDEDOR", "email": f"v{i}@loja.com"},
+            SETTINGS
+        )
+        for i in range(lojas)
+    }
+    executor = QueryExecutor(max_workers=16)
+
+    print(f"Latência simulada: {latencia_ms}ms, {requisicoes} requisições, {lojas} lojas, concorrência {CONCORRENCIA}")
+    for nome, estrategia in [
+        ("set_config", via_set_config),
+        ("sessao_global", via_sessao_global),
+        ("cliente_loja", via_cliente_loja),
+    ]:
+        p50, p95, vazamentos = await carga(estrategia, SupabaseSimulado(latencia_ms / 1000), executor, tokens, requisicoes)
+        print(f"{nome:14s} p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   vazamentos {vazamentos}")
+
+    executor.shutdown()
+
+
+def main():
+    latencia_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    requisicoes = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    lojas = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    asyncio.run(executar(latencia_ms, requisicoes, lojas))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: latência ponta a ponta de OrcamentoService.criar_orcamento
+(p50/p95) contra um Supabase simulado com latência fixa por query.
+
+Sem acesso à rede: cada .execute() dorme `latencia_ms` numa thread do
+QueryExecutor, como faria o round-trip real ao PostgREST. Os caches de
+comissão/config são desativados para medir o pior caso (cache frio).
+
+Uso:
+    python -m benchmarks.bench_criar_orcamento [latencia_ms] [orcamentos]
+"""
+
+import asyncio
+import logging
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from modules.orcamentos.schemas import OrcamentoCreate
+from modules.orcamentos.services import OrcamentoService
+
+LOJA_ID = str(uuid.uuid4())
+VENDEDOR_ID = str(uuid.uuid4())
+AMBIENTE_IDS = [str(uuid.uuid4()) for _ in range(3)]
+
+
+class FakeQuery:
+    def __init__(self, supabase, tabela):
+        self.supabase = supabase
+        self.tabela = tabela
+        self.operacao = 'select'
+        self.payload = None
+
+    def insert(self, payload):
+        self.operacao, self.payload = 'insert', payload
+        return self
+
+    def __getattr__(self, nome):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self.supabase.latencia)
+        return SimpleNamespace(data=self.supabase.responder(self))
+
+
+class FakeSupabase:
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+        self.orcamento = None
+
+    def table(self, nome):
+        return FakeQuery(self, nome)
+
+    def responder(self, query):
+        agora = datetime.utcnow().isoformat()
+        if query.operacao == 'insert':
+            if query.tabela == 'c_orcamentos':
+                self.orcamento = {**query.payload, 'id': str(uuid.uuid4()), 'created_at': agora, 'updated_at': agora}
+                return [self.orcamento]
+            return query.payload if isinstance(query.payload, list) else [query.payload]
+
+        if query.tabela == 'c_ambientes':
+            return [{'valor_total': 10000.0} for _ in AMBIENTE_IDS]
+        if query.tabela == 'config_loja':
+            return [{
+                'loja_id': LOJA_ID, 'deflator_custo_fabrica': 0.4, 'valor_medidor_padrao': 200.0,
+                'valor_frete_percentual': 0.02, 'limite_desconto_vendedor': 0.15, 'limite_desconto_gerente': 0.25,
+                'proximo_numero_orcamento': 1, 'formato_numeracao': 'SEQUENCIAL', 'prefixo_numeracao': ''
+            }]
+        if query.tabela == 'config_regras_comissao_faixa':
+            return [{'valor_minimo': 0, 'valor_maximo': None, 'percentual': 0.05, 'ordem': 1}]
+        if query.tabela == 'config_status_orcamento':
+            return [{'id': str(uuid.uuid4()), 'nome_status': 'Negociação', 'is_default': True}]
+        if query.tabela == 'c_orcamentos':
+            return [self.orcamento] if self.orcamento else []
+        return []
+
+
+def desativar_caches():
+    for modulo, atributo in (
+        ('modules.orcamentos.cache_comissao', 'get_cache_comissao'),
+        ('modules.orcamentos.cache_config_loja', 'get_cache_config_loja'),
+    ):
+        try:
+            cache = getattr(__import__(modulo, fromlist=[atributo]), atributo)()
+            cache.ttl_seconds = 0
+        except ImportError:
+            pass
+
+
+def novo_orcamento() -> OrcamentoCreate:
+    return OrcamentoCreate(
+        cliente_id=uuid.uuid4(),
+        ambiente_ids=AMBIENTE_IDS,
+        desconto_percentual=10,
+        medidor_selecionado_id=uuid.uuid4(),
+        montador_selecionado_id=uuid.uuid4(),
+        transportadora_selecionada_id=uuid.uuid4(),
+        plano_pagamento=[{
+            'descricao': 'Entrada', 'valor': 27000, 'data_vencimento': datetime.utcnow(), 'forma_pagamento': 'PIX'
+        }],
+        custos_adicionais=[{'descricao_custo': 'Frete especial', 'valor_custo': 300}]
+    )
+
+
+async def main(latencia_ms: float = 20.0, orcamentos: int = 30):
+    logging.disable(logging.INFO)
+    desativar_caches()
+    usuario = {'loja_id': LOJA_ID, 'id': VENDEDOR_ID, 'perfil': 'ADMIN_MASTER'}
+
+    latencias = []
+    for _ in range(orcamentos):
+        service = OrcamentoService(FakeSupabase(latencia_ms / 1000))
+        inicio = time.perf_counter()
+        await service.criar_orcamento(novo_orcamento(), usuario)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+    latencias.sort()
+    p95 = latencias[max(0, int(len(latencias) * 0.95) - 1)]
+    print(f"Latência simulada por query: {latencia_ms:.0f}ms, {orcamentos} orçamentos")
+    print(f"criar_orcamento  p50 {statistics.median(latencias):7.1f} ms   p95 {p95:7.1f} ms")
+
+
+if __name__ == "__main__":
+    argumentos = [float(a) for a in sys.argv[1:3]]
+    if len(argumentos) > 1:
+        argumentos[1] = int(argumentos[1])
+    asyncio.run(main(*argumentos))
@@ -0,0 +1,80 @@
+"""
+Benchmark: tempo de resposta do upload de XML (síncrono x fila em segundo plano).
+
+Para um XML sintético, com repositório em memória e latência simulada:
+- antes: a requisição espera a importação inteira (importar_xml)
+- depois: a requisição copia o arquivo, cria o log e responde 202
+  (enfileirar_importacao); a importação termina na fila
+
+Também mede o maior atraso do event loop durante o processamento (outras
+requisições do mesmo worker continuam sendo atendidas).
+
+Uso:
+    python -m benchmarks.bench_fila_xml [tamanho_mb] [rtt_ms]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_xml_cache import RepositorioLatencia, USUARIO, gerar_xml
+from core.config import get_settings
+from core.jobs import get_fila_jobs
+from modules.ambientes import cache_xml
+from modules.ambientes.services import AmbienteService
+from modules.xml_logs.repository import XmlLogMemoria
+from modules.xml_logs.services import XmlLogService
+
+
+async def medir_atraso_loop(parar: asyncio.Event, atrasos: list) -> None:
+    """Agenda um tick a cada 10ms e registra o atraso em relação ao esperado"""
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(0.01)
+        atrasos.append((time.perf_counter() - inicio - 0.01) * 1000)
+
+
+async def executar(modo: str, caminho: str, rtt: float):
+    cache_xml.get_cache_xml().limpar()
+    service = AmbienteService.__new__(AmbienteService)
+    service.repository = RepositorioLatencia(rtt)
+    logs = XmlLogService(XmlLogMemoria())
+    parar, atrasos = asyncio.Event(), []
+    monitor = asyncio.create_task(medir_atraso_loop(parar, atrasos))
+
+    inicio = time.perf_counter()
+    with open(caminho, "rb") as arquivo:
+        if modo == "antes":
+            await service.importar_xml(arquivo, "projeto.xml", USUARIO)
+        else:
+            await service.enfileirar_importacao(arquivo, "projeto.xml", USUARIO, logs)
+    resposta = time.perf_counter() - inicio
+    await get_fila_jobs().aguardar()
+    total = time.perf_counter() - inicio
+
+    parar.set()
+    await monitor
+    return resposta, total, max(atrasos)
+
+
+async def main():
+    tamanho_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    get_settings().max_file_size_mb = tamanho_mb + 1
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "projeto.xml")
+        gerar_xml(caminho, tamanho_mb, 8)
+
+        print(f"XML de {tamanho_mb}MB, RTT {rtt * 1000:.0f}ms")
+        print(f"{'modo':8} {'resposta':>10} {'importação':>11} {'maior atraso do loop':>21}")
+        for modo in ("antes", "depois"):
+            resposta, total, atraso = await executar(modo, caminho, rtt)
+            print(f"{modo:8} {resposta * 1000:8.0f}ms {total * 1000:9.0f}ms {atraso:19.1f}ms")
+    await get_fila_jobs().encerrar()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
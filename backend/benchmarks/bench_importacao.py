@@ -0,0 +1,117 @@
+"""
+Benchmark: importação de clientes em massa (migração de uma loja).
+
+Compara, com repositório em memória e latência simulada por round-trip:
+- antes: POST /clientes/ por linha (verificação de CPF/CNPJ + insert = 2
+  round-trips por cliente), medido em uma amostra e extrapolado
+- depois: ClienteService.importar_clientes (1 leitura dos documentos da loja
+  + 1 insert por bloco de IMPORT_BATCH_SIZE)
+
+Uso:
+    python -m benchmarks.bench_importacao [linhas] [rtt_ms]
+"""
+
+import asyncio
+import csv
+import io
+import sys
+import time
+import tracemalloc
+
+from core.config import get_settings
+from modules.clientes.schemas import ClienteCreate
+from modules.clientes.services import ClienteService
+
+USUARIO = {'loja_id': 'loja-bench', 'id': 'u-1', 'perfil': 'GERENTE'}
+AMOSTRA_ANTES = 200
+LOJA_UUID = '00000000-0000-0000-0000-0000000000aa'
+
+
+class RepositorioLatencia:
+    """Repositório em memória que espera `rtt` segundos por round-trip"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.round_trips = 0
+        self.criados = 0
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+
+    async def _lotes(self):
+        await self._round_trip()
+        yield []
+
+    def iterar_clientes(self, loja_id, filters, colunas, tamanho_lote):
+        return self._lotes()
+
+    async def verificar_cpf_cnpj_existente(self, cpf_cnpj, loja_id):
+        await self._round_trip()
+        return False
+
+    def _linha(self, dados):
+        self.criados += 1
+        return {
+            **dados, 'id': f'00000000-0000-0000-0000-{self.criados:012d}', 'loja_id': LOJA_UUID,
+            'created_at': '2026-01-01T00:00:00+00:00', 'updated_at': '2026-01-01T00:00:00+00:00'
+        }
+
+    async def criar_cliente(self, dados, loja_id):
+        await self._round_trip()
+        return self._linha(dados)
+
+    async def criar_clientes_em_lote(self, lista, loja_id):
+        await self._round_trip()
+        return [self._linha(dados) for dados in lista]
+
+
+def gerar_csv(quantidade: int) -> bytes:
+    saida = io.StringIO()
+    escritor = csv.writer(saida, delimiter=';')
+    escritor.writerow(['nome', 'cpf_cnpj', 'telefone', 'email', 'cidade', 'uf', 'cep'])
+    for i in range(quantidade):
+        escritor.writerow([f'Cliente Migrado {i}', f'{i:011d}', f'(41) 9{i % 10000:04d}-{i % 9999:04d}',
+                           f'cliente{i}@exemplo.com', 'Curitiba', 'PR', '80000-000'])
+    return saida.getvalue().encode('utf-8')
+
+
+def servico(rtt: float) -> ClienteService:
+    service = ClienteService.__new__(ClienteService)
+    service.repository = RepositorioLatencia(rtt)
+    return service
+
+
+async def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 5.0) / 1000
+    conteudo = gerar_csv(linhas)
+    print(f"{linhas} linhas ({len(conteudo) / 1024 / 1024:.1f}MB), RTT simulado {rtt * 1000:.0f}ms, "
+          f"bloco de {get_settings().import_batch_size}")
+
+    # Antes: uma requisição de criação por cliente (amostra)
+    antes = servico(rtt)
+    inicio = time.perf_counter()
+    for i in range(AMOSTRA_ANTES):
+        await antes.criar_cliente(ClienteCreate(
+            nome=f'Cliente {i}', cpf_cnpj=f'{i:011d}', telefone='(41) 99999-0000', cidade='Curitiba', cep='80000-000'
+        ), USUARIO)
+    por_linha = (time.perf_counter() - inicio) / AMOSTRA_ANTES
+    print(f"antes:  {antes.repository.round_trips // AMOSTRA_ANTES} round-trips/linha, "
+          f"~{por_linha * linhas:.0f}s estimados para {linhas} linhas")
+
+    depois = servico(rtt)
+    inicio = time.perf_counter()
+    resultado = await depois.importar_clientes(io.BytesIO(conteudo), 'csv', USUARIO)
+    print(f"depois: {depois.repository.round_trips} round-trips, {time.perf_counter() - inicio:.2f}s "
+          f"({resultado.criados} criados)")
+
+    tracemalloc.start()
+    await servico(0).importar_clientes(io.BytesIO(conteudo), 'csv', USUARIO)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"pico de memória da importação (sem o arquivo): {pico / 1024 / 1024:.1f}MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
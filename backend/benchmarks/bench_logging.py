@@ -0,0 +1,91 @@
+"""
+Benchmark: custo do log de acesso por requisição na thread da requisição.
+
+Compara:
+- antes: duas linhas INFO com f-string/emoji e `extra` (query params,
+  user agent) escritas sincronamente por StreamHandler (logging.basicConfig)
+- depois: PipelineLog (uma linha JSON, amostragem de 2xx, fila + listener)
+
+A saída vai para /dev/null para medir só o custo do logging.
+
+Uso:
+    python -m benchmarks.bench_logging [requisicoes] [taxa_2xx]
+"""
+
+import logging
+import os
+import sys
+import time
+
+from core.config import Settings
+from core.logs import PipelineLog
+
+REQUEST = {
+    "method": "GET",
+    "path": "/api/v1/orcamentos",
+    "query_params": "status_id=1&limit=50",
+    "user_agent": "Mozilla/5.0 (X11; Linux x86_64)",
+    "client_ip": "10.0.0.7",
+}
+
+
+def configurar_root(handler: logging.Handler) -> None:
+    root = logging.getLogger()
+    for antigo in list(root.handlers):
+        root.removeHandler(antigo)
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def medir_antes(requisicoes: int, saida) -> float:
+    handler = logging.StreamHandler(saida)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    configurar_root(handler)
+    logger = logging.getLogger("main")
+
+    inicio = time.perf_counter()
+    for i in range(requisicoes):
+        logger.info(
+            f"🔵 REQUEST: {REQUEST['method']} {REQUEST['path']}",
+            extra={**REQUEST, "request_id": None}
+        )
+        process_time = 0.012
+        logger.info(
+            f"🟢 RESPONSE: {200} - {process_time:.3f}s",
+            extra={"status_code": 200, "process_time": process_time, "request_id": None}
+        )
+    return (time.perf_counter() - inicio) / requisicoes * 1e6
+
+
+def medir_depois(requisicoes: int, taxa_2xx: float, saida) -> PipelineLog:
+    pipeline = PipelineLog(Settings(log_sample_rate_2xx=taxa_2xx, log_queue_size=requisicoes + 1))
+    pipeline.listener.handlers[0].setStream(saida)
+    configurar_root(pipeline.handler)
+    pipeline.listener.start()
+
+    for i in range(requisicoes):
+        status_code = 500 if i % 100 == 0 else 200
+        pipeline.registrar_acesso(REQUEST["method"], REQUEST["path"], status_code, 12.0)
+
+    pipeline.listener.stop()
+    return pipeline
+
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    taxa_2xx = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        antes = medir_antes(requisicoes, devnull)
+        pipeline = medir_depois(requisicoes, taxa_2xx, devnull)
+
+    stats = pipeline.stats()
+    print(f"{requisicoes} requisições (1% com erro), amostragem 2xx = {taxa_2xx}")
+    print(f"antes  (basicConfig, 2 linhas síncronas)   {antes:8.2f} µs/req")
+    print(f"depois (JSON em fila, amostrado)           {stats['avg_cost_us']:8.2f} µs/req  "
+          f"(máx {stats['max_cost_us']} µs, orçamento {stats['budget_us']} µs, acima {stats['over_budget']})")
+    print(f"linhas registradas: {stats['logged']}, descartadas: {stats['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
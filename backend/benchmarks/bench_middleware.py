@@ -0,0 +1,133 @@
+"""
+Benchmark: requisições/s de um endpoint trivial com a pilha de middlewares.
+
+Compara:
+- antes: @app.middleware("http") para request id, log de acesso e headers de
+  debug (BaseHTTPMiddleware) + AuthMiddleware + GZip + CORS
+- depois: RequisicaoMiddleware (ASGI puro, com métricas) + GZip + CORS
+
+As requisições são feitas em processo (httpx ASGITransport), sem rede,
+com token Bearer válido para exercitar o contexto de autenticação.
+
+Uso:
+    python -m benchmarks.bench_middleware [requisicoes] [concorrencia]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+
+from core import auth
+from core.auth import AuthMiddleware, create_access_token
+from core.config import Settings
+from core.logs import PipelineLog, loja_id_var, request_id_var
+from core.metricas import RegistroMetricas
+from core.middleware import RequisicaoMiddleware
+
+SETTINGS = Settings(jwt_secret_key="segredo-benchmark", log_sample_rate_2xx=0.1)
+
+
+def app_base() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def finalizar(app: FastAPI) -> FastAPI:
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_credentials=True,
+                       allow_methods=["*"], allow_headers=["*"])
+    return app
+
+
+def app_antes(pipeline: PipelineLog) -> FastAPI:
+    app = app_base()
+
+    @app.middleware("http")
+    async def debug_headers(request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Environment"] = "development"
+        response.headers["X-Debug"] = "true"
+        return response
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start_time = time.perf_counter()
+        response = await call_next(request)
+        process_time = time.perf_counter() - start_time
+        pipeline.registrar_acesso(request.method, request.url.path, response.status_code, process_time * 1000)
+        response.headers["X-Process-Time"] = str(process_time)
+        return response
+
+    @app.middleware("http")
+    async def add_request_id(request: Request, call_next):
+        request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
+        usuario = request.scope.get("user") or {}
+        token_request_id = request_id_var.set(request_id)
+        token_loja_id = loja_id_var.set(usuario.get("loja_id"))
+        try:
+            response = await call_next(request)
+        finally:
+            request_id_var.reset(token_request_id)
+            loja_id_var.reset(token_loja_id)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+    app.add_middleware(AuthMiddleware)
+    return finalizar(app)
+
+
+def app_depois(pipeline: PipelineLog) -> FastAPI:
+    app = app_base()
+    app.add_middleware(RequisicaoMiddleware, pipeline_log=pipeline, debug_headers=True, metricas=RegistroMetricas())
+    return finalizar(app)
+
+
+async def medir(app: FastAPI, requisicoes: int, concorrencia: int, headers) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://teste") as cliente:
+        await cliente.get("/ping", headers=headers)  # aquecimento (monta a pilha)
+
+        fila = iter(range(requisicoes))
+
+        async def trabalhador():
+            for _ in fila:
+                resposta = await cliente.get("/ping", headers=headers)
+                assert resposta.status_code == 200 and "x-request-id" in resposta.headers
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+        return requisicoes / (time.perf_counter() - inicio)
+
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concorrencia = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    logging.getLogger("fluyt.acesso").disabled = True
+    auth.get_settings = lambda: SETTINGS
+    token = create_access_token({"user_id": "u-1", "loja_id": "loja-1", "perfil": "VENDEDOR", "email": "v@l.com"}, SETTINGS)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    antes = asyncio.run(medir(app_antes(PipelineLog(SETTINGS)), requisicoes, concorrencia, headers))
+    depois = asyncio.run(medir(app_depois(PipelineLog(SETTINGS)), requisicoes, concorrencia, headers))
+
+    print(f"{requisicoes} requisições GET /ping, concorrência {concorrencia}")
+    print(f"antes  (3x BaseHTTPMiddleware + Auth)   {antes:8.0f} req/s")
+    print(f"depois (RequisicaoMiddleware ASGI)      {depois:8.0f} req/s   ({depois / antes:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
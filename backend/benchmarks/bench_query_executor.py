@@ -0,0 +1,63 @@
+"""
+Benchmark: throughput de requisições concorrentes com queries Supabase
+executadas inline (bloqueando o event loop) vs via QueryExecutor.
+
+Simula o round-trip do PostgREST com time.sleep, sem acesso à rede.
+
+Uso:
+    python -m benchmarks.bench_query_executor [latencia_ms] [requisicoes]
+"""
+
+import asyncio
+import sys
+import time
+
+from core.database import QueryExecutor
+
+
+class FakeQuery:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def execute(self):
+        time.sleep(self.latency)
+        return self
+
+
+async def handler_bloqueante(latency: float):
+    # Comportamento antigo: .execute() direto dentro do handler async
+    FakeQuery(latency).execute()
+
+
+async def handler_executor(executor: QueryExecutor, latency: float):
+    await executor.run(FakeQuery(latency))
+
+
+async def medir(nome: str, coros) -> float:
+    inicio = time.perf_counter()
+    await asyncio.gather(*coros)
+    duracao = time.perf_counter() - inicio
+    total = len(coros)
+    print(f"{nome:<28} {total:>5} req  {duracao:7.3f}s  {total / duracao:9.1f} req/s")
+    return duracao
+
+
+async def main(latency_ms: float = 20.0, requisicoes: int = 200):
+    latency = latency_ms / 1000
+    print(f"Latência simulada por query: {latency_ms:.0f}ms\n")
+
+    await medir("inline (bloqueante)", [handler_bloqueante(latency) for _ in range(requisicoes)])
+
+    for workers in (4, 8, 16, 32):
+        executor = QueryExecutor(max_workers=workers)
+        await medir(
+            f"executor ({workers} workers)",
+            [handler_executor(executor, latency) for _ in range(requisicoes)]
+        )
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    latencia = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(main(latencia, total))
@@ -0,0 +1,110 @@
+"""
+Benchmark: reenvio de XML do Promob com cache por hash de bloco.
+
+Simula a negociação de um projeto com vários ambientes, com repositório em
+memória e latência simulada por round-trip:
+- antes: todo upload lê o XML inteiro e insere todos os ambientes
+- depois: AmbienteService.importar_xml com cache_xml, para o primeiro
+  envio, o reenvio idêntico e o reenvio com um único ambiente alterado
+
+Uso:
+    python -m benchmarks.bench_xml_cache [tamanho_mb] [ambientes] [rtt_ms]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from core.config import get_settings
+from modules.ambientes.promob import ler_xml_promob
+from modules.ambientes.services import AmbienteService
+
+USUARIO = {'loja_id': '00000000-0000-0000-0000-0000000000aa', 'id': 'u-1', 'perfil': 'VENDEDOR'}
+
+ITEM = ('<ITEM DESCRIPTION="Módulo {i}" QUANTITY="1" FAMILY="Unique" WIDTH="600" HEIGHT="720" DEPTH="550">'
+        '<PRICE UNIT="{v}" TOTAL="{v}"/><ITEMS>'
+        '<ITEM DESCRIPTION="Dobradiça com amortecedor"><PRICE TOTAL="12.30"/></ITEM>'
+        '</ITEMS></ITEM>\n')
+
+
+class RepositorioLatencia:
+    """Repositório em memória que espera `rtt` segundos por round-trip"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.linhas = {}
+
+    async def criar_ambientes_em_lote(self, lista, loja_id):
+        await asyncio.sleep(self.rtt)
+        criados = []
+        for dados in lista:
+            linha = {**dados, 'id': f'00000000-0000-0000-0000-{len(self.linhas):012d}', 'loja_id': loja_id,
+                     'created_at': '2026-01-01T00:00:00+00:00'}
+            self.linhas[linha['id']] = linha
+            criados.append(linha)
+        return criados
+
+    async def buscar_ambientes_por_ids(self, ids, loja_id):
+        await asyncio.sleep(self.rtt)
+        return [self.linhas[i] for i in ids if i in self.linhas]
+
+
+def gerar_xml(caminho: str, tamanho_mb: int, ambientes: int, alterado: int = -1) -> None:
+    """XML com `ambientes` blocos; o bloco `alterado` recebe um preço diferente"""
+    por_ambiente = tamanho_mb * 1024 * 1024 // ambientes
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write('<?xml version="1.0" encoding="UTF-8"?>\n<LISTING><AMBIENTS>\n')
+        for ambiente in range(ambientes):
+            arquivo.write(f'<AMBIENT DESCRIPTION="Ambiente {ambiente}"><CATEGORIES><CATEGORY DESCRIPTION="Armários"><ITEMS>\n')
+            escritos = item = 0
+            while escritos < por_ambiente:
+                valor = f"{100 + item % 900}.50" if not (ambiente == alterado and item == 0) else "999.99"
+                linha = ITEM.format(i=item, v=valor)
+                arquivo.write(linha)
+                escritos += len(linha)
+                item += 1
+            arquivo.write('</ITEMS></CATEGORY></CATEGORIES></AMBIENT>\n')
+        arquivo.write('</AMBIENTS><CUSTOMERSDATA><DATA ID="nomecliente" VALUE="Cliente Benchmark"/></CUSTOMERSDATA></LISTING>\n')
+
+
+async def importar(service: AmbienteService, caminho: str):
+    inicio = time.perf_counter()
+    with open(caminho, "rb") as arquivo:
+        resultado = await service.importar_xml(arquivo, os.path.basename(caminho), USUARIO)
+    return time.perf_counter() - inicio, resultado
+
+
+async def main():
+    tamanho_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    ambientes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rtt = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000
+    get_settings().max_file_size_mb = tamanho_mb + 1
+
+    with tempfile.TemporaryDirectory() as pasta:
+        original = os.path.join(pasta, "projeto.xml")
+        revisado = os.path.join(pasta, "projeto-v2.xml")
+        gerar_xml(original, tamanho_mb, ambientes)
+        gerar_xml(revisado, tamanho_mb, ambientes, alterado=ambientes // 2)
+
+        inicio = time.perf_counter()
+        with open(original, "rb") as arquivo:
+            ler_xml_promob(arquivo, 1024 * 1024 * 1024)
+        parse_completo = time.perf_counter() - inicio + rtt  # + 1 insert
+
+        service = AmbienteService.__new__(AmbienteService)
+        service.repository = RepositorioLatencia(rtt)
+
+        print(f"XML de {tamanho_mb}MB com {ambientes} ambientes, RTT {rtt * 1000:.0f}ms")
+        print(f"{'envio':28} {'antes':>9} {'depois':>9} {'blocos sem parse':>17} {'linhas reaproveitadas':>22}")
+        for descricao, caminho in (("primeiro envio", original), ("reenvio idêntico", original),
+                                   ("reenvio, 1 ambiente alterado", revisado)):
+            tempo, resultado = await importar(service, caminho)
+            linhas = f"{resultado.ambientes_reaproveitados}/{len(resultado.ambientes)}"
+            print(f"{descricao:28} {parse_completo:8.2f}s {tempo:8.2f}s "
+                  f"{resultado.taxa_reaproveitamento:>17.0%} {linhas:>22}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
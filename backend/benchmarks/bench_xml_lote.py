@@ -0,0 +1,90 @@
+"""
+Benchmark: importação de vários XMLs do Promob em lote.
+
+Compara, com repositório em memória e cache vazio a cada rodada:
+- antes: um arquivo após o outro com AmbienteService.importar_xml (parse em thread)
+- depois: AmbienteService.importar_xmls com o pool de processos em 1, 2 e 4 processos
+
+O ganho depende das CPUs livres: com um único núcleo os processos apenas
+se revezam e o lote não fica mais rápido.
+
+Uso:
+    python -m benchmarks.bench_xml_lote [arquivos] [tamanho_mb]
+"""
+
+import asyncio
+import importlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from core.config import get_settings
+from modules.ambientes import cache_xml, services
+from modules.ambientes.cache_xml import CacheBlocosXml
+from modules.ambientes.services import AmbienteService
+
+from .bench_xml_cache import USUARIO, RepositorioLatencia, gerar_xml
+
+
+def servico() -> AmbienteService:
+    cache_xml._cache_xml = CacheBlocosXml(max_entradas=10000, ttl_seconds=600)
+    service = AmbienteService.__new__(AmbienteService)
+    service.repository = RepositorioLatencia(0)
+    return service
+
+
+async def sequencial(caminhos) -> float:
+    service = servico()
+    inicio = time.perf_counter()
+    for caminho in caminhos:
+        with open(caminho, "rb") as arquivo:
+            await service.importar_xml(arquivo, os.path.basename(caminho), USUARIO)
+    return time.perf_counter() - inicio
+
+
+async def em_processos(caminhos, processos: int):
+    pool = ProcessPoolExecutor(
+        max_workers=processos, mp_context=multiprocessing.get_context("spawn"),
+        initializer=importlib.import_module, initargs=("modules.ambientes.promob",)
+    )
+    # Sobe os processos (e os imports) fora da medição, como no servidor já aquecido
+    for tarefa in [pool.submit(time.sleep, 0.5) for _ in range(processos)]:
+        tarefa.result()
+    services.get_pool_processos = lambda: pool
+    get_settings().jobs_processos = processos
+    try:
+        service = servico()
+        inicio = time.perf_counter()
+        lote = await service.importar_xmls(caminhos, [os.path.basename(c) for c in caminhos], USUARIO)
+        return time.perf_counter() - inicio, lote
+    finally:
+        pool.shutdown()
+
+
+async def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    tamanho_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    get_settings().max_file_size_mb = tamanho_mb + 1
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminhos = []
+        for numero in range(quantidade):
+            caminho = os.path.join(pasta, f"ambiente-{numero}.xml")
+            gerar_xml(caminho, tamanho_mb, numero + 1)  # blocos distintos entre arquivos: sem acerto de cache
+            caminhos.append(caminho)
+
+        print(f"{quantidade} XMLs de {tamanho_mb}MB, {os.cpu_count()} CPUs")
+        base = await sequencial(caminhos)
+        print(f"{'modo':22} {'tempo':>8} {'speedup':>8} {'leitura média/arquivo':>22}")
+        print(f"{'sequencial (thread)':22} {base:7.2f}s {1:7.2f}x {base / quantidade * 1000:>20.0f}ms")
+        for processos in (1, 2, 4):
+            tempo, lote = await em_processos(caminhos, processos)
+            leitura = sum(arquivo.tempo_leitura_ms for arquivo in lote.arquivos) / quantidade
+            print(f"{f'{processos} processos':22} {tempo:7.2f}s {base / tempo:7.2f}x {leitura:>20.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark: leitura do XML do Promob (memória e tempo por tamanho de arquivo).
+
+Compara, para XMLs sintéticos de tamanhos crescentes:
+- antes: documento inteiro em memória (etree.parse + soma dos itens)
+- depois: ler_xml_promob (iterparse, itens descartados após somados)
+
+O pico de memória (RSS) é medido em um subprocesso novo por execução, já que
+as alocações do libxml2 não aparecem no tracemalloc.
+
+Uso:
+    python -m benchmarks.bench_xml_promob [tamanhos_mb...]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+ITEM = ('<ITEM DESCRIPTION="Módulo {i}" QUANTITY="1" FAMILY="Unique" WIDTH="600" HEIGHT="720" DEPTH="550">'
+        '<PRICE UNIT="{v}" TOTAL="{v}"/><ITEMS>'
+        '<ITEM DESCRIPTION="Dobradiça com amortecedor"><PRICE TOTAL="12.30"/></ITEM>'
+        '<ITEM DESCRIPTION="Puxador perfil alumínio"><PRICE TOTAL="25.90"/></ITEM>'
+        '</ITEMS></ITEM>\n')
+
+
+def gerar_xml(caminho: str, tamanho_mb: int) -> int:
+    """Escreve um XML com ~tamanho_mb MB em 4 ambientes; devolve a quantidade de itens"""
+    alvo = tamanho_mb * 1024 * 1024
+    itens = 0
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write('<?xml version="1.0" encoding="UTF-8"?>\n<LISTING><AMBIENTS>\n')
+        for ambiente in ("Cozinha", "Closet", "Lavanderia", "Dormitório"):
+            arquivo.write(f'<AMBIENT DESCRIPTION="{ambiente}"><CATEGORIES><CATEGORY DESCRIPTION="Armários"><ITEMS>\n')
+            limite = alvo // 4
+            escritos = 0
+            while escritos < limite:
+                linha = ITEM.format(i=itens, v=f"{100 + itens % 900}.50")
+                arquivo.write(linha)
+                escritos += len(linha)
+                itens += 1
+            arquivo.write('</ITEMS></CATEGORY></CATEGORIES></AMBIENT>\n')
+        arquivo.write('</AMBIENTS><CUSTOMERSDATA><DATA ID="nomecliente" VALUE="Cliente Benchmark"/></CUSTOMERSDATA></LISTING>\n')
+    return itens
+
+
+def medir(modo: str, caminho: str) -> None:
+    """Executado no subprocesso: lê o arquivo e imprime tempo, RSS e total"""
+    from lxml import etree
+    from modules.ambientes.promob import ler_xml_promob
+
+    inicio = time.perf_counter()
+    if modo == "antes":
+        raiz = etree.parse(caminho).getroot()
+        total = sum(Decimal(preco.get("TOTAL")) for preco in raiz.xpath("//AMBIENT/CATEGORIES/CATEGORY/ITEMS/ITEM/PRICE"))
+    else:
+        with open(caminho, "rb") as arquivo:
+            resultado = ler_xml_promob(arquivo, 1024 * 1024 * 1024)
+        total = sum(ambiente.valor_total for ambiente in resultado.ambientes)
+    tempo = time.perf_counter() - inicio
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{tempo:.2f} {pico_mb:.0f} {total}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--medir":
+        medir(sys.argv[2], sys.argv[3])
+        return
+
+    tamanhos = [int(t) for t in sys.argv[1:]] or [5, 20, 50]
+    print(f"{'arquivo':>8} {'itens':>8} {'antes':>18} {'depois':>18}")
+    with tempfile.TemporaryDirectory() as pasta:
+        for tamanho in tamanhos:
+            caminho = os.path.join(pasta, f"promob_{tamanho}mb.xml")
+            itens = gerar_xml(caminho, tamanho)
+            colunas = []
+            totais = set()
+            for modo in ("antes", "depois"):
+                saida = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_xml_promob", "--medir", modo, caminho],
+                    capture_output=True, text=True, check=True
+                ).stdout.split()
+                tempo, pico, total = saida[-3:]
+                totais.add(Decimal(total))
+                colunas.append(f"{float(tempo):5.2f}s {int(pico):5d}MB RSS")
+            assert len(totais) == 1, f"totais divergentes: {totais}"
+            print(f"{tamanho:>6}MB {itens:>8} {colunas[0]:>18} {colunas[1]:>18}")
+
+
+if __name__ == "__main__":
+    main()
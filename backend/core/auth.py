@@ -5,11 +5,16 @@ Implementa JWT com Supabase Auth e middleware para RLS.
 
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.datastructures import Headers
 from jose import JWTError, jwt
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+from collections import OrderedDict
 from core.config import get_settings, Settings
 from enum import Enum
+import threading
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -34,9 +39,103 @@ class AuthException(Exception):
         super().__init__(self.message)
 
 
+class CacheTokensVerificados:
+    """
+    LRU de tokens já verificados → claims decodificadas.
+    
+    A verificação HMAC do jose é feita uma vez por token; requisições
+    seguintes com o mesmo token reaproveitam as claims até o `exp`.
+    A chave é o SHA-256 do escopo de verificação (algoritmo e segredo) com o
+    token (nenhum dos dois fica em memória): após a troca de JWT_SECRET_KEY
+    os tokens verificados com o segredo anterior não são mais encontrados.
+    Apenas tokens válidos e com `exp` numérico entram no cache.
+    
+    Args:
+        max_entradas: Limite de tokens em cache (0 desativa o cache)
+        relogio: Função de tempo em epoch seconds (injetável para testes)
+    """
+    
+    def __init__(self, max_entradas: int, relogio=time.time):
+        self.max_entradas = max_entradas
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _chave(token: str, escopo: str) -> bytes:
+        return hashlib.sha256(f"{escopo}\0{token}".encode()).digest()
+    
+    def obter(self, token: str, escopo: str = "") -> Optional[Dict[str, Any]]:
+        """Retorna as claims em cache ou None (miss ou token expirado)"""
+        chave = self._chave(token, escopo)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[1] > self._relogio():
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return entrada[0]
+            
+            if entrada is not None:
+                del self._entradas[chave]
+            self.misses += 1
+            return None
+    
+    def armazenar(self, token: str, payload: Dict[str, Any], escopo: str = "") -> None:
+        """Guarda as claims de um token válido até o seu `exp` (sem `exp` numérico, não guarda)"""
+        if self.max_entradas <= 0:
+            return
+        try:
+            expira_em = float(payload.get("exp"))
+        except (TypeError, ValueError):
+            return
+        chave = self._chave(token, escopo)
+        with self._lock:
+            self._entradas[chave] = (payload, expira_em)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.evictions += 1
+    
+    def limpar(self) -> None:
+        """Descarta todos os tokens (ex.: troca de JWT_SECRET_KEY)"""
+        with self._lock:
+            self._entradas.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Contadores do cache (expostos no /health)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entradas),
+                "max_entries": self.max_entradas,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions
+            }
+
+
+# Instância global do cache de tokens
+_cache_tokens: Optional[CacheTokensVerificados] = None
+
+
+def get_cache_tokens() -> CacheTokensVerificados:
+    """Retorna o cache global de tokens verificados, criando-o sob demanda"""
+    global _cache_tokens
+    
+    if _cache_tokens is None:
+        _cache_tokens = CacheTokensVerificados(get_settings().jwt_cache_max_entries)
+    
+    return _cache_tokens
+
+
 def decode_jwt_token(token: str, settings: Settings) -> Dict[str, Any]:
     """
     Decodifica e valida um token JWT.
+    Tokens já verificados são servidos do cache até expirarem.
     
     Args:
         token: Token JWT para decodificar
@@ -48,6 +147,12 @@ def decode_jwt_token(token: str, settings: Settings) -> Dict[str, Any]:
     Raises:
         AuthException: Se o token for inválido
     """
+    cache = get_cache_tokens()
+    escopo = f"{settings.jwt_algorithm}:{settings.jwt_secret_key}"
+    payload = cache.obter(token, escopo)
+    if payload is not None:
+        return dict(payload)
+    
     try:
         payload = jwt.decode(
             token,
@@ -63,8 +168,11 @@ def decode_jwt_token(token: str, settings: Settings) -> Dict[str, Any]:
         if not user_id:
             raise AuthException("Token sem identificação de usuário")
         
-        return payload
+        cache.armazenar(token, payload, escopo)
+        return dict(payload)
         
+    except AuthException:
+        raise
     except JWTError as e:
         logger.warning(f"Token JWT inválido: {e}")
         raise AuthException("Token inválido ou expirado")
@@ -73,13 +181,27 @@ def decode_jwt_token(token: str, settings: Settings) -> Dict[str, Any]:
         raise AuthException("Erro interno de autenticação")
 
 
+def _dados_usuario(payload: Dict[str, Any], token: str) -> Dict[str, Any]:
+    """Extrai do payload os dados do usuário usados pelas rotas"""
+    return {
+        "user_id": payload.get("sub"),
+        "loja_id": payload.get("loja_id"),
+        "perfil": payload.get("perfil"),
+        "email": payload.get("email"),
+        "nome": payload.get("nome", ""),
+        "token": token  # Mantém token para operações com Supabase
+    }
+
+
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     settings: Settings = Depends(get_settings)
 ) -> Dict[str, Any]:
     """
     Dependency injection para obter o usuário autenticado.
-    Valida o token JWT e retorna os dados do usuário.
+    Reaproveita o usuário já validado pelo AuthMiddleware (scope["user"]);
+    sem middleware, valida o token JWT aqui.
     
     Returns:
         Dados do usuário autenticado incluindo:
@@ -93,17 +215,12 @@ async def get_current_user(
     """
     try:
         token = credentials.credentials
-        payload = decode_jwt_token(token, settings)
         
-        # Extrai dados essenciais do payload
-        user_data = {
-            "user_id": payload.get("sub"),
-            "loja_id": payload.get("loja_id"),
-            "perfil": payload.get("perfil"),
-            "email": payload.get("email"),
-            "nome": payload.get("nome", ""),
-            "token": token  # Mantém token para operações com Supabase
-        }
+        user_data = request.scope.get("user")
+        if not user_data or user_data.get("token") != token:
+            user_data = _dados_usuario(decode_jwt_token(token, settings), token)
+        else:
+            user_data = dict(user_data)
         
         # Validações obrigatórias
         if not user_data["loja_id"]:
@@ -184,38 +301,39 @@ class AuthMiddleware:
     
     async def __call__(self, scope, receive, send):
         if scope["type"] == "http":
-            request = Request(scope, receive)
-            
-            # Extrai token se presente
-            auth_header = request.headers.get("authorization")
-            if auth_header and auth_header.startswith("Bearer "):
-                token = auth_header.split(" ")[1]
-                
-                try:
-                    settings = get_settings()
-                    payload = decode_jwt_token(token, settings)
-                    
-                    # Adiciona dados do usuário ao escopo da requisição
-                    scope["user"] = {
-                        "user_id": payload.get("sub"),
-                        "loja_id": payload.get("loja_id"),
-                        "perfil": payload.get("perfil"),
-                        "token": token
-                    }
-                    
-                except AuthException:
-                    # Token inválido - continua sem usuário
-                    scope["user"] = None
+            autenticar_scope(scope)
         
         await self.app(scope, receive, send)
 
 
+def autenticar_scope(scope) -> None:
+    """
+    Valida o Bearer token (se presente) e grava o usuário em scope["user"],
+    reutilizado por get_current_user. Token inválido → scope["user"] = None.
+    """
+    # Extrai token se presente (sem construir Request)
+    auth_header = Headers(scope=scope).get("authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        token = auth_header.split(" ")[1]
+        
+        try:
+            settings = get_settings()
+            payload = decode_jwt_token(token, settings)
+            
+            # Adiciona dados do usuário ao escopo da requisição
+            scope["user"] = _dados_usuario(payload, token)
+            
+        except AuthException:
+            # Token inválido - continua sem usuário
+            scope["user"] = None
+
+
 def get_optional_user(request: Request) -> Optional[Dict[str, Any]]:
     """
     Obtém usuário opcional (não obrigatório).
     Útil para endpoints que funcionam com ou sem autenticação.
     """
-    return getattr(request.scope, "user", None)
+    return request.scope.get("user")
 
 
 def create_access_token(user_data: Dict[str, Any], settings: Settings) -> str:
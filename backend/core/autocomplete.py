@@ -0,0 +1,328 @@
+"""
+Autocomplete (typeahead) de clientes com índice de prefixos em memória.
+
+A cada tecla o frontend pede sugestões; uma busca ilike por requisição
+sobrecarrega o banco. Aqui cada loja tem arrays ordenados de chaves
+normalizadas, consultados com bisect (O(log n) + tamanho da resposta):
+- sufixos por palavra do nome sem acento ('joao da silva', 'da silva',
+  'silva'): 'sil' e 'joao' encontram 'João da Silva'
+- dígitos do telefone, com e sem DDD: '9876' e '11987' encontram
+  '(11) 98765-4321'
+
+As sugestões saem direto da memória (sem round-trip). O índice é atualizado
+pelas escritas do próprio processo, reconstruído após
+AUTOCOMPLETE_INDICE_TTL_SECONDS (escritas de outros workers) e limitado a
+AUTOCOMPLETE_MAX_CLIENTES_POR_LOJA documentos (os mais antigos saem primeiro);
+a quantidade de lojas em memória é limitada pelo RegistroIndices (LRU).
+"""
+
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from core.busca import MIN_DIGITOS, apenas_digitos, normalizar
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Palavras do nome que viram chave de sufixo (nomes muito longos não crescem o índice)
+MAX_PALAVRAS_NOME = 5
+
+# Entradas percorridas por consulta: prefixos curtos ('a') não varrem a loja inteira
+MAX_VARREDURA = 2000
+
+# Telefones com DDD: também indexados sem os 2 primeiros dígitos
+MIN_DIGITOS_COM_DDD = 10
+
+
+def _sufixos_nome(nome_normalizado: str) -> List[str]:
+    palavras = nome_normalizado.split()[:MAX_PALAVRAS_NOME]
+    return [" ".join(palavras[i:]) for i in range(len(palavras))]
+
+
+def _chaves_telefone(digitos: str) -> List[str]:
+    if not digitos:
+        return []
+    if len(digitos) >= MIN_DIGITOS_COM_DDD:
+        return [digitos, digitos[2:]]
+    return [digitos]
+
+
+class IndicePrefixos:
+    """
+    Índice de prefixos (arrays ordenados + bisect) sobre nome e telefone.
+
+    Args:
+        max_documentos: Limite de clientes no índice; ao exceder, os mais antigos saem
+    """
+
+    def __init__(self, max_documentos: int):
+        self.max_documentos = max_documentos
+        # id → (nome, telefone, nome normalizado, dígitos do telefone)
+        self._documentos: Dict[str, Tuple[Any, Any, str, str]] = {}
+        self._nomes: List[Tuple[str, str]] = []
+        self._telefones: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._documentos)
+
+    def _entradas(self, doc_id: str, linha: Dict[str, Any]):
+        nome = normalizar(linha.get("nome"))
+        telefone = apenas_digitos(linha.get("telefone"))
+        documento = (linha.get("nome"), linha.get("telefone"), nome, telefone)
+        nomes = [(chave, doc_id) for chave in _sufixos_nome(nome)]
+        telefones = [(chave, doc_id) for chave in _chaves_telefone(telefone)]
+        return documento, nomes, telefones
+
+    def adicionar(self, doc_id: Any, linha: Dict[str, Any]) -> None:
+        """Indexa (ou reindexa) um cliente"""
+        doc_id = str(doc_id)
+        self.remover(doc_id)
+
+        documento, nomes, telefones = self._entradas(doc_id, linha)
+        self._documentos[doc_id] = documento
+        for entrada in nomes:
+            self._nomes.insert(bisect_left(self._nomes, entrada), entrada)
+        for entrada in telefones:
+            self._telefones.insert(bisect_left(self._telefones, entrada), entrada)
+
+        while len(self._documentos) > self.max_documentos:
+            self.remover(next(iter(self._documentos)))
+
+    def adicionar_lote(self, linhas: Iterable[Dict[str, Any]]) -> None:
+        """
+        Carga inicial (índice vazio): acumula as entradas e ordena uma única vez
+
+        Args:
+            linhas: Clientes (id, nome, telefone) em ordem de criação, mais
+                antigos primeiro; acima do limite ficam os últimos da sequência
+        """
+        for linha in linhas:
+            doc_id = str(linha["id"])
+            if doc_id in self._documentos:
+                continue
+            documento, nomes, telefones = self._entradas(doc_id, linha)
+            self._documentos[doc_id] = documento
+            self._nomes.extend(nomes)
+            self._telefones.extend(telefones)
+
+        excedentes = len(self._documentos) - self.max_documentos
+        if excedentes > 0:
+            descartados = set()
+            for doc_id in list(self._documentos)[:excedentes]:
+                del self._documentos[doc_id]
+                descartados.add(doc_id)
+            self._nomes = [e for e in self._nomes if e[1] not in descartados]
+            self._telefones = [e for e in self._telefones if e[1] not in descartados]
+            logger.warning(f"Autocomplete limitado a {self.max_documentos} clientes ({excedentes} mais antigos fora do índice)")
+
+        self._nomes.sort()
+        self._telefones.sort()
+
+    def remover(self, doc_id: Any) -> bool:
+        """Remove um cliente do índice (True se existia)"""
+        doc_id = str(doc_id)
+        documento = self._documentos.pop(doc_id, None)
+        if documento is None:
+            return False
+
+        _, _, nome, telefone = documento
+        for entradas, chaves in ((self._nomes, _sufixos_nome(nome)), (self._telefones, _chaves_telefone(telefone))):
+            for chave in chaves:
+                posicao = bisect_left(entradas, (chave, doc_id))
+                if posicao < len(entradas) and entradas[posicao] == (chave, doc_id):
+                    del entradas[posicao]
+        return True
+
+    def _tamanho_faixa(self, entradas: List[Tuple[str, str]], prefixo: str) -> int:
+        return bisect_left(entradas, (prefixo + "\uffff",)) - bisect_left(entradas, (prefixo,))
+
+    def _faixa(self, entradas: List[Tuple[str, str]], prefixo: str):
+        """Entradas cuja chave começa com o prefixo (no máximo MAX_VARREDURA)"""
+        posicao = bisect_left(entradas, (prefixo,))
+        fim = min(len(entradas), posicao + MAX_VARREDURA)
+        while posicao < fim and entradas[posicao][0].startswith(prefixo):
+            yield entradas[posicao]
+            posicao += 1
+
+    def sugerir(self, q: str, limite: int = 10) -> List[Dict[str, Any]]:
+        """
+        Sugestões para o termo digitado.
+
+        Nome começando pelo termo vem antes de palavra do meio começando pelo
+        termo; em cada grupo, ordem alfabética da chave.
+
+        Args:
+            q: Termo digitado (parte do nome ou do telefone)
+            limite: Máximo de sugestões
+
+        Returns:
+            Lista de {id, nome, telefone}
+        """
+        termo = normalizar(q)
+        digitos = apenas_digitos(q)
+        # dicts como conjuntos ordenados (um cliente aparece uma vez)
+        inicio_do_nome: Dict[str, None] = {}
+        meio_do_nome: Dict[str, None] = {}
+
+        if digitos and termo.replace(" ", "") == digitos:
+            if len(digitos) >= MIN_DIGITOS:
+                for _, doc_id in self._faixa(self._telefones, digitos):
+                    inicio_do_nome[doc_id] = None
+                    if len(inicio_do_nome) >= limite:
+                        break
+        elif termo:
+            palavras = termo.split()
+            # A palavra com a menor faixa no índice guia a varredura; as
+            # demais precisam ser prefixo de alguma palavra do nome
+            guia = min(palavras, key=lambda p: self._tamanho_faixa(self._nomes, p))
+            outras = [f" {p}" for p in palavras if p != guia]
+            for chave, doc_id in self._faixa(self._nomes, guia):
+                nome = f" {self._documentos[doc_id][2]}"
+                if not all(p in nome for p in outras):
+                    continue
+                if nome.startswith(f" {palavras[0]}"):
+                    inicio_do_nome[doc_id] = None
+                    if len(inicio_do_nome) >= limite:
+                        break
+                else:
+                    meio_do_nome[doc_id] = None
+
+        ids = list(inicio_do_nome) + [doc_id for doc_id in meio_do_nome if doc_id not in inicio_do_nome]
+        return [
+            {"id": doc_id, "nome": self._documentos[doc_id][0], "telefone": self._documentos[doc_id][1]}
+            for doc_id in ids[:limite]
+        ]
+
+
+class RegistroIndices:
+    """
+    Índices em memória por chave (ex.: 'clientes:<loja_id>').
+
+    Guarda qualquer índice com adicionar/remover/__len__ (IndicePrefixos).
+
+    Args:
+        max_indices: Quantidade máxima de índices mantidos (LRU)
+        ttl_seconds: Idade máxima de um índice antes de ser reconstruído
+        relogio: Função de tempo monotônico (injetável para testes)
+    """
+
+    def __init__(self, max_indices: int, ttl_seconds: int, relogio: Callable[[], float] = time.monotonic):
+        self.max_indices = max_indices
+        self.ttl_seconds = ttl_seconds
+        self._relogio = relogio
+        self._indices: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.construcoes = 0
+        self.hits = 0
+        self.descartes = 0
+
+    def _valido(self, chave: str) -> Optional[Any]:
+        entrada = self._indices.get(chave)
+        if entrada is None or entrada[1] <= self._relogio():
+            return None
+        self._indices.move_to_end(chave)
+        return entrada[0]
+
+    async def obter(self, chave: str, construir: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Índice da chave, construído (uma vez, mesmo com concorrência) se ausente ou expirado.
+
+        Args:
+            chave: Identificador do índice
+            construir: Corrotina que lê as linhas do banco e monta o índice
+        """
+        indice = self._valido(chave)
+        if indice is not None:
+            self.hits += 1
+            return indice
+
+        async with self._locks.setdefault(chave, asyncio.Lock()):
+            indice = self._valido(chave)
+            if indice is not None:
+                self.hits += 1
+                return indice
+
+            inicio = time.perf_counter()
+            indice = await construir()
+            self.construcoes += 1
+            logger.info(f"Índice de autocomplete '{chave}' construído: {len(indice)} registros "
+                        f"em {(time.perf_counter() - inicio) * 1000:.0f}ms")
+
+            self._indices[chave] = (indice, self._relogio() + self.ttl_seconds)
+            self._indices.move_to_end(chave)
+            while len(self._indices) > self.max_indices:
+                descartada, _ = self._indices.popitem(last=False)
+                self._locks.pop(descartada, None)
+                self.descartes += 1
+            return indice
+
+    def atualizar(self, chave: str, doc_id: Any, linha: Dict[str, Any]) -> None:
+        """Reindexa uma linha escrita pelo processo (no-op se o índice não está carregado)"""
+        entrada = self._indices.get(chave)
+        if entrada is not None:
+            entrada[0].adicionar(doc_id, linha)
+
+    def remover(self, chave: str, doc_id: Any) -> None:
+        """Remove uma linha excluída (no-op se o índice não está carregado)"""
+        entrada = self._indices.get(chave)
+        if entrada is not None:
+            entrada[0].remover(doc_id)
+
+    def invalidar(self, prefixo: str = "") -> int:
+        """Descarta índices cujas chaves começam com o prefixo (reconstruídos na próxima busca)"""
+        chaves = [chave for chave in self._indices if chave.startswith(prefixo)]
+        for chave in chaves:
+            del self._indices[chave]
+        return len(chaves)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores dos índices (expostos no /health)"""
+        return {
+            "indices": len(self._indices),
+            "max_indices": self.max_indices,
+            "documents": sum(len(indice) for indice, _ in self._indices.values()),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "builds": self.construcoes,
+            "evictions": self.descartes
+        }
+
+
+async def construir_indice_prefixos(lotes: Any, max_documentos: Optional[int] = None) -> IndicePrefixos:
+    """
+    Monta um IndicePrefixos a partir de lotes de linhas (ver core.exportacao.iterar_em_lotes).
+
+    Args:
+        lotes: Gerador assíncrono de listas de linhas (id, nome, telefone), mais recentes
+            primeiro (created_at DESC, como core.exportacao.iterar_em_lotes)
+        max_documentos: Limite de clientes (padrão: AUTOCOMPLETE_MAX_CLIENTES_POR_LOJA)
+    """
+    if max_documentos is None:
+        max_documentos = get_settings().autocomplete_max_clientes_por_loja
+    linhas: List[Dict[str, Any]] = []
+    async for lote in lotes:
+        linhas.extend(lote)
+    # Mais antigos primeiro: acima do limite, adicionar_lote descarta os antigos e mantém os recentes
+    linhas.reverse()
+    indice = IndicePrefixos(max_documentos)
+    indice.adicionar_lote(linhas)
+    return indice
+
+
+# Instância global
+_indices: Optional[RegistroIndices] = None
+
+
+def get_indices_autocomplete() -> RegistroIndices:
+    """Retorna o registro global de índices de autocomplete, criando-o sob demanda"""
+    global _indices
+
+    if _indices is None:
+        settings = get_settings()
+        _indices = RegistroIndices(settings.autocomplete_max_lojas, settings.autocomplete_indice_ttl_seconds)
+
+    return _indices
@@ -0,0 +1,167 @@
+"""
+Busca textual ranqueada (parâmetro q=) no banco, sobre chaves normalizadas com pg_trgm.
+
+Os filtros de listagem usavam ilike('%termo%') nas colunas originais: o
+curinga inicial impede o uso de índices b-tree, acentos diferenciam 'João' de
+'joao' e '(11) 98765-4321' não contém '987654321'. Cada tabela pesquisável
+(c_clientes, cad_empresas, c_lojas) ganha duas colunas geradas pelo banco,
+com a mesma normalização de normalizar()/apenas_digitos(), e índices GIN de
+trigramas, que atendem ILIKE '%termo%' sem varrer a tabela:
+
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE EXTENSION IF NOT EXISTS unaccent;
+
+    CREATE OR REPLACE FUNCTION busca_normalizar(texto text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT trim(regexp_replace(lower(public.unaccent('public.unaccent', coalesce(texto, ''))),
+                                   '[^a-z0-9]+', ' ', 'g'))
+    $$;
+
+    -- c_clientes: nome, email, cidade / telefone, cpf_cnpj
+    ALTER TABLE c_clientes
+        ADD COLUMN IF NOT EXISTS busca_texto text GENERATED ALWAYS AS (
+            busca_normalizar(concat_ws(' ', nome, email, cidade))) STORED,
+        ADD COLUMN IF NOT EXISTS busca_digitos text GENERATED ALWAYS AS (
+            concat_ws(' ', regexp_replace(telefone, '\\D', '', 'g'),
+                           regexp_replace(cpf_cnpj, '\\D', '', 'g'))) STORED;
+    CREATE INDEX IF NOT EXISTS idx_c_clientes_busca_texto
+        ON c_clientes USING gin (busca_texto gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS idx_c_clientes_busca_digitos
+        ON c_clientes USING gin (busca_digitos gin_trgm_ops);
+
+    -- cad_empresas: nome, email / cnpj, telefone (mesmo molde)
+    -- c_lojas: nome, codigo, email / telefone (mesmo molde)
+
+O banco devolve até BUSCA_MAX_CANDIDATOS linhas (mais recentes primeiro) que
+contêm todas as palavras do termo ou os seus dígitos; a aplicação ranqueia
+esses candidatos pelos campos de cada tabela (início do campo > início de
+palavra > meio) e pagina. Os resultados são sempre os dados atuais do banco,
+sem cópia da tabela em memória.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import re
+import unicodedata
+
+from core.paginacao import filtro_or
+
+logger = logging.getLogger(__name__)
+
+_NAO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+_NAO_DIGITO = re.compile(r"\D+")
+
+# Colunas geradas no banco (ver docstring do módulo)
+COLUNA_TEXTO = "busca_texto"
+COLUNA_DIGITOS = "busca_digitos"
+
+# Termos com menos dígitos que isso não são tratados como telefone/documento
+MIN_DIGITOS = 3
+
+# Palavras do termo usadas no filtro (termos muito longos não viram N condições)
+MAX_PALAVRAS_TERMO = 5
+
+
+def normalizar(texto: Any) -> str:
+    """Chave de busca: sem acentos, minúsculas, só letras/dígitos separados por espaço"""
+    if texto is None:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    sem_acento = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return _NAO_ALFANUMERICO.sub(" ", sem_acento.lower()).strip()
+
+
+def apenas_digitos(texto: Any) -> str:
+    """Chave de telefone/documento: apenas os dígitos"""
+    return _NAO_DIGITO.sub("", str(texto)) if texto is not None else ""
+
+
+def aplicar_busca(query: Any, q: str) -> Optional[Any]:
+    """
+    Restringe a query às linhas que contêm o termo nas colunas de busca.
+
+    Todas as palavras do termo (sem acento) em busca_texto, ou os dígitos do
+    termo (3 ou mais) em busca_digitos. O termo normalizado só tem [a-z0-9 ],
+    então não precisa de escape no filtro do PostgREST.
+
+    Args:
+        query: Query do PostgREST (já com RLS e filtros da listagem)
+        q: Termo digitado
+
+    Returns:
+        Query filtrada ou None se o termo não tem letras nem dígitos suficientes
+    """
+    palavras = normalizar(q).split()[:MAX_PALAVRAS_TERMO]
+    digitos = apenas_digitos(q)
+
+    condicoes = []
+    if palavras:
+        texto = [f"{COLUNA_TEXTO}.ilike.*{palavra}*" for palavra in palavras]
+        condicoes.append(texto[0] if len(texto) == 1 else f"and({','.join(texto)})")
+    if len(digitos) >= MIN_DIGITOS:
+        condicoes.append(f"{COLUNA_DIGITOS}.ilike.*{digitos}*")
+    if not condicoes:
+        return None
+
+    return filtro_or(query, ",".join(condicoes))
+
+
+def _pontuar_texto(valor: Any, termo: str, palavras: List[str]) -> float:
+    chave = normalizar(valor)
+    if not chave or not all(palavra in chave for palavra in palavras):
+        return 0.0
+    if chave.startswith(termo):
+        return 1.5
+    if f" {termo}" in f" {chave}":
+        return 1.25
+    return 1.0
+
+
+def ranquear(
+    linhas: Iterable[Dict[str, Any]],
+    q: str,
+    campos_texto: Dict[str, float],
+    campos_digitos: Optional[Dict[str, float]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Ordena os candidatos devolvidos pelo banco por relevância.
+
+    Cada campo vale o seu peso vezes a qualidade do acerto (início do campo
+    1.5, início de palavra 1.25, meio 1.0; dígitos 1.5, ou 2.0 no início/fim).
+    Empates mantêm a ordem do banco (mais recentes primeiro); candidatos
+    com as palavras espalhadas por campos diferentes ficam no fim.
+
+    Args:
+        linhas: Candidatos (já filtrados por aplicar_busca)
+        q: Termo digitado
+        campos_texto: Campo → peso (comparação sem acentos)
+        campos_digitos: Campo → peso (comparação só por dígitos)
+
+    Returns:
+        As mesmas linhas, mais relevantes primeiro
+    """
+    termo = " ".join(normalizar(q).split()[:MAX_PALAVRAS_TERMO])
+    palavras = termo.split()
+    digitos = apenas_digitos(q)
+
+    pontuadas = []
+    for posicao, linha in enumerate(linhas):
+        pontuacao = 0.0
+        if palavras:
+            for campo, peso in campos_texto.items():
+                pontuacao = max(pontuacao, peso * _pontuar_texto(linha.get(campo), termo, palavras))
+        if len(digitos) >= MIN_DIGITOS:
+            for campo, peso in (campos_digitos or {}).items():
+                chave = apenas_digitos(linha.get(campo))
+                if digitos in chave:
+                    bonus = 0.5 if chave.startswith(digitos) or chave.endswith(digitos) else 0.0
+                    pontuacao = max(pontuacao, peso * (1.5 + bonus))
+        pontuadas.append((-pontuacao, posicao, linha))
+
+    pontuadas.sort(key=lambda item: item[:2])
+    return [linha for _, _, linha in pontuadas]
+
+
+def colunas_indice(campos: Iterable[str]) -> str:
+    """Select mínimo para montar um índice em memória (inclui as colunas do keyset)"""
+    return ",".join(dict.fromkeys(["id", "created_at", *campos]))
@@ -19,15 +19,28 @@ class Settings(BaseSettings):
     debug: bool = Field(default=True, env="DEBUG")
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
     
+    # ===== LOGGING =====
+    log_format: str = Field(default="json", env="LOG_FORMAT")  # json ou texto
+    log_levels: str = Field(default="", env="LOG_LEVELS")  # ex.: "modules.orcamentos=DEBUG,httpx=WARNING"
+    log_sample_rate_2xx: float = Field(default=0.1, env="LOG_SAMPLE_RATE_2XX")
+    log_slow_request_ms: int = Field(default=1000, env="LOG_SLOW_REQUEST_MS")
+    log_queue_size: int = Field(default=10000, env="LOG_QUEUE_SIZE")
+    log_budget_us: int = Field(default=50, env="LOG_BUDGET_US")
+    
     # ===== SUPABASE =====
     supabase_url: str = Field(default="", env="SUPABASE_URL")
     supabase_anon_key: str = Field(default="", env="SUPABASE_ANON_KEY")
     supabase_service_key: str = Field(default="", env="SUPABASE_SERVICE_KEY")
+    # JWT secret do projeto Supabase: assina os tokens curtos repassados ao PostgREST
+    # (vazio = queries com a chave do cliente, sem claims do usuário)
+    supabase_jwt_secret: str = Field(default="", env="SUPABASE_JWT_SECRET")
+    supabase_jwt_ttl_seconds: int = Field(default=300, env="SUPABASE_JWT_TTL_SECONDS")
     
     # ===== JWT =====
     jwt_secret_key: str = Field(default="development-secret-key", env="JWT_SECRET_KEY")
     jwt_algorithm: str = Field(default="HS256", env="JWT_ALGORITHM")
     jwt_access_token_expire_minutes: int = Field(default=60, env="JWT_ACCESS_TOKEN_EXPIRE_MINUTES")
+    jwt_cache_max_entries: int = Field(default=10000, env="JWT_CACHE_MAX_ENTRIES")
     
     # ===== CORS =====
     cors_origins: str = Field(
@@ -42,6 +55,39 @@ class Settings(BaseSettings):
     # ===== DATABASE =====
     db_pool_size: int = Field(default=10, env="DB_POOL_SIZE")
     db_max_overflow: int = Field(default=0, env="DB_MAX_OVERFLOW")
+    db_query_workers: int = Field(default=16, env="DB_QUERY_WORKERS")
+    slow_query_ms: int = Field(default=500, env="SLOW_QUERY_MS")
+    
+    # ===== CACHE =====
+    comissao_cache_ttl_seconds: int = Field(default=300, env="COMISSAO_CACHE_TTL_SECONDS")
+    config_loja_cache_ttl_seconds: int = Field(default=60, env="CONFIG_LOJA_CACHE_TTL_SECONDS")
+    stats_cache_ttl_seconds: int = Field(default=30, env="STATS_CACHE_TTL_SECONDS")
+    
+    # ===== BUSCA =====
+    busca_max_candidatos: int = Field(default=500, env="BUSCA_MAX_CANDIDATOS")
+    autocomplete_indice_ttl_seconds: int = Field(default=120, env="AUTOCOMPLETE_INDICE_TTL_SECONDS")
+    autocomplete_max_lojas: int = Field(default=128, env="AUTOCOMPLETE_MAX_LOJAS")
+    autocomplete_max_clientes_por_loja: int = Field(default=100000, env="AUTOCOMPLETE_MAX_CLIENTES_POR_LOJA")
+    
+    # ===== EXPORTAÇÃO =====
+    export_batch_size: int = Field(default=1000, env="EXPORT_BATCH_SIZE")
+    
+    # ===== IMPORTAÇÃO =====
+    import_batch_size: int = Field(default=500, env="IMPORT_BATCH_SIZE")
+    import_max_file_size_mb: int = Field(default=50, env="IMPORT_MAX_FILE_SIZE_MB")
+    xml_cache_max_blocos: int = Field(default=2000, env="XML_CACHE_MAX_BLOCOS")
+    xml_cache_ttl_seconds: int = Field(default=86400, env="XML_CACHE_TTL_SECONDS")
+    xml_lote_max_arquivos: int = Field(default=20, env="XML_LOTE_MAX_ARQUIVOS")
+    
+    # ===== PROCESSAMENTO EM SEGUNDO PLANO =====
+    jobs_workers: int = Field(default=2, env="JOBS_WORKERS")
+    jobs_max_fila: int = Field(default=20, env="JOBS_MAX_FILA")
+    jobs_processos: int = Field(default=0, env="JOBS_PROCESSOS")
+    jobs_progresso_intervalo_seconds: float = Field(default=1.0, env="JOBS_PROGRESSO_INTERVALO_SECONDS")
+    xml_logs_store: str = Field(default="supabase", env="XML_LOGS_STORE")
+    
+    # ===== NUMERAÇÃO DE ORÇAMENTOS =====
+    numeracao_bloco_orcamentos: int = Field(default=10, env="NUMERACAO_BLOCO_ORCAMENTOS")
     
     @field_validator('cors_origins')
     @classmethod
@@ -0,0 +1,146 @@
+"""
+Instrumentação por query do Supabase (execute_query).
+
+Cada execução registra tabela, operação, formato dos filtros (colunas e
+operadores, sem valores), linhas retornadas e duração:
+- queries acima de SLOW_QUERY_MS geram WARNING com esses campos
+- com a requisição rastreada (RequisicaoMiddleware em modo debug), as
+  queries da requisição ficam disponíveis em X-Query-Count/X-Query-Time e
+  em GET /debug/queries/{request_id} (ADMIN_MASTER), com as repetidas
+  agrupadas (N+1)
+"""
+
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import logging
+
+from core.config import get_settings
+from core.metricas import descrever_query, get_metricas
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros do PostgREST que não são filtros
+_PARAMETROS_CONTROLE = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class RegistroConsulta:
+    """Uma execução de query"""
+
+    __slots__ = ("tabela", "operacao", "filtros", "linhas", "duracao_ms", "erro")
+
+    def __init__(self, tabela: str, operacao: str, filtros: str, linhas: Optional[int], duracao_ms: float, erro: bool):
+        self.tabela = tabela
+        self.operacao = operacao
+        self.filtros = filtros
+        self.linhas = linhas
+        self.duracao_ms = duracao_ms
+        self.erro = erro
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+def formato_filtros(query: Any) -> str:
+    """
+    Forma dos filtros sem os valores, ex.: 'loja_id=eq&created_at=gte&order&limit'.
+    Queries com o mesmo formato são a mesma consulta com parâmetros diferentes.
+    """
+    params = getattr(query, "params", None)
+    if not hasattr(params, "multi_items"):
+        return ""
+
+    partes = []
+    for chave, valor in params.multi_items():
+        if chave in _PARAMETROS_CONTROLE:
+            if chave != "select":
+                partes.append(chave)
+        elif chave in ("or", "and"):
+            partes.append(chave)
+        else:
+            pedacos = str(valor).split(".", 2)
+            operador = f"not.{pedacos[1]}" if pedacos[0] == "not" and len(pedacos) > 1 else pedacos[0]
+            partes.append(f"{chave}={operador}")
+    return "&".join(partes)
+
+
+# Queries da requisição corrente (lista criada pelo middleware; None = sem rastreio)
+consultas_requisicao_var: ContextVar[Optional[List[RegistroConsulta]]] = ContextVar("consultas_requisicao", default=None)
+
+
+class HistoricoConsultas:
+    """Últimas requisições rastreadas → queries (para GET /debug/queries)"""
+
+    def __init__(self, max_requisicoes: int = 200):
+        self.max_requisicoes = max_requisicoes
+        self._requisicoes: "OrderedDict[str, List[RegistroConsulta]]" = OrderedDict()
+
+    def guardar(self, request_id: str, consultas: List[RegistroConsulta]) -> None:
+        self._requisicoes[request_id] = consultas
+        while len(self._requisicoes) > self.max_requisicoes:
+            self._requisicoes.popitem(last=False)
+
+    def obter(self, request_id: str) -> Optional[List[RegistroConsulta]]:
+        return self._requisicoes.get(request_id)
+
+    def recentes(self) -> List[str]:
+        return list(reversed(self._requisicoes))
+
+
+def resumo_consultas(consultas: List[RegistroConsulta]) -> Dict[str, Any]:
+    """Lista das queries com totais e as repetidas agrupadas por formato (suspeitas de N+1)"""
+    grupos: Dict[tuple, Dict[str, Any]] = {}
+    for consulta in consultas:
+        chave = (consulta.tabela, consulta.operacao, consulta.filtros)
+        grupo = grupos.setdefault(chave, {"tabela": chave[0], "operacao": chave[1], "filtros": chave[2], "vezes": 0, "duracao_ms": 0.0})
+        grupo["vezes"] += 1
+        grupo["duracao_ms"] = round(grupo["duracao_ms"] + consulta.duracao_ms, 2)
+
+    return {
+        "total": len(consultas),
+        "duracao_ms": round(sum(c.duracao_ms for c in consultas), 2),
+        "repetidas": sorted((g for g in grupos.values() if g["vezes"] > 1), key=lambda g: -g["vezes"]),
+        "consultas": [c.como_dict() for c in consultas]
+    }
+
+
+def registrar_consulta(query: Any, resultado: Any, duracao_s: float, erro: bool) -> RegistroConsulta:
+    """
+    Registra uma execução (métricas, log de query lenta e lista da requisição).
+    Chamado pelo QueryExecutor na thread do event loop.
+    """
+    tabela, operacao = descrever_query(query)
+    get_metricas().registrar_query(tabela, operacao, duracao_s, erro)
+
+    dados = getattr(resultado, "data", None)
+    registro = RegistroConsulta(
+        tabela=tabela,
+        operacao=operacao,
+        filtros=formato_filtros(query),
+        linhas=len(dados) if isinstance(dados, list) else None,
+        duracao_ms=round(duracao_s * 1000, 2),
+        erro=erro
+    )
+
+    if registro.duracao_ms >= get_settings().slow_query_ms:
+        logger.warning("query lenta", extra=registro.como_dict())
+
+    consultas = consultas_requisicao_var.get()
+    if consultas is not None:
+        consultas.append(registro)
+
+    return registro
+
+
+# Histórico global (somente requisições rastreadas)
+_historico: Optional[HistoricoConsultas] = None
+
+
+def get_historico_consultas() -> HistoricoConsultas:
+    """Retorna o histórico global, criando-o sob demanda"""
+    global _historico
+
+    if _historico is None:
+        _historico = HistoricoConsultas()
+
+    return _historico
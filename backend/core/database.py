@@ -3,17 +3,147 @@ Configuração e gerenciamento da conexão com Supabase.
 Implementa RLS (Row Level Security) automático e dependency injection.
 """
 
+import supabase
 from supabase import create_client, Client
+from postgrest.utils import SyncClient
 from typing import Optional, Dict, Any
 from fastapi import Depends, HTTPException, status
 from core.config import get_settings, Settings
 from core.auth import get_current_user
+from core.http_pool import get_http_pool
+from core.consultas import registrar_consulta
+from concurrent.futures import ThreadPoolExecutor
+from jose import jwt
 import asyncio
+import threading
+import time
 from functools import wraps
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Versão do supabase-py em que _bind_http_pool foi verificado (ver requirements.txt)
+VERSAO_SUPABASE_COMPATIVEL = "2."
+
+
+class QueryExecutor:
+    """
+    Executa queries do PostgREST sem bloquear o event loop.
+    
+    O cliente supabase-py é síncrono: cada `.execute()` prende a thread
+    chamadora durante todo o round-trip HTTP. As chamadas são despachadas
+    para um pool de threads de tamanho fixo, de modo que uma query lenta
+    ocupa apenas um worker e o uvicorn continua atendendo outras requisições.
+    """
+    
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool de threads criado sob demanda"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="supabase-query"
+            )
+        return self._executor
+    
+    async def run(self, query: Any) -> Any:
+        """
+        Executa um query builder do PostgREST (ou qualquer objeto com
+        `.execute()`) em uma thread do pool e aguarda o resultado.
+        """
+        loop = asyncio.get_running_loop()
+        inicio = time.perf_counter()
+        resultado, erro = None, False
+        try:
+            resultado = await loop.run_in_executor(self.executor, query.execute)
+            return resultado
+        except Exception:
+            erro = True
+            raise
+        finally:
+            # De volta à thread do event loop: métricas/registro sem lock
+            registrar_consulta(query, resultado, time.perf_counter() - inicio, erro)
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Finaliza o pool (chamado no shutdown da aplicação)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+# Instância global do executor de queries
+_query_executor: Optional[QueryExecutor] = None
+
+
+def get_query_executor() -> QueryExecutor:
+    """Retorna o executor de queries compartilhado pela aplicação"""
+    global _query_executor
+    
+    if _query_executor is None:
+        _query_executor = QueryExecutor(get_settings().db_query_workers)
+    
+    return _query_executor
+
+
+async def execute_query(query: Any) -> Any:
+    """
+    Executa uma query Supabase de forma não-bloqueante.
+    
+    Uso nos repositories:
+        result = await execute_query(
+            self.supabase.table('c_clientes').select('*').eq('loja_id', loja_id)
+        )
+    """
+    return await get_query_executor().run(query)
+
+
+def shutdown_query_executor() -> None:
+    """Libera as threads do executor de queries"""
+    global _query_executor
+    
+    if _query_executor is not None:
+        _query_executor.shutdown()
+        _query_executor = None
+
+
+def _bind_http_pool(client: Client) -> Client:
+    """
+    Faz a sessão PostgREST do cliente usar o transporte HTTP/2 compartilhado
+    (core.http_pool) em vez de abrir um pool de conexões próprio.
+    
+    O supabase-py 2.x não aceita um cliente httpx em ClientOptions; a
+    sessão é trocada no ponto em que o cliente PostgREST é criado
+    (_init_postgrest_client, também chamado após eventos de auth). Em
+    outra versão ou sem esse ponto, o cliente segue com o pool próprio.
+    """
+    versao = getattr(supabase, "__version__", "")
+    if not versao.startswith(VERSAO_SUPABASE_COMPATIVEL) or not hasattr(client, "_init_postgrest_client"):
+        logger.warning(f"supabase-py {versao or '?'} sem suporte ao pool HTTP compartilhado; usando o pool do cliente")
+        return client
+    
+    init_postgrest = client._init_postgrest_client
+    
+    def init_postgrest_com_pool(*args, **kwargs):
+        postgrest = init_postgrest(*args, **kwargs)
+        session = getattr(postgrest, "session", None)
+        if not isinstance(session, SyncClient):
+            return postgrest
+        postgrest.session = SyncClient(
+            base_url=session.base_url,
+            headers=session.headers,
+            timeout=session.timeout,
+            transport=get_http_pool().sync_transport
+        )
+        session.close()
+        return postgrest
+    
+    client._init_postgrest_client = init_postgrest_com_pool
+    return client
+
 
 class SupabaseClient:
     """
@@ -30,22 +160,26 @@ class SupabaseClient:
     def client(self) -> Client:
         """Cliente Supabase com chave anônima (para operações autenticadas)"""
         if self._client is None:
-            self._client = create_client(
+            self._client = _bind_http_pool(create_client(
                 self.settings.supabase_url,
                 self.settings.supabase_anon_key
-            )
+            ))
         return self._client
     
     @property
     def service_client(self) -> Client:
         """Cliente Supabase com chave de serviço (bypassa RLS - usar com cuidado)"""
         if self._service_client is None:
-            self._service_client = create_client(
+            self._service_client = _bind_http_pool(create_client(
                 self.settings.supabase_url,
                 self.settings.supabase_service_key
-            )
+            ))
         return self._service_client
     
+    async def execute(self, query: Any) -> Any:
+        """Executa uma query construída com este cliente sem bloquear o event loop"""
+        return await execute_query(query)
+    
     def set_auth_token(self, token: str) -> Client:
         """
         Define o token JWT para operações autenticadas.
@@ -54,24 +188,130 @@ class SupabaseClient:
         self.client.auth.set_session_from_url(token)
         return self.client
     
-    def get_user_client(self, user_data: Dict[str, Any]) -> Client:
+    def get_user_client(self, user_data: Dict[str, Any]) -> "ClienteLoja":
         """
         Retorna cliente Supabase configurado para um usuário específico.
-        Aplica automaticamente o RLS baseado no loja_id do usuário.
+        O contexto RLS (loja_id) segue nas claims de um token PostgREST
+        emitido para o usuário, enviado em cada query; o cliente global
+        não é alterado.
         """
-        client = self.client
+        return ClienteLoja(self.client, criar_token_postgrest(user_data, self.settings), user_data.get('loja_id'))
+
+
+class TokenPostgrest:
+    """
+    JWT curto que o PostgREST aceita para um usuário da aplicação.
+    
+    O token da aplicação é assinado com JWT_SECRET_KEY, que o PostgREST não
+    conhece. Aqui as claims do usuário (sub, loja_id, perfil) são reassinadas
+    com o JWT secret do projeto Supabase, com role=authenticated. O token é
+    renovado perto de expirar, então um ClienteLoja reaproveitado por um
+    trabalho em segundo plano continua válido.
+    
+    Args:
+        segredo: SUPABASE_JWT_SECRET
+        claims: Claims do usuário (sub, loja_id, perfil)
+        ttl_seconds: Validade de cada token emitido
+        relogio: Função de tempo em epoch seconds (injetável para testes)
+    """
+    
+    # Renova quando falta menos que isto para expirar
+    MARGEM_RENOVACAO_SECONDS = 30
+    
+    def __init__(self, segredo: str, claims: Dict[str, Any], ttl_seconds: int, relogio=time.time):
+        self._segredo = segredo
+        self._claims = claims
+        self._ttl = max(self.MARGEM_RENOVACAO_SECONDS * 2, ttl_seconds)
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._valor: Optional[str] = None
+        self._expira_em = 0.0
+    
+    def valor(self) -> str:
+        """Token vigente, emitindo um novo se estiver perto de expirar"""
+        with self._lock:
+            agora = self._relogio()
+            if self._valor is None or self._expira_em - agora < self.MARGEM_RENOVACAO_SECONDS:
+                self._expira_em = agora + self._ttl
+                self._valor = jwt.encode(
+                    {**self._claims, "iat": int(agora), "exp": int(self._expira_em)},
+                    self._segredo,
+                    algorithm="HS256"
+                )
+            return self._valor
+
+
+def criar_token_postgrest(user_data: Dict[str, Any], settings: Settings) -> Optional[TokenPostgrest]:
+    """
+    Token PostgREST do usuário, ou None sem SUPABASE_JWT_SECRET (as queries
+    seguem com a chave do cliente e sem claims do usuário)
+    """
+    if not settings.supabase_jwt_secret:
+        return None
+    claims = {
+        "sub": str(user_data.get("user_id") or user_data.get("id") or ""),
+        "role": "authenticated",
+        "aud": "authenticated",
+        "loja_id": str(user_data.get("loja_id") or ""),
+        "perfil": user_data.get("perfil")
+    }
+    return TokenPostgrest(settings.supabase_jwt_secret, claims, settings.supabase_jwt_ttl_seconds)
+
+
+class _TabelaLoja:
+    """SyncRequestBuilder cujas queries saem com o token da requisição"""
+    
+    def __init__(self, builder: Any, aplicar_contexto):
+        self._builder = builder
+        self._aplicar_contexto = aplicar_contexto
+    
+    def __getattr__(self, nome: str) -> Any:
+        metodo = getattr(self._builder, nome)
         
-        # Configura o contexto RLS para o usuário
-        loja_id = user_data.get('loja_id')
-        if loja_id:
-            # Configura variáveis de contexto para RLS
-            client.rpc('set_config', {
-                'setting_name': 'app.current_loja_id',
-                'setting_value': str(loja_id),
-                'is_local': True
-            })
+        def chamar(*args, **kwargs):
+            # select/insert/update/upsert/delete criam headers próprios por query
+            return self._aplicar_contexto(metodo(*args, **kwargs))
         
-        return client
+        return chamar
+
+
+class ClienteLoja:
+    """
+    Visão por requisição do cliente Supabase compartilhado.
+    
+    Cada query construída por aqui leva `Authorization: Bearer <token
+    PostgREST do usuário>` nos headers da própria query (não na sessão HTTP
+    compartilhada), então o PostgREST avalia as policies com as claims do
+    usuário (`auth.jwt() ->> 'loja_id'`). Requisições concorrentes de lojas
+    diferentes não compartilham estado e não há round-trip extra de set_config.
+    
+    Args:
+        client: Cliente Supabase global (sessão/pool HTTP compartilhados)
+        token: Token PostgREST do usuário (None = usa a chave do cliente)
+        loja_id: Loja do usuário (informativo para logs/diagnóstico)
+    """
+    
+    def __init__(self, client: Client, token: Optional[TokenPostgrest], loja_id: Optional[str]):
+        self._client = client
+        self.loja_id = loja_id
+        self._token = token
+    
+    def _aplicar_contexto(self, builder: Any) -> Any:
+        if self._token is not None:
+            builder.headers["Authorization"] = f"Bearer {self._token.valor()}"
+        return builder
+    
+    def table(self, table_name: str) -> _TabelaLoja:
+        return _TabelaLoja(self._client.table(table_name), self._aplicar_contexto)
+    
+    from_ = table
+    
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        return self._aplicar_contexto(self._client.rpc(fn, params or {}))
+    
+    def __getattr__(self, nome: str) -> Any:
+        # auth, storage etc. continuam vindo do cliente global
+        return getattr(self._client, nome)
 
 
 # Instância global do Supabase client
@@ -94,10 +334,11 @@ def get_supabase_client(settings: Settings = Depends(get_settings)) -> SupabaseC
 def get_database(
     current_user: Dict[str, Any] = Depends(get_current_user),
     supabase_client: SupabaseClient = Depends(get_supabase_client)
-) -> Client:
+) -> ClienteLoja:
     """
     Dependency injection para obter cliente Supabase autenticado.
     Aplica automaticamente RLS baseado no usuário logado.
+    Criado uma vez por requisição (cache de dependências do FastAPI).
     
     Args:
         current_user: Dados do usuário autenticado (do JWT)
@@ -0,0 +1,231 @@
+"""
+Estatísticas de dashboard (equipe, lojas, empresas) por agregação no banco.
+
+Os endpoints de stats carregavam as tabelas inteiras (limitadas às 1000
+linhas padrão do PostgREST) e contavam em Python. Aqui:
+- contagens simples usam count=exact (Content-Range, sem trafegar linhas)
+- contagens por grupo usam uma única query agregada do PostgREST
+  (select=coluna,total:count()); se o servidor não permitir funções de
+  agregação (PGRST123), percorre apenas a coluna agrupada em páginas,
+  sem o limite de 1000 linhas, e tenta a agregação de novo para aquela
+  tabela após alguns minutos
+- o resultado fica num cache com TTL curto, invalidado pelas escritas
+  do próprio processo; dashboards repetidos custam O(1)
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from postgrest.exceptions import APIError
+
+from core.config import get_settings
+from core.database import execute_query
+
+logger = logging.getLogger(__name__)
+
+# Erro do PostgREST quando db-aggregates-enabled está desligado
+_CODIGO_AGREGACAO_DESATIVADA = "PGRST123"
+
+_TAMANHO_PAGINA = 1000
+_LOTE_NOMES = 200
+
+# Após um PGRST123 a tabela usa o modo paginado até o instante guardado aqui
+# (tabela → time.monotonic()); depois disso a agregação é tentada de novo
+_RETENTAR_AGREGACAO_SEGUNDOS = 300
+_agregacao_desativada_ate: Dict[str, float] = {}
+
+
+def _aplicar_filtros(query: Any, filtros: Optional[Dict[str, Any]]) -> Any:
+    for coluna, valor in (filtros or {}).items():
+        query = query.eq(coluna, valor)
+    return query
+
+
+async def contar(client: Any, tabela: str, filtros: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Quantidade de linhas (count=exact, sem trazer as linhas).
+
+    Args:
+        client: Cliente Supabase
+        tabela: Nome da tabela
+        filtros: Igualdades coluna → valor
+
+    Returns:
+        Total de linhas que atendem aos filtros
+    """
+    query = _aplicar_filtros(client.table(tabela).select("id", count="exact"), filtros).limit(1)
+    result = await execute_query(query)
+    return result.count or 0
+
+
+async def _contar_paginado(client: Any, tabela: str, coluna: str, filtros: Optional[Dict[str, Any]]) -> Dict[Any, int]:
+    contagens: Dict[Any, int] = {}
+    inicio = 0
+
+    while True:
+        query = _aplicar_filtros(client.table(tabela).select(coluna), filtros)
+        # limit/offset explícitos: .range() do postgrest-py 0.13 pede uma linha a menos
+        result = await execute_query(query.order("id").limit(_TAMANHO_PAGINA).offset(inicio))
+        linhas = result.data or []
+
+        for linha in linhas:
+            valor = linha.get(coluna)
+            contagens[valor] = contagens.get(valor, 0) + 1
+
+        if len(linhas) < _TAMANHO_PAGINA:
+            return contagens
+        inicio += _TAMANHO_PAGINA
+
+
+async def contar_por_grupo(
+    client: Any,
+    tabela: str,
+    coluna: str,
+    filtros: Optional[Dict[str, Any]] = None
+) -> Dict[Any, int]:
+    """
+    Contagem de linhas por valor de uma coluna (GROUP BY coluna).
+
+    Args:
+        client: Cliente Supabase
+        tabela: Nome da tabela
+        coluna: Coluna de agrupamento (None vira uma chave própria)
+        filtros: Igualdades coluna → valor
+
+    Returns:
+        Dict valor → quantidade
+    """
+    if _agregacao_desativada_ate.get(tabela, 0.0) <= time.monotonic():
+        try:
+            query = _aplicar_filtros(client.table(tabela).select(f"{coluna}, total:count()"), filtros)
+            result = await execute_query(query)
+            return {linha.get(coluna): int(linha.get("total") or 0) for linha in result.data or []}
+        except APIError as e:
+            if e.code != _CODIGO_AGREGACAO_DESATIVADA:
+                raise
+            _agregacao_desativada_ate[tabela] = time.monotonic() + _RETENTAR_AGREGACAO_SEGUNDOS
+            logger.warning(
+                f"Funções de agregação desativadas no PostgREST para {tabela}; "
+                f"contagens por grupo paginadas por {_RETENTAR_AGREGACAO_SEGUNDOS}s"
+            )
+
+    return await _contar_paginado(client, tabela, coluna, filtros)
+
+
+async def nomes_por_id(client: Any, tabela: str, ids: Iterable[Any]) -> Dict[str, str]:
+    """
+    Nomes (coluna `nome`) dos registros informados, em lotes de IDs.
+
+    Returns:
+        Dict id → nome
+    """
+    ids_validos = sorted({str(i) for i in ids if i is not None})
+    lotes = [ids_validos[i:i + _LOTE_NOMES] for i in range(0, len(ids_validos), _LOTE_NOMES)]
+
+    resultados = await asyncio.gather(*(
+        execute_query(client.table(tabela).select("id, nome").in_("id", lote)) for lote in lotes
+    ))
+    return {str(linha["id"]): linha.get("nome") for result in resultados for linha in result.data or []}
+
+
+class CacheEstatisticas:
+    """
+    Cache com TTL dos resultados de estatísticas, por chave.
+
+    Requisições concorrentes para a mesma chave expirada aguardam um único
+    cálculo (sem rajada de agregações no banco).
+
+    Args:
+        ttl_seconds: Tempo de vida de cada resultado (0 desativa o cache)
+        relogio: Função de tempo monotônico (injetável para testes)
+    """
+
+    def __init__(self, ttl_seconds: int, relogio: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._relogio = relogio
+        self._entradas: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    def _valida(self, chave: str) -> Optional[Dict[str, Any]]:
+        entrada = self._entradas.get(chave)
+        if entrada is not None and entrada[1] > self._relogio():
+            return entrada[0]
+        return None
+
+    async def obter(self, chave: str, calcular: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Retorna o resultado em cache ou calcula (uma vez por chave).
+
+        Args:
+            chave: Identificador da estatística (ex.: 'lojas', 'empresas:<loja>')
+            calcular: Corrotina que consulta o banco
+
+        Returns:
+            Cópia do resultado (o chamador pode acrescentar campos)
+        """
+        resultado = self._valida(chave)
+        if resultado is None:
+            lock = self._locks.setdefault(chave, asyncio.Lock())
+            async with lock:
+                resultado = self._valida(chave)
+                if resultado is None:
+                    self.misses += 1
+                    resultado = await calcular()
+                    if self.ttl_seconds > 0:
+                        self._entradas[chave] = (resultado, self._relogio() + self.ttl_seconds)
+                    return dict(resultado)
+
+        self.hits += 1
+        return dict(resultado)
+
+    def invalidar(self, *prefixos: str) -> int:
+        """
+        Descarta resultados cujas chaves começam com algum dos prefixos.
+
+        Returns:
+            Quantidade de entradas removidas
+        """
+        chaves = [chave for chave in self._entradas if any(chave.startswith(p) for p in prefixos)]
+        for chave in chaves:
+            del self._entradas[chave]
+        self.invalidacoes += 1
+        return len(chaves)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores do cache (expostos no /health)"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entradas),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidacoes,
+            "aggregates_disabled": sorted(
+                tabela for tabela, ate in _agregacao_desativada_ate.items() if ate > time.monotonic()
+            )
+        }
+
+
+# Instância global do cache
+_cache_estatisticas: Optional[CacheEstatisticas] = None
+
+
+def get_cache_estatisticas() -> CacheEstatisticas:
+    """Retorna o cache global, criando-o sob demanda"""
+    global _cache_estatisticas
+
+    if _cache_estatisticas is None:
+        _cache_estatisticas = CacheEstatisticas(get_settings().stats_cache_ttl_seconds)
+
+    return _cache_estatisticas
+
+
+def invalidar_estatisticas(*prefixos: str) -> int:
+    """Hook de invalidação: chamar nas escritas de equipe, lojas e empresas"""
+    return get_cache_estatisticas().invalidar(*prefixos)
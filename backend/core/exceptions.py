@@ -128,6 +128,18 @@ class XMLProcessingException(FluyteException):
         )
 
 
+class ServiceBusyException(FluyteException):
+    """Exceção para serviço temporariamente sem capacidade (ex.: fila cheia)"""
+    
+    def __init__(self, message: str, details: Optional[Dict] = None):
+        super().__init__(
+            message=message,
+            code="SERVICE_BUSY",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            details=details
+        )
+
+
 class ConfigurationException(FluyteException):
     """Exceção para erros de configuração"""
     
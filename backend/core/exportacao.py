@@ -0,0 +1,119 @@
+"""
+Exportação em streaming (NDJSON/CSV) de listagens grandes.
+
+As linhas são lidas do Supabase em lotes com paginação keyset e escritas na
+resposta à medida que chegam: a memória usada é a de um lote, não a da
+listagem inteira, e nenhum modelo Pydantic é construído por linha.
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence
+import csv
+import io
+import json
+import logging
+
+from fastapi.responses import StreamingResponse
+
+from core.database import execute_query
+from core.paginacao import CursorKeyset, aplicar_cursor, fatiar_pagina
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_EXPORTACAO = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
+
+
+async def iterar_em_lotes(
+    construir_query: Callable[[], Any],
+    tamanho_lote: int,
+    transformar: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Percorre todas as linhas de uma query em lotes (keyset por created_at, id).
+
+    Args:
+        construir_query: Função que devolve uma query nova já filtrada
+            (RLS por loja incluído); chamada uma vez por lote
+        tamanho_lote: Linhas por round-trip
+        transformar: Conversão opcional aplicada a cada linha
+
+    Yields:
+        Listas com até `tamanho_lote` linhas
+    """
+    posicao: Optional[CursorKeyset] = None
+
+    while True:
+        result = await execute_query(aplicar_cursor(construir_query(), posicao, tamanho_lote))
+        lote, proximo = fatiar_pagina(result.data or [], tamanho_lote)
+
+        if lote:
+            yield [transformar(linha) for linha in lote] if transformar else lote
+
+        if proximo is None:
+            return
+        posicao = CursorKeyset.decodificar(proximo)
+
+
+async def _ndjson(lotes: AsyncIterator[List[Dict[str, Any]]], colunas: Sequence[str]) -> AsyncIterator[bytes]:
+    async for lote in lotes:
+        yield "".join(
+            json.dumps({coluna: linha.get(coluna) for coluna in colunas}, ensure_ascii=False, default=str) + "\n"
+            for linha in lote
+        ).encode("utf-8")
+
+
+async def _csv(lotes: AsyncIterator[List[Dict[str, Any]]], colunas: Sequence[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(colunas), extrasaction="ignore")
+
+    # BOM para o Excel reconhecer UTF-8 (acentos em nomes/cidades)
+    buffer.write("\ufeff")
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+
+    async for lote in lotes:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(lote)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _com_log(conteudo: AsyncIterator[bytes], nome_arquivo: str) -> AsyncIterator[bytes]:
+    """Registra o fim (ou a falha) da exportação; o status HTTP já foi enviado"""
+    total_bytes = 0
+    try:
+        async for parte in conteudo:
+            total_bytes += len(parte)
+            yield parte
+        logger.info(f"Exportação {nome_arquivo} concluída: {total_bytes} bytes")
+    except Exception as e:
+        logger.error(f"Erro durante exportação {nome_arquivo} após {total_bytes} bytes: {str(e)}")
+        raise
+
+
+def resposta_exportacao(
+    lotes: AsyncIterator[List[Dict[str, Any]]],
+    formato: str,
+    colunas: Iterable[str],
+    nome_arquivo: str
+) -> StreamingResponse:
+    """
+    Monta a StreamingResponse no formato pedido.
+
+    Args:
+        lotes: Gerador de lotes (ver iterar_em_lotes)
+        formato: 'ndjson' ou 'csv'
+        colunas: Colunas exportadas, na ordem
+        nome_arquivo: Nome base do arquivo (sem extensão)
+    """
+    colunas = list(colunas)
+    conteudo = _csv(lotes, colunas) if formato == "csv" else _ndjson(lotes, colunas)
+    arquivo = f"{nome_arquivo}.{formato}"
+
+    return StreamingResponse(
+        _com_log(conteudo, arquivo),
+        media_type=FORMATOS_EXPORTACAO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{arquivo}"'}
+    )
@@ -0,0 +1,155 @@
+"""
+Pool de conexões HTTP compartilhado para todo o tráfego com o Supabase.
+Evita handshake TCP+TLS a cada chamada reutilizando conexões HTTP/2.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import threading
+import logging
+
+import httpx
+
+from core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class _PoolCounters:
+    """Contadores de uso do pool (compartilhados entre threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.waits = 0
+
+    def registrar(self, aguardou: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            if aguardou:
+                self.waits += 1
+
+
+def _pool_saturado(pool: Any, max_connections: int) -> bool:
+    """Indica se uma nova requisição terá que esperar por uma conexão livre"""
+    connections = list(pool.connections)
+    if len(connections) < max_connections:
+        return False
+    return not any(conn.is_available() for conn in connections)
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    """Transporte síncrono (PostgREST) que registra esperas por conexão"""
+
+    def __init__(self, counters: _PoolCounters, max_connections: int, **kwargs):
+        super().__init__(**kwargs)
+        self.counters = counters
+        self.max_connections = max_connections
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.counters.registrar(_pool_saturado(self._pool, self.max_connections))
+        return super().handle_request(request)
+
+
+class InstrumentedAsyncTransport(httpx.AsyncHTTPTransport):
+    """Transporte assíncrono (Auth/REST direto) que registra esperas por conexão"""
+
+    def __init__(self, counters: _PoolCounters, max_connections: int, **kwargs):
+        super().__init__(**kwargs)
+        self.counters = counters
+        self.max_connections = max_connections
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.counters.registrar(_pool_saturado(self._pool, self.max_connections))
+        return await super().handle_async_request(request)
+
+
+def _dividir_limite(total: int) -> Tuple[int, int]:
+    """(assíncrono, síncrono): um quarto para o assíncrono, no mínimo 1 para cada"""
+    assincrono = max(1, total // 4)
+    return assincrono, max(1, total - assincrono)
+
+
+class HttpPool:
+    """
+    Pool de conexões único da aplicação.
+
+    - `async_client`: chamadas assíncronas diretas (Auth, REST)
+    - `sync_transport`: transporte compartilhado pelas sessões síncronas
+      do PostgREST (clientes anon e service)
+
+    Dimensionado por `db_pool_size` (conexões mantidas abertas) e
+    `db_max_overflow` (conexões extras em picos). O limite é dividido entre
+    os dois transportes (cada um com pool próprio no httpx): um quarto para
+    o assíncrono, o restante para as queries do PostgREST, no mínimo 1 cada.
+    """
+
+    def __init__(self, settings: Settings):
+        self.max_connections = max(1, settings.db_pool_size + settings.db_max_overflow)
+        self.max_keepalive = max(1, settings.db_pool_size)
+        self.counters = _PoolCounters()
+
+        max_async, max_sync = _dividir_limite(self.max_connections)
+        keepalive_async, keepalive_sync = _dividir_limite(self.max_keepalive)
+        self.limites = {"sync": max_sync, "async": max_async}
+
+        self.sync_transport = InstrumentedTransport(
+            self.counters, max_sync, http2=True,
+            limits=httpx.Limits(max_connections=max_sync, max_keepalive_connections=min(keepalive_sync, max_sync))
+        )
+        self.async_transport = InstrumentedAsyncTransport(
+            self.counters, max_async, http2=True,
+            limits=httpx.Limits(max_connections=max_async, max_keepalive_connections=min(keepalive_async, max_async))
+        )
+        self.async_client = httpx.AsyncClient(transport=self.async_transport, timeout=30.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas do pool para o endpoint /health"""
+        connections = list(self.sync_transport._pool.connections) + list(self.async_transport._pool.connections)
+        idle = sum(1 for conn in connections if conn.is_idle())
+
+        return {
+            "max_connections": self.max_connections,
+            "max_connections_by_transport": self.limites,
+            "max_keepalive": self.max_keepalive,
+            "in_use": len(connections) - idle,
+            "idle": idle,
+            "requests": self.counters.requests,
+            "waits": self.counters.waits
+        }
+
+    async def aclose(self) -> None:
+        """Fecha todas as conexões abertas"""
+        await self.async_client.aclose()
+        self.sync_transport.close()
+
+
+# Instância global do pool
+_http_pool: Optional[HttpPool] = None
+
+
+def init_http_pool(settings: Optional[Settings] = None) -> HttpPool:
+    """Cria o pool global (chamado no startup da aplicação)"""
+    global _http_pool
+
+    if _http_pool is None:
+        _http_pool = HttpPool(settings or get_settings())
+        logger.info(
+            f"Pool HTTP criado: {_http_pool.max_keepalive} conexões "
+            f"(+{_http_pool.max_connections - _http_pool.max_keepalive} overflow)"
+        )
+
+    return _http_pool
+
+
+def get_http_pool() -> HttpPool:
+    """Retorna o pool global, criando-o sob demanda fora do lifespan (scripts/testes)"""
+    return _http_pool or init_http_pool()
+
+
+async def close_http_pool() -> None:
+    """Fecha o pool global (chamado no shutdown da aplicação)"""
+    global _http_pool
+
+    if _http_pool is not None:
+        await _http_pool.aclose()
+        _http_pool = None
@@ -0,0 +1,233 @@
+"""
+Fila de processamento em segundo plano (no próprio processo).
+
+Trabalhos longos (ex.: importação de XML do Promob) não devem prender a
+requisição: o endpoint enfileira o trabalho e responde 202; um pool fixo de
+workers asyncio consome a fila. A fila é limitada (JOBS_MAX_FILA): com ela
+cheia o enfileiramento falha com 503 em vez de acumular trabalho e memória
+sem limite. O registro de progresso e erros fica a cargo de cada trabalho
+(ex.: linhas de xml_logs), inclusive quando o encerramento da aplicação
+interrompe o trabalho (CancelledError) ou o descarta da fila (ao_descartar).
+
+Os workers rodam num contexto vazio; cada trabalho roda numa cópia do
+contexto de quem o enfileirou (request_id/loja_id nos logs), sem a lista
+de consultas da requisição (DEBUG), que já terminou.
+
+Etapas de CPU (parse de XML) vão para um pool de processos (JOBS_PROCESSOS),
+que não disputa o GIL com o event loop nem entre si.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import os
+import time
+
+from core.config import get_settings
+from core.consultas import consultas_requisicao_var
+from core.exceptions import ServiceBusyException
+
+logger = logging.getLogger(__name__)
+
+Trabalho = Callable[[], Awaitable[Any]]
+
+# (nome, trabalho, contexto de quem enfileirou, chamado se o trabalho for descartado)
+ItemFila = Tuple[str, Trabalho, contextvars.Context, Optional[Trabalho]]
+
+
+class FilaJobs:
+    """
+    Pool de workers asyncio com fila limitada.
+
+    A fila e os workers são criados no event loop em execução no primeiro
+    enfileiramento (e recriados se o loop mudar, como entre testes).
+
+    Args:
+        workers: Trabalhos executados ao mesmo tempo
+        max_fila: Trabalhos aguardando além dos em execução
+    """
+
+    def __init__(self, workers: int, max_fila: int):
+        self.workers = max(1, workers)
+        self.max_fila = max(1, max_fila)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefas: Set[asyncio.Task] = set()
+        self.em_execucao = 0
+        self.concluidos = 0
+        self.falhas = 0
+        self.rejeitados = 0
+        self.tempo_total_ms = 0.0
+
+    def _garantir_workers(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._fila is None or self._loop is not loop:
+            self._loop = loop
+            self._fila = asyncio.Queue(maxsize=self.max_fila)
+            # Contexto vazio: o worker não herda as variáveis da requisição que o criou
+            # (create_task(context=...) só existe a partir do Python 3.11)
+            self._tarefas = {
+                contextvars.Context().run(loop.create_task, self._worker(self._fila), name=f"job-worker:{numero}")
+                for numero in range(self.workers)
+            }
+        return self._fila
+
+    def enfileirar(self, nome: str, trabalho: Trabalho, ao_descartar: Optional[Trabalho] = None) -> int:
+        """
+        Enfileira um trabalho (não espera a execução)
+
+        Args:
+            nome: Identificação para logs
+            trabalho: Função sem argumentos que retorna a coroutine a executar
+            ao_descartar: Chamado no encerramento se o trabalho ainda não tiver começado
+
+        Returns:
+            Posição na fila (0 = será o próximo)
+
+        Raises:
+            ServiceBusyException: Fila cheia
+        """
+        fila = self._garantir_workers()
+        try:
+            fila.put_nowait((nome, trabalho, contextvars.copy_context(), ao_descartar))
+        except asyncio.QueueFull:
+            self.rejeitados += 1
+            logger.warning(f"Fila de processamento cheia ({self.max_fila}), trabalho {nome} recusado")
+            raise ServiceBusyException(
+                "Fila de processamento cheia, tente novamente em instantes",
+                details={"max_fila": self.max_fila}
+            )
+        return fila.qsize() - 1
+
+    @staticmethod
+    async def _executar(trabalho: Trabalho) -> Any:
+        """Roda o trabalho sem acumular consultas na lista da requisição já encerrada"""
+        consultas_requisicao_var.set(None)
+        return await trabalho()
+
+    async def _worker(self, fila: asyncio.Queue) -> None:
+        while True:
+            nome, trabalho, contexto, _ = await fila.get()
+            self.em_execucao += 1
+            inicio = time.perf_counter()
+            try:
+                await contexto.run(asyncio.get_running_loop().create_task, self._executar(trabalho))
+                self.concluidos += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # O trabalho registra os próprios erros; aqui só não derruba o worker
+                self.falhas += 1
+                logger.error(f"Trabalho {nome} falhou: {str(e)}")
+            finally:
+                self.em_execucao -= 1
+                self.tempo_total_ms += (time.perf_counter() - inicio) * 1000
+                fila.task_done()
+
+    async def aguardar(self) -> None:
+        """Espera a fila esvaziar e os trabalhos em execução terminarem"""
+        if self._fila is not None and self._loop is asyncio.get_running_loop():
+            await self._fila.join()
+
+    async def encerrar(self, timeout: float = 30.0) -> None:
+        """Aguarda os trabalhos por até `timeout` segundos e para os workers"""
+        if self._fila is None or self._loop is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(self._fila.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Encerrando com {self._fila.qsize()} trabalhos na fila e {self.em_execucao} em execução")
+        # Os trabalhos em execução recebem CancelledError e registram a interrupção
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        await self._descartar_pendentes(self._fila)
+        self._fila = None
+        self._tarefas = set()
+
+    async def _descartar_pendentes(self, fila: asyncio.Queue) -> None:
+        """Avisa os trabalhos que ficaram na fila (ex.: marcar o log como erro)"""
+        while not fila.empty():
+            nome, _, contexto, ao_descartar = fila.get_nowait()
+            fila.task_done()
+            logger.warning(f"Trabalho {nome} descartado no encerramento")
+            if ao_descartar is None:
+                continue
+            try:
+                await contexto.run(asyncio.get_running_loop().create_task, self._executar(ao_descartar))
+            except Exception as e:
+                logger.error(f"Erro ao descartar trabalho {nome}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores da fila (expostos no /health)"""
+        finalizados = self.concluidos + self.falhas
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_fila,
+            "queued": self._fila.qsize() if self._fila is not None else 0,
+            "running": self.em_execucao,
+            "completed": self.concluidos,
+            "failed": self.falhas,
+            "rejected": self.rejeitados,
+            "avg_ms": round(self.tempo_total_ms / finalizados, 1) if finalizados else 0.0
+        }
+
+
+# Instância global
+_fila_jobs: Optional[FilaJobs] = None
+
+
+def get_fila_jobs() -> FilaJobs:
+    """Retorna a fila global de processamento, criando-a sob demanda"""
+    global _fila_jobs
+
+    if _fila_jobs is None:
+        settings = get_settings()
+        _fila_jobs = FilaJobs(settings.jobs_workers, settings.jobs_max_fila)
+
+    return _fila_jobs
+
+
+# Pool de processos para etapas de CPU
+_pool_processos: Optional[ProcessPoolExecutor] = None
+
+
+def quantidade_processos() -> int:
+    """JOBS_PROCESSOS ou, com 0, a quantidade de CPUs"""
+    return get_settings().jobs_processos or os.cpu_count() or 1
+
+
+def get_pool_processos() -> ProcessPoolExecutor:
+    """
+    Retorna o pool global de processos, criando-o sob demanda
+
+    Usa 'spawn': processos novos não herdam as threads (pool HTTP, executor
+    de queries) do servidor, o que com 'fork' pode travar o filho.
+    """
+    global _pool_processos
+
+    if _pool_processos is None:
+        _pool_processos = ProcessPoolExecutor(
+            max_workers=quantidade_processos(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Pool de processos iniciado com {quantidade_processos()} processos")
+
+    return _pool_processos
+
+
+def encerrar_pool_processos() -> None:
+    """Encerra o pool de processos (shutdown da aplicação)"""
+    global _pool_processos
+
+    if _pool_processos is not None:
+        _pool_processos.shutdown(wait=True, cancel_futures=True)
+        _pool_processos = None
+
+
+def stats_pool_processos() -> Dict[str, Any]:
+    """Configuração do pool de processos (exposta no /health)"""
+    return {"workers": quantidade_processos(), "started": _pool_processos is not None}
@@ -0,0 +1,233 @@
+"""
+Pipeline de logging estruturado (JSON) do Fluyt Comercial.
+
+- Não bloqueante: os loggers só enfileiram o registro (QueueHandler); a
+  formatação JSON e a escrita em stdout acontecem na thread do QueueListener.
+  Fila cheia descarta o registro e conta o descarte, nunca trava a requisição.
+- Contexto automático: request_id e loja_id da requisição corrente
+  (contextvars) são anexados a todo registro, de qualquer módulo.
+- Nível por módulo via LOG_LEVELS ("modules.orcamentos=DEBUG,httpx=WARNING").
+- Log de acesso com amostragem: respostas 2xx/3xx rápidas entram com
+  probabilidade LOG_SAMPLE_RATE_2XX; erros e requisições lentas sempre.
+- Custo medido por requisição e comparado com LOG_BUDGET_US (/health).
+"""
+
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+from datetime import datetime, timezone
+import threading
+import logging
+import atexit
+import random
+import queue
+import json
+import sys
+import time
+
+from core.config import Settings
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+loja_id_var: ContextVar[Optional[str]] = ContextVar("loja_id", default=None)
+
+# Atributos padrão do LogRecord; o resto veio de `extra=` e vai para o JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "loja_id"}
+
+logger_acesso = logging.getLogger("fluyt.acesso")
+
+
+class ContextoFilter(logging.Filter):
+    """Anexa request_id/loja_id da requisição corrente ao registro"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.loja_id = loja_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "loja_id": getattr(record, "loja_id", None),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                dados[chave] = valor
+        if record.exc_info:
+            dados["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            dados["exc"] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class TextoFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento, com o contexto da requisição"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s")
+
+
+class FilaLogHandler(QueueHandler):
+    """
+    QueueHandler que não bloqueia e faz o mínimo na thread da requisição:
+    resolve a mensagem e o traceback (não serializáveis depois) e enfileira.
+    """
+
+    def __init__(self, fila: "queue.Queue[logging.LogRecord]"):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class EstatisticasLog:
+    """Custo do log de acesso por requisição, comparado ao orçamento"""
+
+    def __init__(self, orcamento_us: int):
+        self.orcamento_us = orcamento_us
+        self._lock = threading.Lock()
+        self.requisicoes = 0
+        self.registradas = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+        self.acima_orcamento = 0
+
+    def registrar(self, custo_us: float, registrada: bool) -> None:
+        with self._lock:
+            self.requisicoes += 1
+            self.registradas += int(registrada)
+            self.total_us += custo_us
+            self.max_us = max(self.max_us, custo_us)
+            self.acima_orcamento += int(custo_us > self.orcamento_us)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requisicoes,
+                "logged": self.registradas,
+                "avg_cost_us": round(self.total_us / self.requisicoes, 2) if self.requisicoes else 0.0,
+                "max_cost_us": round(self.max_us, 2),
+                "budget_us": self.orcamento_us,
+                "over_budget": self.acima_orcamento
+            }
+
+
+class PipelineLog:
+    """Fila + listener instalados no root logger por configurar_logging"""
+
+    def __init__(self, settings: Settings):
+        self.taxa_2xx = settings.log_sample_rate_2xx
+        self.lento_ms = settings.log_slow_request_ms
+        self.estatisticas = EstatisticasLog(settings.log_budget_us)
+
+        saida = logging.StreamHandler(sys.stdout)
+        saida.setFormatter(TextoFormatter() if settings.log_format.lower() == "texto" else JsonFormatter())
+
+        self.fila: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=settings.log_queue_size)
+        self.handler = FilaLogHandler(self.fila)
+        self.handler.addFilter(ContextoFilter())
+        self.listener = QueueListener(self.fila, saida, respect_handler_level=False)
+
+    def deve_registrar(self, status_code: int, duracao_ms: float) -> bool:
+        """Erros e requisições lentas sempre; demais por amostragem"""
+        if status_code >= 400 or duracao_ms >= self.lento_ms:
+            return True
+        return random.random() < self.taxa_2xx
+
+    def registrar_acesso(self, metodo: str, path: str, status_code: int, duracao_ms: float) -> None:
+        """Log de acesso (uma linha por requisição amostrada) com medição de custo"""
+        inicio = time.perf_counter()
+        registrada = self.deve_registrar(status_code, duracao_ms)
+        if registrada:
+            nivel = logging.ERROR if status_code >= 500 else logging.WARNING if status_code >= 400 else logging.INFO
+            logger_acesso.log(nivel, "request", extra={
+                "method": metodo,
+                "path": path,
+                "status": status_code,
+                "duration_ms": round(duracao_ms, 2)
+            })
+        self.estatisticas.registrar((time.perf_counter() - inicio) * 1e6, registrada)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores expostos no /health"""
+        return {
+            **self.estatisticas.stats(),
+            "sample_rate_2xx": self.taxa_2xx,
+            "queue_size": self.fila.qsize(),
+            "dropped": self.handler.descartados
+        }
+
+
+def _parse_niveis(niveis: str) -> Dict[str, str]:
+    """'modulo=NIVEL,outro=NIVEL' → {modulo: NIVEL}"""
+    resultado = {}
+    for item in niveis.split(","):
+        if "=" in item:
+            modulo, nivel = item.split("=", 1)
+            resultado[modulo.strip()] = nivel.strip().upper()
+    return resultado
+
+
+# Pipeline global
+_pipeline: Optional[PipelineLog] = None
+
+
+def configurar_logging(settings: Settings) -> PipelineLog:
+    """
+    Substitui os handlers do root logger pela fila e inicia o listener.
+    Idempotente: chamadas seguintes retornam o pipeline já instalado.
+    """
+    global _pipeline
+
+    if _pipeline is not None:
+        return _pipeline
+
+    _pipeline = PipelineLog(settings)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_pipeline.handler)
+    root.setLevel(settings.log_level.upper())
+
+    for modulo, nivel in _parse_niveis(settings.log_levels).items():
+        logging.getLogger(modulo).setLevel(nivel)
+
+    _pipeline.listener.start()
+    atexit.register(encerrar_logging)
+    return _pipeline
+
+
+def encerrar_logging() -> None:
+    """Esvazia a fila e para o listener (shutdown)"""
+    global _pipeline
+
+    if _pipeline is None:
+        return
+    _pipeline.listener.stop()
+    logging.getLogger().removeHandler(_pipeline.handler)
+    _pipeline = None
+
+
+def get_pipeline_log() -> Optional[PipelineLog]:
+    """Pipeline instalado (None antes de configurar_logging)"""
+    return _pipeline
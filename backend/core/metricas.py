@@ -0,0 +1,202 @@
+"""
+Métricas no formato texto do Prometheus (GET /metrics).
+
+- HTTP por rota (path template, ex.: /api/v1/clientes/{cliente_id}):
+  contagem por status, histograma de latência e requisições em andamento
+- Supabase por tabela e operação: contagem, erros e histograma de duração
+
+Coleta sem locks: todas as atualizações acontecem na thread do event loop
+(o middleware e o QueryExecutor registram depois do `await`, não nas
+threads do pool), então incrementos em dict não disputam com outras threads.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+
+from starlette.routing import Match
+
+# Limites dos buckets em segundos (convenção do Prometheus)
+BUCKETS_PADRAO: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rotas não encontradas viram um só rótulo (evita explosão de cardinalidade)
+ROTA_NAO_ENCONTRADA = "unmatched"
+
+_OPERACOES_HTTP = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "PUT": "upsert", "DELETE": "delete"}
+
+
+class Histograma:
+    """Histograma com buckets fixos (contagens não cumulativas até a renderização)"""
+
+    __slots__ = ("limites", "contagens", "soma", "total")
+
+    def __init__(self, limites: Sequence[float] = BUCKETS_PADRAO):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def cumulativos(self) -> List[Tuple[str, int]]:
+        """Pares (le, contagem acumulada), incluindo +Inf"""
+        acumulado, resultado = 0, []
+        for limite, contagem in zip(list(self.limites) + [float("inf")], self.contagens):
+            acumulado += contagem
+            resultado.append(("+Inf" if limite == float("inf") else repr(limite), acumulado))
+        return resultado
+
+
+def descrever_query(query: Any) -> Tuple[str, str]:
+    """
+    Tabela e operação de um query builder do PostgREST.
+
+    Returns:
+        (tabela, operacao), ex.: ('c_clientes', 'select'), ('rpc/fn', 'rpc')
+    """
+    tabela = str(getattr(query, "path", "") or "desconhecida").lstrip("/")
+    metodo = str(getattr(query, "http_method", "") or "").upper()
+
+    if tabela.startswith("rpc/"):
+        return tabela, "rpc"
+    operacao = _OPERACOES_HTTP.get(metodo, metodo.lower() or "desconhecida")
+    if operacao == "insert" and "merge-duplicates" in str(getattr(query, "headers", {}).get("prefer", "")):
+        operacao = "upsert"
+    return tabela, operacao
+
+
+def _rotulos(nomes: Sequence[str], valores: Sequence[Any]) -> str:
+    pares = []
+    for nome, valor in zip(nomes, valores):
+        texto = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pares.append(f'{nome}="{texto}"')
+    return ",".join(pares)
+
+
+class RegistroMetricas:
+    """
+    Contadores, gauges e histogramas da aplicação.
+
+    Args:
+        buckets: Limites (segundos) dos histogramas de latência
+        max_rotas_cache: Entradas do cache (método, path) → rota template
+    """
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS_PADRAO, max_rotas_cache: int = 4096):
+        self.buckets = tuple(buckets)
+        self.max_rotas_cache = max_rotas_cache
+        self._rotas: Dict[Tuple[str, str], str] = {}
+
+        self.http_total: Dict[Tuple[str, str, int], int] = {}
+        self.http_latencia: Dict[Tuple[str, str], Histograma] = {}
+        self.http_em_andamento: Dict[Tuple[str, str], int] = {}
+
+        self.queries_total: Dict[Tuple[str, str], int] = {}
+        self.queries_erros: Dict[Tuple[str, str], int] = {}
+        self.queries_duracao: Dict[Tuple[str, str], Histograma] = {}
+
+    # ===== HTTP =====
+
+    def rota(self, scope: Dict[str, Any]) -> str:
+        """Path template da rota que vai atender o scope (com cache)"""
+        chave = (scope["method"], scope["path"])
+        rota = self._rotas.get(chave)
+        if rota is not None:
+            return rota
+
+        rota = ROTA_NAO_ENCONTRADA
+        app = scope.get("app")
+        for candidata in getattr(getattr(app, "router", None), "routes", []):
+            match, _ = candidata.matches(scope)
+            if match == Match.FULL:
+                rota = getattr(candidata, "path", ROTA_NAO_ENCONTRADA)
+                break
+            if match == Match.PARTIAL and rota == ROTA_NAO_ENCONTRADA:
+                rota = getattr(candidata, "path", ROTA_NAO_ENCONTRADA)  # método não permitido
+
+        if len(self._rotas) >= self.max_rotas_cache:
+            self._rotas.clear()
+        self._rotas[chave] = rota
+        return rota
+
+    def inicio_requisicao(self, metodo: str, rota: str) -> None:
+        chave = (metodo, rota)
+        self.http_em_andamento[chave] = self.http_em_andamento.get(chave, 0) + 1
+
+    def fim_requisicao(self, metodo: str, rota: str, status_code: int, duracao_s: float) -> None:
+        chave = (metodo, rota)
+        self.http_em_andamento[chave] = self.http_em_andamento.get(chave, 1) - 1
+
+        chave_status = (metodo, rota, status_code)
+        self.http_total[chave_status] = self.http_total.get(chave_status, 0) + 1
+
+        histograma = self.http_latencia.get(chave)
+        if histograma is None:
+            histograma = self.http_latencia[chave] = Histograma(self.buckets)
+        histograma.observar(duracao_s)
+
+    # ===== SUPABASE =====
+
+    def registrar_query(self, tabela: str, operacao: str, duracao_s: float, erro: bool = False) -> None:
+        chave = (tabela, operacao)
+        self.queries_total[chave] = self.queries_total.get(chave, 0) + 1
+        if erro:
+            self.queries_erros[chave] = self.queries_erros.get(chave, 0) + 1
+
+        histograma = self.queries_duracao.get(chave)
+        if histograma is None:
+            histograma = self.queries_duracao[chave] = Histograma(self.buckets)
+        histograma.observar(duracao_s)
+
+    # ===== EXPOSIÇÃO =====
+
+    def renderizar(self) -> str:
+        """Texto no formato de exposição do Prometheus (0.0.4)"""
+        linhas: List[str] = []
+
+        def contador(nome: str, ajuda: str, tipo: str, rotulos: Sequence[str], valores: Dict[Tuple, Any]) -> None:
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for chave, valor in sorted(valores.items(), key=lambda item: tuple(map(str, item[0]))):
+                linhas.append(f"{nome}{{{_rotulos(rotulos, chave)}}} {valor}")
+
+        def histograma(nome: str, ajuda: str, rotulos: Sequence[str], valores: Dict[Tuple, Histograma]) -> None:
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} histogram")
+            for chave, hist in sorted(valores.items(), key=lambda item: tuple(map(str, item[0]))):
+                base = _rotulos(rotulos, chave)
+                for le, acumulado in hist.cumulativos():
+                    linhas.append(f'{nome}_bucket{{{base},le="{le}"}} {acumulado}')
+                linhas.append(f"{nome}_sum{{{base}}} {hist.soma}")
+                linhas.append(f"{nome}_count{{{base}}} {hist.total}")
+
+        contador("fluyt_http_requests_total", "Requisições HTTP por rota e status", "counter",
+                 ("method", "route", "status"), dict(self.http_total))
+        histograma("fluyt_http_request_duration_seconds", "Latência das requisições HTTP por rota",
+                   ("method", "route"), dict(self.http_latencia))
+        contador("fluyt_http_requests_in_flight", "Requisições HTTP em andamento por rota", "gauge",
+                 ("method", "route"), dict(self.http_em_andamento))
+        contador("fluyt_supabase_queries_total", "Queries ao Supabase por tabela e operação", "counter",
+                 ("table", "operation"), dict(self.queries_total))
+        contador("fluyt_supabase_query_errors_total", "Queries ao Supabase que falharam", "counter",
+                 ("table", "operation"), dict(self.queries_erros))
+        histograma("fluyt_supabase_query_duration_seconds", "Duração das queries ao Supabase por tabela",
+                   ("table", "operation"), dict(self.queries_duracao))
+
+        return "\n".join(linhas) + "\n"
+
+
+# Instância global
+_metricas: Optional[RegistroMetricas] = None
+
+
+def get_metricas() -> RegistroMetricas:
+    """Retorna o registro global de métricas, criando-o sob demanda"""
+    global _metricas
+
+    if _metricas is None:
+        _metricas = RegistroMetricas()
+
+    return _metricas
@@ -0,0 +1,107 @@
+"""
+Middleware ASGI único da aplicação.
+
+Substitui os decorators @app.middleware("http") (request id, log de acesso,
+headers de debug) e o AuthMiddleware empilhados: cada BaseHTTPMiddleware
+criava uma task e um stream de memória por requisição e bufferizava
+respostas em streaming. Aqui tudo acontece numa só camada ASGI, que apenas
+embrulha `send` para acrescentar os headers.
+"""
+
+from typing import Optional
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.auth import autenticar_scope
+from core.logs import PipelineLog, loja_id_var, request_id_var
+from core.metricas import RegistroMetricas
+from core.consultas import HistoricoConsultas, consultas_requisicao_var
+
+
+class RequisicaoMiddleware:
+    """
+    Por requisição HTTP:
+    1. Contexto de autenticação (scope["user"], ver core.auth.autenticar_scope)
+    2. Request ID (request.state.request_id, header X-Request-ID e contexto dos logs)
+    3. Tempo de processamento (header X-Process-Time, até o início da resposta)
+    4. Log de acesso amostrado ao fim do corpo da resposta
+    5. Métricas por rota (contagem, latência, em andamento)
+    6. Rastreio das queries da requisição (X-Query-Count/X-Query-Time e histórico
+       para GET /debug/queries/{request_id})
+
+    Args:
+        app: Aplicação ASGI
+        pipeline_log: Pipeline de logging (None = sem log de acesso)
+        debug_headers: Adiciona X-Environment/X-Debug (desenvolvimento)
+        metricas: Registro de métricas (None = sem métricas)
+        historico_consultas: Histórico de queries por requisição (None = sem rastreio)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        pipeline_log: Optional[PipelineLog] = None,
+        debug_headers: bool = False,
+        metricas: Optional[RegistroMetricas] = None,
+        historico_consultas: Optional[HistoricoConsultas] = None
+    ):
+        self.app = app
+        self.pipeline_log = pipeline_log
+        self.debug_headers = debug_headers
+        self.metricas = metricas
+        self.historico_consultas = historico_consultas
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        autenticar_scope(scope)
+
+        request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        usuario = scope.get("user") or {}
+
+        status_code = 500
+        consultas = [] if self.historico_consultas is not None else None
+
+        async def send_com_headers(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Process-Time"] = str(time.perf_counter() - inicio)
+                if self.debug_headers:
+                    headers["X-Environment"] = "development"
+                    headers["X-Debug"] = "true"
+                if consultas is not None:
+                    headers["X-Query-Count"] = str(len(consultas))
+                    headers["X-Query-Time"] = str(round(sum(c.duracao_ms for c in consultas), 2))
+            await send(message)
+
+        rota = self.metricas.rota(scope) if self.metricas is not None else None
+        if rota is not None:
+            self.metricas.inicio_requisicao(scope["method"], rota)
+
+        token_request_id = request_id_var.set(request_id)
+        token_loja_id = loja_id_var.set(usuario.get("loja_id"))
+        token_consultas = consultas_requisicao_var.set(consultas)
+        try:
+            await self.app(scope, receive, send_com_headers)
+        finally:
+            # Registrado ainda com o contexto da requisição (também em exceções → 500)
+            duracao = time.perf_counter() - inicio
+            if rota is not None:
+                self.metricas.fim_requisicao(scope["method"], rota, status_code, duracao)
+            if self.pipeline_log is not None:
+                self.pipeline_log.registrar_acesso(scope["method"], scope["path"], status_code, duracao * 1000)
+            if consultas is not None:
+                self.historico_consultas.guardar(request_id, consultas)
+            request_id_var.reset(token_request_id)
+            loja_id_var.reset(token_loja_id)
+            consultas_requisicao_var.reset(token_consultas)
@@ -0,0 +1,95 @@
+"""
+Orquestração de etapas assíncronas com dependências.
+
+Cada etapa declara de quais outras depende; etapas independentes rodam
+concorrentemente e recebem os resultados das dependências como argumentos
+nomeados. Na primeira falha as etapas ainda pendentes são canceladas e a
+exceção original é propagada (sem ExceptionGroup), preservando o tratamento
+de erros existente nos services.
+
+O cancelamento só interrompe as corrotinas: uma query já entregue ao
+QueryExecutor (core.database) segue até o fim na thread e o resultado é
+descartado. Etapas com efeito colateral que não deve ocorrer quando outra
+falha (ex.: reservar o número do orçamento) precisam depender dela.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+FuncaoEtapa = Callable[..., Awaitable[Any]]
+Etapas = Dict[str, Tuple[FuncaoEtapa, Sequence[str]]]
+
+
+def _validar_dependencias(etapas: Etapas) -> None:
+    """Garante que todas as dependências existem e que não há ciclos"""
+    for nome, (_, dependencias) in etapas.items():
+        for dependencia in dependencias:
+            if dependencia not in etapas:
+                raise ValueError(f"Etapa '{nome}' depende de etapa inexistente '{dependencia}'")
+
+    visitando, concluidas = set(), set()
+
+    def visitar(nome: str) -> None:
+        if nome in concluidas:
+            return
+        if nome in visitando:
+            raise ValueError(f"Dependência circular envolvendo a etapa '{nome}'")
+        visitando.add(nome)
+        for dependencia in etapas[nome][1]:
+            visitar(dependencia)
+        visitando.discard(nome)
+        concluidas.add(nome)
+
+    for nome in etapas:
+        visitar(nome)
+
+
+async def executar_etapas(
+    etapas: Etapas,
+    duracoes: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Executa as etapas respeitando dependências, com máxima concorrência.
+
+    Args:
+        etapas: {nome: (funcao_async, [dependencias])}. A função recebe os
+            resultados das dependências como kwargs com o nome de cada etapa.
+        duracoes: Dict opcional preenchido com a duração (ms) de cada etapa
+
+    Returns:
+        Dict {nome: resultado} de todas as etapas
+
+    Raises:
+        A exceção da primeira etapa que falhar (demais etapas são canceladas;
+        queries já em execução numa thread não são interrompidas)
+    """
+    _validar_dependencias(etapas)
+    tarefas: Dict[str, asyncio.Task] = {}
+
+    async def executar(nome: str) -> Any:
+        funcao, dependencias = etapas[nome]
+        argumentos = {dep: await tarefas[dep] for dep in dependencias}
+
+        inicio = time.perf_counter()
+        resultado = await funcao(**argumentos)
+        if duracoes is not None:
+            duracoes[nome] = round((time.perf_counter() - inicio) * 1000, 2)
+        return resultado
+
+    for nome in etapas:
+        tarefas[nome] = asyncio.create_task(executar(nome), name=f"etapa:{nome}")
+
+    try:
+        await asyncio.gather(*tarefas.values())
+    except BaseException:
+        for tarefa in tarefas.values():
+            tarefa.cancel()
+        # Aguarda o cancelamento para não deixar tarefas órfãs no loop
+        await asyncio.gather(*tarefas.values(), return_exceptions=True)
+        raise
+
+    return {nome: tarefa.result() for nome, tarefa in tarefas.items()}
@@ -0,0 +1,106 @@
+"""
+Paginação keyset (cursor) por (created_at, id).
+
+Diferente de .range(skip, ...), o cursor aponta para a última linha vista:
+páginas profundas custam o mesmo que a primeira (o índice vai direto à
+posição) e inserções concorrentes não deslocam linhas entre páginas.
+
+O cursor é opaco para o cliente (base64 de JSON) e deve ser devolvido
+exatamente como recebido em `next_cursor`.
+"""
+
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+import base64
+import json
+
+from pydantic import BaseModel
+
+from core.exceptions import ValidationException
+
+T = TypeVar("T")
+
+
+class PaginaCursor(BaseModel, Generic[T]):
+    """Página retornada no modo cursor"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class CursorKeyset:
+    """Posição (created_at, id) da última linha de uma página"""
+
+    def __init__(self, created_at: str, id: str):
+        self.created_at = created_at
+        self.id = id
+
+    def codificar(self) -> str:
+        payload = json.dumps({"c": self.created_at, "i": self.id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decodificar(cls, cursor: Optional[str]) -> Optional["CursorKeyset"]:
+        """
+        Decodifica o cursor recebido do cliente.
+
+        Args:
+            cursor: Valor de `next_cursor` (vazio = primeira página)
+
+        Returns:
+            CursorKeyset ou None para a primeira página
+
+        Raises:
+            ValidationException: Cursor adulterado ou de outro formato
+        """
+        if not cursor:
+            return None
+        try:
+            preenchimento = "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+            return cls(str(payload["c"]), str(payload["i"]))
+        except Exception:
+            raise ValidationException("Cursor de paginação inválido", field="cursor")
+
+    @classmethod
+    def do_registro(cls, registro: Dict[str, Any]) -> "CursorKeyset":
+        return cls(str(registro["created_at"]), str(registro["id"]))
+
+
+def filtro_or(query: Any, expressao: str) -> Any:
+    """Filtro `or=(...)` do PostgREST (postgrest-py 0.13 ainda não tem .or_())"""
+    if hasattr(query, "or_"):
+        return query.or_(expressao)
+    query.params = query.params.add("or", f"({expressao})")
+    return query
+
+
+def aplicar_cursor(query: Any, cursor: Optional[CursorKeyset], limit: int) -> Any:
+    """
+    Ordena por (created_at, id) decrescente e posiciona após o cursor.
+
+    Busca `limit + 1` linhas para saber se existe próxima página;
+    use `fatiar_pagina` sobre o resultado.
+    """
+    if cursor is not None:
+        # Linhas estritamente "depois" do cursor na ordem decrescente
+        query = filtro_or(
+            query,
+            f'created_at.lt."{cursor.created_at}",'
+            f'and(created_at.eq."{cursor.created_at}",id.lt."{cursor.id}")'
+        )
+
+    # Ordenação composta num único parâmetro (o PostgREST não combina `order` repetidos)
+    query.params = query.params.set("order", "created_at.desc,id.desc")
+    return query.limit(limit + 1)
+
+
+def fatiar_pagina(registros: Sequence[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Corta a linha excedente buscada por `aplicar_cursor`.
+
+    Returns:
+        (registros da página, next_cursor ou None se for a última página)
+    """
+    pagina = list(registros[:limit])
+    if len(registros) <= limit or not pagina:
+        return pagina, None
+    return pagina, CursorKeyset.do_registro(pagina[-1]).codificar()
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from core import auth
+from core.auth import AuthException, AuthMiddleware, CacheTokensVerificados, create_access_token, decode_jwt_token, get_current_user
+from core.config import Settings
+
+SETTINGS = Settings(jwt_secret_key="segredo-de-teste")
+USUARIO = {"user_id": "u-1", "loja_id": "loja-1", "perfil": "GERENTE", "email": "g@loja.com"}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CacheTokensVerificados(max_entradas=2)
+    monkeypatch.setattr(auth, "_cache_tokens", cache)
+    return cache
+
+
+@pytest.fixture
+def contador_decode(monkeypatch):
+    chamadas = []
+    original = auth.jwt.decode
+
+    def decode(*args, **kwargs):
+        chamadas.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", decode)
+    return chamadas
+
+
+def test_token_verificado_uma_vez(cache, contador_decode):
+    token = create_access_token(USUARIO, SETTINGS)
+
+    primeiro = decode_jwt_token(token, SETTINGS)
+    segundo = decode_jwt_token(token, SETTINGS)
+
+    assert primeiro == segundo and primeiro["loja_id"] == "loja-1"
+    assert len(contador_decode) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_token_invalido_nao_entra_no_cache(cache):
+    with pytest.raises(AuthException):
+        decode_jwt_token("nao.e.jwt", SETTINGS)
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_limita_entradas_e_expira_no_exp():
+    agora = [1000.0]
+    cache = CacheTokensVerificados(max_entradas=2, relogio=lambda: agora[0])
+
+    cache.armazenar("a", {"sub": "a", "exp": 2000})
+    cache.armazenar("b", {"sub": "b", "exp": 1500})
+    cache.obter("a")
+    cache.armazenar("c", {"sub": "c", "exp": 2000})
+
+    assert cache.obter("b") is None  # menos usado recentemente
+    assert cache.obter("a")["sub"] == "a"
+
+    agora[0] = 2000.0
+    assert cache.obter("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_middleware_e_dependency_decodificam_uma_vez(cache, contador_decode, monkeypatch):
+    monkeypatch.setattr(auth, "get_settings", lambda: SETTINGS)
+    cache.max_entradas = 0  # sem LRU: mede só o reaproveitamento do scope["user"]
+
+    app = FastAPI()
+    app.add_middleware(AuthMiddleware)
+    app.dependency_overrides[auth.get_settings] = lambda: SETTINGS
+
+    @app.get("/eu")
+    async def eu(current_user=Depends(get_current_user)):
+        return current_user
+
+    token = create_access_token(USUARIO, SETTINGS)
+    resposta = TestClient(app).get("/eu", headers={"Authorization": f"Bearer {token}"})
+
+    assert resposta.status_code == 200
+    assert resposta.json()["perfil"] == "GERENTE"
+    assert len(contador_decode) == 1
+
+
+def test_token_sem_exp_nao_entra_no_cache_e_troca_de_segredo_invalida(cache):
+    cache.armazenar("sem-exp", {"sub": "a"})
+    cache.armazenar("exp-texto", {"sub": "a", "exp": "amanhã"})
+    assert cache.stats()["entries"] == 0
+
+    token = create_access_token(USUARIO, SETTINGS)
+    decode_jwt_token(token, SETTINGS)
+
+    # Token assinado com o segredo anterior não é servido do cache
+    with pytest.raises(AuthException):
+        decode_jwt_token(token, Settings(jwt_secret_key="segredo-novo"))
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from core.autocomplete import IndicePrefixos, RegistroIndices, construir_indice_prefixos
+
+
+def indice_clientes(max_documentos=100):
+    indice = IndicePrefixos(max_documentos)
+    indice.adicionar_lote([
+        {'id': '1', 'nome': 'João da Silva', 'telefone': '(11) 98765-4321'},
+        {'id': '2', 'nome': 'Joana Prado', 'telefone': '(41) 3333-1234'},
+        {'id': '3', 'nome': 'Ana Joaquina Souza', 'telefone': None},
+        {'id': '4', 'nome': 'Silvio Santos', 'telefone': '11 99999-0000'},
+    ])
+    return indice
+
+
+def ids(sugestoes):
+    return [s['id'] for s in sugestoes]
+
+
+def test_prefixo_de_nome_sem_acento_e_telefone():
+    indice = indice_clientes()
+
+    # Nome começando pelo termo antes de palavra do meio
+    assert ids(indice.sugerir('joa')) == ['2', '1', '3']
+    assert ids(indice.sugerir('SIL')) == ['4', '1']
+    assert ids(indice.sugerir('joao silv')) == ['1']
+    assert ids(indice.sugerir('98765')) == ['1']
+    assert ids(indice.sugerir('11 9')) == ['1', '4']
+    assert indice.sugerir('joa', limite=1) == [{'id': '2', 'nome': 'Joana Prado', 'telefone': '(41) 3333-1234'}]
+    assert indice.sugerir('xyz') == [] and indice.sugerir('12') == []
+
+
+def test_atualizacao_incremental_e_limite_de_memoria():
+    indice = indice_clientes(max_documentos=4)
+
+    indice.adicionar('2', {'nome': 'Carla Prado', 'telefone': '(41) 3333-1234'})
+    assert ids(indice.sugerir('joa')) == ['1', '3'] and ids(indice.sugerir('car')) == ['2']
+    assert indice.remover('1') and not indice.remover('1')
+    assert ids(indice.sugerir('silva')) == [] and ids(indice.sugerir('987')) == []
+
+    # Acima do limite, o cliente mais antigo sai do índice
+    indice.adicionar('5', {'nome': 'Bruno Costa', 'telefone': None})
+    indice.adicionar('6', {'nome': 'Beatriz Costa', 'telefone': None})
+    assert len(indice) == 4 and ids(indice.sugerir('ana')) == []
+    assert ids(indice.sugerir('costa')) == ['5', '6']
+
+
+@pytest.mark.asyncio
+async def test_carga_acima_do_limite_mantem_os_clientes_mais_recentes():
+    async def lotes():
+        # Como iterar_clientes: created_at DESC, em lotes
+        yield [{'id': '5', 'nome': 'Eva Nova', 'telefone': None}, {'id': '4', 'nome': 'Davi Novo', 'telefone': None}]
+        yield [{'id': '3', 'nome': 'Caio Novo', 'telefone': None}, {'id': '2', 'nome': 'Bia Antiga', 'telefone': None}]
+        yield [{'id': '1', 'nome': 'Ana Antiga', 'telefone': None}]
+
+    indice = await construir_indice_prefixos(lotes(), max_documentos=3)
+
+    assert len(indice) == 3
+    assert ids(indice.sugerir('antig')) == []
+    assert sorted(ids(indice.sugerir('nov'))) == ['3', '4', '5']
+
+
+@pytest.mark.asyncio
+async def test_registro_constroi_uma_vez_com_lru_e_ttl():
+    relogio = [0.0]
+    registro = RegistroIndices(max_indices=2, ttl_seconds=60, relogio=lambda: relogio[0])
+    construcoes = []
+
+    async def construir():
+        construcoes.append(1)
+        await asyncio.sleep(0.01)
+        indice = IndicePrefixos(100)
+        indice.adicionar('1', {'nome': 'João', 'telefone': None})
+        return indice
+
+    indices = await asyncio.gather(*(registro.obter('clientes:a', construir) for _ in range(5)))
+    assert len(construcoes) == 1 and all(i is indices[0] for i in indices)
+
+    registro.atualizar('clientes:a', '2', {'nome': 'Joana', 'telefone': None})
+    registro.atualizar('clientes:x', '9', {'nome': 'ignorado', 'telefone': None})  # índice não carregado
+    assert len(indices[0].sugerir('joa')) == 2
+
+    await registro.obter('clientes:b', construir)
+    await registro.obter('clientes:c', construir)
+    assert registro.stats()['indices'] == 2 and registro.stats()['evictions'] == 1
+
+    relogio[0] = 61
+    await registro.obter('clientes:c', construir)
+    assert len(construcoes) == 4
@@ -0,0 +1,49 @@
+from core.busca import MIN_DIGITOS, aplicar_busca, apenas_digitos, normalizar, ranquear
+
+
+class QueryFalsa:
+    def __init__(self):
+        self.filtros = []
+
+    def or_(self, expressao):
+        self.filtros.append(expressao)
+        return self
+
+
+CLIENTES = [
+    {'id': '1', 'nome': 'Pedro Álvares', 'cidade': 'João Pessoa', 'telefone': None, 'cpf_cnpj': None},
+    {'id': '2', 'nome': 'Maria Joana Souza', 'cidade': 'Campinas', 'telefone': '(19) 3232-1000', 'cpf_cnpj': '321.654.987-00'},
+    {'id': '3', 'nome': 'João da Silva', 'cidade': 'São Paulo', 'telefone': '(11) 98765-4321', 'cpf_cnpj': '123.456.789-09'},
+]
+
+
+def ids(linhas):
+    return [linha['id'] for linha in linhas]
+
+
+def test_normalizacao():
+    assert normalizar('  JOÃO  da Conceição-Ávila ') == 'joao da conceicao avila'
+    assert apenas_digitos('(11) 98765-4321') == '11987654321'
+    assert normalizar(None) == '' and apenas_digitos(None) == ''
+
+
+def test_aplicar_busca_usa_colunas_normalizadas():
+    assert aplicar_busca(QueryFalsa(), 'João  Silva').filtros == [
+        'and(busca_texto.ilike.*joao*,busca_texto.ilike.*silva*)'
+    ]
+    assert aplicar_busca(QueryFalsa(), '98765-4321').filtros == [
+        'and(busca_texto.ilike.*98765*,busca_texto.ilike.*4321*),busca_digitos.ilike.*987654321*'
+    ]
+    # Dígitos abaixo do mínimo não viram filtro de telefone/documento
+    assert aplicar_busca(QueryFalsa(), '1' * (MIN_DIGITOS - 1)).filtros == ['busca_texto.ilike.*11*']
+    assert aplicar_busca(QueryFalsa(), '  --  ') is None
+
+
+def test_ranquear_por_campo_e_posicao():
+    campos_texto, campos_digitos = {'nome': 1.0, 'cidade': 0.4}, {'telefone': 1.0, 'cpf_cnpj': 1.0}
+
+    # Nome começando pelo termo antes de palavra do meio, e ambos antes da cidade
+    assert ids(ranquear(CLIENTES, 'joa', campos_texto, campos_digitos)) == ['3', '2', '1']
+    assert ids(ranquear(CLIENTES, '321.654', campos_texto, campos_digitos))[0] == '2'
+    # Empate mantém a ordem do banco
+    assert ids(ranquear(CLIENTES, 'zzz', campos_texto, campos_digitos)) == ['1', '2', '3']
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from postgrest import SyncPostgrestClient
+
+from core import consultas
+from core.config import Settings
+from core.consultas import HistoricoConsultas, formato_filtros, registrar_consulta, resumo_consultas
+from core.database import QueryExecutor
+from core.metricas import RegistroMetricas
+from core.middleware import RequisicaoMiddleware
+
+
+class QueryFalsa:
+    def __init__(self, query, linhas):
+        self._query = query
+        self._linhas = linhas
+        self.path = query.path
+        self.http_method = query.http_method
+        self.params = query.params
+        self.headers = query.headers
+
+    def execute(self):
+        return SimpleNamespace(data=[{"id": i} for i in range(self._linhas)])
+
+
+def tabela(nome="c_clientes"):
+    return SyncPostgrestClient("http://localhost").table(nome)
+
+
+def test_formato_filtros_sem_valores():
+    query = tabela().select("id, nome").eq("loja_id", "loja-1").gte("created_at", "2024-01-01").order("nome").limit(20)
+
+    assert formato_filtros(query) == "loja_id=eq&created_at=gte&order&limit"
+    assert formato_filtros(tabela().select("*").eq("loja_id", "loja-2").gte("created_at", "2025-05-05").order("nome").limit(5)) \
+        == formato_filtros(query)
+
+
+def test_query_lenta_gera_warning(monkeypatch, caplog):
+    monkeypatch.setattr(consultas, "get_settings", lambda: Settings(slow_query_ms=100))
+    monkeypatch.setattr(consultas, "get_metricas", lambda: RegistroMetricas())
+    query = tabela().select("*").eq("loja_id", "loja-1")
+
+    with caplog.at_level("WARNING", logger="core.consultas"):
+        rapida = registrar_consulta(query, SimpleNamespace(data=[{}, {}]), 0.01, False)
+        lenta = registrar_consulta(query, SimpleNamespace(data=[{}]), 0.25, False)
+
+    assert rapida.linhas == 2 and lenta.duracao_ms == 250.0
+    avisos = [r for r in caplog.records if r.name == "core.consultas"]
+    assert len(avisos) == 1
+    assert avisos[0].tabela == "c_clientes" and avisos[0].filtros == "loja_id=eq"
+
+
+def test_resumo_agrupa_queries_repetidas(monkeypatch):
+    monkeypatch.setattr(consultas, "get_metricas", lambda: RegistroMetricas())
+    registros = [registrar_consulta(tabela().select("*").eq("id", str(i)), None, 0.001, False) for i in range(3)]
+    registros.append(registrar_consulta(tabela("c_lojas").select("*"), None, 0.001, False))
+
+    resumo = resumo_consultas(registros)
+
+    assert resumo["total"] == 4
+    assert resumo["repetidas"] == [
+        {"tabela": "c_clientes", "operacao": "select", "filtros": "id=eq", "vezes": 3, "duracao_ms": 3.0}
+    ]
+
+
+def test_queries_da_requisicao_em_headers_e_historico(monkeypatch):
+    monkeypatch.setattr(consultas, "get_metricas", lambda: RegistroMetricas())
+    historico = HistoricoConsultas(max_requisicoes=1)
+    executor = QueryExecutor(max_workers=2)
+    app = FastAPI()
+    app.add_middleware(RequisicaoMiddleware, historico_consultas=historico)
+
+    @app.get("/lista")
+    async def lista():
+        for _ in range(2):
+            await executor.run(QueryFalsa(tabela().select("*").eq("loja_id", "loja-1"), linhas=3))
+        return {"ok": True}
+
+    cliente = TestClient(app)
+    resposta = cliente.get("/lista")
+    segunda = cliente.get("/lista")
+
+    assert resposta.headers["x-query-count"] == "2"
+    assert float(resposta.headers["x-query-time"]) >= 0
+    assert historico.obter(resposta.headers["x-request-id"]) is None  # descartada (max_requisicoes=1)
+    registros = historico.obter(segunda.headers["x-request-id"])
+    assert [r.linhas for r in registros] == [3, 3]
+    assert consultas.consultas_requisicao_var.get() is None
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from jose import jwt
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+
+from core.config import Settings
+from core.database import ClienteLoja, QueryExecutor, criar_token_postgrest
+
+SEGREDO_SUPABASE = "segredo-do-projeto"
+
+
+class FakeQuery:
+    """Simula um query builder do PostgREST com round-trip bloqueante"""
+
+    def __init__(self, latency: float = 0.05, data=None):
+        self.latency = latency
+        self.data = data if data is not None else [{"id": "1"}]
+        self.thread_name = None
+
+    def execute(self):
+        self.thread_name = threading.current_thread().name
+        time.sleep(self.latency)
+        return self
+
+
+@pytest.mark.asyncio
+async def test_run_executa_fora_do_event_loop():
+    executor = QueryExecutor(max_workers=2)
+    query = FakeQuery(latency=0)
+
+    result = await executor.run(query)
+
+    assert result.data == [{"id": "1"}]
+    assert query.thread_name.startswith("supabase-query")
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queries_concorrentes_nao_serializam():
+    executor = QueryExecutor(max_workers=8)
+    queries = [FakeQuery(latency=0.1) for _ in range(8)]
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(executor.run(q) for q in queries))
+    duracao = time.perf_counter() - inicio
+
+    # Serializado levaria ~0.8s
+    assert duracao < 0.4
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_continua_responsivo():
+    executor = QueryExecutor(max_workers=1)
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    tarefa = asyncio.create_task(heartbeat())
+    await executor.run(FakeQuery(latency=0.2))
+    tarefa.cancel()
+
+    assert ticks >= 10
+    executor.shutdown()
+
+
+class ClienteSupabaseFalso:
+    """Cliente com a mesma sessão PostgREST para todas as requisições"""
+
+    def __init__(self, latencia: float = 0.0):
+
+        def responder(request):
+            # Simula o RLS do PostgREST: filtra pela claim loja_id do token recebido
+            token = request.headers["authorization"].split(" ")[1]
+            time.sleep(latencia)
+            if token == "anon":
+                return httpx.Response(200, json=[])
+            try:
+                claims = jwt.decode(token, SEGREDO_SUPABASE, algorithms=["HS256"], audience="authenticated")
+            except Exception:
+                return httpx.Response(401, json={"message": "JWSError"})
+            return httpx.Response(200, json=[{"loja_id": claims["loja_id"], "role": claims["role"]}])
+
+        self.postgrest = SyncPostgrestClient("http://postgrest", headers={"Authorization": "Bearer anon", "apikey": "anon"})
+        self.postgrest.session = SyncClient(
+            base_url="http://postgrest",
+            headers=self.postgrest.session.headers,
+            transport=httpx.MockTransport(responder)
+        )
+
+    def table(self, nome):
+        return self.postgrest.from_(nome)
+
+    def rpc(self, fn, params):
+        return self.postgrest.rpc(fn, params)
+
+
+def token_loja(loja_id: str, segredo: str = SEGREDO_SUPABASE):
+    return criar_token_postgrest(
+        {"user_id": f"u-{loja_id}", "loja_id": loja_id, "perfil": "VENDEDOR", "token": "token-da-aplicacao"},
+        Settings(jwt_secret_key="teste", supabase_jwt_secret=segredo)
+    )
+
+
+def test_cliente_loja_envia_token_na_query_sem_alterar_sessao():
+    supabase = ClienteSupabaseFalso()
+    cliente = ClienteLoja(supabase, token_loja("loja-1"), "loja-1")
+
+    query = cliente.table("c_clientes").select("*").eq("nome", "Ana")
+
+    assert query.headers["authorization"].startswith("Bearer ey")
+    assert query.execute().data == [{"loja_id": "loja-1", "role": "authenticated"}]
+    assert supabase.postgrest.session.headers["authorization"] == "Bearer anon"
+
+
+def test_sem_segredo_supabase_queries_usam_chave_do_cliente():
+    supabase = ClienteSupabaseFalso()
+    cliente = ClienteLoja(supabase, token_loja("loja-1", segredo=""), "loja-1")
+
+    query = cliente.table("c_clientes").select("*")
+
+    # O token da aplicação (JWT_SECRET_KEY) nunca é repassado ao PostgREST
+    assert "authorization" not in query.headers
+    assert query.execute().data == []
+
+
+@pytest.mark.asyncio
+async def test_requisicoes_concorrentes_de_lojas_diferentes_nao_vazam():
+    supabase = ClienteSupabaseFalso(latencia=0.002)
+    executor = QueryExecutor(max_workers=16)
+    tokens = {f"loja-{i}": token_loja(f"loja-{i}") for i in range(8)}
+
+    async def requisicao(n):
+        loja_id = f"loja-{n % 8}"
+        cliente = ClienteLoja(supabase, tokens[loja_id], loja_id)
+        result = await executor.run(cliente.table("c_orcamentos").select("*").eq("loja_id", loja_id))
+        return loja_id, result.data[0]["loja_id"]
+
+    respostas = await asyncio.gather(*(requisicao(n) for n in range(200)))
+
+    assert all(esperada == recebida for esperada, recebida in respostas)
+    executor.shutdown()
@@ -0,0 +1,124 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+
+from core import estatisticas
+from core.estatisticas import CacheEstatisticas, contar, contar_por_grupo
+
+
+class TabelaFalsa:
+    """PostgREST simulado sobre uma tabela em memória (filtros eq, count, agregação, limit/offset)"""
+
+    def __init__(self, linhas, agregacao=True):
+        self.linhas = linhas
+        self.agregacao = agregacao
+        self.requisicoes = 0
+        self.selects = []
+
+        def responder(request):
+            self.requisicoes += 1
+            params = request.url.params
+            selecionadas = [l for l in self.linhas if all(
+                str(l.get(coluna)) == valor[3:] for coluna, valor in params.multi_items() if valor.startswith("eq.")
+            )]
+            select = params["select"]
+            self.selects.append((request.url.path.rsplit("/", 1)[-1], select))
+
+            if "count()" in select:
+                if not self.agregacao:
+                    return httpx.Response(400, json={"code": "PGRST123", "message": "Use of aggregate functions is not allowed"})
+                coluna = select.split(",")[0].strip()
+                grupos = {}
+                for linha in selecionadas:
+                    grupos[linha[coluna]] = grupos.get(linha[coluna], 0) + 1
+                return httpx.Response(200, json=[{coluna: valor, "total": total} for valor, total in grupos.items()])
+
+            if "count=exact" in request.headers.get("prefer", ""):
+                return httpx.Response(200, json=selecionadas[:1], headers={"Content-Range": f"0-0/{len(selecionadas)}"})
+
+            # Limite padrão de linhas do PostgREST do Supabase
+            inicio = int(params.get("offset", 0))
+            pagina = selecionadas[inicio:inicio + min(int(params.get("limit", 1000)), 1000)]
+            return httpx.Response(200, json=[{select: linha[select]} for linha in pagina])
+
+        self.postgrest = SyncPostgrestClient("http://postgrest")
+        self.postgrest.session = SyncClient(base_url="http://postgrest", transport=httpx.MockTransport(responder))
+
+    def table(self, nome):
+        return self.postgrest.from_(nome)
+
+
+def criar_lojas(quantidade):
+    return [
+        {"id": f"l-{i:05d}", "empresa_id": f"e-{i % 3}", "ativo": i % 4 != 0}
+        for i in range(quantidade)
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("agregacao", [True, False])
+async def test_contagens_corretas_acima_de_1000_linhas(monkeypatch, agregacao):
+    monkeypatch.setattr(estatisticas, "_agregacao_desativada_ate", {})
+    tabela = TabelaFalsa(criar_lojas(2500), agregacao=agregacao)
+
+    por_status = await contar_por_grupo(tabela, "c_lojas", "ativo")
+    por_empresa = await contar_por_grupo(tabela, "c_lojas", "empresa_id", {"ativo": True})
+    total = await contar(tabela, "c_lojas")
+
+    assert total == 2500
+    assert por_status == {True: 1875, False: 625}
+    assert sum(por_empresa.values()) == 1875 and set(por_empresa) == {"e-0", "e-1", "e-2"}
+    assert ("c_lojas" not in estatisticas._agregacao_desativada_ate) is agregacao
+
+
+@pytest.mark.asyncio
+async def test_fallback_por_tabela_e_nova_tentativa_apos_ttl(monkeypatch):
+    relogio = [1000.0]
+    monkeypatch.setattr(estatisticas, "_agregacao_desativada_ate", {})
+    monkeypatch.setattr(estatisticas, "time", SimpleNamespace(monotonic=lambda: relogio[0]))
+    tabela = TabelaFalsa(criar_lojas(10), agregacao=False)
+
+    assert await contar_por_grupo(tabela, "c_lojas", "ativo") == {True: 7, False: 3}
+    assert set(estatisticas._agregacao_desativada_ate) == {"c_lojas"}
+
+    # Outras tabelas continuam tentando a agregação
+    tabela.agregacao = True
+    assert await contar_por_grupo(tabela, "c_equipe", "ativo") == {True: 7, False: 3}
+    assert tabela.selects[-1] == ("c_equipe", "ativo, total:count()")
+
+    # c_lojas segue paginada até o prazo vencer
+    await contar_por_grupo(tabela, "c_lojas", "ativo")
+    assert tabela.selects[-1] == ("c_lojas", "ativo")
+
+    relogio[0] += estatisticas._RETENTAR_AGREGACAO_SEGUNDOS
+    assert await contar_por_grupo(tabela, "c_lojas", "ativo") == {True: 7, False: 3}
+    assert tabela.selects[-1] == ("c_lojas", "ativo, total:count()")
+
+
+@pytest.mark.asyncio
+async def test_cache_calcula_uma_vez_e_invalida():
+    relogio = [0.0]
+    cache = CacheEstatisticas(ttl_seconds=30, relogio=lambda: relogio[0])
+    calculos = []
+
+    async def calcular():
+        calculos.append(1)
+        await asyncio.sleep(0.01)
+        return {"total": len(calculos)}
+
+    resultados = await asyncio.gather(*(cache.obter("lojas", calcular) for _ in range(10)))
+    assert len(calculos) == 1 and all(r == {"total": 1} for r in resultados)
+
+    resultados[0]["percentual"] = 50  # cópia: não altera o cache
+    assert await cache.obter("lojas", calcular) == {"total": 1}
+
+    cache.invalidar("lojas")
+    assert await cache.obter("lojas", calcular) == {"total": 2}
+
+    relogio[0] = 31
+    assert await cache.obter("lojas", calcular) == {"total": 3}
+    assert cache.stats()["misses"] == 3
@@ -0,0 +1,77 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from postgrest import SyncPostgrestClient
+
+from core.exportacao import _csv, _ndjson, iterar_em_lotes
+
+TABELA = [
+    {'id': f'id-{i:03d}', 'created_at': f'2026-01-01T10:00:{i:02d}+00:00', 'nome': f'José {i}', 'loja_id': 'loja-1'}
+    for i in range(7, 0, -1)
+]
+
+
+class QueryFalsa:
+    """Simula o PostgREST aplicando o filtro keyset e o limite recebidos"""
+
+    def __init__(self, chamadas):
+        self._query = SyncPostgrestClient('http://localhost').table('c_clientes').select('*').eq('loja_id', 'loja-1')
+        self.params = self._query.params
+        self.chamadas = chamadas
+
+    def limit(self, n):
+        self.params = self.params.set('limit', str(n))
+        return self
+
+    def execute(self):
+        params = dict(self.params)
+        self.chamadas.append(params)
+        linhas = TABELA
+        if 'or' in params:
+            # created_at.lt."<c>",... -> linhas depois do cursor
+            corte = params['or'].split('"')[1]
+            linhas = [r for r in TABELA if r['created_at'] < corte]
+        return SimpleNamespace(data=linhas[:int(params['limit'])])
+
+
+async def coletar(gerador):
+    return [parte async for parte in gerador]
+
+
+@pytest.mark.asyncio
+async def test_iterar_em_lotes_percorre_tudo_com_lotes_limitados():
+    chamadas = []
+
+    lotes = await coletar(iterar_em_lotes(lambda: QueryFalsa(chamadas), 3, lambda r: {**r, 'nome': r['nome'].upper()}))
+
+    assert [len(lote) for lote in lotes] == [3, 3, 1]
+    assert [r['id'] for lote in lotes for r in lote] == [r['id'] for r in TABELA]
+    assert lotes[0][0]['nome'] == 'JOSÉ 7'
+    assert all(c['loja_id'] == 'eq.loja-1' and c['limit'] == '4' for c in chamadas)
+
+
+@pytest.mark.asyncio
+async def test_csv_tem_bom_cabecalho_e_ignora_colunas_extras():
+    async def lotes():
+        yield TABELA[:2]
+        yield TABELA[2:3]
+
+    conteudo = b''.join(await coletar(_csv(lotes(), ['id', 'nome']))).decode('utf-8')
+
+    linhas = conteudo.splitlines()
+    assert linhas[0] == '\ufeffid,nome'
+    assert linhas[1:] == ['id-007,José 7', 'id-006,José 6', 'id-005,José 5']
+
+
+@pytest.mark.asyncio
+async def test_ndjson_uma_linha_por_registro():
+    async def lotes():
+        yield TABELA[:2]
+
+    conteudo = b''.join(await coletar(_ndjson(lotes(), ['id', 'nome']))).decode('utf-8')
+
+    assert [json.loads(linha) for linha in conteudo.splitlines()] == [
+        {'id': 'id-007', 'nome': 'José 7'},
+        {'id': 'id-006', 'nome': 'José 6'}
+    ]
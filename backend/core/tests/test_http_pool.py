@@ -0,0 +1,88 @@
+from core.config import Settings
+from core.database import SupabaseClient
+from core.http_pool import HttpPool, _pool_saturado
+
+
+def make_settings(**overrides) -> Settings:
+    valores = {
+        "supabase_url": "https://exemplo.supabase.co",
+        "supabase_anon_key": "anon.chave.teste",
+        "supabase_service_key": "service.chave.teste",
+        "db_pool_size": 4,
+        "db_max_overflow": 2,
+    }
+    valores.update(overrides)
+    return Settings(**valores)
+
+
+def test_pool_dimensionado_pelas_settings():
+    pool = HttpPool(make_settings())
+
+    stats = pool.stats()
+
+    assert stats["max_connections"] == 6
+    assert stats["max_keepalive"] == 4
+    # Os dois transportes juntos não passam do limite configurado
+    assert stats["max_connections_by_transport"] == {"sync": 5, "async": 1}
+    assert pool.sync_transport._pool._max_connections + pool.async_transport._pool._max_connections == 6
+    assert stats["in_use"] == 0
+    assert stats["idle"] == 0
+    assert stats["waits"] == 0
+
+
+def test_clientes_anon_e_service_compartilham_transporte(monkeypatch):
+    pool = HttpPool(make_settings())
+    monkeypatch.setattr("core.database.get_http_pool", lambda: pool)
+    supabase = SupabaseClient(make_settings())
+
+    anon_session = supabase.client.postgrest.session
+    service_session = supabase.service_client.postgrest.session
+
+    assert anon_session._transport is pool.sync_transport
+    assert service_session._transport is pool.sync_transport
+    assert anon_session.headers["apikey"] == "anon.chave.teste"
+    assert service_session.headers["apikey"] == "service.chave.teste"
+
+
+
+def test_versao_desconhecida_do_supabase_mantem_pool_do_cliente(monkeypatch):
+    pool = HttpPool(make_settings())
+    monkeypatch.setattr("core.database.get_http_pool", lambda: pool)
+    monkeypatch.setattr("core.database.supabase.__version__", "3.0.0")
+    supabase = SupabaseClient(make_settings())
+
+    assert supabase.client.postgrest.session._transport is not pool.sync_transport
+
+
+class FakeConnection:
+    def __init__(self, disponivel: bool, ociosa: bool = False):
+        self.disponivel = disponivel
+        self.ociosa = ociosa
+
+    def is_available(self) -> bool:
+        return self.disponivel
+
+    def is_idle(self) -> bool:
+        return self.ociosa
+
+
+class FakePool:
+    def __init__(self, connections):
+        self.connections = connections
+
+
+def test_espera_registrada_quando_pool_saturado():
+    assert not _pool_saturado(FakePool([FakeConnection(False)]), max_connections=2)
+    assert not _pool_saturado(FakePool([FakeConnection(False), FakeConnection(True)]), max_connections=2)
+    assert _pool_saturado(FakePool([FakeConnection(False), FakeConnection(False)]), max_connections=2)
+
+
+def test_stats_separa_conexoes_em_uso_e_ociosas():
+    pool = HttpPool(make_settings())
+    pool.sync_transport._pool = FakePool([FakeConnection(False), FakeConnection(True, ociosa=True)])
+    pool.async_transport._pool = FakePool([FakeConnection(True, ociosa=True)])
+
+    stats = pool.stats()
+
+    assert stats["in_use"] == 1
+    assert stats["idle"] == 2
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from core.consultas import consultas_requisicao_var
+from core.exceptions import ServiceBusyException
+from core.jobs import FilaJobs
+from core.logs import request_id_var
+
+
+@pytest.mark.asyncio
+async def test_workers_limitam_concorrencia_e_sobrevivem_a_falhas():
+    fila = FilaJobs(workers=2, max_fila=10)
+    simultaneos, maximo, feitos = [0], [0], []
+
+    async def trabalho(numero):
+        simultaneos[0] += 1
+        maximo[0] = max(maximo[0], simultaneos[0])
+        await asyncio.sleep(0.01)
+        simultaneos[0] -= 1
+        if numero == 2:
+            raise RuntimeError("falhou")
+        feitos.append(numero)
+
+    for numero in range(5):
+        fila.enfileirar(f"t{numero}", lambda numero=numero: trabalho(numero))
+    await fila.aguardar()
+
+    assert sorted(feitos) == [0, 1, 3, 4] and maximo[0] == 2
+    assert fila.stats()["completed"] == 4 and fila.stats()["failed"] == 1
+    await fila.encerrar()
+
+
+@pytest.mark.asyncio
+async def test_fila_cheia_recusa_com_503():
+    fila = FilaJobs(workers=1, max_fila=1)
+    liberar = asyncio.Event()
+
+    fila.enfileirar("rodando", liberar.wait)
+    await asyncio.sleep(0)  # o worker pega o primeiro trabalho
+    fila.enfileirar("aguardando", liberar.wait)
+    with pytest.raises(ServiceBusyException) as erro:
+        fila.enfileirar("excedente", liberar.wait)
+
+    assert erro.value.status_code == 503 and fila.stats()["rejected"] == 1
+    liberar.set()
+    await fila.encerrar()
+    assert fila.stats()["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_trabalho_roda_no_contexto_de_quem_enfileirou():
+    fila = FilaJobs(workers=1, max_fila=10)
+    vistos = []
+
+    async def trabalho():
+        vistos.append((request_id_var.get(), consultas_requisicao_var.get()))
+
+    for rid in ("req-1", "req-2"):
+        request_id_var.set(rid)
+        consultas_requisicao_var.set([])
+        fila.enfileirar(rid, trabalho)
+    await fila.aguardar()
+
+    # request_id de cada requisição; a lista de consultas da requisição não é compartilhada
+    assert vistos == [("req-1", None), ("req-2", None)]
+    await fila.encerrar()
+
+
+@pytest.mark.asyncio
+async def test_encerramento_avisa_trabalhos_descartados():
+    fila = FilaJobs(workers=1, max_fila=10)
+    descartados = []
+
+    async def descartar(nome):
+        descartados.append(nome)
+
+    fila.enfileirar("rodando", lambda: asyncio.sleep(60), lambda: descartar("rodando"))
+    fila.enfileirar("na_fila", lambda: asyncio.sleep(60), lambda: descartar("na_fila"))
+    await asyncio.sleep(0)
+    await fila.encerrar(timeout=0.01)
+
+    assert descartados == ["na_fila"]
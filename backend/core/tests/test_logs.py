@@ -0,0 +1,69 @@
+import json
+import logging
+import queue
+
+from core.config import Settings
+from core.logs import (
+    ContextoFilter, FilaLogHandler, JsonFormatter, PipelineLog,
+    _parse_niveis, loja_id_var, request_id_var
+)
+
+
+def registro(msg="cliente %s criado", args=("Ana",), **extra):
+    record = logging.makeLogRecord({"name": "modules.clientes", "levelno": logging.INFO, "levelname": "INFO", "msg": msg, "args": args})
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_inclui_contexto_da_requisicao_e_extras():
+    token_req, token_loja = request_id_var.set("req-1"), loja_id_var.set("loja-9")
+    try:
+        record = registro(status=201)
+        ContextoFilter().filter(record)
+    finally:
+        request_id_var.reset(token_req)
+        loja_id_var.reset(token_loja)
+
+    dados = json.loads(JsonFormatter().format(record))
+
+    assert dados["msg"] == "cliente Ana criado"
+    assert (dados["request_id"], dados["loja_id"]) == ("req-1", "loja-9")
+    assert dados["status"] == 201 and dados["logger"] == "modules.clientes"
+
+
+def test_fila_cheia_descarta_sem_bloquear():
+    handler = FilaLogHandler(queue.Queue(maxsize=1))
+
+    handler.handle(registro())
+    handler.handle(registro())
+
+    assert handler.queue.qsize() == 1
+    assert handler.descartados == 1
+    assert handler.queue.get_nowait().msg == "cliente Ana criado"
+
+
+def test_amostragem_mantem_erros_e_lentas():
+    pipeline = PipelineLog(Settings(log_sample_rate_2xx=0.0, log_slow_request_ms=500))
+
+    assert not pipeline.deve_registrar(200, 10)
+    assert pipeline.deve_registrar(404, 10)
+    assert pipeline.deve_registrar(500, 10)
+    assert pipeline.deve_registrar(200, 800)
+
+
+def test_custo_do_log_de_acesso_dentro_do_orcamento():
+    pipeline = PipelineLog(Settings(log_sample_rate_2xx=0.1, log_budget_us=50))
+
+    for i in range(2000):
+        pipeline.registrar_acesso("GET", "/api/v1/clientes", 500 if i % 50 == 0 else 200, 12.0)
+
+    stats = pipeline.stats()
+    assert stats["requests"] == 2000
+    assert stats["avg_cost_us"] < stats["budget_us"]
+
+
+def test_niveis_por_modulo():
+    assert _parse_niveis("modules.orcamentos=debug, httpx=WARNING,invalido") == {
+        "modules.orcamentos": "DEBUG",
+        "httpx": "WARNING"
+    }
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from postgrest import SyncPostgrestClient
+
+from core.database import QueryExecutor
+from core.metricas import Histograma, RegistroMetricas, descrever_query
+from core.middleware import RequisicaoMiddleware
+
+
+def test_histograma_cumulativo():
+    histograma = Histograma((0.1, 0.5))
+
+    for valor in (0.05, 0.1, 0.3, 2.0):
+        histograma.observar(valor)
+
+    assert histograma.cumulativos() == [("0.1", 2), ("0.5", 3), ("+Inf", 4)]
+    assert histograma.total == 4
+
+
+def test_descrever_query_postgrest():
+    tabela = SyncPostgrestClient("http://localhost").table("config_regras_comissao_faixa")
+
+    assert descrever_query(tabela.select("*").eq("loja_id", "1")) == ("config_regras_comissao_faixa", "select")
+    assert descrever_query(tabela.update({"a": 1}).eq("id", "1")) == ("config_regras_comissao_faixa", "update")
+    assert descrever_query(tabela.upsert({"a": 1})) == ("config_regras_comissao_faixa", "upsert")
+
+
+def test_metricas_por_rota_template():
+    metricas = RegistroMetricas()
+    app = FastAPI()
+    app.add_middleware(RequisicaoMiddleware, metricas=metricas)
+
+    @app.get("/clientes/{cliente_id}")
+    async def obter(cliente_id: str):
+        assert metricas.http_em_andamento[("GET", "/clientes/{cliente_id}")] == 1
+        return {"id": cliente_id}
+
+    cliente = TestClient(app)
+    for i in range(3):
+        cliente.get(f"/clientes/{i}")
+    cliente.get("/nao-existe")
+
+    texto = metricas.renderizar()
+    assert 'fluyt_http_requests_total{method="GET",route="/clientes/{cliente_id}",status="200"} 3' in texto
+    assert 'fluyt_http_requests_total{method="GET",route="unmatched",status="404"} 1' in texto
+    assert 'fluyt_http_request_duration_seconds_count{method="GET",route="/clientes/{cliente_id}"} 3' in texto
+    assert 'fluyt_http_requests_in_flight{method="GET",route="/clientes/{cliente_id}"} 0' in texto
+
+
+@pytest.mark.asyncio
+async def test_executor_registra_queries_por_tabela(monkeypatch):
+    metricas = RegistroMetricas()
+    monkeypatch.setattr("core.consultas.get_metricas", lambda: metricas)
+    executor = QueryExecutor(max_workers=2)
+
+    class Falha:
+        path, http_method = "/c_orcamentos", "POST"
+
+        def execute(self):
+            raise RuntimeError("erro")
+
+    ok = SimpleNamespace(path="/c_clientes", http_method="GET", execute=lambda: SimpleNamespace(data=[]))
+    await asyncio.gather(executor.run(ok), executor.run(ok))
+    with pytest.raises(RuntimeError):
+        await executor.run(Falha())
+
+    assert metricas.queries_total == {("c_clientes", "select"): 2, ("c_orcamentos", "insert"): 1}
+    assert metricas.queries_erros == {("c_orcamentos", "insert"): 1}
+    executor.shutdown()
@@ -0,0 +1,65 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from core import auth
+from core.auth import CacheTokensVerificados, create_access_token
+from core.config import Settings
+from core.logs import PipelineLog, loja_id_var, request_id_var
+from core.middleware import RequisicaoMiddleware
+
+SETTINGS = Settings(jwt_secret_key="segredo-de-teste", log_sample_rate_2xx=1.0)
+
+
+def criar_app(pipeline=None):
+    app = FastAPI()
+    app.add_middleware(RequisicaoMiddleware, pipeline_log=pipeline, debug_headers=True)
+
+    @app.get("/contexto")
+    async def contexto(request: Request):
+        usuario = request.scope.get("user") or {}
+        return {
+            "state": request.state.request_id,
+            "log": request_id_var.get(),
+            "loja_log": loja_id_var.get(),
+            "loja_user": usuario.get("loja_id")
+        }
+
+    @app.get("/stream")
+    async def stream():
+        async def partes():
+            for i in range(3):
+                yield f"{i}\n".encode()
+        return StreamingResponse(partes(), media_type="text/plain")
+
+    return app
+
+
+def test_request_id_e_contexto_de_usuario(monkeypatch):
+    monkeypatch.setattr(auth, "get_settings", lambda: SETTINGS)
+    monkeypatch.setattr(auth, "_cache_tokens", CacheTokensVerificados(max_entradas=10))
+    token = create_access_token({"user_id": "u-1", "loja_id": "loja-7", "perfil": "GERENTE", "email": "g@l.com"}, SETTINGS)
+
+    resposta = TestClient(criar_app()).get("/contexto", headers={"Authorization": f"Bearer {token}"})
+
+    corpo = resposta.json()
+    assert resposta.headers["x-request-id"] == corpo["state"] == corpo["log"]
+    assert corpo["loja_log"] == corpo["loja_user"] == "loja-7"
+    assert float(resposta.headers["x-process-time"]) >= 0
+    assert resposta.headers["x-debug"] == "true"
+    assert request_id_var.get() is None
+
+
+def test_streaming_e_log_de_acesso_com_status(caplog):
+    caplog.set_level("INFO", logger="fluyt.acesso")
+    pipeline = PipelineLog(SETTINGS)
+    cliente = TestClient(criar_app(pipeline))
+
+    resposta = cliente.get("/stream")
+    cliente.get("/nao-existe")
+
+    assert resposta.text == "0\n1\n2\n"
+    assert "x-request-id" in resposta.headers
+    stats = pipeline.stats()
+    assert stats["requests"] == 2 and stats["logged"] == 2
+    assert [r.status for r in caplog.records if r.name == "fluyt.acesso"] == [200, 404]
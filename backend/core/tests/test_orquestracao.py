@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from core.orquestracao import executar_etapas
+
+
+@pytest.mark.asyncio
+async def test_etapas_independentes_rodam_em_paralelo():
+    async def lenta(valor):
+        await asyncio.sleep(0.1)
+        return valor
+
+    async def soma(a, b):
+        return a + b
+
+    inicio = time.perf_counter()
+    duracoes = {}
+    resultados = await executar_etapas({
+        'a': (lambda: lenta(1), []),
+        'b': (lambda: lenta(2), []),
+        'soma': (soma, ['a', 'b'])
+    }, duracoes)
+
+    assert resultados == {'a': 1, 'b': 2, 'soma': 3}
+    assert time.perf_counter() - inicio < 0.18
+    assert set(duracoes) == {'a', 'b', 'soma'}
+
+
+@pytest.mark.asyncio
+async def test_falha_cancela_etapas_pendentes_e_propaga_excecao_original():
+    canceladas = []
+
+    async def demorada():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            canceladas.append('demorada')
+            raise
+
+    async def falha():
+        await asyncio.sleep(0.01)
+        raise ValueError("ambiente não encontrado")
+
+    async def dependente(falha):
+        canceladas.append('não deveria executar')
+
+    with pytest.raises(ValueError, match="ambiente não encontrado"):
+        await executar_etapas({
+            'demorada': (demorada, []),
+            'falha': (falha, []),
+            'dependente': (dependente, ['falha'])
+        })
+
+    assert canceladas == ['demorada']
+
+
+@pytest.mark.asyncio
+async def test_dependencia_circular_ou_inexistente():
+    async def etapa(**_):
+        return None
+
+    with pytest.raises(ValueError, match="circular"):
+        await executar_etapas({'a': (etapa, ['b']), 'b': (etapa, ['a'])})
+
+    with pytest.raises(ValueError, match="inexistente"):
+        await executar_etapas({'a': (etapa, ['x'])})
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+from postgrest import SyncPostgrestClient
+
+from core.exceptions import ValidationException
+from core.paginacao import CursorKeyset, aplicar_cursor, fatiar_pagina
+
+
+def registros(n):
+    # Ordem decrescente por (created_at, id), com empates de created_at
+    return [
+        {'id': f'id-{i:03d}', 'created_at': f'2026-01-01T10:00:{i // 2:02d}+00:00'}
+        for i in range(n, 0, -1)
+    ]
+
+
+def test_cursor_e_opaco_e_reversivel():
+    cursor = CursorKeyset('2026-01-01T10:00:00.123456+00:00', 'abc').codificar()
+
+    decodificado = CursorKeyset.decodificar(cursor)
+
+    assert '2026' not in cursor
+    assert (decodificado.created_at, decodificado.id) == ('2026-01-01T10:00:00.123456+00:00', 'abc')
+    assert CursorKeyset.decodificar('') is None
+
+
+def test_cursor_invalido_gera_erro_de_validacao():
+    with pytest.raises(ValidationException):
+        CursorKeyset.decodificar('isto-nao-e-um-cursor')
+
+
+def test_aplicar_cursor_gera_filtro_keyset_e_limite_extra():
+    query = SyncPostgrestClient('http://localhost').table('c_clientes').select('*')
+    cursor = CursorKeyset('2026-01-01T10:00:00+00:00', 'id-9')
+
+    params = dict(aplicar_cursor(query, cursor, 20).params)
+
+    assert params['or'] == (
+        '(created_at.lt."2026-01-01T10:00:00+00:00",'
+        'and(created_at.eq."2026-01-01T10:00:00+00:00",id.lt."id-9"))'
+    )
+    assert params['order'] == 'created_at.desc,id.desc'
+    assert params['limit'] == '21'
+
+
+def test_fatiar_pagina():
+    pagina, next_cursor = fatiar_pagina(registros(6), 5)
+    assert len(pagina) == 5
+    assert CursorKeyset.decodificar(next_cursor).id == pagina[-1]['id']
+
+    pagina, next_cursor = fatiar_pagina(registros(5), 5)
+    assert len(pagina) == 5 and next_cursor is None
+
+
+def test_paginas_estaveis_com_insercoes_concorrentes():
+    tabela = registros(10)
+
+    def buscar(cursor, limit):
+        # Mesma semântica do filtro keyset aplicado pelo PostgREST
+        linhas = tabela
+        if cursor:
+            linhas = [r for r in tabela if (r['created_at'], r['id']) < (cursor.created_at, cursor.id)]
+        return fatiar_pagina(linhas[:limit + 1], limit)
+
+    primeira, cursor = buscar(None, 4)
+    # Novo registro inserido entre as páginas entra no topo e não desloca nada
+    tabela.insert(0, {'id': 'id-999', 'created_at': '2026-01-01T11:00:00+00:00'})
+    segunda, cursor = buscar(CursorKeyset.decodificar(cursor), 4)
+    terceira, cursor = buscar(CursorKeyset.decodificar(cursor), 4)
+
+    vistos = [r['id'] for r in primeira + segunda + terceira]
+    assert vistos == [r['id'] for r in registros(10)]
+    assert cursor is None
@@ -3,25 +3,34 @@ Aplicação principal do Fluyt Comercial - FastAPI.
 Configura middleware, routers, documentação e segurança.
 """
 
-from fastapi import FastAPI, Request, status, Query
+from fastapi import Depends, FastAPI, Request, status, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import logging
 import time
-import uuid
 
 # Core imports
 from core.config import get_settings
-from core.auth import AuthMiddleware
+from core.auth import get_cache_tokens, require_admin
+from core.database import shutdown_query_executor
+from core.http_pool import init_http_pool, close_http_pool, get_http_pool
 from core.exceptions import register_exception_handlers
-
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from core.logs import configurar_logging
+from core.middleware import RequisicaoMiddleware
+from core.metricas import get_metricas
+from core.estatisticas import get_cache_estatisticas
+from core.autocomplete import get_indices_autocomplete
+from core.consultas import get_historico_consultas, resumo_consultas
+from core.jobs import encerrar_pool_processos, get_fila_jobs, stats_pool_processos
+from modules.orcamentos.cache_comissao import get_cache_comissao
+from modules.orcamentos.cache_config_loja import get_cache_config_loja
+from modules.ambientes.cache_xml import get_cache_xml
+from modules.orcamentos.numeracao import get_alocador_numeracao
+
+# Configuração de logging (JSON estruturado, fila não bloqueante)
+pipeline_log = configurar_logging(get_settings())
 logger = logging.getLogger(__name__)
 
 
@@ -46,6 +55,9 @@ async def lifespan(app: FastAPI):
         logger.info(f"📊 Supabase URL: {settings.supabase_url}")
         logger.info(f"🔐 JWT configurado - Expiração: {settings.jwt_access_token_expire_minutes}min")
         
+        # Pool de conexões HTTP compartilhado com o Supabase
+        init_http_pool(settings)
+        
     except Exception as e:
         logger.error(f"❌ Erro na validação de configurações: {e}")
         raise
@@ -54,6 +66,10 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Finalizando Fluyt Comercial API...")
+    await get_fila_jobs().encerrar()
+    encerrar_pool_processos()
+    shutdown_query_executor()
+    await close_http_pool()
 
 
 # Configuração da aplicação FastAPI
@@ -95,62 +111,19 @@ app = FastAPI(
 
 # ===== MIDDLEWARES =====
 
-# 1. Request ID para rastreamento
-@app.middleware("http")
-async def add_request_id(request: Request, call_next):
-    """Adiciona ID único para cada requisição para rastreamento de logs"""
-    request_id = str(uuid.uuid4())
-    request.state.request_id = request_id
-    
-    # Adiciona no header de resposta
-    response = await call_next(request)
-    response.headers["X-Request-ID"] = request_id
-    return response
-
-# 2. Logging de requisições
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log detalhado de todas as requisições"""
-    start_time = time.time()
-    
-    # Log da requisição
-    logger.info(
-        f"🔵 REQUEST: {request.method} {request.url.path}",
-        extra={
-            "method": request.method,
-            "path": request.url.path,
-            "query_params": str(request.query_params),
-            "request_id": getattr(request.state, 'request_id', None),
-            "user_agent": request.headers.get("user-agent", ""),
-            "client_ip": request.client.host if request.client else ""
-        }
-    )
-    
-    # Processa requisição
-    response = await call_next(request)
-    
-    # Log da resposta
-    process_time = time.time() - start_time
-    logger.info(
-        f"🟢 RESPONSE: {response.status_code} - {process_time:.3f}s",
-        extra={
-            "status_code": response.status_code,
-            "process_time": process_time,
-            "request_id": getattr(request.state, 'request_id', None)
-        }
-    )
-    
-    # Adiciona tempo de processamento no header
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
-
-# 3. Middleware de autenticação customizado
-app.add_middleware(AuthMiddleware)
+# 1. Request ID, tempo, log de acesso e contexto de autenticação (uma única camada ASGI)
+app.add_middleware(
+    RequisicaoMiddleware,
+    pipeline_log=pipeline_log,
+    debug_headers=settings.is_development,
+    metricas=get_metricas(),
+    historico_consultas=get_historico_consultas() if settings.debug else None
+)
 
-# 4. Compressão GZIP para respostas grandes
+# 2. Compressão GZIP para respostas grandes
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
-# 5. CORS - configurado dinamicamente
+# 3. CORS - configurado dinamicamente
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
@@ -188,6 +161,17 @@ async def health_check():
         "version": settings.api_version,
         "environment": settings.environment,
         "timestamp": time.time(),
+        "connection_pool": get_http_pool().stats(),
+        "comissao_cache": get_cache_comissao().stats(),
+        "config_loja_cache": get_cache_config_loja().stats(),
+        "numeracao_orcamentos": get_alocador_numeracao().stats(),
+        "jwt_cache": get_cache_tokens().stats(),
+        "stats_cache": get_cache_estatisticas().stats(),
+        "autocomplete": get_indices_autocomplete().stats(),
+        "xml_cache": get_cache_xml().stats(),
+        "jobs": get_fila_jobs().stats(),
+        "process_pool": stats_pool_processos(),
+        "logging": pipeline_log.stats(),
         "debug_info": {
             "total_routes": len(app.routes),
             "app_instance_id": id(app),
@@ -195,6 +179,30 @@ async def health_check():
         }
     }
 
+# Métricas no formato Prometheus (scrape)
+@app.get("/metrics", tags=["Sistema"], summary="Métricas Prometheus", include_in_schema=False)
+async def metrics():
+    """Contadores e histogramas por rota HTTP e por tabela do Supabase"""
+    return PlainTextResponse(get_metricas().renderizar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Queries ao Supabase por requisição (apenas com DEBUG e para ADMIN_MASTER:
+# expõem formato das queries, tempos e loja_id de todas as requisições)
+if settings.debug:
+    @app.get("/debug/queries", tags=["Sistema"], include_in_schema=False,
+             dependencies=[Depends(require_admin())])
+    async def debug_queries_recentes():
+        """Request IDs rastreados, do mais recente ao mais antigo"""
+        return {"request_ids": get_historico_consultas().recentes()}
+
+    @app.get("/debug/queries/{request_id}", tags=["Sistema"], include_in_schema=False,
+             dependencies=[Depends(require_admin())])
+    async def debug_queries(request_id: str):
+        """Queries emitidas pela requisição (use o header X-Request-ID), com repetidas agrupadas"""
+        consultas = get_historico_consultas().obter(request_id)
+        if consultas is None:
+            return JSONResponse(status_code=404, content={"detail": "Requisição não encontrada no histórico"})
+        return {"request_id": request_id, **resumo_consultas(consultas)}
+
 # Root endpoint com informações básicas
 @app.get("/", tags=["Sistema"], summary="Informações da API")
 async def root():
@@ -802,16 +810,6 @@ if settings.is_development:
 
 # ⚠️ DEBUG ENDPOINTS MOVIDOS PARA STARTUP EVENT (VER ABAIXO)
 
-# ===== MIDDLEWARE DE DESENVOLVIMENTO =====
-if settings.is_development:
-    @app.middleware("http")
-    async def debug_headers(request: Request, call_next):
-        """Adiciona headers de debug em desenvolvimento"""
-        response = await call_next(request)
-        response.headers["X-Environment"] = "development"
-        response.headers["X-Debug"] = "true"
-        return response
-
 # ===== EVENTOS DE STARTUP ADICIONAIS =====
 @app.on_event("startup")
 async def startup_event():
@@ -0,0 +1,91 @@
+-- Aprovações de desconto (modules/aprovacoes)
+-- Executar no SQL Editor do Supabase (ou via CLI) antes de subir o módulo.
+-- Idempotente: pode ser executado mais de uma vez.
+
+-- Colunas gravadas pelo AprovacaoService
+ALTER TABLE c_aprovacoes
+    ADD COLUMN IF NOT EXISTS orcamento_versao timestamptz,
+    ADD COLUMN IF NOT EXISTS valores_orcamento jsonb,
+    ADD COLUMN IF NOT EXISTS necessitava_aprovacao boolean NOT NULL DEFAULT false,
+    ADD COLUMN IF NOT EXISTS decidido_em timestamptz,
+    ADD COLUMN IF NOT EXISTS justificativa_decisao text;
+
+-- Caixa de entrada dos aprovadores: pendentes por (loja, nível), keyset por created_at/id
+CREATE INDEX IF NOT EXISTS idx_c_aprovacoes_pendentes
+    ON c_aprovacoes (loja_id, nivel_aprovacao, created_at DESC, id DESC)
+    WHERE status = 'PENDENTE';
+
+-- No máximo uma solicitação PENDENTE por orçamento; a segunda inserção
+-- simultânea falha com 23505 (APROVACAO_PENDENTE no repository).
+-- Falha se já houver duplicadas: cancele as mais antigas antes de criar.
+CREATE UNIQUE INDEX IF NOT EXISTS uq_c_aprovacoes_pendente_orcamento
+    ON c_aprovacoes (orcamento_id)
+    WHERE status = 'PENDENTE';
+
+-- Decisão de uma solicitação numa única transação (AprovacaoRepository.decidir):
+-- 1. PENDENTE → APROVADO/REJEITADO (compare-and-swap: só um aprovador vence)
+-- 2. orçamento atualizado só se continua na versão (updated_at) da solicitação;
+--    na aprovação, com o desconto e os valores calculados na solicitação
+-- 3. aprovação sobre orçamento alterado vira CANCELADO, sem aplicar nada
+-- Qualquer erro desfaz os dois UPDATEs: a solicitação não fica decidida
+-- com o orçamento nos valores antigos.
+-- Retorna a solicitação decidida, ou nenhuma linha se já não estava PENDENTE.
+CREATE OR REPLACE FUNCTION decidir_aprovacao(
+    p_aprovacao_id uuid,
+    p_loja_id uuid,
+    p_aprovado boolean,
+    p_aprovador_id uuid,
+    p_justificativa text
+) RETURNS SETOF c_aprovacoes
+    LANGUAGE plpgsql SECURITY INVOKER AS $$
+DECLARE
+    v_aprovacao c_aprovacoes;
+    v_valores c_orcamentos;
+BEGIN
+    UPDATE c_aprovacoes
+       SET status = CASE WHEN p_aprovado THEN 'APROVADO' ELSE 'REJEITADO' END,
+           aprovador_id = p_aprovador_id,
+           justificativa_decisao = p_justificativa,
+           decidido_em = now()
+     WHERE id = p_aprovacao_id
+       AND loja_id = p_loja_id
+       AND status = 'PENDENTE'
+    RETURNING * INTO v_aprovacao;
+
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    IF p_aprovado THEN
+        v_valores := jsonb_populate_record(NULL::c_orcamentos, coalesce(v_aprovacao.valores_orcamento, '{}'));
+    END IF;
+
+    UPDATE c_orcamentos
+       SET necessita_aprovacao = CASE WHEN p_aprovado THEN false ELSE v_aprovacao.necessitava_aprovacao END,
+           aprovador_id = p_aprovador_id,
+           updated_at = now(),
+           desconto_percentual = coalesce(v_valores.desconto_percentual, desconto_percentual),
+           valor_final = coalesce(v_valores.valor_final, valor_final),
+           custo_fabrica = coalesce(v_valores.custo_fabrica, custo_fabrica),
+           comissao_vendedor = coalesce(v_valores.comissao_vendedor, comissao_vendedor),
+           comissao_gerente = coalesce(v_valores.comissao_gerente, comissao_gerente),
+           custo_frete = coalesce(v_valores.custo_frete, custo_frete),
+           margem_lucro = coalesce(v_valores.margem_lucro, margem_lucro)
+     WHERE id = v_aprovacao.orcamento_id
+       AND loja_id = p_loja_id
+       AND updated_at = v_aprovacao.orcamento_versao;
+
+    -- Rejeição não aplica desconto: vale mesmo com o orçamento alterado
+    IF NOT FOUND AND p_aprovado THEN
+        UPDATE c_aprovacoes
+           SET status = 'CANCELADO',
+               justificativa_decisao = 'Orçamento alterado após a solicitação'
+         WHERE id = p_aprovacao_id
+        RETURNING * INTO v_aprovacao;
+    END IF;
+
+    RETURN NEXT v_aprovacao;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION decidir_aprovacao(uuid, uuid, boolean, uuid, text) TO authenticated;
@@ -0,0 +1,137 @@
+"""
+Cache por conteúdo dos ambientes de XMLs do Promob já importados.
+
+Durante a negociação o projetista reenvia o mesmo XML (ou um XML com um
+ambiente alterado) várias vezes. Cada bloco <AMBIENT> é identificado pelo
+SHA-256 dos seus bytes (ver promob.mapear_blocos); para um hash já visto na
+loja, o cache guarda os totais lidos (AmbientePromob) e as linhas de
+c_ambientes criadas a partir dele. No reenvio, só os blocos com hash novo
+passam pelo parse e pelo insert.
+
+O cache é do processo, limitado a XML_CACHE_MAX_BLOCOS entradas (LRU) com
+TTL de XML_CACHE_TTL_SECONDS.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import logging
+import time
+
+from core.config import get_settings
+from .promob import AmbientePromob
+
+logger = logging.getLogger(__name__)
+
+
+class EntradaBloco:
+    """Totais de um bloco <AMBIENT> e as linhas de c_ambientes criadas com ele"""
+
+    def __init__(self, ambiente: AmbientePromob):
+        self.ambiente = ambiente
+        # Uma linha por ocorrência do bloco no arquivo (dois ambientes idênticos = duas linhas)
+        self.linhas: List[Dict[str, Any]] = []
+
+
+class CacheBlocosXml:
+    """
+    LRU de (loja_id, hash do bloco) → EntradaBloco.
+
+    Args:
+        max_entradas: Limite de blocos em cache (0 desativa o cache)
+        ttl_seconds: Tempo de vida de cada bloco
+        relogio: Função de tempo monotônico (injetável para testes)
+    """
+
+    def __init__(self, max_entradas: int, ttl_seconds: int, relogio: Callable[[], float] = time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl_seconds = ttl_seconds
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Tuple[str, str], Tuple[EntradaBloco, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obter(self, loja_id: str, hash_bloco: str) -> Optional[EntradaBloco]:
+        """Retorna a entrada do bloco ou None (miss ou expirada)"""
+        chave = (str(loja_id), hash_bloco)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[1] > self._relogio():
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return entrada[0]
+
+            if entrada is not None:
+                del self._entradas[chave]
+            self.misses += 1
+            return None
+
+    def armazenar(
+        self,
+        loja_id: str,
+        hash_bloco: str,
+        ambiente: AmbientePromob,
+        linha: Dict[str, Any],
+        ocorrencia: int = 0
+    ) -> None:
+        """
+        Registra a linha criada para a n-ésima ocorrência do bloco no arquivo
+
+        Args:
+            loja_id: Loja do upload
+            hash_bloco: SHA-256 do bloco
+            ambiente: Totais lidos do bloco
+            linha: Linha de c_ambientes criada
+            ocorrencia: Índice da ocorrência do mesmo bloco no arquivo (0 = primeira)
+        """
+        if self.max_entradas <= 0:
+            return
+        chave = (str(loja_id), hash_bloco)
+        with self._lock:
+            atual = self._entradas.get(chave)
+            entrada = atual[0] if atual is not None else EntradaBloco(ambiente)
+            if ocorrencia < len(entrada.linhas):
+                entrada.linhas[ocorrencia] = linha
+            else:
+                entrada.linhas.append(linha)
+            self._entradas[chave] = (entrada, self._relogio() + self.ttl_seconds)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.evictions += 1
+
+    def limpar(self) -> None:
+        """Descarta todos os blocos"""
+        with self._lock:
+            self._entradas.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores do cache (expostos no /health)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entradas),
+                "max_entries": self.max_entradas,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions
+            }
+
+
+# Instância global do cache
+_cache_xml: Optional[CacheBlocosXml] = None
+
+
+def get_cache_xml() -> CacheBlocosXml:
+    """Retorna o cache global de blocos de XML, criando-o sob demanda"""
+    global _cache_xml
+
+    if _cache_xml is None:
+        settings = get_settings()
+        _cache_xml = CacheBlocosXml(settings.xml_cache_max_blocos, settings.xml_cache_ttl_seconds)
+
+    return _cache_xml
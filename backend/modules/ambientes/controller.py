@@ -1,11 +1,112 @@
+"""
+Controller (rotas) para o módulo de Ambientes.
+Define endpoints REST para importação e consulta de ambientes.
+"""
 
-# FastAPI routes for ambientes
-from fastapi import APIRouter, Depends
-from .schemas import *
-from .repository import *
+from fastapi import APIRouter, Depends, File, Query, Response, UploadFile, status
+from typing import List, Dict, Any
+from core.auth import get_current_user, require_vendedor_ou_superior
+from core.config import get_settings
+from core.database import get_database
+from core.exceptions import ValidationException
+from supabase import Client
+from modules.xml_logs.repository import get_xml_log_repository
+from modules.xml_logs.schemas import XmlLogResponse
+from modules.xml_logs.services import XmlLogService
 
-router = APIRouter(prefix='/ambientes', tags=['ambientes'])
+from .schemas import AmbienteResponse
+from .services import AmbienteService
 
-@router.get('/', response_model=list[dict])
-async def list_ambientes():
-    return await repo_list_ambientes()
+# Router para o módulo de ambientes
+router = APIRouter()
+
+
+@router.get("/",
+    response_model=List[AmbienteResponse],
+    summary="Listar ambientes",
+    description="Lista ambientes da loja, mais recentes primeiro"
+)
+async def listar_ambientes(
+    skip: int = Query(0, ge=0, description="Registros a pular"),
+    limit: int = Query(50, ge=1, le=200, description="Limite de registros"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_database)
+):
+    """
+    Lista ambientes importados.
+    
+    **RLS aplicado:** Usuário vê apenas ambientes da própria loja.
+    """
+    service = AmbienteService(db)
+    return await service.listar_ambientes(current_user, skip, limit)
+
+
+@router.post("/upload-xml",
+    response_model=XmlLogResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Importar XML do Promob",
+    description="Aceita o XML exportado pelo Promob e cria os ambientes em segundo plano; "
+                "o andamento fica em /xml-logs/{id}"
+)
+async def upload_xml(
+    response: Response,
+    arquivo: UploadFile = File(..., description="XML exportado pelo Promob"),
+    current_user: Dict[str, Any] = Depends(require_vendedor_ou_superior()),
+    db: Client = Depends(get_database)
+):
+    """
+    Importa os ambientes de um XML do Promob.
+    
+    - **Extensão e tamanho** conforme ALLOWED_FILE_EXTENSIONS e MAX_FILE_SIZE_MB
+    - **Segundo plano:** responde 202 com o log PENDENTE; status, progresso,
+      duração e erros ficam em GET /xml-logs/{id} (503 com a fila cheia)
+    - **Streaming:** memória constante mesmo para XMLs de dezenas de MB
+    - **Um ambiente por <AMBIENT>**, com valor_total somando os itens
+    """
+    settings = get_settings()
+    if arquivo.size is not None and arquivo.size > settings.max_file_size_bytes:
+        raise ValidationException(f"Arquivo maior que {settings.max_file_size_mb}MB", field="arquivo")
+    
+    service = AmbienteService(db)
+    log = await service.enfileirar_importacao(
+        arquivo.file, arquivo.filename, current_user, XmlLogService(get_xml_log_repository(db))
+    )
+    response.headers["Location"] = f"/api/{settings.api_version}/xml-logs/{log.id}"
+    return log
+
+
+@router.post("/upload-xml-lote",
+    response_model=XmlLogResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Importar vários XMLs do Promob",
+    description="Aceita vários XMLs do Promob (ex.: um por ambiente) e os importa em segundo plano, "
+                "com o parse em paralelo; o andamento fica em /xml-logs/{id}"
+)
+async def upload_xml_lote(
+    response: Response,
+    arquivos: List[UploadFile] = File(..., description="XMLs exportados pelo Promob"),
+    current_user: Dict[str, Any] = Depends(require_vendedor_ou_superior()),
+    db: Client = Depends(get_database)
+):
+    """
+    Importa os ambientes de vários XMLs do Promob de uma vez.
+    
+    - **Até XML_LOTE_MAX_ARQUIVOS arquivos**, cada um conforme ALLOWED_FILE_EXTENSIONS e MAX_FILE_SIZE_MB
+    - **Paralelo:** o parse roda no pool de processos (JOBS_PROCESSOS); os
+      ambientes são gravados na ordem dos arquivos
+    - **Um log por lote:** GET /xml-logs/{id} traz em `detalhes.arquivos` os
+      ambientes, o tempo e o erro de cada arquivo (um inválido não impede os demais)
+    """
+    settings = get_settings()
+    for arquivo in arquivos:
+        if arquivo.size is not None and arquivo.size > settings.max_file_size_bytes:
+            raise ValidationException(f"Arquivo {arquivo.filename} maior que {settings.max_file_size_mb}MB", field="arquivos")
+    
+    service = AmbienteService(db)
+    log = await service.enfileirar_importacao_lote(
+        [(arquivo.file, arquivo.filename) for arquivo in arquivos],
+        current_user,
+        XmlLogService(get_xml_log_repository(db))
+    )
+    response.headers["Location"] = f"/api/{settings.api_version}/xml-logs/{log.id}"
+    return log
@@ -0,0 +1,501 @@
+"""
+Leitura em streaming do XML exportado pelo Promob.
+
+O XML de uma cozinha completa com closets chega a dezenas de MB (cada peça,
+componente e ferragem é um ITEM). O documento é percorrido com
+lxml.etree.iterparse: cada ITEM de primeiro nível é somado ao ambiente e
+descartado em seguida, de modo que só os totais por ambiente ficam em memória,
+independente do tamanho do arquivo.
+
+Estrutura esperada (tags e atributos em maiúsculas ou minúsculas):
+
+    <LISTING>
+      <CUSTOMERSDATA><DATA ID="nomecliente" VALUE="Maria Souza"/></CUSTOMERSDATA>
+      <AMBIENTS>
+        <AMBIENT DESCRIPTION="Cozinha" LINE="Unique">
+          <CATEGORIES><CATEGORY DESCRIPTION="Armários">
+            <ITEMS>
+              <ITEM DESCRIPTION="Balcão 2 portas" QUANTITY="1" FAMILY="Unique">
+                <PRICE TOTAL="1234.50"/>
+                <ITEMS>...componentes (já incluídos no preço do pai)...</ITEMS>
+              </ITEM>
+            </ITEMS>
+          </CATEGORY></CATEGORIES>
+        </AMBIENT>
+      </AMBIENTS>
+    </LISTING>
+"""
+
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import logging
+import re
+import time
+
+from lxml import etree
+
+from core.exceptions import ValidationException
+
+logger = logging.getLogger(__name__)
+
+TAGS_AMBIENTE = {"AMBIENT", "AMBIENTE"}
+TAGS_CATEGORIA = {"CATEGORY", "CATEGORIA"}
+TAGS_ITEM = {"ITEM"}
+TAGS_PRECO = {"PRICE", "PRECO"}
+TAGS_DADO_CLIENTE = {"DATA", "DADO"}
+TAGS_CLIENTE = {"CUSTOMER", "CLIENTE"}
+
+
+def _variantes(*nomes: str) -> tuple:
+    """Nomes de atributo em maiúsculas e minúsculas, na ordem de preferência"""
+    return tuple(variante for nome in nomes for variante in (nome, nome.lower()))
+
+
+ATRIBUTOS_NOME = _variantes("DESCRIPTION", "DESCRICAO", "NAME", "NOME")
+ATRIBUTOS_LINHA = _variantes("LINE", "LINHA", "COLLECTION", "COLECAO", "FAMILY")
+ATRIBUTOS_TOTAL = _variantes("TOTAL", "VALOR_TOTAL", "VALOR")
+ATRIBUTOS_UNITARIO = _variantes("UNIT", "UNITARIO")
+ATRIBUTOS_QUANTIDADE = _variantes("QUANTITY", "QUANTIDADE")
+ATRIBUTOS_ID = _variantes("ID")
+ATRIBUTOS_VALOR = _variantes("VALUE", "VALOR")
+IDS_NOME_CLIENTE = {"nomecliente", "nome_cliente", "cliente", "customername", "customer"}
+
+CENTAVOS = Decimal("0.01")
+
+# Só essas tags geram eventos no iterparse (o resto do documento é apenas percorrido pelo libxml2)
+_TAGS_LIDAS = TAGS_AMBIENTE | TAGS_CATEGORIA | TAGS_ITEM | TAGS_PRECO | TAGS_DADO_CLIENTE | TAGS_CLIENTE
+_VARIANTES_TAG = {variante: tag for tag in _TAGS_LIDAS for variante in (tag, tag.lower(), tag.capitalize())}
+
+# Delimitação dos blocos <AMBIENT> direto nos bytes (sem parse), para o hash por bloco
+_NOMES_AMBIENTE = b"|".join(
+    sorted((v.encode() for v, tag in _VARIANTES_TAG.items() if tag in TAGS_AMBIENTE), key=len, reverse=True)
+)
+_ABERTURA_AMBIENTE = re.compile(rb"<(?:" + _NOMES_AMBIENTE + rb")(?=[\s/>])")
+_FECHAMENTO_AMBIENTE = re.compile(rb"</(?:" + _NOMES_AMBIENTE + rb")\s*>")
+# Bytes mantidos entre leituras para não perder uma tag partida ao meio
+_CAUDA_BLOCO = 32
+TAMANHO_LEITURA_MAPA = 1024 * 1024
+
+
+def _atributo(elemento, nomes: tuple) -> Optional[str]:
+    """Primeiro atributo presente entre os nomes"""
+    for nome in nomes:
+        valor = elemento.get(nome)
+        if valor:
+            return valor.strip()
+    return None
+
+
+def _decimal(valor: Optional[str]) -> Optional[Decimal]:
+    """Número do XML ('1234.50', '1.234,50' ou '1,234.50': o último separador é o decimal)"""
+    if valor is None:
+        return None
+    texto = valor.strip()
+    if texto.rfind(",") > texto.rfind("."):
+        texto = texto.replace(".", "").replace(",", ".")
+    else:
+        texto = texto.replace(",", "")
+    try:
+        return Decimal(texto)
+    except InvalidOperation:
+        return None
+
+
+class LeitorLimitado:
+    """Arquivo que interrompe a leitura ao passar de `limite` bytes"""
+
+    def __init__(self, arquivo: BinaryIO, limite: int):
+        self.arquivo = arquivo
+        self.limite = limite
+        self.lidos = 0
+
+    def read(self, tamanho: int = -1) -> bytes:
+        bloco = self.arquivo.read(tamanho)
+        self.lidos += len(bloco)
+        if self.lidos > self.limite:
+            raise ValidationException(f"Arquivo maior que {self.limite / (1024 * 1024):g}MB", field="arquivo")
+        return bloco
+
+
+class LeitorComProgresso:
+    """
+    Arquivo que conta os bytes lidos (progresso de uma importação em segundo plano).
+
+    A importação percorre o arquivo duas vezes (mapear_blocos e o parse), então
+    o progresso é a fração de 2 x tamanho já lida, limitada a 99% até o fim.
+
+    Args:
+        arquivo: Arquivo binário com seek
+        tamanho: Tamanho do arquivo em bytes
+    """
+
+    def __init__(self, arquivo: BinaryIO, tamanho: int):
+        self.arquivo = arquivo
+        self.tamanho = tamanho
+        self.lidos = 0
+
+    def read(self, tamanho: int = -1) -> bytes:
+        bloco = self.arquivo.read(tamanho)
+        self.lidos += len(bloco)
+        return bloco
+
+    def seek(self, posicao: int, origem: int = 0) -> int:
+        return self.arquivo.seek(posicao, origem)
+
+    @property
+    def progresso(self) -> float:
+        """Percentual estimado (0 a 99)"""
+        if self.tamanho <= 0:
+            return 0.0
+        return min(99.0, self.lidos * 100 / (2 * self.tamanho))
+
+
+class AmbientePromob:
+    """Totais de um ambiente acumulados durante a leitura"""
+
+    def __init__(self, nome: str, linha_produto: Optional[str]):
+        self.nome = nome
+        self.linha_produto = linha_produto
+        self.valor_total = Decimal("0")
+        self.itens = 0
+        self.categorias: Dict[str, Decimal] = {}
+        self.valor_por_linha: Counter = Counter()
+
+    def adicionar_item(self, categoria: str, valor: Decimal, linha: Optional[str]) -> None:
+        self.itens += 1
+        self.valor_total += valor
+        self.categorias[categoria] = self.categorias.get(categoria, Decimal("0")) + valor
+        if linha:
+            self.valor_por_linha[linha] += valor
+
+    def linha_predominante(self) -> Optional[str]:
+        """Linha declarada no ambiente ou, na falta, a de maior valor entre os itens"""
+        if self.linha_produto:
+            return self.linha_produto
+        if self.valor_por_linha:
+            return self.valor_por_linha.most_common(1)[0][0]
+        return None
+
+
+class ResultadoPromob:
+    """Ambientes e dados do cliente extraídos do XML"""
+
+    def __init__(self):
+        self.nome_cliente: Optional[str] = None
+        self.ambientes: List[AmbientePromob] = []
+        self.bytes_lidos = 0
+
+    @property
+    def itens(self) -> int:
+        return sum(ambiente.itens for ambiente in self.ambientes)
+
+
+def ler_xml_promob(
+    arquivo: BinaryIO,
+    tamanho_maximo: int,
+    posicoes: Optional[Sequence[int]] = None,
+    permitir_vazio: bool = False
+) -> ResultadoPromob:
+    """
+    Percorre o XML do Promob em streaming e totaliza os ambientes.
+
+    Args:
+        arquivo: Arquivo binário (o upload fica em disco acima de 1MB)
+        tamanho_maximo: Limite de bytes lidos (MAX_FILE_SIZE_MB)
+        posicoes: Posição no arquivo original de cada ambiente lido (quando
+            `arquivo` é um LeitorSemBlocos); usada no nome padrão "Ambiente N"
+        permitir_vazio: Não falha se nenhum <AMBIENT> for lido
+
+    Returns:
+        ResultadoPromob com um AmbientePromob por <AMBIENT>
+
+    Raises:
+        ValidationException: XML malformado, acima do limite ou sem ambientes
+    """
+    resultado = ResultadoPromob()
+    leitor = LeitorLimitado(arquivo, tamanho_maximo)
+
+    # Ambiente em andamento e o elemento <AMBIENT> correspondente
+    ambiente: Optional[AmbientePromob] = None
+    elemento_ambiente = None
+    # Itens irmãos (mesmo <ITEMS>) compartilham categoria e ambiente
+    ultimo_pai = None
+    categoria = "Sem categoria"
+
+    # Só eventos de fim: o ITEM chega completo (com PRICE) e o ambiente e a
+    # categoria são achados subindo pelos ancestrais, no próprio libxml2.
+    # Sem rede e sem DTD externo; entidades internas (<!ENTITY> no próprio
+    # arquivo) ainda são expandidas pelo iterparse, só com a proteção do
+    # libxml2 contra expansão exponencial. O limite de bytes vale para o
+    # arquivo, não para o texto expandido.
+    eventos = etree.iterparse(
+        leitor,
+        events=("end",),
+        tag=list(_VARIANTES_TAG),
+        resolve_entities=False,
+        no_network=True,
+        load_dtd=False,
+        remove_comments=True
+    )
+
+    try:
+        for _, elemento in eventos:
+            tag = _VARIANTES_TAG[elemento.tag]
+
+            if tag in TAGS_ITEM:
+                pai = elemento.getparent()
+                if pai is not ultimo_pai:
+                    nome_categoria = None
+                    dono = None
+                    for ancestral in elemento.iterancestors():
+                        tag_ancestral = _VARIANTES_TAG.get(ancestral.tag)
+                        if tag_ancestral in TAGS_ITEM:
+                            break  # componente: o preço já está no item pai
+                        if tag_ancestral in TAGS_CATEGORIA and nome_categoria is None:
+                            nome_categoria = _atributo(ancestral, ATRIBUTOS_NOME)
+                        elif tag_ancestral in TAGS_AMBIENTE:
+                            dono = ancestral
+                            break
+                    if dono is None:
+                        continue
+
+                    ultimo_pai = pai
+                    categoria = nome_categoria or "Sem categoria"
+                    if dono is not elemento_ambiente:
+                        ambiente = _novo_ambiente(dono, _posicao(resultado, posicoes))
+                        elemento_ambiente = dono
+
+                ambiente.adicionar_item(categoria, _valor_item(elemento), _atributo(elemento, ATRIBUTOS_LINHA))
+                _descartar(elemento)
+
+            elif tag in TAGS_AMBIENTE:
+                if elemento is not elemento_ambiente:
+                    ambiente = _novo_ambiente(elemento, _posicao(resultado, posicoes))
+                resultado.ambientes.append(ambiente)
+                ambiente = elemento_ambiente = ultimo_pai = None
+                _descartar(elemento)
+
+            elif tag in TAGS_DADO_CLIENTE:
+                identificador = (_atributo(elemento, ATRIBUTOS_ID) or "").lower()
+                if identificador in IDS_NOME_CLIENTE and not resultado.nome_cliente:
+                    resultado.nome_cliente = _atributo(elemento, ATRIBUTOS_VALOR)
+
+            elif tag in TAGS_CLIENTE and not resultado.nome_cliente:
+                resultado.nome_cliente = _atributo(elemento, ATRIBUTOS_NOME)
+
+    except etree.XMLSyntaxError as e:
+        raise ValidationException(f"XML inválido: {str(e)}", field="arquivo")
+
+    resultado.bytes_lidos = leitor.lidos
+    if not resultado.ambientes and not permitir_vazio:
+        raise ValidationException("Nenhum ambiente encontrado no XML do Promob", field="arquivo")
+
+    logger.info(f"XML Promob lido: {len(resultado.ambientes)} ambientes, {resultado.itens} itens, "
+                f"{resultado.bytes_lidos / 1024:.0f}KB")
+    return resultado
+
+
+def _posicao(resultado: ResultadoPromob, posicoes: Optional[Sequence[int]]) -> int:
+    lidos = len(resultado.ambientes)
+    return posicoes[lidos] if posicoes is not None and lidos < len(posicoes) else lidos
+
+
+def _novo_ambiente(elemento, posicao: int) -> AmbientePromob:
+    return AmbientePromob(
+        _atributo(elemento, ATRIBUTOS_NOME) or f"Ambiente {posicao + 1}",
+        _atributo(elemento, ATRIBUTOS_LINHA)
+    )
+
+
+def _valor_item(elemento) -> Decimal:
+    """TOTAL do item (atributo ou <PRICE>); na falta, preço unitário x quantidade"""
+    total = _decimal(_atributo(elemento, ATRIBUTOS_TOTAL))
+    unitario = None
+    if total is None:
+        for filho in elemento:
+            if _VARIANTES_TAG.get(filho.tag) in TAGS_PRECO:
+                total = _decimal(_atributo(filho, ATRIBUTOS_TOTAL))
+                unitario = _decimal(_atributo(filho, ATRIBUTOS_UNITARIO))
+                break
+    if total is None and unitario is not None:
+        quantidade = _decimal(_atributo(elemento, ATRIBUTOS_QUANTIDADE)) or Decimal("1")
+        total = unitario * quantidade
+    return total or Decimal("0")
+
+
+def _descartar(elemento) -> None:
+    """Libera o elemento já processado e os irmãos anteriores (memória constante)"""
+    elemento.clear(keep_tail=True)
+    pai = elemento.getparent()
+    if pai is not None:
+        while elemento.getprevious() is not None:
+            del pai[0]
+
+
+class BlocoAmbiente:
+    """Trecho de bytes [inicio, fim) de um <AMBIENT> e o SHA-256 do trecho"""
+
+    __slots__ = ("inicio", "fim", "hash")
+
+    def __init__(self, inicio: int, fim: int, hash: str):
+        self.inicio = inicio
+        self.fim = fim
+        self.hash = hash
+
+
+class MapaXml:
+    """Hash do arquivo inteiro e dos blocos de ambiente, na ordem do arquivo"""
+
+    def __init__(self):
+        self.hash = ""
+        self.blocos: List[BlocoAmbiente] = []
+        self.bytes_lidos = 0
+        # False quando a delimitação por bytes não fechou (ex.: <AMBIENT> sem fim)
+        self.valido = True
+
+
+def mapear_blocos(arquivo: BinaryIO, tamanho_maximo: int) -> MapaXml:
+    """
+    Calcula o hash do arquivo e de cada bloco <AMBIENT>...</AMBIENT> sem fazer parse.
+
+    Uma varredura por regex sobre os bytes, em leituras de 1MB, custa uma
+    fração do iterparse; com ela dá para saber quais ambientes não mudaram
+    desde o último upload antes de ler o XML. A posição do arquivo é
+    restaurada para o início ao final.
+
+    Args:
+        arquivo: Arquivo binário com seek
+        tamanho_maximo: Limite de bytes lidos (MAX_FILE_SIZE_MB)
+
+    Returns:
+        MapaXml com os blocos em ordem
+    """
+    mapa = MapaXml()
+    leitor = LeitorLimitado(arquivo, tamanho_maximo)
+    hash_arquivo = hashlib.sha256()
+    hash_bloco = None
+    inicio_bloco = 0
+    buffer = b""
+    base = 0  # posição no arquivo de buffer[0]
+
+    while True:
+        leitura = leitor.read(TAMANHO_LEITURA_MAPA)
+        hash_arquivo.update(leitura)
+        buffer += leitura
+        posicao = 0
+        tag_partida = False
+
+        while True:
+            if hash_bloco is None:
+                abertura = _ABERTURA_AMBIENTE.search(buffer, posicao)
+                if abertura is None:
+                    break
+                fim_tag = buffer.find(b">", abertura.end())
+                if fim_tag < 0:
+                    posicao = abertura.start()
+                    tag_partida = True
+                    break
+                inicio_bloco = base + abertura.start()
+                hash_bloco = hashlib.sha256(buffer[abertura.start():fim_tag + 1])
+                posicao = fim_tag + 1
+                if buffer[fim_tag - 1:fim_tag] == b"/":  # <AMBIENT .../>
+                    mapa.blocos.append(BlocoAmbiente(inicio_bloco, base + posicao, hash_bloco.hexdigest()))
+                    hash_bloco = None
+            else:
+                fechamento = _FECHAMENTO_AMBIENTE.search(buffer, posicao)
+                if fechamento is None:
+                    break
+                hash_bloco.update(buffer[posicao:fechamento.end()])
+                posicao = fechamento.end()
+                mapa.blocos.append(BlocoAmbiente(inicio_bloco, base + posicao, hash_bloco.hexdigest()))
+                hash_bloco = None
+
+        if not leitura:
+            break
+
+        # Descarta o que já foi processado, mantendo a cauda (tag partida entre leituras)
+        corte = posicao if tag_partida else max(posicao, len(buffer) - _CAUDA_BLOCO)
+        if hash_bloco is not None:
+            hash_bloco.update(buffer[posicao:corte])
+        buffer = buffer[corte:]
+        base += corte
+
+    mapa.valido = hash_bloco is None
+    mapa.hash = hash_arquivo.hexdigest()
+    mapa.bytes_lidos = leitor.lidos
+    arquivo.seek(0)
+    return mapa
+
+
+def mapear_caminho(caminho: str, tamanho_maximo: int) -> Tuple[MapaXml, float]:
+    """mapear_blocos de um arquivo em disco (para o pool de processos); devolve também os segundos gastos"""
+    inicio = time.perf_counter()
+    with open(caminho, "rb") as arquivo:
+        mapa = mapear_blocos(arquivo, tamanho_maximo)
+    return mapa, time.perf_counter() - inicio
+
+
+def ler_caminho(
+    caminho: str,
+    tamanho_maximo: int,
+    ignorados: Sequence[Tuple[int, int]],
+    posicoes: Optional[Sequence[int]],
+    permitir_vazio: bool
+) -> Tuple[ResultadoPromob, float]:
+    """ler_xml_promob de um arquivo em disco sem os trechos ignorados (para o pool de processos)"""
+    inicio = time.perf_counter()
+    with open(caminho, "rb") as arquivo:
+        resultado = ler_xml_promob(LeitorSemBlocos(arquivo, ignorados), tamanho_maximo, posicoes, permitir_vazio)
+    return resultado, time.perf_counter() - inicio
+
+
+class LeitorSemBlocos:
+    """
+    Arquivo que pula trechos de bytes (blocos de ambiente já conhecidos).
+
+    Remover elementos <AMBIENT> inteiros mantém o XML bem formado, e o
+    libxml2 nem chega a tokenizar os trechos pulados.
+
+    Args:
+        arquivo: Arquivo binário com seek, posicionado no início
+        ignorados: Trechos (inicio, fim) em ordem e sem sobreposição
+    """
+
+    def __init__(self, arquivo: BinaryIO, ignorados: Sequence[Tuple[int, int]]):
+        self.arquivo = arquivo
+        self.ignorados = list(ignorados)
+        self.posicao = 0
+        self._proximo = 0
+
+    def read(self, tamanho: int = -1) -> bytes:
+        while self._proximo < len(self.ignorados) and self.ignorados[self._proximo][0] <= self.posicao:
+            self.posicao = max(self.posicao, self.ignorados[self._proximo][1])
+            self.arquivo.seek(self.posicao)
+            self._proximo += 1
+
+        if self._proximo < len(self.ignorados):
+            restante = self.ignorados[self._proximo][0] - self.posicao
+            tamanho = restante if tamanho is None or tamanho < 0 else min(tamanho, restante)
+        bloco = self.arquivo.read(tamanho)
+        self.posicao += len(bloco)
+        return bloco
+
+
+def linha_ambiente(ambiente: AmbientePromob, nome_cliente: Optional[str], nome_arquivo: str) -> Dict[str, Any]:
+    """Linha de c_ambientes (sem loja_id) a partir dos totais do ambiente"""
+    return {
+        "nome_ambiente": ambiente.nome,
+        "nome_cliente": nome_cliente,
+        "valor_total": float(ambiente.valor_total.quantize(CENTAVOS)),
+        "linha_produto": ambiente.linha_predominante(),
+        "descricao_completa": f"{ambiente.nome} - {ambiente.itens} itens",
+        "detalhes_xml": {
+            "arquivo": nome_arquivo,
+            "itens": ambiente.itens,
+            "categorias": {
+                nome: float(valor.quantize(CENTAVOS)) for nome, valor in ambiente.categorias.items()
+            }
+        }
+    }
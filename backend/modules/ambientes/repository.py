@@ -1,5 +1,113 @@
+"""
+Repository para operações de ambientes com Supabase.
+Responsabilidade: Acesso a dados, queries, conversões.
+"""
 
-# Supabase access layer for ambientes
-async def repo_list_ambientes():
-    # TODO: call Supabase HTTP API
-    return []
+import logging
+from typing import List, Dict, Any
+from supabase import Client
+from core.database import execute_query
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class AmbienteRepository:
+    """
+    Repository para operações de ambientes com Supabase
+    
+    Responsabilidade: Acesso a dados, queries diretas no Supabase
+    Lógica de negócio: AmbienteService
+    """
+    
+    def __init__(self, supabase_client: Client):
+        self.supabase = supabase_client
+    
+    async def criar_ambientes_em_lote(self, lista_ambientes: List[Dict[str, Any]], loja_id: str) -> List[Dict[str, Any]]:
+        """
+        Insere vários ambientes em um único round-trip
+        
+        Args:
+            lista_ambientes: Linhas de c_ambientes
+            loja_id: ID da loja (RLS)
+            
+        Returns:
+            Lista com os ambientes criados, na ordem enviada
+        """
+        try:
+            for dados_ambiente in lista_ambientes:
+                dados_ambiente['loja_id'] = loja_id
+            
+            result = await execute_query(
+                self.supabase
+                .table('c_ambientes')
+                .insert(lista_ambientes)
+            )
+            
+            if len(result.data or []) != len(lista_ambientes):
+                raise Exception("Quantidade de ambientes inseridos diferente da enviada")
+            
+            logger.info(f"{len(result.data)} ambientes inseridos na loja {loja_id}")
+            return result.data
+            
+        except Exception as e:
+            logger.error(f"Erro ao criar ambientes: {str(e)}")
+            raise Exception(f"Erro ao criar ambientes: {str(e)}")
+    
+    async def buscar_ambientes_por_ids(self, ids: List[str], loja_id: str) -> List[Dict[str, Any]]:
+        """
+        Busca vários ambientes da loja em um único round-trip
+        
+        Args:
+            ids: IDs dos ambientes
+            loja_id: ID da loja (RLS)
+            
+        Returns:
+            Ambientes encontrados (os inexistentes ficam de fora)
+        """
+        try:
+            if not ids:
+                return []
+            
+            result = await execute_query(
+                self.supabase
+                .table('c_ambientes')
+                .select('*')
+                .eq('loja_id', loja_id)
+                .in_('id', ids)
+            )
+            
+            return result.data or []
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar ambientes: {str(e)}")
+            raise Exception(f"Erro ao buscar ambientes: {str(e)}")
+    
+    async def listar_ambientes(self, loja_id: str, skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Lista ambientes da loja, mais recentes primeiro
+        
+        Args:
+            loja_id: ID da loja (RLS)
+            skip: Paginação - registros a pular
+            limit: Paginação - limite de registros
+            
+        Returns:
+            Lista de ambientes
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('c_ambientes')
+                .select('*')
+                .eq('loja_id', loja_id)
+                .order('created_at', desc=True)
+                .limit(limit)
+                .offset(skip)
+            )
+            
+            return result.data or []
+            
+        except Exception as e:
+            logger.error(f"Erro ao listar ambientes: {str(e)}")
+            raise Exception(f"Erro ao listar ambientes: {str(e)}")
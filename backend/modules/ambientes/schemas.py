@@ -1,12 +1,60 @@
+"""
+Schemas Pydantic para o módulo de Ambientes.
+Define modelos de validação para entrada e saída de dados.
+"""
 
-# Pydantic models for ambientes
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+import uuid
+from datetime import datetime
 
-class AmbientesBase(BaseModel):
-    pass
 
-class AmbientesCreate(AmbientesBase):
-    pass
+# ===== SCHEMAS DE SAÍDA (RESPONSE) =====
 
-class AmbientesResponse(AmbientesBase):
-    id: str
+class AmbienteResponse(BaseModel):
+    """Schema de resposta para ambiente"""
+    id: uuid.UUID
+    nome_ambiente: str
+    nome_cliente: Optional[str] = None
+    valor_total: float
+    linha_produto: Optional[str] = None
+    descricao_completa: Optional[str] = None
+    detalhes_xml: Optional[Dict[str, Any]] = None
+    loja_id: uuid.UUID
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class AmbienteImportacaoResultado(BaseModel):
+    """Resultado da importação de um XML do Promob"""
+    arquivo: str
+    nome_cliente: Optional[str]
+    ambientes: List[AmbienteResponse]
+    valor_total: float
+    itens: int
+    tamanho_bytes: int
+    tempo_ms: float
+    hash_arquivo: str
+    ambientes_reaproveitados: int = 0
+    taxa_reaproveitamento: float = 0.0
+
+
+class AmbienteImportacaoArquivo(BaseModel):
+    """Resultado de um arquivo dentro de um lote de XMLs"""
+    arquivo: str
+    resultado: Optional[AmbienteImportacaoResultado] = None
+    erro: Optional[str] = None
+    tempo_leitura_ms: float = Field(description="Mapeamento + parse no processo do pool")
+
+
+class AmbienteImportacaoLoteResultado(BaseModel):
+    """Resultado da importação de vários XMLs do Promob"""
+    arquivos: List[AmbienteImportacaoArquivo]
+    ambientes_importados: int
+    ambientes_reaproveitados: int
+    valor_total: float
+    arquivos_com_erro: int
+    processos: int
+    tempo_ms: float
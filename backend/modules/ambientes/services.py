@@ -1 +1,659 @@
-# Business logic helpers for ambientes
+"""
+Service layer para ambientes - lógica de negócio e validações.
+Responsabilidade: Orquestração, validações, regras de negócio.
+"""
+
+import asyncio
+import logging
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from core.config import get_settings
+from core.exceptions import ServiceBusyException, ValidationException
+from core.jobs import get_fila_jobs, get_pool_processos, quantidade_processos
+from modules.xml_logs.schemas import XmlLogResponse
+from modules.xml_logs.services import XmlLogService
+from .cache_xml import EntradaBloco, get_cache_xml
+from .promob import (
+    AmbientePromob, LeitorComProgresso, LeitorLimitado, LeitorSemBlocos, MapaXml, ResultadoPromob,
+    ler_caminho, ler_xml_promob, linha_ambiente, mapear_blocos, mapear_caminho
+)
+from .repository import AmbienteRepository
+from .schemas import (
+    AmbienteImportacaoArquivo, AmbienteImportacaoLoteResultado, AmbienteImportacaoResultado, AmbienteResponse
+)
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Cópia do upload para o arquivo temporário do processamento em segundo plano
+TAMANHO_BLOCO_COPIA = 1024 * 1024
+
+# Erro gravado em xml_logs quando o encerramento do servidor interrompe ou descarta a importação
+MENSAGEM_INTERROMPIDO = "Processamento interrompido pelo encerramento do servidor"
+
+# (totais, hash do bloco, ocorrência do hash no arquivo, entrada do cache) de cada ambiente
+AmbienteLido = Tuple[AmbientePromob, Optional[str], int, Optional[EntradaBloco]]
+
+
+def validar_arquivo_xml(nome_arquivo: str) -> None:
+    """Extensão do arquivo enviado (ALLOWED_FILE_EXTENSIONS)"""
+    extensoes = get_settings().allowed_file_extensions_list
+    if not any((nome_arquivo or '').lower().endswith(ext.lower()) for ext in extensoes):
+        raise ValidationException(f"Extensão não permitida (aceitas: {', '.join(extensoes)})", field="arquivo")
+
+
+def _leitura_em_thread(arquivo: BinaryIO, tamanho_maximo: int):
+    """mapear/ler de AmbienteService._ler_ambientes sobre um arquivo aberto, numa thread"""
+    async def mapear() -> MapaXml:
+        return await asyncio.to_thread(mapear_blocos, arquivo, tamanho_maximo)
+    
+    async def ler(ignorados, posicoes, permitir_vazio) -> ResultadoPromob:
+        arquivo.seek(0)
+        return await asyncio.to_thread(
+            ler_xml_promob, LeitorSemBlocos(arquivo, ignorados), tamanho_maximo, posicoes, permitir_vazio
+        )
+    
+    return mapear, ler
+
+
+def _leitura_em_processo(caminho: str, tamanho_maximo: int, pool: Executor, tempo: Dict[str, float]):
+    """mapear/ler de AmbienteService._ler_ambientes sobre um caminho, no pool de processos"""
+    loop = asyncio.get_running_loop()
+    
+    async def mapear() -> MapaXml:
+        mapa, segundos = await loop.run_in_executor(pool, mapear_caminho, caminho, tamanho_maximo)
+        tempo['leitura_ms'] += segundos * 1000
+        return mapa
+    
+    async def ler(ignorados, posicoes, permitir_vazio) -> ResultadoPromob:
+        resultado, segundos = await loop.run_in_executor(
+            pool, ler_caminho, caminho, tamanho_maximo, ignorados, posicoes, permitir_vazio
+        )
+        tempo['leitura_ms'] += segundos * 1000
+        return resultado
+    
+    return mapear, ler
+
+
+def copiar_upload(origem: BinaryIO, tamanho_maximo: int, nomeado: bool = False) -> Tuple[BinaryIO, int]:
+    """
+    Copia o upload para um arquivo temporário do próprio processamento
+    
+    O UploadFile é fechado ao fim da requisição, antes de o trabalho em
+    segundo plano rodar; a cópia é fechada (e apagada) pelo trabalho.
+    
+    Args:
+        origem: Arquivo enviado
+        tamanho_maximo: Limite de bytes (MAX_FILE_SIZE_MB)
+        nomeado: Cria o temporário com caminho (`.name`), para abrir em outro processo
+    
+    Returns:
+        (arquivo temporário posicionado no início, tamanho em bytes)
+    """
+    destino = tempfile.NamedTemporaryFile(suffix=".xml") if nomeado else tempfile.TemporaryFile()
+    try:
+        leitor = LeitorLimitado(origem, tamanho_maximo)
+        while True:
+            bloco = leitor.read(TAMANHO_BLOCO_COPIA)
+            if not bloco:
+                break
+            destino.write(bloco)
+        destino.seek(0)
+        return destino, leitor.lidos
+    except Exception:
+        destino.close()
+        raise
+
+
+class AmbienteService:
+    """
+    Service layer para ambientes - lógica de negócio
+    
+    Responsabilidade: Validações, regras de negócio, orquestração
+    """
+    
+    def __init__(self, supabase_client):
+        self.repository = AmbienteRepository(supabase_client)
+    
+    async def importar_xml(self, arquivo: BinaryIO, nome_arquivo: str, current_user: Dict[str, Any]) -> AmbienteImportacaoResultado:
+        """
+        Importa os ambientes de um XML do Promob
+        
+        O arquivo é mapeado por hash (arquivo inteiro e cada bloco <AMBIENT>).
+        Blocos já importados na loja (cache_xml) não passam pelo parse e,
+        sendo do mesmo cliente, reaproveitam a linha de c_ambientes criada
+        antes; só os blocos novos ou alterados são lidos (streaming, numa
+        thread) e inseridos em blocos de IMPORT_BATCH_SIZE.
+        
+        Args:
+            arquivo: Arquivo binário enviado (com seek)
+            nome_arquivo: Nome original (validação da extensão e detalhes_xml)
+            current_user: Usuário logado (ambientes criados na loja dele)
+            
+        Returns:
+            AmbienteImportacaoResultado: Ambientes (na ordem do arquivo) com valor_total e taxa de reaproveitamento
+        """
+        try:
+            loja_id = current_user['loja_id']
+            validar_arquivo_xml(nome_arquivo)
+            inicio = time.perf_counter()
+            
+            mapear, ler = _leitura_em_thread(arquivo, get_settings().max_file_size_bytes)
+            lido = await self._ler_ambientes(loja_id, mapear, ler)
+            tempo_leitura_ms = (time.perf_counter() - inicio) * 1000
+            return await self._gravar_ambientes(lido, nome_arquivo, loja_id, tempo_leitura_ms)
+            
+        except ValidationException:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao importar XML {nome_arquivo}: {str(e)}")
+            raise Exception(f"Erro ao importar XML: {str(e)}")
+    
+    async def importar_xmls(
+        self,
+        caminhos: List[str],
+        nomes_arquivos: List[str],
+        current_user: Dict[str, Any],
+        ao_concluir_arquivo: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> AmbienteImportacaoLoteResultado:
+        """
+        Importa vários XMLs do Promob com o parse em paralelo (processos)
+        
+        O mapeamento por hash e o parse (CPU) de todos os arquivos rodam no
+        pool de processos (JOBS_PROCESSOS), fora do GIL; os inserts seguem a
+        ordem dos arquivos, cada um assim que ele e os anteriores foram lidos.
+        Blocos repetidos entre arquivos do lote são inseridos uma vez só (ver
+        _gravar_ambientes). Um arquivo inválido não impede os demais: o erro
+        fica no resultado do próprio arquivo.
+        
+        Args:
+            caminhos: Arquivos em disco (lidos pelos processos)
+            nomes_arquivos: Nome original de cada arquivo
+            current_user: Usuário logado (ambientes criados na loja dele)
+            ao_concluir_arquivo: Chamado com a quantidade de arquivos lidos até o momento
+            
+        Returns:
+            AmbienteImportacaoLoteResultado: Um resultado por arquivo, na ordem enviada
+        """
+        try:
+            loja_id = current_user['loja_id']
+            tamanho_maximo = get_settings().max_file_size_bytes
+            pool = get_pool_processos()
+            inicio = time.perf_counter()
+            tempos = [{'leitura_ms': 0.0} for _ in caminhos]
+            lidos_ate_agora = [0]
+            
+            async def ler_arquivo(caminho: str, tempo: Dict[str, float]):
+                try:
+                    return await self._ler_ambientes(loja_id, *_leitura_em_processo(caminho, tamanho_maximo, pool, tempo))
+                finally:
+                    lidos_ate_agora[0] += 1
+                    if ao_concluir_arquivo is not None:
+                        await ao_concluir_arquivo(lidos_ate_agora[0])
+            
+            leituras = [asyncio.ensure_future(ler_arquivo(caminho, tempo)) for caminho, tempo in zip(caminhos, tempos)]
+            
+            # Cada arquivo é gravado assim que ele e os anteriores foram lidos (os
+            # seguintes continuam no pool): a leitura concluída é descartada após a
+            # gravação e o cache já tem os blocos dele quando o próximo é gravado
+            arquivos: List[AmbienteImportacaoArquivo] = []
+            try:
+                for nome_arquivo, leitura, tempo in zip(nomes_arquivos, leituras, tempos):
+                    try:
+                        lido = await leitura
+                    except Exception as e:
+                        mensagem = e.message if isinstance(e, ValidationException) else str(e)
+                        logger.warning(f"XML {nome_arquivo} do lote com erro: {mensagem}")
+                        arquivos.append(AmbienteImportacaoArquivo(
+                            arquivo=nome_arquivo, erro=mensagem, tempo_leitura_ms=round(tempo['leitura_ms'], 1)
+                        ))
+                        continue
+                    leitura_ms = round(tempo['leitura_ms'], 1)
+                    resultado = await self._gravar_ambientes(lido, nome_arquivo, loja_id, leitura_ms)
+                    arquivos.append(AmbienteImportacaoArquivo(arquivo=nome_arquivo, resultado=resultado, tempo_leitura_ms=leitura_ms))
+            finally:
+                for leitura in leituras:
+                    leitura.cancel()
+            
+            importados = [arquivo.resultado for arquivo in arquivos if arquivo.resultado is not None]
+            tempo_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            lote = AmbienteImportacaoLoteResultado(
+                arquivos=arquivos,
+                ambientes_importados=sum(len(resultado.ambientes) for resultado in importados),
+                ambientes_reaproveitados=sum(resultado.ambientes_reaproveitados for resultado in importados),
+                valor_total=round(sum(resultado.valor_total for resultado in importados), 2),
+                arquivos_com_erro=len(arquivos) - len(importados),
+                processos=quantidade_processos(),
+                tempo_ms=tempo_ms
+            )
+            logger.info(f"Lote de {len(arquivos)} XMLs importado na loja {loja_id}: {lote.ambientes_importados} ambientes, "
+                        f"{lote.arquivos_com_erro} arquivos com erro, {tempo_ms}ms com {lote.processos} processos")
+            return lote
+            
+        except ValidationException:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao importar lote de XMLs: {str(e)}")
+            raise Exception(f"Erro ao importar lote de XMLs: {str(e)}")
+    
+    async def _gravar_ambientes(
+        self,
+        lido: Tuple[MapaXml, List[AmbienteLido], Optional[str]],
+        nome_arquivo: str,
+        loja_id: str,
+        tempo_leitura_ms: float
+    ) -> AmbienteImportacaoResultado:
+        """
+        Reaproveita ou insere as linhas de c_ambientes de um arquivo já lido e atualiza o cache
+        
+        Blocos que não estavam no cache na leitura são consultados de novo:
+        um arquivo anterior do mesmo lote (ou outro upload) pode tê-los gravado
+        enquanto este era lido.
+        """
+        settings = get_settings()
+        inicio = time.perf_counter()
+        mapa, ambientes, nome_cliente = lido
+        cache = get_cache_xml()
+        atualizados = [
+            (ambiente, hash_bloco, ocorrencia, entrada if entrada is not None or hash_bloco is None
+             else cache.obter(loja_id, hash_bloco))
+            for ambiente, hash_bloco, ocorrencia, entrada in ambientes
+        ]
+        reaproveitados = await self._linhas_reaproveitadas(atualizados, nome_cliente, loja_id)
+        
+        # Ambientes sem linha reaproveitável: insert em blocos
+        pendentes = [posicao for posicao in range(len(ambientes)) if posicao not in reaproveitados]
+        linhas = [linha_ambiente(ambientes[posicao][0], nome_cliente, nome_arquivo) for posicao in pendentes]
+        criados: Dict[int, Dict[str, Any]] = {}
+        for inicio_bloco in range(0, len(linhas), settings.import_batch_size):
+            lote = await self.repository.criar_ambientes_em_lote(
+                linhas[inicio_bloco:inicio_bloco + settings.import_batch_size],
+                loja_id
+            )
+            criados.update(zip(pendentes[inicio_bloco:], lote))
+        
+        for posicao, linha in criados.items():
+            ambiente, hash_bloco, ocorrencia, _ = ambientes[posicao]
+            if hash_bloco is not None:
+                cache.armazenar(loja_id, hash_bloco, ambiente, linha, ocorrencia)
+        
+        linhas_finais = [reaproveitados.get(posicao) or criados[posicao] for posicao in range(len(ambientes))]
+        sem_parse = sum(1 for _, _, _, entrada in ambientes if entrada is not None)
+        taxa = round(sem_parse / len(ambientes), 4) if ambientes else 0.0
+        tempo_ms = round(tempo_leitura_ms + (time.perf_counter() - inicio) * 1000, 1)
+        valor_total = round(sum(float(linha['valor_total']) for linha in linhas_finais), 2)
+        logger.info(f"XML {nome_arquivo} importado na loja {loja_id}: {len(ambientes)} ambientes "
+                    f"({len(reaproveitados)} reaproveitados, {taxa:.0%} dos blocos sem parse), "
+                    f"R$ {valor_total:,.2f} em {tempo_ms}ms")
+        
+        return AmbienteImportacaoResultado(
+            arquivo=nome_arquivo,
+            nome_cliente=nome_cliente,
+            ambientes=[AmbienteResponse(**linha) for linha in linhas_finais],
+            valor_total=valor_total,
+            itens=sum(ambiente.itens for ambiente, _, _, _ in ambientes),
+            tamanho_bytes=mapa.bytes_lidos,
+            tempo_ms=tempo_ms,
+            hash_arquivo=mapa.hash,
+            ambientes_reaproveitados=len(reaproveitados),
+            taxa_reaproveitamento=taxa
+        )
+    
+    async def enfileirar_importacao(
+        self,
+        arquivo: BinaryIO,
+        nome_arquivo: str,
+        current_user: Dict[str, Any],
+        logs: XmlLogService
+    ) -> XmlLogResponse:
+        """
+        Aceita um XML do Promob para importação em segundo plano
+        
+        O arquivo é copiado para um temporário, um log PENDENTE é criado em
+        xml_logs e a importação entra na fila de processamento (core.jobs).
+        
+        Args:
+            arquivo: Arquivo binário enviado
+            nome_arquivo: Nome original
+            current_user: Usuário logado (ambientes criados na loja dele)
+            logs: XmlLogService onde o andamento é registrado
+            
+        Returns:
+            XmlLogResponse: Log PENDENTE para acompanhar em /xml-logs/{id}
+            
+        Raises:
+            ServiceBusyException: Fila de processamento cheia
+        """
+        try:
+            validar_arquivo_xml(nome_arquivo)
+            settings = get_settings()
+            copia, tamanho = await asyncio.to_thread(copiar_upload, arquivo, settings.max_file_size_bytes)
+            
+            try:
+                log = await logs.criar_pendente(nome_arquivo, tamanho, current_user)
+                get_fila_jobs().enfileirar(
+                    f"xml:{log['id']}",
+                    lambda: self._processar_importacao(str(log['id']), copia, tamanho, nome_arquivo, current_user, logs),
+                    lambda: self._descartar_importacao(str(log['id']), [copia], logs)
+                )
+            except ServiceBusyException as e:
+                copia.close()
+                await logs.registrar_erro(str(log['id']), 0, e.message)
+                raise
+            except Exception:
+                copia.close()
+                raise
+            
+            logger.info(f"XML {nome_arquivo} ({tamanho / 1024:.0f}KB) enfileirado na loja {current_user['loja_id']}: log {log['id']}")
+            return XmlLogResponse(**log)
+            
+        except (ValidationException, ServiceBusyException):
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao enfileirar XML {nome_arquivo}: {str(e)}")
+            raise Exception(f"Erro ao enfileirar XML: {str(e)}")
+    
+    async def _processar_importacao(
+        self,
+        log_id: str,
+        arquivo: BinaryIO,
+        tamanho: int,
+        nome_arquivo: str,
+        current_user: Dict[str, Any],
+        logs: XmlLogService
+    ) -> None:
+        """Executa a importação na fila, registrando progresso, duração e erro no log"""
+        inicio = time.perf_counter()
+        leitor = LeitorComProgresso(arquivo, tamanho)
+        parar = asyncio.Event()
+        acompanhamento = None
+        try:
+            await logs.registrar_inicio(log_id)
+            acompanhamento = asyncio.create_task(self._acompanhar_progresso(log_id, leitor, logs, parar))
+            resultado = await self.importar_xml(leitor, nome_arquivo, current_user)
+            
+            parar.set()
+            await acompanhamento
+            await logs.registrar_conclusao(log_id, round((time.perf_counter() - inicio) * 1000, 1), {
+                'hash_arquivo': resultado.hash_arquivo,
+                'ambientes_importados': len(resultado.ambientes),
+                'ambientes_reaproveitados': resultado.ambientes_reaproveitados,
+                'valor_total': resultado.valor_total,
+                'detalhes': {
+                    'nome_cliente': resultado.nome_cliente,
+                    'itens': resultado.itens,
+                    'taxa_reaproveitamento': resultado.taxa_reaproveitamento,
+                    'ambiente_ids': [str(ambiente.id) for ambiente in resultado.ambientes]
+                }
+            })
+            
+        except Exception as e:
+            parar.set()
+            if acompanhamento is not None:
+                await asyncio.gather(acompanhamento, return_exceptions=True)
+            mensagem = e.message if isinstance(e, ValidationException) else str(e)
+            await logs.registrar_erro(log_id, round((time.perf_counter() - inicio) * 1000, 1), mensagem)
+            raise
+        except asyncio.CancelledError:
+            parar.set()
+            if acompanhamento is not None:
+                await asyncio.gather(acompanhamento, return_exceptions=True)
+            await logs.registrar_erro(log_id, round((time.perf_counter() - inicio) * 1000, 1), MENSAGEM_INTERROMPIDO)
+            raise
+        finally:
+            arquivo.close()
+    
+    async def _descartar_importacao(self, log_id: str, copias: List[BinaryIO], logs: XmlLogService) -> None:
+        """Importação que ficou na fila no encerramento: fecha as cópias e marca o log como erro"""
+        for copia in copias:
+            copia.close()
+        await logs.registrar_erro(log_id, 0, MENSAGEM_INTERROMPIDO)
+    
+    async def enfileirar_importacao_lote(
+        self,
+        arquivos: List[Tuple[BinaryIO, str]],
+        current_user: Dict[str, Any],
+        logs: XmlLogService
+    ) -> XmlLogResponse:
+        """
+        Aceita vários XMLs do Promob (um por ambiente/cômodo) para importação em segundo plano
+        
+        Um único log em xml_logs acompanha o lote; o parse dos arquivos roda
+        em paralelo no pool de processos (importar_xmls).
+        
+        Args:
+            arquivos: (arquivo binário, nome original) de cada XML
+            current_user: Usuário logado (ambientes criados na loja dele)
+            logs: XmlLogService onde o andamento é registrado
+            
+        Returns:
+            XmlLogResponse: Log PENDENTE do lote
+            
+        Raises:
+            ValidationException: Lote vazio, acima de XML_LOTE_MAX_ARQUIVOS ou com extensão inválida
+            ServiceBusyException: Fila de processamento cheia
+        """
+        copias: List[BinaryIO] = []
+        try:
+            settings = get_settings()
+            if not arquivos:
+                raise ValidationException("Envie ao menos um arquivo XML", field="arquivos")
+            if len(arquivos) > settings.xml_lote_max_arquivos:
+                raise ValidationException(f"Máximo de {settings.xml_lote_max_arquivos} arquivos por lote", field="arquivos")
+            nomes = [nome for _, nome in arquivos]
+            for nome in nomes:
+                validar_arquivo_xml(nome)
+            
+            tamanho_total = 0
+            for arquivo, _ in arquivos:
+                copia, tamanho = await asyncio.to_thread(copiar_upload, arquivo, settings.max_file_size_bytes, True)
+                copias.append(copia)
+                tamanho_total += tamanho
+            
+            log = await logs.criar_pendente(", ".join(nomes)[:255], tamanho_total, current_user)
+            try:
+                get_fila_jobs().enfileirar(
+                    f"xml-lote:{log['id']}",
+                    lambda: self._processar_lote(str(log['id']), copias, nomes, current_user, logs),
+                    lambda: self._descartar_importacao(str(log['id']), copias, logs)
+                )
+            except ServiceBusyException as e:
+                await logs.registrar_erro(str(log['id']), 0, e.message)
+                raise
+            
+            logger.info(f"Lote de {len(nomes)} XMLs ({tamanho_total / 1024:.0f}KB) enfileirado na loja "
+                        f"{current_user['loja_id']}: log {log['id']}")
+            return XmlLogResponse(**log)
+            
+        except (ValidationException, ServiceBusyException):
+            for copia in copias:
+                copia.close()
+            raise
+        except Exception as e:
+            for copia in copias:
+                copia.close()
+            logger.error(f"Erro ao enfileirar lote de XMLs: {str(e)}")
+            raise Exception(f"Erro ao enfileirar lote de XMLs: {str(e)}")
+    
+    async def _processar_lote(
+        self,
+        log_id: str,
+        copias: List[BinaryIO],
+        nomes_arquivos: List[str],
+        current_user: Dict[str, Any],
+        logs: XmlLogService
+    ) -> None:
+        """Executa a importação do lote na fila, registrando progresso por arquivo, tempos e erros no log"""
+        inicio = time.perf_counter()
+        
+        async def ao_concluir_arquivo(concluidos: int) -> None:
+            try:
+                await logs.registrar_progresso(log_id, min(99.0, concluidos * 100 / len(copias)))
+            except Exception as e:
+                logger.warning(f"Erro ao registrar progresso do log {log_id}: {str(e)}")
+        
+        try:
+            await logs.registrar_inicio(log_id)
+            lote = await self.importar_xmls(
+                [copia.name for copia in copias], nomes_arquivos, current_user, ao_concluir_arquivo
+            )
+            duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            arquivos = [
+                {
+                    'arquivo': arquivo.arquivo,
+                    'tempo_leitura_ms': arquivo.tempo_leitura_ms,
+                    'tempo_ms': arquivo.resultado.tempo_ms if arquivo.resultado else None,
+                    'ambientes': len(arquivo.resultado.ambientes) if arquivo.resultado else 0,
+                    'valor_total': arquivo.resultado.valor_total if arquivo.resultado else None,
+                    'erro': arquivo.erro
+                }
+                for arquivo in lote.arquivos
+            ]
+            
+            if lote.arquivos_com_erro == len(lote.arquivos):
+                await logs.registrar_erro(
+                    log_id, duracao_ms, f"Nenhum arquivo do lote pôde ser importado ({lote.arquivos[0].erro})"
+                )
+                return
+            
+            await logs.registrar_conclusao(log_id, duracao_ms, {
+                'ambientes_importados': lote.ambientes_importados,
+                'ambientes_reaproveitados': lote.ambientes_reaproveitados,
+                'valor_total': lote.valor_total,
+                'erro': f"{lote.arquivos_com_erro} de {len(lote.arquivos)} arquivos com erro" if lote.arquivos_com_erro else None,
+                'detalhes': {'processos': lote.processos, 'arquivos': arquivos}
+            })
+            
+        except Exception as e:
+            mensagem = e.message if isinstance(e, ValidationException) else str(e)
+            await logs.registrar_erro(log_id, round((time.perf_counter() - inicio) * 1000, 1), mensagem)
+            raise
+        except asyncio.CancelledError:
+            await logs.registrar_erro(log_id, round((time.perf_counter() - inicio) * 1000, 1), MENSAGEM_INTERROMPIDO)
+            raise
+        finally:
+            for copia in copias:
+                copia.close()
+    
+    async def _acompanhar_progresso(
+        self,
+        log_id: str,
+        leitor: LeitorComProgresso,
+        logs: XmlLogService,
+        parar: asyncio.Event
+    ) -> None:
+        """Grava o progresso no log a cada JOBS_PROGRESSO_INTERVALO_SECONDS até `parar`"""
+        intervalo = get_settings().jobs_progresso_intervalo_seconds
+        gravado = 0.0
+        while not parar.is_set():
+            try:
+                await asyncio.wait_for(parar.wait(), intervalo)
+            except asyncio.TimeoutError:
+                pass
+            if not parar.is_set() and leitor.progresso - gravado >= 1:
+                gravado = leitor.progresso
+                try:
+                    await logs.registrar_progresso(log_id, gravado)
+                except Exception as e:
+                    # Progresso é informativo: falha aqui não interrompe a importação
+                    logger.warning(f"Erro ao registrar progresso do log {log_id}: {str(e)}")
+    
+    async def _ler_ambientes(
+        self,
+        loja_id: str,
+        mapear: Callable[[], Awaitable[MapaXml]],
+        ler: Callable[..., Awaitable[ResultadoPromob]]
+    ) -> Tuple[MapaXml, List[AmbienteLido], Optional[str]]:
+        """
+        Mapeia os blocos do XML e lê só os que não estão no cache da loja
+        
+        Args:
+            loja_id: Loja do upload (chave do cache)
+            mapear: Executa mapear_blocos no arquivo
+            ler: Executa ler_xml_promob(ignorados, posicoes, permitir_vazio) no arquivo
+            
+        Returns:
+            (mapa do arquivo, ambientes na ordem do arquivo, nome do cliente)
+        """
+        mapa = await mapear()
+        cache = get_cache_xml()
+        
+        ocorrencias: Counter = Counter()
+        blocos = []
+        for bloco in (mapa.blocos if mapa.valido else []):
+            blocos.append((bloco, ocorrencias[bloco.hash], cache.obter(loja_id, bloco.hash)))
+            ocorrencias[bloco.hash] += 1
+        
+        # Os blocos em cache são pulados nos bytes; o envelope (dados do cliente) é sempre lido
+        ignorados = [(bloco.inicio, bloco.fim) for bloco, _, entrada in blocos if entrada is not None]
+        posicoes = [posicao for posicao, (_, _, entrada) in enumerate(blocos) if entrada is None]
+        resultado = await ler(ignorados, posicoes if mapa.valido else None, bool(ignorados))
+        
+        if mapa.valido and len(resultado.ambientes) == len(posicoes):
+            lidos = iter(resultado.ambientes)
+            ambientes = [
+                (entrada.ambiente if entrada is not None else next(lidos), bloco.hash, ocorrencia, entrada)
+                for bloco, ocorrencia, entrada in blocos
+            ]
+            return mapa, ambientes, resultado.nome_cliente
+        
+        if mapa.valido:
+            # Delimitação por bytes não bateu com o parse (ex.: "<AMBIENT" dentro de CDATA): lê tudo sem cache
+            logger.warning(f"Blocos do XML não conferem com o parse ({len(posicoes)} x {len(resultado.ambientes)}), "
+                           f"importando sem cache")
+            resultado = await ler([], None, False)
+        
+        return mapa, [(ambiente, None, 0, None) for ambiente in resultado.ambientes], resultado.nome_cliente
+    
+    async def _linhas_reaproveitadas(
+        self,
+        ambientes: List[AmbienteLido],
+        nome_cliente: Optional[str],
+        loja_id: str
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Linhas de c_ambientes já criadas para os mesmos blocos e o mesmo cliente
+        
+        As linhas candidatas são conferidas no banco em um único round-trip
+        (uma linha removida volta a ser inserida).
+        
+        Returns:
+            posição no arquivo → linha atual de c_ambientes
+        """
+        candidatas: Dict[int, str] = {}
+        for posicao, (_, _, ocorrencia, entrada) in enumerate(ambientes):
+            if entrada is None or ocorrencia >= len(entrada.linhas):
+                continue
+            linha = entrada.linhas[ocorrencia]
+            if linha.get('nome_cliente') == nome_cliente:
+                candidatas[posicao] = str(linha['id'])
+        
+        existentes = {
+            str(linha['id']): linha
+            for linha in await self.repository.buscar_ambientes_por_ids(list(candidatas.values()), loja_id)
+        }
+        return {posicao: existentes[id_] for posicao, id_ in candidatas.items() if id_ in existentes}
+    
+    async def listar_ambientes(self, current_user: Dict[str, Any], skip: int = 0, limit: int = 50) -> List[AmbienteResponse]:
+        """
+        Lista ambientes da loja do usuário
+        
+        Args:
+            current_user: Usuário logado
+            skip: Paginação - registros a pular
+            limit: Paginação - limite de registros
+            
+        Returns:
+            List[AmbienteResponse]: Ambientes, mais recentes primeiro
+        """
+        try:
+            ambientes = await self.repository.listar_ambientes(current_user['loja_id'], skip, limit)
+            return [AmbienteResponse(**ambiente) for ambiente in ambientes]
+            
+        except Exception as e:
+            logger.error(f"Erro ao listar ambientes: {str(e)}")
+            raise Exception(f"Erro ao listar ambientes: {str(e)}")
@@ -0,0 +1,194 @@
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from core.exceptions import ValidationException
+from modules.ambientes import cache_xml, services
+from modules.ambientes.cache_xml import CacheBlocosXml
+from modules.ambientes.promob import _decimal, ler_xml_promob
+from modules.ambientes.services import AmbienteService
+
+USUARIO = {'loja_id': '00000000-0000-0000-0000-0000000000aa', 'id': 'u-1', 'perfil': 'VENDEDOR'}
+
+XML_PROMOB = '''<?xml version="1.0" encoding="UTF-8"?>
+<LISTING>
+  <AMBIENTS>
+    <AMBIENT DESCRIPTION="Cozinha">
+      <CATEGORIES>
+        <CATEGORY DESCRIPTION="Armários"><ITEMS>
+          <ITEM DESCRIPTION="Balcão" QUANTITY="1" FAMILY="Unique">
+            <PRICE TOTAL="1000.50"/>
+            <ITEMS><ITEM DESCRIPTION="Dobradiça"><PRICE TOTAL="10.00"/></ITEM></ITEMS>
+          </ITEM>
+          <ITEM DESCRIPTION="Aéreo" QUANTITY="2" FAMILY="Sublime"><PRICE UNIT="1.234,25"/></ITEM>
+        </ITEMS></CATEGORY>
+        <CATEGORY DESCRIPTION="Tampos"><ITEMS>
+          <ITEM DESCRIPTION="Tampo" QUANTITY="1" FAMILY="Unique" TOTAL="99.99"/>
+        </ITEMS></CATEGORY>
+      </CATEGORIES>
+    </AMBIENT>
+    <AMBIENT DESCRIPTION="Closet" LINE="Brilhart"><ITEMS><ITEM TOTAL="300"/></ITEMS></AMBIENT>
+  </AMBIENTS>
+  <CUSTOMERSDATA><DATA ID="NomeCliente" VALUE="Maria Souza"/></CUSTOMERSDATA>
+</LISTING>'''.encode('utf-8')
+
+
+class RepositorioFalso:
+    def __init__(self):
+        self.lotes = []
+        self.linhas = {}
+
+    async def criar_ambientes_em_lote(self, lista, loja_id):
+        self.lotes.append(len(lista))
+        criados = []
+        for dados in lista:
+            linha = {**dados, 'id': f'00000000-0000-0000-0000-{len(self.linhas):012d}', 'loja_id': loja_id,
+                     'created_at': '2026-01-01T00:00:00+00:00'}
+            self.linhas[linha['id']] = linha
+            criados.append(linha)
+        return criados
+
+    async def buscar_ambientes_por_ids(self, ids, loja_id):
+        return [self.linhas[i] for i in ids if i in self.linhas]
+
+
+@pytest.fixture(autouse=True)
+def cache_vazio(monkeypatch):
+    monkeypatch.setattr(cache_xml, '_cache_xml', CacheBlocosXml(max_entradas=100, ttl_seconds=600))
+
+
+def servico():
+    service = AmbienteService.__new__(AmbienteService)
+    service.repository = RepositorioFalso()
+    return service
+
+
+def test_totais_por_ambiente_sem_somar_componentes():
+    resultado = ler_xml_promob(io.BytesIO(XML_PROMOB), 1024 * 1024)
+
+    cozinha, closet = resultado.ambientes
+    assert resultado.nome_cliente == 'Maria Souza' and resultado.itens == 4
+    assert str(cozinha.valor_total) == '3568.99'  # 1000.50 + 2 x 1234.25 + 99.99
+    assert {nome: str(valor) for nome, valor in cozinha.categorias.items()} == {'Armários': '3469.00', 'Tampos': '99.99'}
+    assert cozinha.linha_predominante() == 'Sublime' and closet.linha_predominante() == 'Brilhart'
+
+
+def test_decimal_com_separador_de_milhar():
+    assert [str(_decimal(v)) for v in ('1234.50', '1.234,50', '1,000.50', '1.000.000,5', '12,5')] == [
+        '1234.50', '1234.50', '1000.50', '1000000.5', '12.5'
+    ]
+    assert _decimal('abc') is None and _decimal(None) is None
+
+
+def test_xml_invalido_grande_ou_sem_ambientes():
+    with pytest.raises(ValidationException):
+        ler_xml_promob(io.BytesIO(b'<LISTING><AMBIENT></LISTING>'), 1024)
+    with pytest.raises(ValidationException):
+        ler_xml_promob(io.BytesIO(XML_PROMOB), 100)
+    with pytest.raises(ValidationException):
+        ler_xml_promob(io.BytesIO(b'<LISTING/>'), 1024)
+
+
+@pytest.mark.asyncio
+async def test_upload_cria_ambientes_com_valor_total():
+    service = servico()
+
+    resultado = await service.importar_xml(io.BytesIO(XML_PROMOB), 'projeto.xml', USUARIO)
+
+    assert [(a.nome_ambiente, a.valor_total, a.linha_produto) for a in resultado.ambientes] == [
+        ('Cozinha', 3568.99, 'Sublime'), ('Closet', 300.0, 'Brilhart')
+    ]
+    assert resultado.valor_total == 3868.99 and resultado.ambientes[0].nome_cliente == 'Maria Souza'
+    assert resultado.ambientes[0].detalhes_xml['arquivo'] == 'projeto.xml'
+    assert service.repository.lotes == [2]
+    with pytest.raises(ValidationException):
+        await service.importar_xml(io.BytesIO(XML_PROMOB), 'projeto.pdf', USUARIO)
+
+
+@pytest.mark.asyncio
+async def test_reenvio_reaproveita_blocos_iguais():
+    service = servico()
+    primeiro = await service.importar_xml(io.BytesIO(XML_PROMOB), 'projeto.xml', USUARIO)
+    assert primeiro.taxa_reaproveitamento == 0.0
+
+    # Mesmo arquivo: nada é lido nem inserido de novo
+    repetido = await service.importar_xml(io.BytesIO(XML_PROMOB), 'projeto.xml', USUARIO)
+    assert repetido.hash_arquivo == primeiro.hash_arquivo
+    assert repetido.taxa_reaproveitamento == 1.0 and repetido.ambientes_reaproveitados == 2
+    assert [a.id for a in repetido.ambientes] == [a.id for a in primeiro.ambientes]
+    assert repetido.valor_total == 3868.99 and repetido.itens == 4
+    assert service.repository.lotes == [2]
+
+    # Só o Closet mudou: um bloco lido e inserido, a Cozinha reaproveitada
+    alterado = XML_PROMOB.replace(b'<ITEM TOTAL="300"/>', b'<ITEM TOTAL="450"/>')
+    resultado = await service.importar_xml(io.BytesIO(alterado), 'projeto-v2.xml', USUARIO)
+    assert resultado.taxa_reaproveitamento == 0.5 and resultado.ambientes_reaproveitados == 1
+    assert [(a.nome_ambiente, a.valor_total) for a in resultado.ambientes] == [('Cozinha', 3568.99), ('Closet', 450.0)]
+    assert resultado.ambientes[0].id == primeiro.ambientes[0].id
+    assert service.repository.lotes == [2, 1]
+
+    # Outro cliente: os totais vêm do cache, mas as linhas são novas
+    outro_cliente = alterado.replace(b'Maria Souza', b'Ana Lima')
+    resultado = await service.importar_xml(io.BytesIO(outro_cliente), 'projeto-v2.xml', USUARIO)
+    assert resultado.taxa_reaproveitamento == 1.0 and resultado.ambientes_reaproveitados == 0
+    assert {a.nome_cliente for a in resultado.ambientes} == {'Ana Lima'}
+    assert service.repository.lotes == [2, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_lote_em_processos_mantem_ordem_e_erro_por_arquivo(tmp_path, monkeypatch):
+    pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+    monkeypatch.setattr(services, 'get_pool_processos', lambda: pool)
+    caminhos = []
+    for nome, conteudo in (('cozinha.xml', XML_PROMOB), ('quebrado.xml', b'<LISTING><AMBIENT>'),
+                           ('closet.xml', XML_PROMOB.replace(b'Maria Souza', b'Ana Lima'))):
+        caminho = tmp_path / nome
+        caminho.write_bytes(conteudo)
+        caminhos.append(str(caminho))
+    service = servico()
+    concluidos = []
+
+    async def ao_concluir(quantidade):
+        concluidos.append(quantidade)
+
+    try:
+        lote = await service.importar_xmls(caminhos, ['cozinha.xml', 'quebrado.xml', 'closet.xml'], USUARIO, ao_concluir)
+    finally:
+        pool.shutdown()
+
+    assert [arquivo.arquivo for arquivo in lote.arquivos] == ['cozinha.xml', 'quebrado.xml', 'closet.xml']
+    cozinha, quebrado, closet = lote.arquivos
+    assert quebrado.resultado is None and quebrado.erro and lote.arquivos_com_erro == 1
+    assert cozinha.resultado.ambientes[0].nome_cliente == 'Maria Souza'
+    assert closet.resultado.ambientes[0].nome_cliente == 'Ana Lima'
+    assert cozinha.tempo_leitura_ms > 0 and closet.tempo_leitura_ms > 0
+    assert lote.ambientes_importados == 4 and lote.valor_total == 7737.98
+    assert sorted(concluidos) == [1, 2, 3]
+    # Inserts na ordem dos arquivos
+    assert service.repository.lotes == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_lote_insere_uma_vez_blocos_repetidos_entre_arquivos(tmp_path, monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(services, 'get_pool_processos', lambda: pool)
+    caminhos = []
+    for nome in ('projeto.xml', 'projeto-copia.xml'):
+        caminho = tmp_path / nome
+        caminho.write_bytes(XML_PROMOB)
+        caminhos.append(str(caminho))
+    service = servico()
+
+    try:
+        lote = await service.importar_xmls(caminhos, ['projeto.xml', 'projeto-copia.xml'], USUARIO)
+    finally:
+        pool.shutdown()
+
+    # Os dois arquivos são lidos em paralelo (cache vazio), mas o segundo reaproveita as linhas do primeiro
+    primeiro, copia = (arquivo.resultado for arquivo in lote.arquivos)
+    assert [a.id for a in copia.ambientes] == [a.id for a in primeiro.ambientes]
+    assert copia.ambientes_reaproveitados == 2 and copia.taxa_reaproveitamento == 0.0
+    assert service.repository.lotes == [2]
+
@@ -1,11 +1,60 @@
+"""
+Controller (rotas) para o módulo de Aprovações.
+Caixa de entrada dos aprovadores; solicitar e decidir ficam também em /orcamentos/{id}.
+"""
 
-# FastAPI routes for aprovacoes
-from fastapi import APIRouter, Depends
-from .schemas import *
-from .repository import *
+from fastapi import APIRouter, Depends, Query
+from typing import Dict, Any, Optional
+import uuid
+from core.auth import require_gerente_ou_admin
+from core.database import get_database
+from core.paginacao import PaginaCursor
+from supabase import Client
 
-router = APIRouter(prefix='/aprovacoes', tags=['aprovacoes'])
+from .schemas import AprovacaoResponse, DecisaoAprovacao
+from .services import AprovacaoService
 
-@router.get('/', response_model=list[dict])
-async def list_aprovacoes():
-    return await repo_list_aprovacoes()
+# Router para o módulo de aprovações
+router = APIRouter()
+
+
+@router.get("/pendentes",
+    response_model=PaginaCursor[AprovacaoResponse],
+    summary="Aprovações pendentes",
+    description="Solicitações de desconto da loja aguardando o nível do usuário, mais recentes primeiro"
+)
+async def listar_pendentes(
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior (vazio = primeira página)"),
+    limit: int = Query(20, ge=1, le=100, description="Tamanho da página"),
+    current_user: Dict[str, Any] = Depends(require_gerente_ou_admin()),
+    db: Client = Depends(get_database)
+):
+    """
+    Caixa de entrada do aprovador.
+
+    - **GERENTE:** solicitações de nível GERENTE
+    - **ADMIN_MASTER:** solicitações de nível GERENTE e ADMIN_MASTER
+    - **Paginação keyset:** o custo de cada página não depende do total de orçamentos
+    """
+    service = AprovacaoService(db)
+    return await service.listar_pendentes(current_user, cursor, limit)
+
+
+@router.post("/orcamentos/{orcamento_id}/decisao",
+    response_model=AprovacaoResponse,
+    summary="Aprovar/Rejeitar desconto",
+    description="Decide a solicitação pendente do orçamento e atualiza o orçamento"
+)
+async def decidir(
+    orcamento_id: uuid.UUID,
+    decisao: DecisaoAprovacao,
+    current_user: Dict[str, Any] = Depends(require_gerente_ou_admin()),
+    db: Client = Depends(get_database)
+):
+    """
+    Aprova (aplica desconto e valores calculados) ou rejeita a solicitação.
+
+    **422:** se outro aprovador decidiu antes ou, na aprovação, o orçamento mudou após a solicitação.
+    """
+    service = AprovacaoService(db)
+    return await service.decidir(str(orcamento_id), decisao.aprovado, decisao.justificativa, current_user)
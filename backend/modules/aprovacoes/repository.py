@@ -1,5 +1,302 @@
+"""
+Repository para aprovações de desconto (c_aprovacoes).
+Responsabilidade: Acesso a dados, queries, conversões.
 
-# Supabase access layer for aprovacoes
-async def repo_list_aprovacoes():
-    # TODO: call Supabase HTTP API
-    return []
+A caixa de entrada dos aprovadores filtra por (loja_id, nivel_aprovacao)
+apenas entre as solicitações PENDENTE e pagina por keyset; com o índice
+parcial idx_c_aprovacoes_pendentes cada página lê só as próprias linhas,
+sem varrer orçamentos nem o histórico de solicitações já decididas.
+
+No máximo uma solicitação PENDENTE por orçamento: o índice único parcial
+uq_c_aprovacoes_pendente_orcamento faz a segunda solicitação simultânea
+falhar (vira BusinessRuleException APROVACAO_PENDENTE). Sem ele as duas
+inserções passam.
+
+Colunas e índices: migrations/001_aprovacoes_desconto.sql (executar antes
+de subir o módulo).
+
+As transições de status usam compare-and-swap (UPDATE ... WHERE status =
+'PENDENTE'), como a numeração de orçamentos: dois aprovadores nunca decidem
+a mesma solicitação. A decisão e a sua aplicação no orçamento rodam na
+mesma transação (função SQL decidir_aprovacao, chamada via rpc).
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+from supabase import Client
+from core.database import execute_query, handle_supabase_error
+from core.exceptions import BusinessRuleException
+from core.paginacao import CursorKeyset, aplicar_cursor
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Solicitação com os nomes exibidos na caixa de entrada e no histórico
+SELECT_APROVACAO = '''
+    *,
+    orcamento:c_orcamentos!orcamento_id(numero),
+    solicitante:cad_equipe!solicitante_id(nome),
+    aprovador:cad_equipe!aprovador_id(nome)
+'''
+
+
+class AprovacaoRepository:
+    """
+    Repository para a tabela c_aprovacoes no Supabase
+
+    Responsabilidade: Acesso a dados, queries diretas no Supabase
+    """
+
+    def __init__(self, supabase_client: Client):
+        self.supabase = supabase_client
+
+    async def criar_aprovacao(self, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cria uma solicitação de aprovação
+
+        Args:
+            dados: Campos da solicitação (status PENDENTE)
+
+        Returns:
+            Solicitação criada
+
+        Raises:
+            BusinessRuleException: Orçamento já tem solicitação PENDENTE (índice único)
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('c_aprovacoes')
+                .insert(dados)
+            )
+
+            if not result.data:
+                raise Exception("Nenhum dado retornado após inserção")
+
+            return result.data[0]
+
+        except Exception as e:
+            if handle_supabase_error(e).code == "DUPLICATE_KEY":
+                raise BusinessRuleException(
+                    "Orçamento já possui solicitação de aprovação pendente", code="APROVACAO_PENDENTE"
+                )
+            logger.error(f"Erro ao criar aprovação: {str(e)}")
+            raise Exception(f"Erro ao criar aprovação: {str(e)}")
+
+    async def cancelar_pendentes(self, orcamento_id: str, loja_id: str, dados: Dict[str, Any]) -> int:
+        """
+        Cancela as solicitações pendentes de um orçamento
+
+        Args:
+            orcamento_id: ID do orçamento
+            loja_id: ID da loja (RLS)
+            dados: Campos da transição (status CANCELADO, decidido_em...)
+
+        Returns:
+            Quantidade de solicitações canceladas
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('c_aprovacoes')
+                .update(dados)
+                .eq('orcamento_id', orcamento_id)
+                .eq('loja_id', loja_id)
+                .eq('status', 'PENDENTE')
+            )
+
+            return len(result.data or [])
+
+        except Exception as e:
+            logger.error(f"Erro ao cancelar aprovações do orçamento {orcamento_id}: {str(e)}")
+            raise Exception(f"Erro ao cancelar aprovações: {str(e)}")
+
+    async def listar_pendentes(
+        self,
+        loja_id: str,
+        niveis: Sequence[str],
+        cursor: Optional[CursorKeyset],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Página da fila de pendentes da loja para os níveis informados
+
+        Args:
+            loja_id: ID da loja (RLS)
+            niveis: Níveis que o aprovador pode decidir
+            cursor: Última solicitação vista (None = primeira página)
+            limit: Tamanho da página (busca limit + 1, ver fatiar_pagina)
+
+        Returns:
+            Solicitações, mais recentes primeiro
+        """
+        try:
+            query = (
+                self.supabase
+                .table('c_aprovacoes')
+                .select(SELECT_APROVACAO)
+                .eq('loja_id', loja_id)
+                .eq('status', 'PENDENTE')
+                .in_('nivel_aprovacao', list(niveis))
+            )
+            result = await execute_query(aplicar_cursor(query, cursor, limit))
+
+            return result.data or []
+
+        except Exception as e:
+            logger.error(f"Erro ao listar aprovações pendentes da loja {loja_id}: {str(e)}")
+            raise Exception(f"Erro ao listar aprovações pendentes: {str(e)}")
+
+    async def obter_pendente(self, orcamento_id: str, loja_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca a solicitação pendente de um orçamento
+
+        Args:
+            orcamento_id: ID do orçamento
+            loja_id: ID da loja (RLS)
+
+        Returns:
+            Solicitação ou None se não houver pendente
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('c_aprovacoes')
+                .select('*')
+                .eq('orcamento_id', orcamento_id)
+                .eq('loja_id', loja_id)
+                .eq('status', 'PENDENTE')
+                .order('created_at', desc=True)
+                .limit(1)
+            )
+
+            return result.data[0] if result.data else None
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar aprovação pendente do orçamento {orcamento_id}: {str(e)}")
+            raise Exception(f"Erro ao buscar aprovação pendente: {str(e)}")
+
+    async def decidir(
+        self,
+        aprovacao_id: str,
+        loja_id: str,
+        aprovado: bool,
+        aprovador_id: str,
+        justificativa: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Decide a solicitação e aplica a decisão no orçamento numa transação
+
+        Função SQL decidir_aprovacao (migrations/001_aprovacoes_desconto.sql):
+        a solicitação só muda se ainda estiver PENDENTE, o orçamento só muda
+        se continua na versão da solicitação (senão a aprovação vira
+        CANCELADO) e um erro desfaz as duas escritas.
+
+        Args:
+            aprovacao_id: ID da solicitação
+            loja_id: ID da loja (RLS)
+            aprovado: True para aprovar, False para rejeitar
+            aprovador_id: ID do aprovador
+            justificativa: Motivo da decisão
+
+        Returns:
+            Solicitação decidida (APROVADO, REJEITADO ou CANCELADO) ou None se
+            outra requisição decidiu antes
+        """
+        try:
+            result = await execute_query(
+                self.supabase.rpc('decidir_aprovacao', {
+                    'p_aprovacao_id': aprovacao_id,
+                    'p_loja_id': loja_id,
+                    'p_aprovado': aprovado,
+                    'p_aprovador_id': aprovador_id,
+                    'p_justificativa': justificativa
+                })
+            )
+
+            return result.data[0] if result.data else None
+
+        except Exception as e:
+            logger.error(f"Erro ao decidir aprovação {aprovacao_id}: {str(e)}")
+            raise Exception(f"Erro ao decidir aprovação: {str(e)}")
+
+    async def listar_por_orcamento(self, orcamento_id: str, loja_id: str) -> List[Dict[str, Any]]:
+        """
+        Histórico de solicitações de um orçamento, mais recentes primeiro
+
+        Args:
+            orcamento_id: ID do orçamento
+            loja_id: ID da loja (RLS)
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('c_aprovacoes')
+                .select(SELECT_APROVACAO)
+                .eq('orcamento_id', orcamento_id)
+                .eq('loja_id', loja_id)
+                .order('created_at', desc=True)
+            )
+
+            return result.data or []
+
+        except Exception as e:
+            logger.error(f"Erro ao listar aprovações do orçamento {orcamento_id}: {str(e)}")
+            raise Exception(f"Erro ao listar aprovações: {str(e)}")
+
+    async def marcar_orcamento_pendente(self, orcamento_id: str, loja_id: str, dados: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Marca o orçamento como aguardando aprovação
+
+        Returns:
+            Orçamento atualizado (o updated_at gravado é a versão usada na decisão)
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('c_orcamentos')
+                .update(dados)
+                .eq('id', orcamento_id)
+                .eq('loja_id', loja_id)
+            )
+
+            return result.data[0] if result.data else None
+
+        except Exception as e:
+            logger.error(f"Erro ao marcar orçamento {orcamento_id} como pendente: {str(e)}")
+            raise Exception(f"Erro ao atualizar orçamento: {str(e)}")
+
+    async def aplicar_decisao_orcamento(
+        self,
+        orcamento_id: str,
+        loja_id: str,
+        versao: str,
+        dados: Dict[str, Any]
+    ) -> bool:
+        """
+        Grava a decisão no orçamento somente se ele não mudou desde a solicitação
+
+        Args:
+            orcamento_id: ID do orçamento
+            loja_id: ID da loja (RLS)
+            versao: updated_at gravado ao solicitar a aprovação
+            dados: Campos do orçamento (desconto, valores, necessita_aprovacao...)
+
+        Returns:
+            False se o orçamento foi alterado (ou excluído) nesse meio tempo
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('c_orcamentos')
+                .update(dados)
+                .eq('id', orcamento_id)
+                .eq('loja_id', loja_id)
+                .eq('updated_at', versao)
+            )
+
+            return bool(result.data)
+
+        except Exception as e:
+            logger.error(f"Erro ao aplicar decisão no orçamento {orcamento_id}: {str(e)}")
+            raise Exception(f"Erro ao atualizar orçamento: {str(e)}")
@@ -1,12 +1,60 @@
+"""
+Schemas Pydantic para o módulo de Aprovações.
+Define modelos das solicitações de desconto e das decisões dos aprovadores.
+"""
 
-# Pydantic models for aprovacoes
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Optional
+from decimal import Decimal
+from enum import Enum
+import uuid
+from datetime import datetime
 
-class AprovacoesBase(BaseModel):
-    pass
 
-class AprovacoesCreate(AprovacoesBase):
-    pass
+class NivelAprovacao(str, Enum):
+    """Quem pode decidir a solicitação (ver OrcamentoService.validar_limite_desconto)"""
+    GERENTE = "GERENTE"
+    ADMIN_MASTER = "ADMIN_MASTER"
 
-class AprovacoesResponse(AprovacoesBase):
-    id: str
+
+class StatusAprovacao(str, Enum):
+    """Situação de uma solicitação de aprovação"""
+    PENDENTE = "PENDENTE"
+    APROVADO = "APROVADO"
+    REJEITADO = "REJEITADO"
+    CANCELADO = "CANCELADO"
+
+
+# ===== SCHEMAS DE ENTRADA (REQUEST) =====
+
+class DecisaoAprovacao(BaseModel):
+    """Schema para aprovar ou rejeitar uma solicitação"""
+    aprovado: bool = Field(..., description="True para aprovar, False para rejeitar")
+    justificativa: Optional[str] = Field(None, max_length=500, description="Justificativa (obrigatória na rejeição)")
+
+
+# ===== SCHEMAS DE SAÍDA (RESPONSE) =====
+
+class AprovacaoResponse(BaseModel):
+    """Schema de resposta para solicitação de aprovação"""
+    id: uuid.UUID
+    loja_id: uuid.UUID
+    orcamento_id: uuid.UUID
+    orcamento_numero: Optional[str] = None
+    solicitante_id: Optional[uuid.UUID] = None
+    solicitante_nome: Optional[str] = None
+    aprovador_id: Optional[uuid.UUID] = None
+    aprovador_nome: Optional[str] = None
+    nivel_aprovacao: NivelAprovacao
+    status: StatusAprovacao
+    desconto_solicitado: Decimal = Field(..., description="Fração do valor dos ambientes (0.30 = 30%)")
+    valor_desconto: Decimal
+    valor_final: Decimal
+    margem_resultante: Optional[Decimal] = Field(None, description="Margem com o desconto (apenas aprovadores)")
+    justificativa: str
+    justificativa_decisao: Optional[str] = None
+    created_at: datetime
+    decidido_em: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
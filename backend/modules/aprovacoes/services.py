@@ -1 +1,290 @@
-# Business logic helpers for aprovacoes
+"""
+Service layer para aprovações de desconto.
+Responsabilidade: Fila de pendentes por nível, decisões e histórico.
+
+Fluxo: o orçamento pede aprovação (OrcamentoService.solicitar_aprovacao,
+que calcula desconto, valores e nível), a solicitação entra na fila
+PENDENTE da loja para o nível exigido e um aprovador a decide. A decisão
+é gravada na solicitação (compare-and-swap de status) e no orçamento na
+mesma transação (AprovacaoRepository.decidir), condicionada à versão
+(updated_at) lida na solicitação; se o orçamento mudou nesse meio tempo, a
+aprovação é cancelada e nada é aplicado (a rejeição vale mesmo assim, pois
+não aplica nada). Editar o orçamento (OrcamentoService.atualizar_orcamento)
+cancela a pendente.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from core.exceptions import (
+    BusinessRuleException, PermissionException, ResourceNotFoundException, ValidationException
+)
+from core.paginacao import CursorKeyset, PaginaCursor, fatiar_pagina
+from .repository import AprovacaoRepository
+from .schemas import AprovacaoResponse, NivelAprovacao, StatusAprovacao
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Níveis de solicitação que cada perfil decide (Admin Master decide tudo)
+NIVEIS_POR_PERFIL: Dict[str, List[str]] = {
+    'GERENTE': [NivelAprovacao.GERENTE.value],
+    'ADMIN_MASTER': [NivelAprovacao.GERENTE.value, NivelAprovacao.ADMIN_MASTER.value]
+}
+
+# Campos de c_orcamentos recalculados com o desconto solicitado
+CAMPOS_CALCULO_ORCAMENTO = [
+    'desconto_percentual', 'valor_final', 'custo_fabrica', 'comissao_vendedor',
+    'comissao_gerente', 'custo_frete', 'margem_lucro'
+]
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def niveis_do_perfil(perfil: Optional[str]) -> List[str]:
+    """Níveis de aprovação que o perfil pode decidir (vazio = não aprova)"""
+    return NIVEIS_POR_PERFIL.get(perfil or '', [])
+
+
+def _resposta(registro: Dict[str, Any], perfil: Optional[str]) -> AprovacaoResponse:
+    """Achata os relacionamentos embutidos; margem só para quem aprova"""
+    dados = {chave: valor for chave, valor in registro.items() if chave not in ('orcamento', 'solicitante', 'aprovador')}
+    dados['orcamento_numero'] = (registro.get('orcamento') or {}).get('numero')
+    dados['solicitante_nome'] = (registro.get('solicitante') or {}).get('nome')
+    dados['aprovador_nome'] = (registro.get('aprovador') or {}).get('nome')
+    if not niveis_do_perfil(perfil):
+        dados['margem_resultante'] = None
+    return AprovacaoResponse(**dados)
+
+
+class AprovacaoService:
+    """
+    Service layer para aprovações de desconto
+
+    Responsabilidade: Regras de quem decide o quê e consistência com o orçamento
+    """
+
+    def __init__(self, supabase_client):
+        self.repository = AprovacaoRepository(supabase_client)
+
+    async def solicitar(
+        self,
+        orcamento: Dict[str, Any],
+        nivel: str,
+        calculo: Dict[str, Any],
+        justificativa: str,
+        current_user: Dict[str, Any]
+    ) -> AprovacaoResponse:
+        """
+        Coloca o desconto de um orçamento na fila de aprovação
+
+        Uma solicitação pendente anterior do mesmo orçamento é cancelada (a
+        nova substitui a antiga). Se a nova não puder ser gravada, o
+        orçamento volta ao necessita_aprovacao anterior.
+
+        Args:
+            orcamento: Linha de c_orcamentos (id, updated_at, necessita_aprovacao...)
+            nivel: Nível exigido (GERENTE ou ADMIN_MASTER)
+            calculo: Resultado de OrcamentoService.criar_orcamento_completo com o desconto solicitado
+            justificativa: Motivo informado pelo solicitante
+            current_user: Usuário logado
+
+        Returns:
+            AprovacaoResponse: Solicitação PENDENTE
+
+        Raises:
+            BusinessRuleException: Outra solicitação do orçamento ficou pendente ao mesmo tempo
+        """
+        try:
+            loja_id = current_user['loja_id']
+            orcamento_id = str(orcamento['id'])
+            necessitava_aprovacao = bool(orcamento.get('necessita_aprovacao'))
+
+            canceladas = await self.repository.cancelar_pendentes(orcamento_id, loja_id, {
+                'status': StatusAprovacao.CANCELADO.value,
+                'justificativa_decisao': 'Substituída por nova solicitação',
+                'decidido_em': _agora()
+            })
+
+            # A versão gravada aqui é a que a decisão exige para aplicar o desconto
+            marcado = await self.repository.marcar_orcamento_pendente(orcamento_id, loja_id, {
+                'necessita_aprovacao': True,
+                'aprovador_id': None,
+                'updated_at': _agora()
+            })
+            if not marcado:
+                raise ResourceNotFoundException("Orçamento", orcamento_id)
+
+            calculado = {**calculo['custos'], **calculo}
+            valores = {campo: calculado[campo] for campo in CAMPOS_CALCULO_ORCAMENTO}
+            try:
+                registro = await self.repository.criar_aprovacao({
+                    'loja_id': loja_id,
+                    'orcamento_id': orcamento_id,
+                    'solicitante_id': current_user['user_id'],
+                    'nivel_aprovacao': nivel,
+                    'status': StatusAprovacao.PENDENTE.value,
+                    'desconto_solicitado': calculo['desconto_percentual'],
+                    'valor_desconto': round(calculo['valor_ambientes'] * calculo['desconto_percentual'], 2),
+                    'valor_final': calculo['valor_final'],
+                    'margem_resultante': calculo['margem_lucro'],
+                    'justificativa': justificativa,
+                    'valores_orcamento': valores,
+                    'orcamento_versao': marcado['updated_at'],
+                    'necessitava_aprovacao': necessitava_aprovacao
+                })
+            except Exception:
+                # Sem solicitação gravada: desfaz a marcação (se ninguém alterou o orçamento depois)
+                await self.repository.aplicar_decisao_orcamento(orcamento_id, loja_id, marcado['updated_at'], {
+                    'necessita_aprovacao': necessitava_aprovacao
+                })
+                raise
+
+            logger.info(f"Aprovação {nivel} solicitada para orçamento {orcamento_id}: desconto "
+                        f"{calculo['desconto_percentual']:.1%}" + (f" ({canceladas} anterior cancelada)" if canceladas else ""))
+            return _resposta(registro, current_user.get('perfil'))
+
+        except (ResourceNotFoundException, BusinessRuleException):
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao solicitar aprovação do orçamento {orcamento.get('id')}: {str(e)}")
+            raise Exception(f"Erro ao solicitar aprovação: {str(e)}")
+
+    async def cancelar_pendentes(self, orcamento_id: str, loja_id: str, motivo: str) -> int:
+        """
+        Cancela a solicitação pendente de um orçamento (ex.: orçamento editado)
+
+        Returns:
+            Quantidade de solicitações canceladas
+        """
+        try:
+            canceladas = await self.repository.cancelar_pendentes(orcamento_id, loja_id, {
+                'status': StatusAprovacao.CANCELADO.value,
+                'justificativa_decisao': motivo,
+                'decidido_em': _agora()
+            })
+            if canceladas:
+                logger.info(f"Aprovação pendente do orçamento {orcamento_id} cancelada: {motivo}")
+            return canceladas
+
+        except Exception as e:
+            logger.error(f"Erro ao cancelar aprovação pendente do orçamento {orcamento_id}: {str(e)}")
+            raise Exception(f"Erro ao cancelar aprovação pendente: {str(e)}")
+
+    async def listar_pendentes(
+        self,
+        current_user: Dict[str, Any],
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> PaginaCursor[AprovacaoResponse]:
+        """
+        Caixa de entrada do aprovador: pendentes da loja nos níveis que ele decide
+
+        Args:
+            current_user: Usuário logado (GERENTE ou ADMIN_MASTER)
+            cursor: Paginação keyset (vazio = primeira página)
+            limit: Tamanho da página
+
+        Returns:
+            PaginaCursor[AprovacaoResponse]: Página com next_cursor
+        """
+        try:
+            perfil = current_user.get('perfil')
+            niveis = niveis_do_perfil(perfil)
+            if not niveis:
+                raise PermissionException("Apenas gerentes e administradores aprovam descontos")
+
+            posicao = CursorKeyset.decodificar(cursor)
+            registros = await self.repository.listar_pendentes(current_user['loja_id'], niveis, posicao, limit)
+            pagina, next_cursor = fatiar_pagina(registros, limit)
+
+            return PaginaCursor[AprovacaoResponse](
+                items=[_resposta(registro, perfil) for registro in pagina],
+                next_cursor=next_cursor
+            )
+
+        except (ValidationException, PermissionException):
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao listar aprovações pendentes: {str(e)}")
+            raise Exception(f"Erro ao listar aprovações pendentes: {str(e)}")
+
+    async def decidir(
+        self,
+        orcamento_id: str,
+        aprovado: bool,
+        justificativa: Optional[str],
+        current_user: Dict[str, Any]
+    ) -> AprovacaoResponse:
+        """
+        Aprova ou rejeita a solicitação pendente de um orçamento
+
+        Aprovar aplica ao orçamento o desconto e os valores calculados na
+        solicitação; rejeitar mantém o desconto atual do orçamento.
+
+        Args:
+            orcamento_id: ID do orçamento
+            aprovado: True para aprovar, False para rejeitar
+            justificativa: Motivo da decisão (obrigatório na rejeição)
+            current_user: Usuário logado
+
+        Returns:
+            AprovacaoResponse: Solicitação decidida
+
+        Raises:
+            ResourceNotFoundException: Orçamento sem solicitação pendente
+            PermissionException: Perfil abaixo do nível exigido
+            BusinessRuleException: Já decidida por outro aprovador ou orçamento alterado
+        """
+        try:
+            loja_id = current_user['loja_id']
+            perfil = current_user.get('perfil')
+            if not aprovado and not (justificativa or '').strip():
+                raise ValidationException("Informe a justificativa da rejeição", field="justificativa")
+
+            pendente = await self.repository.obter_pendente(orcamento_id, loja_id)
+            if not pendente:
+                raise ResourceNotFoundException("Aprovação pendente", orcamento_id)
+            if pendente['nivel_aprovacao'] not in niveis_do_perfil(perfil):
+                raise PermissionException(f"Desconto exige aprovação de {pendente['nivel_aprovacao']}")
+
+            # Solicitação e orçamento numa transação: só um aprovador vence e o
+            # desconto só é aplicado se o orçamento continua na versão solicitada
+            status = StatusAprovacao.APROVADO if aprovado else StatusAprovacao.REJEITADO
+            decidida = await self.repository.decidir(
+                str(pendente['id']), loja_id, aprovado, current_user['user_id'], justificativa
+            )
+            if not decidida:
+                raise BusinessRuleException("Solicitação já decidida por outro aprovador", code="APROVACAO_JA_DECIDIDA")
+            if decidida['status'] == StatusAprovacao.CANCELADO.value:
+                raise BusinessRuleException(
+                    "Orçamento alterado após a solicitação; solicite a aprovação novamente",
+                    code="ORCAMENTO_ALTERADO"
+                )
+
+            logger.info(f"Aprovação {pendente['id']} do orçamento {orcamento_id} {status.value} por {current_user['user_id']}")
+            return _resposta(decidida, perfil)
+
+        except (ValidationException, PermissionException, ResourceNotFoundException, BusinessRuleException):
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao decidir aprovação do orçamento {orcamento_id}: {str(e)}")
+            raise Exception(f"Erro ao decidir aprovação: {str(e)}")
+
+    async def historico(self, orcamento_id: str, current_user: Dict[str, Any]) -> List[AprovacaoResponse]:
+        """
+        Solicitações de um orçamento (pendentes e decididas), mais recentes primeiro
+
+        A permissão de ver o orçamento é verificada por quem chama
+        (OrcamentoService.historico_aprovacoes).
+        """
+        try:
+            registros = await self.repository.listar_por_orcamento(orcamento_id, current_user['loja_id'])
+            return [_resposta(registro, current_user.get('perfil')) for registro in registros]
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar histórico de aprovações do orçamento {orcamento_id}: {str(e)}")
+            raise Exception(f"Erro ao buscar histórico de aprovações: {str(e)}")
@@ -1,4 +1,273 @@
-
 # Tests for aprovacoes module
+import asyncio
+import itertools
+
+import pytest
+
+from core.auth import _dados_usuario
+from core.exceptions import BusinessRuleException, PermissionException
+from modules.aprovacoes.services import AprovacaoService
+
+LOJA = '00000000-0000-0000-0000-0000000000aa'
+
+
+def usuario(sub, perfil):
+    """current_user como o get_current_user monta a partir do JWT"""
+    return _dados_usuario({'sub': sub, 'loja_id': LOJA, 'perfil': perfil, 'email': f'{perfil.lower()}@loja.com'}, 'token')
+
+
+VENDEDOR = usuario('00000000-0000-0000-0000-00000000000a', 'VENDEDOR')
+GERENTE = usuario('00000000-0000-0000-0000-00000000000b', 'GERENTE')
+ADMIN = usuario('00000000-0000-0000-0000-00000000000c', 'ADMIN_MASTER')
+
+
 async def test_list_aprovacoes():
     assert True
+
+
+class RepositorioFalso:
+    """c_aprovacoes e c_orcamentos em memória, com as mesmas condições dos UPDATEs"""
+
+    def __init__(self):
+        self.aprovacoes = {}
+        self.orcamentos = {}
+        self.relogio = itertools.count(1)
+        self.paginas_lidas = []
+        self.falha_insercao = None
+        self.falha_decisao = None
+
+    def _agora(self):
+        segundos = next(self.relogio)
+        return f'2026-01-01T00:{segundos // 60:02d}:{segundos % 60:02d}+00:00'
+
+    async def criar_aprovacao(self, dados):
+        if self.falha_insercao:
+            raise self.falha_insercao
+        if any(a['orcamento_id'] == dados['orcamento_id'] and a['status'] == 'PENDENTE' for a in self.aprovacoes.values()):
+            # Índice único parcial (orcamento_id) WHERE status = 'PENDENTE'
+            raise BusinessRuleException("Orçamento já possui solicitação de aprovação pendente", code="APROVACAO_PENDENTE")
+        linha = {**dados, 'id': f'00000000-0000-0000-0000-{len(self.aprovacoes):012d}',
+                 'created_at': self._agora(), 'decidido_em': None, 'aprovador_id': None, 'justificativa_decisao': None}
+        self.aprovacoes[linha['id']] = linha
+        return dict(linha)
+
+    async def cancelar_pendentes(self, orcamento_id, loja_id, dados):
+        alvos = [a for a in self.aprovacoes.values()
+                 if a['orcamento_id'] == orcamento_id and a['loja_id'] == loja_id and a['status'] == 'PENDENTE']
+        for aprovacao in alvos:
+            aprovacao.update(dados)
+        return len(alvos)
+
+    async def listar_pendentes(self, loja_id, niveis, cursor, limit):
+        linhas = sorted(
+            (a for a in self.aprovacoes.values()
+             if a['loja_id'] == loja_id and a['status'] == 'PENDENTE' and a['nivel_aprovacao'] in niveis),
+            key=lambda a: (a['created_at'], a['id']), reverse=True
+        )
+        if cursor is not None:
+            linhas = [a for a in linhas if (a['created_at'], a['id']) < (cursor.created_at, cursor.id)]
+        self.paginas_lidas.append(len(linhas[:limit + 1]))
+        return [dict(a) for a in linhas[:limit + 1]]
+
+    async def obter_pendente(self, orcamento_id, loja_id):
+        pendentes = [dict(a) for a in self.aprovacoes.values()
+                     if a['orcamento_id'] == orcamento_id and a['loja_id'] == loja_id and a['status'] == 'PENDENTE']
+        await asyncio.sleep(0)  # aprovadores concorrentes leem a mesma pendente antes de decidir
+        return pendentes[0] if pendentes else None
+
+    async def decidir(self, aprovacao_id, loja_id, aprovado, aprovador_id, justificativa):
+        # Mesmas etapas da função SQL decidir_aprovacao; uma falha não grava nada (rollback)
+        aprovacao = self.aprovacoes.get(aprovacao_id)
+        if not aprovacao or aprovacao['loja_id'] != loja_id or aprovacao['status'] != 'PENDENTE':
+            return None
+        if self.falha_decisao:
+            raise self.falha_decisao
+
+        decisao = {'status': 'APROVADO' if aprovado else 'REJEITADO', 'aprovador_id': aprovador_id,
+                   'justificativa_decisao': justificativa, 'decidido_em': self._agora()}
+        orcamento = self.orcamentos.get(aprovacao['orcamento_id'])
+        if orcamento and orcamento['updated_at'] == aprovacao['orcamento_versao']:
+            orcamento.update({
+                'necessita_aprovacao': False if aprovado else aprovacao['necessitava_aprovacao'],
+                'aprovador_id': aprovador_id, 'updated_at': self._agora(),
+                **(aprovacao['valores_orcamento'] if aprovado else {})
+            })
+        elif aprovado:
+            decisao.update({'status': 'CANCELADO', 'justificativa_decisao': 'Orçamento alterado após a solicitação'})
+        aprovacao.update(decisao)
+        return dict(aprovacao)
+
+    async def listar_por_orcamento(self, orcamento_id, loja_id):
+        return [dict(a) for a in sorted(self.aprovacoes.values(), key=lambda a: a['created_at'], reverse=True)
+                if a['orcamento_id'] == orcamento_id]
+
+    async def marcar_orcamento_pendente(self, orcamento_id, loja_id, dados):
+        orcamento = self.orcamentos.get(orcamento_id)
+        if not orcamento:
+            return None
+        orcamento.update({**dados, 'updated_at': self._agora()})
+        return dict(orcamento)
+
+    async def aplicar_decisao_orcamento(self, orcamento_id, loja_id, versao, dados):
+        orcamento = self.orcamentos.get(orcamento_id)
+        if not orcamento or orcamento['updated_at'] != versao:
+            return False
+        orcamento.update(dados)
+        return True
+
+
+def servico(repositorio):
+    service = AprovacaoService.__new__(AprovacaoService)
+    service.repository = repositorio
+    return service
+
+
+def orcamento(repositorio, numero, desconto=0.05):
+    orcamento_id = f'00000000-0000-0000-0001-{numero:012d}'
+    repositorio.orcamentos[orcamento_id] = {
+        'id': orcamento_id, 'loja_id': LOJA, 'vendedor_id': VENDEDOR['user_id'], 'desconto_percentual': desconto,
+        'valor_final': 10000 * (1 - desconto), 'necessita_aprovacao': False, 'aprovador_id': None,
+        'updated_at': '2025-12-31T00:00:00+00:00'
+    }
+    return repositorio.orcamentos[orcamento_id]
+
+
+def calculo(desconto):
+    return {
+        'valor_ambientes': 10000.0, 'desconto_percentual': desconto, 'valor_final': 10000 * (1 - desconto),
+        'margem_lucro': 1500.0, 'custos': {'custo_fabrica': 4000.0, 'comissao_vendedor': 300.0,
+                                           'comissao_gerente': 100.0, 'custo_frete': 200.0, 'total_custos': 4600.0}
+    }
+
+
+@pytest.mark.asyncio
+async def test_caixa_de_entrada_por_nivel_e_paginada():
+    repositorio = RepositorioFalso()
+    service = servico(repositorio)
+    for numero in range(5):
+        nivel = 'GERENTE' if numero < 3 else 'ADMIN_MASTER'
+        await service.solicitar(orcamento(repositorio, numero), nivel, calculo(0.2), 'Cliente fecha hoje', VENDEDOR)
+
+    pagina = await service.listar_pendentes(GERENTE, '', 2)
+    assert [a.nivel_aprovacao for a in pagina.items] == ['GERENTE', 'GERENTE'] and pagina.next_cursor
+    assert pagina.items[0].margem_resultante is not None
+    resto = await service.listar_pendentes(GERENTE, pagina.next_cursor, 2)
+    assert len(resto.items) == 1 and resto.next_cursor is None
+    # Cada página lê no máximo limit + 1 pendentes, sem varrer o restante
+    assert repositorio.paginas_lidas == [3, 1]
+
+    tudo = await service.listar_pendentes(ADMIN, '', 10)
+    assert len(tudo.items) == 5
+    with pytest.raises(PermissionException):
+        await service.listar_pendentes(VENDEDOR, '', 10)
+
+
+@pytest.mark.asyncio
+async def test_aprovacao_aplica_desconto_e_so_um_aprovador_vence():
+    repositorio = RepositorioFalso()
+    service = servico(repositorio)
+    linha = orcamento(repositorio, 1)
+    await service.solicitar(linha, 'GERENTE', calculo(0.2), 'Cliente fecha hoje', VENDEDOR)
+    assert linha['necessita_aprovacao'] is True
+
+    resultados = await asyncio.gather(
+        service.decidir(linha['id'], True, None, GERENTE),
+        service.decidir(linha['id'], False, 'Margem baixa', ADMIN),
+        return_exceptions=True
+    )
+
+    decididas = [r for r in resultados if not isinstance(r, Exception)]
+    recusadas = [r for r in resultados if isinstance(r, BusinessRuleException)]
+    assert len(decididas) == 1 and len(recusadas) == 1
+    assert recusadas[0].code == 'APROVACAO_JA_DECIDIDA'
+    assert decididas[0].status == 'APROVADO'
+    assert linha['desconto_percentual'] == 0.2 and linha['valor_final'] == 8000.0
+    assert linha['necessita_aprovacao'] is False and linha['aprovador_id'] == GERENTE['user_id']
+    # Solicitante e aprovador vêm do sub do token (current_user['user_id'])
+    assert str(decididas[0].solicitante_id) == VENDEDOR['user_id']
+    assert str(decididas[0].aprovador_id) == GERENTE['user_id']
+    assert (await service.listar_pendentes(ADMIN, '', 10)).items == []
+
+
+@pytest.mark.asyncio
+async def test_nivel_rejeicao_e_orcamento_alterado():
+    repositorio = RepositorioFalso()
+    service = servico(repositorio)
+    linha = orcamento(repositorio, 1)
+    await service.solicitar(linha, 'ADMIN_MASTER', calculo(0.4), 'Concorrência ofereceu 40%', VENDEDOR)
+
+    with pytest.raises(PermissionException):
+        await service.decidir(linha['id'], True, None, GERENTE)
+
+    # Rejeição: desconto do orçamento não muda
+    rejeitada = await service.decidir(linha['id'], False, 'Margem negativa', ADMIN)
+    assert rejeitada.status == 'REJEITADO' and rejeitada.justificativa_decisao == 'Margem negativa'
+    assert linha['desconto_percentual'] == 0.05 and linha['necessita_aprovacao'] is False
+
+    # Orçamento editado depois da solicitação: nada é aplicado
+    await service.solicitar(linha, 'ADMIN_MASTER', calculo(0.4), 'Nova rodada de negociação', VENDEDOR)
+    linha['updated_at'] = '2026-02-01T00:00:00+00:00'
+    with pytest.raises(BusinessRuleException) as erro:
+        await service.decidir(linha['id'], True, None, ADMIN)
+    assert erro.value.code == 'ORCAMENTO_ALTERADO'
+    assert linha['desconto_percentual'] == 0.05
+    historico = await service.historico(linha['id'], VENDEDOR)
+    assert [a.status for a in historico] == ['CANCELADO', 'REJEITADO']
+    assert all(a.margem_resultante is None for a in historico)
+
+
+
+@pytest.mark.asyncio
+async def test_falha_ao_gravar_solicitacao_nao_deixa_orcamento_pendente():
+    repositorio = RepositorioFalso()
+    service = servico(repositorio)
+    linha = orcamento(repositorio, 1)
+
+    repositorio.falha_insercao = BusinessRuleException("Orçamento já possui solicitação de aprovação pendente",
+                                                       code="APROVACAO_PENDENTE")
+    with pytest.raises(BusinessRuleException) as erro:
+        await service.solicitar(linha, 'GERENTE', calculo(0.2), 'Cliente fecha hoje', VENDEDOR)
+    assert erro.value.code == 'APROVACAO_PENDENTE'
+    assert linha['necessita_aprovacao'] is False
+
+    repositorio.falha_insercao = RuntimeError("conexão perdida")
+    with pytest.raises(Exception):
+        await service.solicitar(linha, 'GERENTE', calculo(0.2), 'Cliente fecha hoje', VENDEDOR)
+    assert linha['necessita_aprovacao'] is False and repositorio.aprovacoes == {}
+
+
+@pytest.mark.asyncio
+async def test_rejeicao_vale_com_orcamento_alterado_e_edicao_cancela_pendente():
+    repositorio = RepositorioFalso()
+    service = servico(repositorio)
+    linha = orcamento(repositorio, 1)
+
+    await service.solicitar(linha, 'GERENTE', calculo(0.2), 'Cliente fecha hoje', VENDEDOR)
+    linha['updated_at'] = '2026-02-01T00:00:00+00:00'
+    rejeitada = await service.decidir(linha['id'], False, 'Margem baixa', GERENTE)
+    assert rejeitada.status == 'REJEITADO' and linha['desconto_percentual'] == 0.05
+
+    # Edição do orçamento (OrcamentoService.atualizar_orcamento) cancela a pendente
+    await service.solicitar(linha, 'GERENTE', calculo(0.2), 'Nova rodada', VENDEDOR)
+    assert await service.cancelar_pendentes(linha['id'], LOJA, 'Orçamento alterado após a solicitação') == 1
+    assert (await service.listar_pendentes(GERENTE, '', 10)).items == []
+
+
+@pytest.mark.asyncio
+async def test_falha_na_decisao_mantem_solicitacao_pendente():
+    repositorio = RepositorioFalso()
+    service = servico(repositorio)
+    linha = orcamento(repositorio, 1)
+    await service.solicitar(linha, 'GERENTE', calculo(0.2), 'Cliente fecha hoje', VENDEDOR)
+
+    # Erro no meio da transação (rede, 5xx): nem a solicitação nem o orçamento mudam
+    repositorio.falha_decisao = RuntimeError("502 Bad Gateway")
+    with pytest.raises(Exception):
+        await service.decidir(linha['id'], True, None, GERENTE)
+    assert [a['status'] for a in repositorio.aprovacoes.values()] == ['PENDENTE']
+    assert linha['desconto_percentual'] == 0.05 and linha['necessita_aprovacao'] is True
+
+    # A nova tentativa decide normalmente
+    repositorio.falha_decisao = None
+    aprovada = await service.decidir(linha['id'], True, None, GERENTE)
+    assert aprovada.status == 'APROVADO' and linha['desconto_percentual'] == 0.2
@@ -5,12 +5,12 @@ Implementa login simples com JWT via Supabase.
 
 import os
 import jwt
-import httpx
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, status
 
 from core.config import settings
+from core.http_pool import get_http_pool
 from core.exceptions import ValidationException, ExternalServiceException
 from .schemas import LoginRequest, LoginResponse, UserInfo
 
@@ -43,27 +43,28 @@ class AuthService:
             # Autenticar com Supabase via API REST
             auth_url = f"{self.supabase_url}/auth/v1/token?grant_type=password"
             
-            async with httpx.AsyncClient() as client:
-                auth_response = await client.post(
-                    auth_url,
-                    headers={
-                        "apikey": self.supabase_service_key,
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "email": request.email,
-                        "password": request.password
-                    }
-                )
-                
-                if auth_response.status_code != 200:
-                    raise ValidationException("Email ou senha inválidos")
-                
-                auth_data = auth_response.json()
-                user = auth_data.get("user")
-                
-                if not user:
-                    raise ValidationException("Email ou senha inválidos")
+            # Conexão reaproveitada do pool compartilhado (sem novo handshake TLS)
+            client = get_http_pool().async_client
+            auth_response = await client.post(
+                auth_url,
+                headers={
+                    "apikey": self.supabase_service_key,
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "email": request.email,
+                    "password": request.password
+                }
+            )
+            
+            if auth_response.status_code != 200:
+                raise ValidationException("Email ou senha inválidos")
+            
+            auth_data = auth_response.json()
+            user = auth_data.get("user")
+            
+            if not user:
+                raise ValidationException("Email ou senha inválidos")
             
             # Buscar dados completos do usuário na tabela de usuários
             user_data = await self._get_user_profile(user["id"])
@@ -114,21 +115,21 @@ class AuthService:
             # Buscar na tabela de usuários/perfis via API REST do Supabase
             profile_url = f"{self.supabase_url}/rest/v1/usuarios"
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    profile_url,
-                    headers={
-                        "apikey": self.supabase_service_key,
-                        "Authorization": f"Bearer {self.supabase_service_key}",
-                        "Content-Type": "application/json"
-                    },
-                    params={"user_id": f"eq.{user_id}"}
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data and len(data) > 0:
-                        return data[0]
+            client = get_http_pool().async_client
+            response = await client.get(
+                profile_url,
+                headers={
+                    "apikey": self.supabase_service_key,
+                    "Authorization": f"Bearer {self.supabase_service_key}",
+                    "Content-Type": "application/json"
+                },
+                params={"user_id": f"eq.{user_id}"}
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                if data and len(data) > 0:
+                    return data[0]
             
             # Se não encontrar, retornar dados básicos
             return {
@@ -3,11 +3,15 @@ Controller (rotas) para o módulo de Clientes.
 Define endpoints REST para operações de cliente.
 """
 
-from fastapi import APIRouter, Depends, Query, HTTPException, status
-from typing import List, Optional, Dict, Any
-from core.auth import get_current_user, require_vendedor_ou_superior
-from core.database import get_database, get_service_database
+from fastapi import APIRouter, Depends, File, Query, HTTPException, UploadFile, status
+from typing import List, Optional, Dict, Any, Union
+from core.auth import get_current_user, require_gerente_ou_admin, require_vendedor_ou_superior
+from core.config import get_settings
+from core.exceptions import ValidationException
+from core.database import get_database, get_service_database, execute_query
 from supabase import Client
+from core.paginacao import PaginaCursor
+from core.exportacao import resposta_exportacao
 import uuid
 
 from .schemas import (
@@ -15,9 +19,12 @@ from .schemas import (
     ClienteUpdate,
     ClienteResponse,
     ClienteListItem,
-    ClienteFilters
+    ClienteFilters,
+    ClienteAutocompleteItem,
+    ClienteImportacaoResultado
 )
-from .services import ClienteService
+from .importacao import detectar_formato
+from .services import ClienteService, COLUNAS_EXPORTACAO_CLIENTES
 
 # Router para o módulo de clientes
 router = APIRouter()
@@ -39,13 +46,13 @@ async def testar_conexao_dados_reais_sem_auth(
     """
     try:
         # Buscar estatísticas reais dos clientes
-        result_total = db.table('c_clientes').select('*', count='exact').execute()
+        result_total = await execute_query(db.table('c_clientes').select('*', count='exact'))
         
         # Clientes por cidade
-        result_cidades = db.table('c_clientes').select('cidade', count='exact').execute()
+        result_cidades = await execute_query(db.table('c_clientes').select('cidade', count='exact'))
         
         # Clientes recentes
-        result_recentes = db.table('c_clientes').select('id', 'nome', 'cidade', 'created_at').order('created_at', desc=True).limit(3).execute()
+        result_recentes = await execute_query(db.table('c_clientes').select('id', 'nome', 'cidade', 'created_at').order('created_at', desc=True).limit(3))
         
         # Agrupar cidades
         cidades = {}
@@ -99,12 +106,42 @@ async def criar_cliente(
     return await service.criar_cliente(cliente_data, current_user)
 
 
+@router.post("/importar",
+    response_model=ClienteImportacaoResultado,
+    summary="Importar clientes em massa",
+    description="Importa clientes de um arquivo CSV ou array JSON com relatório por linha"
+)
+async def importar_clientes(
+    arquivo: UploadFile = File(..., description="Arquivo .csv (cabeçalho com os campos do cliente, ',' ou ';') ou .json (array de objetos)"),
+    current_user: Dict[str, Any] = Depends(require_gerente_ou_admin()),
+    db: Client = Depends(get_database)
+):
+    """
+    Importa a base de clientes de uma loja (migração).
+    
+    - **Mesmas validações** do cadastro individual
+    - **CPF/CNPJ duplicado** (na loja ou no próprio arquivo) é reportado, não inserido
+    - **Inserção em blocos** (IMPORT_BATCH_SIZE linhas por round-trip)
+    - **Relatório por linha:** criado, duplicado, invalido ou erro
+    """
+    limite = get_settings().import_max_file_size_mb * 1024 * 1024
+    if arquivo.size is not None and arquivo.size > limite:
+        raise ValidationException(f"Arquivo maior que {get_settings().import_max_file_size_mb}MB", field="arquivo")
+    
+    formato = detectar_formato(arquivo.filename, arquivo.content_type)
+    service = ClienteService(db)
+    return await service.importar_clientes(arquivo.file, formato, current_user)
+
+
 @router.get("/",
-    response_model=List[ClienteListItem],
+    response_model=Union[List[ClienteListItem], PaginaCursor[ClienteListItem]],
     summary="Listar clientes",
-    description="Lista clientes da loja com filtros e paginação"
+    description="Lista clientes da loja com filtros e paginação (offset ou cursor)"
 )
 async def listar_clientes(
+    # Busca ranqueada
+    q: Optional[str] = Query(None, min_length=1, description="Busca por nome, telefone, CPF/CNPJ, email ou cidade (ignora acentos; resultados por relevância)"),
+    
     # Filtros opcionais
     nome: Optional[str] = Query(None, description="Filtro por nome (busca parcial)"),
     cpf_cnpj: Optional[str] = Query(None, description="Filtro por CPF/CNPJ"),
@@ -116,6 +153,7 @@ async def listar_clientes(
     # Paginação
     skip: int = Query(0, ge=0, description="Registros a pular"),
     limit: int = Query(50, ge=1, le=200, description="Limite de registros"),
+    cursor: Optional[str] = Query(None, description="Paginação por cursor: vazio para a primeira página, depois o next_cursor recebido"),
     
     # Dependências
     current_user: Dict[str, Any] = Depends(get_current_user),
@@ -125,9 +163,16 @@ async def listar_clientes(
     Lista clientes com filtros aplicados.
     
     **RLS aplicado:** Usuário vê apenas clientes da própria loja.
+    
+    **Paginação:** `skip`/`limit` (lista) ou `cursor` (objeto com `items` e
+    `next_cursor`, estável mesmo com inserções concorrentes).
+    
+    **Busca:** com `q`, a lista vem ordenada por relevância ('joao' encontra
+    'João', '98765' encontra '(11) 98765-4321'); paginação por `skip`/`limit`.
     """
     # Constrói filtros
     filters = ClienteFilters(
+        q=q,
         nome=nome,
         cpf_cnpj=cpf_cnpj,
         telefone=telefone,
@@ -137,7 +182,68 @@ async def listar_clientes(
     )
     
     service = ClienteService(db)
-    return await service.listar_clientes(filters, current_user, skip, limit)
+    return await service.listar_clientes(filters, current_user, skip, limit, cursor)
+
+
+@router.get("/autocomplete",
+    response_model=List[ClienteAutocompleteItem],
+    summary="Autocomplete de clientes",
+    description="Sugestões por prefixo de nome ou telefone, servidas de índice em memória"
+)
+async def autocompletar_clientes(
+    q: str = Query(..., min_length=1, description="Início do nome (qualquer palavra, sem acentos) ou dígitos do telefone"),
+    limit: int = Query(10, ge=1, le=20, description="Máximo de sugestões"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_database)
+):
+    """
+    Sugestões para o campo de cliente do orçamento (a cada tecla).
+    
+    - 'jo', 'silv' ou 'joao sil' encontram 'João da Silva'
+    - '98765' ou '1198765' encontram '(11) 98765-4321'
+    - **RLS aplicado:** índice montado por loja
+    """
+    service = ClienteService(db)
+    return await service.autocompletar_clientes(q, current_user, limit)
+
+
+@router.get("/exportar",
+    summary="Exportar clientes",
+    description="Exporta todos os clientes da loja em NDJSON ou CSV (streaming)"
+)
+async def exportar_clientes(
+    formato: str = Query("csv", pattern="^(csv|ndjson)$", description="Formato do arquivo: csv ou ndjson"),
+    
+    # Filtros opcionais (mesmos da listagem)
+    nome: Optional[str] = Query(None, description="Filtro por nome (busca parcial)"),
+    cidade: Optional[str] = Query(None, description="Filtro por cidade"),
+    tipo_venda: Optional[str] = Query(None, description="Filtro por tipo de venda (NORMAL/FUTURA)"),
+    procedencia_id: Optional[str] = Query(None, description="Filtro por ID da procedência"),
+    
+    # Dependências
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_database)
+):
+    """
+    Exporta clientes para planilha sem paginar manualmente.
+    
+    - Linhas lidas do banco em lotes e enviadas à medida que chegam
+    - **RLS aplicado:** apenas clientes da loja do usuário
+    """
+    filters = ClienteFilters(
+        nome=nome,
+        cidade=cidade,
+        tipo_venda=tipo_venda,
+        procedencia_id=procedencia_id
+    )
+    
+    service = ClienteService(db)
+    return resposta_exportacao(
+        service.exportar_clientes(filters, current_user),
+        formato,
+        COLUNAS_EXPORTACAO_CLIENTES,
+        "clientes"
+    )
 
 
 @router.get("/{cliente_id}",
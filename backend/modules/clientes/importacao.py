@@ -0,0 +1,204 @@
+"""
+Importação em massa de clientes (CSV ou array JSON).
+
+Migrar a base de uma loja com POST /clientes/ custa dois round-trips por
+cliente (verificação de CPF/CNPJ + insert). Aqui o arquivo é lido em
+streaming, validado com as mesmas regras do cadastro, comparado de uma vez
+com os documentos já existentes na loja e inserido em blocos.
+"""
+
+import codecs
+import csv
+import io
+import itertools
+import json
+import logging
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+
+from pydantic import ValidationError
+
+from core.exceptions import ValidationException
+from .schemas import ClienteCreate
+
+logger = logging.getLogger(__name__)
+
+# Leitura do arquivo enviado (o upload já fica em disco acima de 1MB)
+TAMANHO_BLOCO_LEITURA = 64 * 1024
+
+FORMATOS_IMPORTACAO = ("csv", "json")
+
+
+def regras_cliente(cliente_data: ClienteCreate) -> Tuple[List[str], List[str]]:
+    """
+    Regras de negócio do cadastro de cliente (além das validações do schema)
+
+    Args:
+        cliente_data: Dados do cliente
+
+    Returns:
+        (erros, avisos)
+    """
+    erros = []
+    avisos = []
+
+    # Validação de CPF/CNPJ
+    cpf_cnpj_limpo = ''.join(filter(str.isdigit, cliente_data.cpf_cnpj))
+    if len(cpf_cnpj_limpo) not in [11, 14]:
+        erros.append("CPF deve ter 11 dígitos ou CNPJ deve ter 14 dígitos")
+
+    # Validação de email
+    if cliente_data.email and '@' not in cliente_data.email:
+        erros.append("Email inválido")
+
+    # Validação de CEP
+    cep_limpo = ''.join(filter(str.isdigit, cliente_data.cep))
+    if len(cep_limpo) != 8:
+        erros.append("CEP deve ter 8 dígitos")
+
+    # Validação de telefone
+    telefone_limpo = ''.join(filter(str.isdigit, cliente_data.telefone))
+    if len(telefone_limpo) < 10:
+        avisos.append("Telefone parece estar incompleto")
+
+    return erros, avisos
+
+
+def validar_linha(linha: Dict[str, Any]) -> Tuple[Any, List[str], List[str]]:
+    """
+    Valida uma linha do arquivo como um ClienteCreate
+
+    Células vazias viram None (campos opcionais do CSV); colunas desconhecidas
+    (id, created_at... de uma exportação) são ignoradas.
+
+    Returns:
+        (ClienteCreate ou None, erros, avisos)
+    """
+    dados = {
+        campo: (valor.strip() or None) if isinstance(valor, str) else valor
+        for campo, valor in linha.items()
+        if campo in ClienteCreate.model_fields
+    }
+    try:
+        cliente = ClienteCreate(**dados)
+    except ValidationError as e:
+        erros = [f"{'.'.join(str(p) for p in erro['loc']) or 'linha'}: {erro['msg']}" for erro in e.errors()]
+        return None, erros, []
+
+    erros, avisos = regras_cliente(cliente)
+    return (cliente if not erros else None), erros, avisos
+
+
+def validar_bloco(linhas: Iterator[Dict[str, Any]], tamanho: int) -> List[Tuple[Dict[str, Any], Any, List[str], List[str]]]:
+    """
+    Lê e valida as próximas `tamanho` linhas do arquivo
+
+    Feito em thread (asyncio.to_thread) pela importação: leitura do arquivo,
+    parse e validação não ocupam o event loop.
+
+    Returns:
+        (linha, ClienteCreate ou None, erros, avisos) de cada linha; vazio no fim do arquivo
+    """
+    return [(linha, *validar_linha(linha)) for linha in itertools.islice(linhas, tamanho)]
+
+
+def ler_linhas_csv(arquivo: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """
+    Linhas de um CSV com cabeçalho (separador ',' ou ';', UTF-8 com ou sem BOM)
+
+    Args:
+        arquivo: Arquivo binário (lido em streaming)
+    """
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    try:
+        cabecalho = texto.readline()
+        if not cabecalho.strip():
+            return
+        separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+        colunas = [coluna.strip() for coluna in next(csv.reader([cabecalho], delimiter=separador))]
+        for valores in csv.reader(texto, delimiter=separador):
+            if any(v.strip() for v in valores):
+                yield dict(zip(colunas, valores))
+    finally:
+        # Não fecha o upload junto com o wrapper
+        texto.detach()
+
+
+def ler_linhas_json(arquivo: BinaryIO, tamanho_bloco: int = TAMANHO_BLOCO_LEITURA) -> Iterator[Dict[str, Any]]:
+    """
+    Objetos de um array JSON ([{...}, {...}]) decodificados incrementalmente
+
+    O arquivo é lido em blocos; só o trecho ainda não decodificado fica em
+    memória (o json.load do array inteiro manteria todas as linhas de uma vez).
+
+    Args:
+        arquivo: Arquivo binário (lido em streaming)
+        tamanho_bloco: Bytes por leitura
+    """
+    decodificador = json.JSONDecoder()
+    leitor = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    posicao = 0
+    abriu = False
+    fim_do_arquivo = False
+
+    while True:
+        # Pula espaços e separadores entre os objetos
+        while posicao < len(buffer) and buffer[posicao] in " \t\r\n,":
+            posicao += 1
+
+        if not abriu and posicao < len(buffer):
+            if buffer[posicao] != "[":
+                raise ValidationException("O JSON deve ser um array de clientes", field="arquivo")
+            abriu = True
+            posicao += 1
+            continue
+
+        if abriu and posicao < len(buffer) and buffer[posicao] == "]":
+            return
+
+        if posicao < len(buffer):
+            try:
+                objeto, fim = decodificador.raw_decode(buffer, posicao)
+            except json.JSONDecodeError:
+                objeto, fim = None, None
+                if fim_do_arquivo:
+                    raise ValidationException("JSON inválido ou incompleto", field="arquivo")
+            if fim is not None:
+                if not isinstance(objeto, dict):
+                    raise ValidationException("Cada item do array deve ser um objeto", field="arquivo")
+                yield objeto
+                posicao = fim
+                continue
+        elif fim_do_arquivo:
+            if abriu:
+                raise ValidationException("JSON inválido ou incompleto", field="arquivo")
+            return
+
+        # Objeto incompleto no buffer: descarta o que já foi lido e busca mais
+        buffer = buffer[posicao:]
+        posicao = 0
+        bloco = arquivo.read(tamanho_bloco)
+        fim_do_arquivo = not bloco
+        buffer += leitor.decode(bloco, final=fim_do_arquivo)
+
+
+def ler_linhas(arquivo: BinaryIO, formato: str) -> Iterator[Dict[str, Any]]:
+    """Linhas do arquivo no formato informado ('csv' ou 'json')"""
+    if formato == "csv":
+        return ler_linhas_csv(arquivo)
+    if formato == "json":
+        return ler_linhas_json(arquivo)
+    raise ValidationException(f"Formato não suportado: {formato} (use csv ou json)", field="arquivo")
+
+
+def detectar_formato(nome_arquivo: str, content_type: str = "") -> str:
+    """Formato pelo nome do arquivo ou, na falta da extensão, pelo content-type"""
+    nome = (nome_arquivo or "").lower()
+    for formato in FORMATOS_IMPORTACAO:
+        if nome.endswith(f".{formato}"):
+            return formato
+    if "json" in (content_type or ""):
+        return "json"
+    if "csv" in (content_type or ""):
+        return "csv"
+    raise ValidationException("Envie um arquivo .csv ou .json", field="arquivo")
@@ -4,8 +4,12 @@ Responsabilidade: Acesso a dados, queries, conversões.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
 from supabase import Client
+from core.busca import aplicar_busca
+from core.database import execute_query
+from core.paginacao import CursorKeyset, aplicar_cursor
+from core.exportacao import iterar_em_lotes
 from .schemas import ClienteFilters
 
 # Configurar logger
@@ -39,11 +43,10 @@ class ClienteRepository:
             dados_cliente['loja_id'] = loja_id
             
             # Inserir cliente na tabela real
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('c_clientes')
                 .insert(dados_cliente)
-                .execute()
             )
             
             if not result.data:
@@ -58,7 +61,85 @@ class ClienteRepository:
             logger.error(f"Erro ao criar cliente: {str(e)}")
             raise Exception(f"Erro ao criar cliente: {str(e)}")
     
-    async def listar_clientes(self, loja_id: str, filters: Optional[ClienteFilters] = None, skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+    async def criar_clientes_em_lote(self, lista_clientes: List[Dict[str, Any]], loja_id: str) -> List[Dict[str, Any]]:
+        """
+        Insere vários clientes em um único round-trip
+        
+        Args:
+            lista_clientes: Dados dos clientes
+            loja_id: ID da loja (RLS)
+            
+        Returns:
+            Lista com os clientes criados, na ordem enviada
+        """
+        try:
+            for dados_cliente in lista_clientes:
+                dados_cliente['loja_id'] = loja_id
+            
+            result = await execute_query(
+                self.supabase
+                .table('c_clientes')
+                .insert(lista_clientes)
+            )
+            
+            if len(result.data or []) != len(lista_clientes):
+                raise Exception("Quantidade de clientes inseridos diferente da enviada")
+            
+            logger.info(f"{len(result.data)} clientes inseridos em lote na loja {loja_id}")
+            return result.data
+            
+        except Exception as e:
+            logger.error(f"Erro ao criar clientes em lote: {str(e)}")
+            raise Exception(f"Erro ao criar clientes em lote: {str(e)}")
+    
+    def _aplicar_filtros(self, query, filters: Optional[ClienteFilters]):
+        """Aplica os filtros opcionais de listagem/exportação"""
+        if filters:
+            if filters.nome:
+                query = query.ilike('nome', f'%{filters.nome}%')
+            
+            if filters.cpf_cnpj:
+                query = query.eq('cpf_cnpj', filters.cpf_cnpj)
+            
+            if filters.telefone:
+                query = query.ilike('telefone', f'%{filters.telefone}%')
+            
+            if filters.cidade:
+                query = query.ilike('cidade', f'%{filters.cidade}%')
+            
+            if filters.tipo_venda:
+                query = query.eq('tipo_venda', filters.tipo_venda.value)
+            
+            if filters.procedencia_id:
+                query = query.eq('procedencia_id', filters.procedencia_id)
+        
+        return query
+    
+    def iterar_clientes(self, loja_id: str, filters: Optional[ClienteFilters], colunas: str, tamanho_lote: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Percorre todos os clientes da loja em lotes (exportação em streaming)
+        
+        Args:
+            loja_id: ID da loja (RLS)
+            filters: Filtros opcionais
+            colunas: Colunas do select
+            tamanho_lote: Linhas por round-trip
+            
+        Returns:
+            Gerador assíncrono de lotes de clientes
+        """
+        def construir_query():
+            query = (
+                self.supabase
+                .table('c_clientes')
+                .select(colunas)
+                .eq('loja_id', loja_id)
+            )
+            return self._aplicar_filtros(query, filters)
+        
+        return iterar_em_lotes(construir_query, tamanho_lote)
+    
+    async def listar_clientes(self, loja_id: str, filters: Optional[ClienteFilters] = None, skip: int = 0, limit: int = 50, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Lista clientes com filtros aplicados
         
@@ -67,10 +148,14 @@ class ClienteRepository:
             filters: Filtros opcionais
             skip: Paginação - registros a pular
             limit: Paginação - limite de registros
+            cursor: Paginação keyset (None = offset; "" = primeira página).
+                No modo cursor retorna até limit + 1 registros (ver fatiar_pagina)
             
         Returns:
             List[Dict]: Lista de clientes do Supabase
         """
+        posicao = CursorKeyset.decodificar(cursor)
+        
         try:
             # Query base na tabela real
             query = (
@@ -81,32 +166,15 @@ class ClienteRepository:
             )
             
             # Aplicar filtros se fornecidos
-            if filters:
-                if filters.nome:
-                    query = query.ilike('nome', f'%{filters.nome}%')
-                
-                if filters.cpf_cnpj:
-                    query = query.eq('cpf_cnpj', filters.cpf_cnpj)
-                
-                if filters.telefone:
-                    query = query.ilike('telefone', f'%{filters.telefone}%')
-                
-                if filters.cidade:
-                    query = query.ilike('cidade', f'%{filters.cidade}%')
-                
-                if filters.tipo_venda:
-                    query = query.eq('tipo_venda', filters.tipo_venda.value)
-                
-                if filters.procedencia_id:
-                    query = query.eq('procedencia_id', filters.procedencia_id)
-            
-            # Executar query com paginação
-            result = (
-                query
-                .order('created_at', desc=True)
-                .range(skip, skip + limit - 1)
-                .execute()
-            )
+            query = self._aplicar_filtros(query, filters)
+            
+            # Executar query com paginação (keyset ou offset)
+            if cursor is not None:
+                query = aplicar_cursor(query, posicao, limit)
+            else:
+                query = query.order('created_at', desc=True).range(skip, skip + limit - 1)
+            
+            result = await execute_query(query)
             
             logger.debug(f"Listados {len(result.data)} clientes da loja {loja_id}")
             return result.data
@@ -115,6 +183,36 @@ class ClienteRepository:
             logger.error(f"Erro ao listar clientes: {str(e)}")
             raise Exception(f"Erro ao listar clientes: {str(e)}")
     
+    async def buscar_clientes(self, loja_id: str, filters: ClienteFilters, limite: int) -> List[Dict[str, Any]]:
+        """
+        Candidatos da busca ranqueada (q=) pelas colunas normalizadas (ver core.busca)
+        
+        Args:
+            loja_id: ID da loja (RLS)
+            filters: Filtros com q preenchido
+            limite: Máximo de candidatos (mais recentes primeiro)
+            
+        Returns:
+            List[Dict]: Clientes que contêm o termo, sem ranqueamento
+        """
+        try:
+            query = (
+                self.supabase
+                .table('c_clientes')
+                .select('*')
+                .eq('loja_id', loja_id)
+            )
+            query = aplicar_busca(self._aplicar_filtros(query, filters), filters.q)
+            if query is None:
+                return []
+            
+            result = await execute_query(query.order('created_at', desc=True).limit(limite))
+            return result.data
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar clientes: {str(e)}")
+            raise Exception(f"Erro ao buscar clientes: {str(e)}")
+    
     async def obter_cliente(self, cliente_id: str, loja_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtém cliente por ID
@@ -127,13 +225,12 @@ class ClienteRepository:
             Dict com dados do cliente ou None se não encontrado
         """
         try:
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('c_clientes')
                 .select('*')
                 .eq('id', cliente_id)
                 .eq('loja_id', loja_id)
-                .execute()
             )
             
             if result.data:
@@ -165,13 +262,12 @@ class ClienteRepository:
             dados_atualizacao['updated_at'] = datetime.utcnow().isoformat()
             
             # Atualizar cliente na tabela real
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('c_clientes')
                 .update(dados_atualizacao)
                 .eq('id', cliente_id)
                 .eq('loja_id', loja_id)
-                .execute()
             )
             
             if not result.data:
@@ -203,7 +299,7 @@ class ClienteRepository:
             
             # Primeira tentativa: marcar como excluído (se campo existe)
             try:
-                result = (
+                result = await execute_query(
                     self.supabase
                     .table('c_clientes')
                     .update({
@@ -212,7 +308,6 @@ class ClienteRepository:
                     })
                     .eq('id', cliente_id)
                     .eq('loja_id', loja_id)
-                    .execute()
                 )
                 
                 if result.data:
@@ -220,13 +315,12 @@ class ClienteRepository:
                     return True
             except:
                 # Se não tem campo excluido, fazer delete físico
-                result = (
+                result = await execute_query(
                     self.supabase
                     .table('c_clientes')
                     .delete()
                     .eq('id', cliente_id)
                     .eq('loja_id', loja_id)
-                    .execute()
                 )
                 
                 logger.info(f"Cliente {cliente_id} excluído fisicamente")
@@ -263,7 +357,7 @@ class ClienteRepository:
             if cliente_id_excluir:
                 query = query.neq('id', cliente_id_excluir)
             
-            result = query.execute()
+            result = await execute_query(query)
             
             existe = len(result.data) > 0
             logger.debug(f"CPF/CNPJ {cpf_cnpj} {'já existe' if existe else 'não existe'} na loja {loja_id}")
@@ -286,13 +380,12 @@ class ClienteRepository:
             Dict com dados do cliente ou None se não encontrado
         """
         try:
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('c_clientes')
                 .select('*')
                 .eq('cpf_cnpj', cpf_cnpj)
                 .eq('loja_id', loja_id)
-                .execute()
             )
             
             if result.data:
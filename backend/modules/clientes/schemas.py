@@ -4,7 +4,7 @@ Define modelos de validação para entrada e saída de dados.
 """
 
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 import uuid
 from datetime import datetime
@@ -126,8 +126,37 @@ class ClienteListItem(BaseModel):
         from_attributes = True
 
 
+class ClienteAutocompleteItem(BaseModel):
+    """Sugestão do autocomplete (servida do índice em memória)"""
+    id: uuid.UUID
+    nome: str
+    telefone: Optional[str]
+
+
+class ClienteImportacaoLinha(BaseModel):
+    """Resultado de uma linha do arquivo importado"""
+    linha: int = Field(..., description="Número da linha de dados (1 = primeira após o cabeçalho)")
+    status: str = Field(..., description="criado, duplicado, invalido ou erro")
+    id: Optional[uuid.UUID] = None
+    cpf_cnpj: Optional[str] = None
+    erros: List[str] = Field(default_factory=list)
+    avisos: List[str] = Field(default_factory=list)
+
+
+class ClienteImportacaoResultado(BaseModel):
+    """Relatório da importação em massa"""
+    total: int
+    criados: int
+    duplicados: int
+    invalidos: int
+    erros: int
+    tempo_ms: float
+    linhas: List[ClienteImportacaoLinha]
+
+
 class ClienteFilters(BaseModel):
     """Schema para filtros de busca de clientes"""
+    q: Optional[str] = Field(None, description="Busca ranqueada por nome, telefone, CPF/CNPJ, email ou cidade (sem acentos)")
     nome: Optional[str] = Field(None, description="Filtro por nome (busca parcial)")
     cpf_cnpj: Optional[str] = Field(None, description="Filtro por CPF/CNPJ")
     telefone: Optional[str] = Field(None, description="Filtro por telefone")
@@ -3,16 +3,42 @@ Service layer para clientes - lógica de negócio e validações.
 Responsabilidade: Orquestração, validações, regras de negócio.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import time
+from typing import AsyncIterator, BinaryIO, Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 
+from core.autocomplete import construir_indice_prefixos, get_indices_autocomplete
+from core.busca import apenas_digitos, colunas_indice, ranquear
+from core.config import get_settings
+from core.exceptions import ValidationException
+from core.paginacao import PaginaCursor, fatiar_pagina
+from .importacao import ler_linhas, regras_cliente, validar_bloco
 from .repository import ClienteRepository
-from .schemas import ClienteCreate, ClienteUpdate, ClienteResponse, ClienteListItem, ClienteFilters
+from .schemas import (
+    ClienteCreate, ClienteUpdate, ClienteResponse, ClienteListItem, ClienteFilters, ClienteAutocompleteItem,
+    ClienteImportacaoLinha, ClienteImportacaoResultado
+)
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
+# Colunas da exportação (ordem das colunas no CSV)
+COLUNAS_EXPORTACAO_CLIENTES = [
+    'id', 'nome', 'cpf_cnpj', 'rg_ie', 'telefone', 'email',
+    'logradouro', 'numero', 'complemento', 'bairro', 'cidade', 'uf', 'cep',
+    'tipo_venda', 'procedencia_id', 'vendedor_id', 'observacoes', 'created_at', 'updated_at'
+]
+
+# Busca ranqueada (q=): campos pesquisados com seus pesos
+CAMPOS_BUSCA_CLIENTES = {'nome': 1.0, 'email': 0.6, 'cidade': 0.4}
+CAMPOS_DIGITOS_CLIENTES = {'telefone': 1.0, 'cpf_cnpj': 1.0}
+
+
+def chave_indice_clientes(loja_id: str) -> str:
+    return f"clientes:{loja_id}"
+
 
 class ClienteService:
     """
@@ -50,28 +76,11 @@ class ClienteService:
                 raise Exception(f"CPF/CNPJ {cliente_data.cpf_cnpj} já está cadastrado nesta loja")
             
             # Preparar dados para inserção
-            dados_cliente = {
-                'nome': cliente_data.nome,
-                'cpf_cnpj': cliente_data.cpf_cnpj,
-                'telefone': cliente_data.telefone,
-                'email': cliente_data.email,
-                'endereco': cliente_data.endereco,
-                'logradouro': cliente_data.logradouro,
-                'numero': cliente_data.numero,
-                'complemento': cliente_data.complemento,
-                'bairro': cliente_data.bairro,
-                'cidade': cliente_data.cidade,
-                'uf': cliente_data.uf,
-                'cep': cliente_data.cep,
-                'rg_ie': cliente_data.rg_ie,
-                'tipo_venda': cliente_data.tipo_venda.value,
-                'procedencia_id': cliente_data.procedencia_id,
-                'vendedor_id': cliente_data.vendedor_id,
-                'observacoes': cliente_data.observacoes
-            }
+            dados_cliente = self._dados_cliente(cliente_data)
             
             # Criar cliente
             cliente_criado = await self.repository.criar_cliente(dados_cliente, loja_id)
+            get_indices_autocomplete().atualizar(chave_indice_clientes(loja_id), cliente_criado['id'], cliente_criado)
             
             logger.info(f"Cliente {cliente_data.nome} criado com sucesso: ID {cliente_criado['id']}")
             
@@ -82,7 +91,153 @@ class ClienteService:
             logger.error(f"Erro ao criar cliente: {str(e)}")
             raise Exception(f"Erro ao criar cliente: {str(e)}")
     
-    async def listar_clientes(self, filters: Optional[ClienteFilters], current_user: Dict[str, Any], skip: int = 0, limit: int = 50) -> List[ClienteListItem]:
+    def _dados_cliente(self, cliente_data: ClienteCreate) -> Dict[str, Any]:
+        """Colunas gravadas na criação de um cliente"""
+        return {
+            'nome': cliente_data.nome,
+            'cpf_cnpj': cliente_data.cpf_cnpj,
+            'telefone': cliente_data.telefone,
+            'email': cliente_data.email,
+            'endereco': cliente_data.endereco,
+            'logradouro': cliente_data.logradouro,
+            'numero': cliente_data.numero,
+            'complemento': cliente_data.complemento,
+            'bairro': cliente_data.bairro,
+            'cidade': cliente_data.cidade,
+            'uf': cliente_data.uf,
+            'cep': cliente_data.cep,
+            'rg_ie': cliente_data.rg_ie,
+            'tipo_venda': cliente_data.tipo_venda.value,
+            'procedencia_id': cliente_data.procedencia_id,
+            'vendedor_id': cliente_data.vendedor_id,
+            'observacoes': cliente_data.observacoes
+        }
+    
+    async def importar_clientes(self, arquivo: BinaryIO, formato: str, current_user: Dict[str, Any]) -> ClienteImportacaoResultado:
+        """
+        Importa clientes em massa de um CSV ou array JSON
+        
+        Cada linha passa pelas validações do cadastro (schema + regras de
+        negócio). Os CPF/CNPJ já cadastrados na loja são lidos uma única vez
+        (em lotes) e comparados por dígitos em memória, junto com os repetidos
+        no próprio arquivo. O arquivo é lido e validado em blocos de
+        IMPORT_BATCH_SIZE linhas numa thread; no event loop ficam só a
+        comparação de documentos e os inserts. As linhas válidas são
+        inseridas em blocos de IMPORT_BATCH_SIZE; se um bloco falhar, suas
+        linhas são reenviadas uma a uma para isolar a linha com problema.
+        
+        Args:
+            arquivo: Arquivo binário (lido em streaming)
+            formato: 'csv' ou 'json'
+            current_user: Usuário logado (clientes criados na loja dele)
+            
+        Returns:
+            ClienteImportacaoResultado: Totais e relatório por linha
+        """
+        try:
+            loja_id = current_user['loja_id']
+            settings = get_settings()
+            inicio = time.perf_counter()
+            
+            # Documentos já cadastrados: uma leitura da loja, em vez de uma consulta por linha
+            cadastrados = set()
+            async for lote in self.repository.iterar_clientes(loja_id, None, 'id,created_at,cpf_cnpj', settings.export_batch_size):
+                cadastrados.update(apenas_digitos(cliente.get('cpf_cnpj')) for cliente in lote)
+            cadastrados.discard('')
+            
+            no_arquivo: Dict[str, int] = {}
+            relatorio: List[ClienteImportacaoLinha] = []
+            bloco: List[Tuple[ClienteImportacaoLinha, Dict[str, Any]]] = []
+            
+            linhas = ler_linhas(arquivo, formato)
+            numero = 0
+            while True:
+                validadas = await asyncio.to_thread(validar_bloco, linhas, settings.import_batch_size)
+                if not validadas:
+                    break
+                
+                for linha, cliente, erros, avisos in validadas:
+                    numero += 1
+                    cpf_cnpj = linha.get('cpf_cnpj')
+                    item = ClienteImportacaoLinha(
+                        linha=numero,
+                        status='invalido',
+                        cpf_cnpj=str(cpf_cnpj) if cpf_cnpj is not None else None,
+                        erros=erros,
+                        avisos=avisos
+                    )
+                    relatorio.append(item)
+                    if cliente is None:
+                        continue
+                    
+                    digitos = apenas_digitos(cliente.cpf_cnpj)
+                    if digitos in cadastrados:
+                        item.status = 'duplicado'
+                        item.erros.append("CPF/CNPJ já cadastrado nesta loja")
+                    elif digitos in no_arquivo:
+                        item.status = 'duplicado'
+                        item.erros.append(f"CPF/CNPJ repetido no arquivo (linha {no_arquivo[digitos]})")
+                    else:
+                        no_arquivo[digitos] = numero
+                        bloco.append((item, self._dados_cliente(cliente)))
+                    
+                    if len(bloco) >= settings.import_batch_size:
+                        await self._inserir_bloco(bloco, loja_id)
+                        bloco = []
+            
+            if bloco:
+                await self._inserir_bloco(bloco, loja_id)
+            
+            contagem = {'criado': 0, 'duplicado': 0, 'invalido': 0, 'erro': 0}
+            for item in relatorio:
+                contagem[item.status] += 1
+            
+            if contagem['criado']:
+                # Índice de autocomplete da loja é remontado na próxima consulta
+                get_indices_autocomplete().invalidar(chave_indice_clientes(loja_id))
+            
+            tempo_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            logger.info(f"Importação de clientes na loja {loja_id}: {len(relatorio)} linhas, "
+                        f"{contagem['criado']} criados, {contagem['duplicado']} duplicados, "
+                        f"{contagem['invalido']} inválidos, {contagem['erro']} erros em {tempo_ms}ms")
+            
+            return ClienteImportacaoResultado(
+                total=len(relatorio),
+                criados=contagem['criado'],
+                duplicados=contagem['duplicado'],
+                invalidos=contagem['invalido'],
+                erros=contagem['erro'],
+                tempo_ms=tempo_ms,
+                linhas=relatorio
+            )
+            
+        except ValidationException:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao importar clientes: {str(e)}")
+            raise Exception(f"Erro ao importar clientes: {str(e)}")
+    
+    async def _inserir_bloco(self, bloco: List[Tuple[ClienteImportacaoLinha, Dict[str, Any]]], loja_id: str) -> None:
+        """Insere um bloco da importação e marca as linhas do relatório"""
+        try:
+            criados = await self.repository.criar_clientes_em_lote([dados for _, dados in bloco], loja_id)
+            for (item, _), cliente_criado in zip(bloco, criados):
+                item.status = 'criado'
+                item.id = cliente_criado['id']
+            return
+        except Exception as e:
+            logger.warning(f"Falha no bloco de {len(bloco)} clientes, inserindo um a um: {str(e)}")
+        
+        for item, dados in bloco:
+            try:
+                cliente_criado = await self.repository.criar_cliente(dados, loja_id)
+                item.status = 'criado'
+                item.id = cliente_criado['id']
+            except Exception as e:
+                item.status = 'erro'
+                item.erros.append(str(e))
+    
+    async def listar_clientes(self, filters: Optional[ClienteFilters], current_user: Dict[str, Any], skip: int = 0, limit: int = 50, cursor: Optional[str] = None) -> Union[List[ClienteListItem], PaginaCursor[ClienteListItem]]:
         """
         Lista clientes com filtros aplicados
         
@@ -91,38 +246,128 @@ class ClienteService:
             current_user: Usuário logado
             skip: Paginação - registros a pular
             limit: Paginação - limite de registros
+            cursor: Paginação keyset (None = offset; "" = primeira página)
             
         Returns:
-            List[ClienteListItem]: Lista de clientes
+            List[ClienteListItem]: Lista de clientes (modo offset)
+            PaginaCursor[ClienteListItem]: Página com next_cursor (modo cursor)
         """
         try:
             loja_id = current_user['loja_id']
             
+            if filters and filters.q:
+                if cursor is not None:
+                    raise ValidationException("A busca por q usa paginação skip/limit", field="cursor")
+                return await self.buscar_clientes(filters, loja_id, skip, limit)
+            
             # Buscar clientes
-            clientes_data = await self.repository.listar_clientes(loja_id, filters, skip, limit)
+            clientes_data = await self.repository.listar_clientes(loja_id, filters, skip, limit, cursor)
+            next_cursor = None
+            if cursor is not None:
+                clientes_data, next_cursor = fatiar_pagina(clientes_data, limit)
             
             # Converter para ClienteListItem
-            clientes = []
-            for cliente_data in clientes_data:
-                cliente_item = ClienteListItem(
-                    id=cliente_data['id'],
-                    nome=cliente_data['nome'],
-                    telefone=cliente_data['telefone'],
-                    email=cliente_data.get('email'),
-                    cidade=cliente_data['cidade'],
-                    tipo_venda=cliente_data['tipo_venda'],
-                    procedencia_id=cliente_data.get('procedencia_id'),
-                    created_at=cliente_data['created_at']
-                )
-                clientes.append(cliente_item)
+            clientes = [self._item_listagem(cliente_data) for cliente_data in clientes_data]
             
             logger.debug(f"Listados {len(clientes)} clientes da loja {loja_id}")
+            if cursor is not None:
+                return PaginaCursor[ClienteListItem](items=clientes, next_cursor=next_cursor)
             return clientes
             
+        except ValidationException:
+            raise
         except Exception as e:
             logger.error(f"Erro ao listar clientes: {str(e)}")
             raise Exception(f"Erro ao listar clientes: {str(e)}")
     
+    async def buscar_clientes(self, filters: ClienteFilters, loja_id: str, skip: int = 0, limit: int = 50) -> List[ClienteListItem]:
+        """
+        Busca ranqueada (q=) pelas colunas normalizadas da loja (ver core.busca)
+        
+        O banco devolve até BUSCA_MAX_CANDIDATOS clientes que contêm o termo
+        (com os demais filtros); a relevância e a página saem desses candidatos.
+        
+        Args:
+            filters: Filtros com q preenchido
+            loja_id: ID da loja (RLS)
+            skip: Resultados a pular
+            limit: Limite de resultados
+            
+        Returns:
+            List[ClienteListItem]: Clientes em ordem de relevância
+        """
+        candidatos = await self.repository.buscar_clientes(loja_id, filters, get_settings().busca_max_candidatos)
+        ranking = ranquear(candidatos, filters.q, CAMPOS_BUSCA_CLIENTES, CAMPOS_DIGITOS_CLIENTES)
+        
+        logger.debug(f"Busca '{filters.q}' na loja {loja_id}: {len(ranking)} candidatos")
+        return [self._item_listagem(cliente) for cliente in ranking[skip:skip + limit]]
+    
+    async def autocompletar_clientes(self, q: str, current_user: Dict[str, Any], limit: int = 10) -> List[ClienteAutocompleteItem]:
+        """
+        Sugestões de clientes por prefixo de nome ou telefone (typeahead)
+        
+        Servidas do índice de prefixos da loja em memória: o banco só é lido
+        para montar o índice (uma vez por TTL), não a cada tecla.
+        
+        Args:
+            q: Termo digitado
+            current_user: Usuário logado (índice da loja dele)
+            limit: Máximo de sugestões
+            
+        Returns:
+            List[ClienteAutocompleteItem]: Sugestões
+        """
+        try:
+            loja_id = current_user['loja_id']
+            
+            indice = await get_indices_autocomplete().obter(chave_indice_clientes(loja_id), lambda: construir_indice_prefixos(
+                self.repository.iterar_clientes(
+                    loja_id,
+                    None,
+                    colunas_indice(['nome', 'telefone']),
+                    get_settings().export_batch_size
+                )
+            ))
+            
+            return [ClienteAutocompleteItem(**sugestao) for sugestao in indice.sugerir(q, limit)]
+            
+        except Exception as e:
+            logger.error(f"Erro no autocomplete de clientes: {str(e)}")
+            raise Exception(f"Erro no autocomplete de clientes: {str(e)}")
+    
+    def _item_listagem(self, cliente_data: Dict[str, Any]) -> ClienteListItem:
+        return ClienteListItem(
+            id=cliente_data['id'],
+            nome=cliente_data['nome'],
+            telefone=cliente_data['telefone'],
+            email=cliente_data.get('email'),
+            cidade=cliente_data['cidade'],
+            tipo_venda=cliente_data['tipo_venda'],
+            procedencia_id=cliente_data.get('procedencia_id'),
+            created_at=cliente_data['created_at']
+        )
+    
+    def exportar_clientes(self, filters: Optional[ClienteFilters], current_user: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Exporta todos os clientes da loja do usuário em lotes (streaming)
+        
+        Args:
+            filters: Filtros opcionais (mesmos da listagem)
+            current_user: Usuário logado (RLS pela loja)
+            
+        Returns:
+            Gerador assíncrono de lotes com as COLUNAS_EXPORTACAO_CLIENTES
+        """
+        loja_id = current_user['loja_id']
+        logger.info(f"Exportando clientes da loja {loja_id}")
+        
+        return self.repository.iterar_clientes(
+            loja_id,
+            filters,
+            ','.join(COLUNAS_EXPORTACAO_CLIENTES),
+            get_settings().export_batch_size
+        )
+    
     async def obter_cliente(self, cliente_id: str, current_user: Dict[str, Any]) -> ClienteResponse:
         """
         Obtém cliente por ID
@@ -228,6 +473,7 @@ class ClienteService:
                     dados_atualizacao, 
                     loja_id
                 )
+                get_indices_autocomplete().atualizar(chave_indice_clientes(loja_id), cliente_id, cliente_atualizado)
                 
                 logger.info(f"Cliente {cliente_id} atualizado com sucesso")
                 return ClienteResponse(**cliente_atualizado)
@@ -265,6 +511,7 @@ class ClienteService:
             sucesso = await self.repository.excluir_cliente(cliente_id, loja_id)
             
             if sucesso:
+                get_indices_autocomplete().remover(chave_indice_clientes(loja_id), cliente_id)
                 logger.info(f"Cliente {cliente_id} ({cliente_atual['nome']}) excluído com sucesso")
             
             return sucesso
@@ -310,27 +557,7 @@ class ClienteService:
             Dict com resultado da validação
         """
         try:
-            erros = []
-            avisos = []
-            
-            # Validação de CPF/CNPJ
-            cpf_cnpj_limpo = ''.join(filter(str.isdigit, cliente_data.cpf_cnpj))
-            if len(cpf_cnpj_limpo) not in [11, 14]:
-                erros.append("CPF deve ter 11 dígitos ou CNPJ deve ter 14 dígitos")
-            
-            # Validação de email
-            if cliente_data.email and '@' not in cliente_data.email:
-                erros.append("Email inválido")
-            
-            # Validação de CEP
-            cep_limpo = ''.join(filter(str.isdigit, cliente_data.cep))
-            if len(cep_limpo) != 8:
-                erros.append("CEP deve ter 8 dígitos")
-            
-            # Validação de telefone
-            telefone_limpo = ''.join(filter(str.isdigit, cliente_data.telefone))
-            if len(telefone_limpo) < 10:
-                avisos.append("Telefone parece estar incompleto")
+            erros, avisos = regras_cliente(cliente_data)
             
             return {
                 "valido": len(erros) == 0,
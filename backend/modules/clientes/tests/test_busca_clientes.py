@@ -0,0 +1,100 @@
+import pytest
+
+from core.autocomplete import RegistroIndices
+from core.busca import MIN_DIGITOS, apenas_digitos, normalizar
+from core.exceptions import ValidationException
+from modules.clientes.schemas import ClienteFilters
+from modules.clientes.services import ClienteService
+
+USUARIO = {'loja_id': 'loja-1', 'id': 'u-1', 'perfil': 'VENDEDOR'}
+
+
+def cliente(i, nome, telefone, cidade='Curitiba'):
+    return {
+        'id': f'00000000-0000-0000-0000-{i:012d}', 'nome': nome, 'telefone': telefone, 'cpf_cnpj': None,
+        'email': None, 'cidade': cidade, 'tipo_venda': 'NORMAL', 'procedencia_id': None,
+        'created_at': f'2026-01-01T10:00:{i:02d}+00:00'
+    }
+
+
+class RepositorioFalso:
+    def __init__(self, linhas):
+        self.linhas = {linha['id']: linha for linha in linhas}
+        self.varreduras = 0
+        self.buscas = 0
+
+    async def _lotes(self):
+        self.varreduras += 1
+        yield list(self.linhas.values())
+
+    def iterar_clientes(self, loja_id, filters, colunas, tamanho_lote):
+        return self._lotes()
+
+    async def buscar_clientes(self, loja_id, filters, limite):
+        """Como o banco: colunas busca_texto/busca_digitos + filtros da listagem, mais recentes primeiro"""
+        self.buscas += 1
+        palavras, digitos = normalizar(filters.q).split(), apenas_digitos(filters.q)
+        candidatos = []
+        for linha in sorted(self.linhas.values(), key=lambda c: c['created_at'], reverse=True):
+            texto = normalizar(' '.join(filter(None, [linha['nome'], linha['email'], linha['cidade']])))
+            numeros = ' '.join(filter(None, [apenas_digitos(linha['telefone']), apenas_digitos(linha['cpf_cnpj'])]))
+            casou = (palavras and all(p in texto for p in palavras)) or (len(digitos) >= MIN_DIGITOS and digitos in numeros)
+            if casou and (not filters.cidade or filters.cidade.lower() in linha['cidade'].lower()):
+                candidatos.append(linha)
+        return candidatos[:limite]
+
+    async def obter_cliente(self, cliente_id, loja_id):
+        return self.linhas.get(cliente_id)
+
+    async def excluir_cliente(self, cliente_id, loja_id):
+        return self.linhas.pop(cliente_id, None) is not None
+
+
+@pytest.fixture
+def service():
+    servico = ClienteService.__new__(ClienteService)
+    servico.repository = RepositorioFalso([
+        cliente(1, 'Antônio Souza', '(41) 99999-0001'),
+        cliente(2, 'José Antunes', '(41) 3333-1234', cidade='Londrina'),
+        cliente(3, 'Ana Paula', '(11) 91234-5678'),
+    ])
+    return servico
+
+
+@pytest.mark.asyncio
+async def test_q_ranqueado_sem_acento_e_por_telefone(service):
+    por_nome = await service.listar_clientes(ClienteFilters(q='antonio'), USUARIO)
+    por_telefone = await service.listar_clientes(ClienteFilters(q='91234-5678'), USUARIO)
+    com_filtro = await service.listar_clientes(ClienteFilters(q='ant', cidade='londrina'), USUARIO)
+
+    assert por_nome[0].nome == 'Antônio Souza'
+    assert [c.nome for c in por_telefone] == ['Ana Paula']
+    assert [c.nome for c in com_filtro] == ['José Antunes']
+    assert service.repository.buscas == 3 and service.repository.varreduras == 0
+
+
+@pytest.mark.asyncio
+async def test_busca_le_dados_atuais_e_cursor_rejeitado(service):
+    await service.listar_clientes(ClienteFilters(q='ana'), USUARIO)
+
+    # Escrita de outro worker: aparece na próxima busca, sem TTL
+    service.repository.linhas['00000000-0000-0000-0000-000000000004'] = cliente(4, 'Anabela Reis', '(41) 98888-7777')
+    del service.repository.linhas['00000000-0000-0000-0000-000000000003']
+
+    assert [c.nome for c in await service.listar_clientes(ClienteFilters(q='ana'), USUARIO)] == ['Anabela Reis']
+    with pytest.raises(ValidationException):
+        await service.listar_clientes(ClienteFilters(q='ana'), USUARIO, cursor='')
+
+
+@pytest.mark.asyncio
+async def test_autocomplete_monta_indice_uma_vez_e_segue_exclusao(service, monkeypatch):
+    from core import autocomplete
+    monkeypatch.setattr(autocomplete, '_indices', RegistroIndices(max_indices=4, ttl_seconds=600))
+
+    assert [c.nome for c in await service.autocompletar_clientes('an', USUARIO)] == ['Ana Paula', 'Antônio Souza', 'José Antunes']
+    assert [c.nome for c in await service.autocompletar_clientes('9123', USUARIO)] == ['Ana Paula']
+
+    await service.excluir_cliente('00000000-0000-0000-0000-000000000003', USUARIO)
+
+    assert [c.nome for c in await service.autocompletar_clientes('an', USUARIO)] == ['Antônio Souza', 'José Antunes']
+    assert service.repository.varreduras == 1
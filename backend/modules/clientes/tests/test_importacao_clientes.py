@@ -0,0 +1,102 @@
+import io
+import json
+
+import pytest
+
+from core.config import get_settings
+from core.exceptions import ValidationException
+from modules.clientes.importacao import ler_linhas_json
+from modules.clientes.services import ClienteService
+
+USUARIO = {'loja_id': 'loja-1', 'id': 'u-1', 'perfil': 'GERENTE'}
+
+
+def linha(i, **campos):
+    dados = {
+        'nome': f'Cliente {i}', 'cpf_cnpj': f'{i:011d}', 'telefone': '(41) 99999-0000',
+        'cidade': 'Curitiba', 'cep': '80000-000', 'email': '', 'uf': 'PR'
+    }
+    dados.update(campos)
+    return dados
+
+
+class RepositorioFalso:
+    def __init__(self, existentes=()):
+        self.existentes = [{'id': f'e-{i}', 'cpf_cnpj': cpf} for i, cpf in enumerate(existentes)]
+        self.lotes = []
+        self.individuais = 0
+        self.criados = 0
+
+    async def _lotes(self):
+        yield self.existentes
+
+    def iterar_clientes(self, loja_id, filters, colunas, tamanho_lote):
+        return self._lotes()
+
+    def _criar(self, dados):
+        self.criados += 1
+        return {**dados, 'id': f'00000000-0000-0000-0000-{self.criados:012d}'}
+
+    async def criar_clientes_em_lote(self, lista, loja_id):
+        self.lotes.append(len(lista))
+        if any(d['nome'] == 'Quebra Lote' for d in lista):
+            raise Exception('violação de constraint')
+        return [self._criar(d) for d in lista]
+
+    async def criar_cliente(self, dados, loja_id):
+        self.individuais += 1
+        if dados['nome'] == 'Quebra Lote':
+            raise Exception('violação de constraint')
+        return self._criar(dados)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(get_settings(), 'import_batch_size', 3)
+    servico = ClienteService.__new__(ClienteService)
+    servico.repository = RepositorioFalso(existentes=['000.000.000-01'])
+    return servico
+
+
+@pytest.mark.asyncio
+async def test_importacao_csv_com_relatorio_por_linha(service):
+    csv_texto = 'nome;cpf_cnpj;telefone;cidade;cep;email;uf\n' + '\n'.join(
+        ';'.join(linha(i, **extra).values()) for i, extra in [
+            (1, {}),                          # já cadastrado (formatação diferente)
+            (2, {}), (3, {}), (4, {}), (5, {}),
+            (6, {'cep': '12.345-67'}),        # regra de negócio (7 dígitos)
+            (7, {'nome': ''}),                # schema
+            (2, {'nome': 'Outro'}),           # repetido no arquivo
+        ]
+    )
+
+    resultado = await service.importar_clientes(io.BytesIO(csv_texto.encode('utf-8-sig')), 'csv', USUARIO)
+
+    assert (resultado.total, resultado.criados, resultado.duplicados, resultado.invalidos) == (8, 4, 2, 2)
+    assert [l.status for l in resultado.linhas] == [
+        'duplicado', 'criado', 'criado', 'criado', 'criado', 'invalido', 'invalido', 'duplicado'
+    ]
+    assert 'CEP deve ter 8 dígitos' in resultado.linhas[5].erros
+    assert resultado.linhas[6].erros[0].startswith('nome')
+    assert 'linha 2' in resultado.linhas[7].erros[0]
+    assert service.repository.lotes == [3, 1] and service.repository.individuais == 0
+
+
+@pytest.mark.asyncio
+async def test_bloco_com_falha_reenvia_linha_a_linha(service):
+    dados = [linha(10), linha(11, nome='Quebra Lote'), linha(12)]
+
+    resultado = await service.importar_clientes(io.BytesIO(json.dumps(dados).encode()), 'json', USUARIO)
+
+    assert [l.status for l in resultado.linhas] == ['criado', 'erro', 'criado']
+    assert resultado.erros == 1 and service.repository.individuais == 3
+
+
+def test_json_lido_em_blocos_pequenos():
+    dados = json.dumps([linha(i, nome=f'Joãozinho {i}') for i in range(50)]).encode()
+
+    linhas = list(ler_linhas_json(io.BytesIO(dados), tamanho_bloco=7))
+
+    assert len(linhas) == 50 and linhas[49]['nome'] == 'Joãozinho 49'
+    with pytest.raises(ValidationException):
+        list(ler_linhas_json(io.BytesIO(b'[{"nome": "x"}'), tamanho_bloco=4))
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.exceptions import ValidationException
+from core.paginacao import CursorKeyset, PaginaCursor
+from modules.clientes.services import ClienteService
+
+USUARIO = {'loja_id': 'loja-1', 'id': 'u-1', 'perfil': 'VENDEDOR'}
+
+
+def cliente(i):
+    return {
+        'id': f'00000000-0000-0000-0000-{i:012d}', 'nome': f'Cliente {i}', 'telefone': '11999999999',
+        'email': None, 'cidade': 'São Paulo', 'tipo_venda': 'NORMAL', 'procedencia_id': None,
+        'created_at': f'2026-01-01T10:00:{i:02d}+00:00'
+    }
+
+
+class FakeQuery:
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.params = SimpleNamespace(set=self._set, add=self._add)
+
+    def _set(self, chave, valor):
+        self.supabase.params[chave] = valor
+        return self.params
+
+    def _add(self, chave, valor):
+        return self._set(chave, valor)
+
+    def limit(self, n):
+        self.supabase.params['limit'] = n
+        return self
+
+    def __getattr__(self, nome):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return SimpleNamespace(data=self.supabase.linhas[:self.supabase.params.get('limit', 50)])
+
+
+class FakeSupabase:
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.params = {}
+
+    def table(self, nome):
+        return FakeQuery(self)
+
+
+@pytest.mark.asyncio
+async def test_modo_cursor_retorna_pagina_com_next_cursor():
+    supabase = FakeSupabase([cliente(i) for i in range(9, 0, -1)])
+
+    pagina = await ClienteService(supabase).listar_clientes(None, USUARIO, limit=3, cursor='')
+
+    assert isinstance(pagina, PaginaCursor)
+    assert [c.nome for c in pagina.items] == ['Cliente 9', 'Cliente 8', 'Cliente 7']
+    assert CursorKeyset.decodificar(pagina.next_cursor).id == cliente(7)['id']
+    assert supabase.params['limit'] == 4
+
+
+@pytest.mark.asyncio
+async def test_modo_offset_continua_retornando_lista():
+    supabase = FakeSupabase([cliente(i) for i in range(3, 0, -1)])
+
+    clientes = await ClienteService(supabase).listar_clientes(None, USUARIO, skip=0, limit=50)
+
+    assert isinstance(clientes, list) and len(clientes) == 3
+
+
+@pytest.mark.asyncio
+async def test_cursor_invalido_nao_vira_erro_interno():
+    with pytest.raises(ValidationException):
+        await ClienteService(FakeSupabase([])).listar_clientes(None, USUARIO, cursor='xyz')
@@ -4,10 +4,11 @@ Define endpoints REST para operações de empresas e lojas.
 """
 
 from fastapi import APIRouter, Depends, Query, HTTPException, status
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from core.auth import get_current_user, require_vendedor_ou_superior
-from core.database import get_database, get_service_database
+from core.database import get_database, get_service_database, execute_query
 from supabase import Client
+from core.paginacao import PaginaCursor
 import uuid
 import logging
 
@@ -41,16 +42,16 @@ async def testar_conexao_dados_reais_sem_auth(
     """
     try:
         # Buscar estatísticas reais das empresas
-        result_empresas = db.table('cad_empresas').select('*', count='exact').execute()
+        result_empresas = await execute_query(db.table('cad_empresas').select('*', count='exact'))
         
         # Buscar estatísticas reais das lojas
-        result_lojas = db.table('c_lojas').select('*', count='exact').execute()
+        result_lojas = await execute_query(db.table('c_lojas').select('*', count='exact'))
         
         # Empresas recentes
-        result_empresas_recentes = db.table('cad_empresas').select('id', 'nome', 'cnpj', 'created_at').order('created_at', desc=True).limit(3).execute()
+        result_empresas_recentes = await execute_query(db.table('cad_empresas').select('id', 'nome', 'cnpj', 'created_at').order('created_at', desc=True).limit(3))
         
         # Lojas recentes com nome da empresa
-        result_lojas_recentes = db.table('c_lojas').select('id', 'nome', 'codigo', 'cad_empresas(nome)', 'created_at').order('created_at', desc=True).limit(3).execute()
+        result_lojas_recentes = await execute_query(db.table('c_lojas').select('id', 'nome', 'codigo', 'cad_empresas(nome)', 'created_at').order('created_at', desc=True).limit(3))
         
         return {
             "🟢 STATUS": "CONECTADO AOS DADOS REAIS DO SUPABASE",
@@ -80,11 +81,14 @@ async def testar_conexao_dados_reais_sem_auth(
 # ===== ENDPOINTS DE EMPRESAS =====
 
 @router.get("/empresas/",
-    response_model=List[EmpresaResponse],
+    response_model=Union[List[EmpresaResponse], PaginaCursor[EmpresaResponse]],
     summary="Listar empresas",
-    description="Lista empresas com filtros e paginação"
+    description="Lista empresas com filtros e paginação (offset ou cursor)"
 )
 async def listar_empresas(
+    # Busca ranqueada
+    q: Optional[str] = Query(None, min_length=1, description="Busca por nome, CNPJ, email ou telefone (ignora acentos; resultados por relevância)"),
+    
     # Filtros opcionais
     nome: Optional[str] = Query(None, description="Filtro por nome (busca parcial)"),
     cnpj: Optional[str] = Query(None, description="Filtro por CNPJ"),
@@ -93,6 +97,7 @@ async def listar_empresas(
     # Paginação
     skip: int = Query(0, ge=0, description="Registros a pular"),
     limit: int = Query(50, ge=1, le=200, description="Limite de registros"),
+    cursor: Optional[str] = Query(None, description="Paginação por cursor: vazio para a primeira página, depois o next_cursor recebido"),
     
     # Dependências - TEMPORÁRIO: SEM AUTH PARA DESENVOLVIMENTO
     # current_user: Dict[str, Any] = Depends(get_current_user),
@@ -108,13 +113,14 @@ async def listar_empresas(
     """
     # Constrói filtros
     filters = EmpresaFilters(
+        q=q,
         nome=nome,
         cnpj=cnpj,
         ativo=ativo
     )
     
     service = EmpresaService(db)
-    return await service.listar_empresas(filters, skip, limit)
+    return await service.listar_empresas(filters, skip, limit, cursor)
 
 
 @router.get("/empresas/{empresa_id}",
@@ -339,11 +345,14 @@ async def alternar_status_empresa(
 # ===== ENDPOINTS DE LOJAS =====
 
 @router.get("/lojas/",
-    response_model=List[LojaListItem],
+    response_model=Union[List[LojaListItem], PaginaCursor[LojaListItem]],
     summary="Listar lojas",
-    description="Lista lojas com filtros e paginação, incluindo nome da empresa"
+    description="Lista lojas com filtros e paginação (offset ou cursor), incluindo nome da empresa"
 )
 async def listar_lojas(
+    # Busca ranqueada
+    q: Optional[str] = Query(None, min_length=1, description="Busca por nome, código, email ou telefone (ignora acentos; resultados por relevância)"),
+    
     # Filtros opcionais
     nome: Optional[str] = Query(None, description="Filtro por nome (busca parcial)"),
     codigo: Optional[str] = Query(None, description="Filtro por código"),
@@ -354,6 +363,7 @@ async def listar_lojas(
     # Paginação
     skip: int = Query(0, ge=0, description="Registros a pular"),
     limit: int = Query(50, ge=1, le=200, description="Limite de registros"),
+    cursor: Optional[str] = Query(None, description="Paginação por cursor: vazio para a primeira página, depois o next_cursor recebido"),
     
     # Dependências - TEMPORÁRIO: SEM AUTH
     # current_user: Dict[str, Any] = Depends(get_current_user),  # TEMP DISABLED
@@ -366,6 +376,7 @@ async def listar_lojas(
     """
     # Constrói filtros
     filters = LojaFilters(
+        q=q,
         nome=nome,
         codigo=codigo,
         empresa_id=empresa_id,
@@ -374,7 +385,7 @@ async def listar_lojas(
     )
     
     service = EmpresaService(db)
-    return await service.listar_lojas(filters, skip, limit)
+    return await service.listar_lojas(filters, skip, limit, cursor)
 
 
 @router.get("/empresas/{empresa_id}/lojas",
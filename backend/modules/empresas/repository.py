@@ -6,6 +6,10 @@ Responsabilidade: Acesso a dados, queries, conversões.
 import logging
 from typing import List, Dict, Any, Optional
 from supabase import Client
+from core.busca import aplicar_busca
+from core.database import execute_query
+from core.estatisticas import contar, contar_por_grupo
+from core.paginacao import CursorKeyset, aplicar_cursor
 from .schemas import EmpresaFilters, LojaFilters
 from datetime import datetime
 
@@ -26,8 +30,14 @@ class EmpresaRepository:
     
     # ===== OPERAÇÕES DE EMPRESAS =====
     
-    async def listar_empresas(self, filters: Optional[EmpresaFilters] = None, skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
-        """Lista empresas com filtros aplicados"""
+    async def listar_empresas(self, filters: Optional[EmpresaFilters] = None, skip: int = 0, limit: int = 50, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Lista empresas com filtros aplicados
+        
+        No modo cursor (cursor != None) retorna até limit + 1 registros (ver fatiar_pagina)
+        """
+        posicao = CursorKeyset.decodificar(cursor)
+        
         try:
             query = (
                 self.supabase
@@ -36,23 +46,15 @@ class EmpresaRepository:
             )
             
             # Aplicar filtros se fornecidos
-            if filters:
-                if filters.nome:
-                    query = query.ilike('nome', f'%{filters.nome}%')
-                
-                if filters.cnpj:
-                    query = query.eq('cnpj', filters.cnpj)
-                
-                if filters.ativo is not None:
-                    query = query.eq('ativo', filters.ativo)
-            
-            # Executar query com paginação
-            result = (
-                query
-                .order('created_at', desc=True)
-                .range(skip, skip + limit - 1)
-                .execute()
-            )
+            query = self._filtros_empresas(query, filters)
+            
+            # Executar query com paginação (keyset ou offset)
+            if cursor is not None:
+                query = aplicar_cursor(query, posicao, limit)
+            else:
+                query = query.order('created_at', desc=True).range(skip, skip + limit - 1)
+            
+            result = await execute_query(query)
             
             logger.debug(f"Listadas {len(result.data)} empresas")
             return result.data
@@ -61,15 +63,42 @@ class EmpresaRepository:
             logger.error(f"Erro ao listar empresas: {str(e)}")
             raise Exception(f"Erro ao listar empresas: {str(e)}")
     
+    def _filtros_empresas(self, query, filters: Optional[EmpresaFilters]):
+        """Aplica os filtros opcionais da listagem de empresas"""
+        if filters:
+            if filters.nome:
+                query = query.ilike('nome', f'%{filters.nome}%')
+            
+            if filters.cnpj:
+                query = query.eq('cnpj', filters.cnpj)
+            
+            if filters.ativo is not None:
+                query = query.eq('ativo', filters.ativo)
+        
+        return query
+    
+    async def buscar_empresas(self, filters: EmpresaFilters, limite: int) -> List[Dict[str, Any]]:
+        """Candidatos da busca ranqueada (q=) pelas colunas normalizadas (ver core.busca)"""
+        try:
+            query = aplicar_busca(self._filtros_empresas(self.supabase.table('cad_empresas').select('*'), filters), filters.q)
+            if query is None:
+                return []
+            
+            result = await execute_query(query.order('created_at', desc=True).limit(limite))
+            return result.data
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar empresas: {str(e)}")
+            raise Exception(f"Erro ao buscar empresas: {str(e)}")
+    
     async def obter_empresa(self, empresa_id: str) -> Optional[Dict[str, Any]]:
         """Obtém empresa por ID"""
         try:
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('cad_empresas')
                 .select('*')
                 .eq('id', empresa_id)
-                .execute()
             )
             
             if result.data:
@@ -83,10 +112,35 @@ class EmpresaRepository:
             logger.error(f"Erro ao obter empresa {empresa_id}: {str(e)}")
             raise Exception(f"Erro ao obter empresa: {str(e)}")
     
+    async def contar_empresas_ativas(self) -> int:
+        """Total de empresas ativas (count=exact, sem trazer as linhas)"""
+        try:
+            return await contar(self.supabase, 'cad_empresas', {'ativo': True})
+            
+        except Exception as e:
+            logger.error(f"Erro ao contar empresas: {str(e)}")
+            raise Exception(f"Erro ao contar empresas: {str(e)}")
+    
+    async def contar_lojas_ativas_por_empresa(self) -> Dict[str, int]:
+        """Quantidade de lojas ativas por empresa_id (agregado no banco)"""
+        try:
+            contagens = await contar_por_grupo(self.supabase, 'c_lojas', 'empresa_id', {'ativo': True})
+            return {str(empresa_id): quantidade for empresa_id, quantidade in contagens.items()}
+            
+        except Exception as e:
+            logger.error(f"Erro ao contar lojas por empresa: {str(e)}")
+            raise Exception(f"Erro ao contar lojas por empresa: {str(e)}")
+    
     # ===== OPERAÇÕES DE LOJAS =====
     
-    async def listar_lojas(self, filters: Optional[LojaFilters] = None, skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
-        """Lista lojas com filtros aplicados, incluindo nome da empresa"""
+    async def listar_lojas(self, filters: Optional[LojaFilters] = None, skip: int = 0, limit: int = 50, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Lista lojas com filtros aplicados, incluindo nome da empresa
+        
+        No modo cursor (cursor != None) retorna até limit + 1 registros (ver fatiar_pagina)
+        """
+        posicao = CursorKeyset.decodificar(cursor)
+        
         try:
             query = (
                 self.supabase
@@ -95,25 +149,14 @@ class EmpresaRepository:
             )
             
             # Aplicar filtros se fornecidos
-            if filters:
-                if filters.nome:
-                    query = query.ilike('nome', f'%{filters.nome}%')
-                
-                if filters.codigo:
-                    query = query.ilike('codigo', f'%{filters.codigo}%')
-                
-                if filters.empresa_id:
-                    query = query.eq('empresa_id', str(filters.empresa_id))
-                
-                if filters.ativo is not None:
-                    query = query.eq('ativo', filters.ativo)
-            
-            result = (
-                query
-                .order('created_at', desc=True)
-                .range(skip, skip + limit - 1)
-                .execute()
-            )
+            query = self._filtros_lojas(query, filters)
+            
+            if cursor is not None:
+                query = aplicar_cursor(query, posicao, limit)
+            else:
+                query = query.order('created_at', desc=True).range(skip, skip + limit - 1)
+            
+            result = await execute_query(query)
             
             logger.debug(f"Listadas {len(result.data)} lojas")
             return result.data
@@ -122,16 +165,46 @@ class EmpresaRepository:
             logger.error(f"Erro ao listar lojas: {str(e)}")
             raise Exception(f"Erro ao listar lojas: {str(e)}")
     
+    def _filtros_lojas(self, query, filters: Optional[LojaFilters]):
+        """Aplica os filtros opcionais da listagem de lojas"""
+        if filters:
+            if filters.nome:
+                query = query.ilike('nome', f'%{filters.nome}%')
+            
+            if filters.codigo:
+                query = query.ilike('codigo', f'%{filters.codigo}%')
+            
+            if filters.empresa_id:
+                query = query.eq('empresa_id', str(filters.empresa_id))
+            
+            if filters.ativo is not None:
+                query = query.eq('ativo', filters.ativo)
+        
+        return query
+    
+    async def buscar_lojas(self, filters: LojaFilters, limite: int) -> List[Dict[str, Any]]:
+        """Candidatos da busca ranqueada (q=) com o nome da empresa (ver core.busca)"""
+        try:
+            query = aplicar_busca(self._filtros_lojas(self.supabase.table('c_lojas').select('*, cad_empresas(nome)'), filters), filters.q)
+            if query is None:
+                return []
+            
+            result = await execute_query(query.order('created_at', desc=True).limit(limite))
+            return result.data
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar lojas: {str(e)}")
+            raise Exception(f"Erro ao buscar lojas: {str(e)}")
+    
     async def listar_lojas_por_empresa(self, empresa_id: str) -> List[Dict[str, Any]]:
         """Lista todas as lojas de uma empresa específica"""
         try:
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('c_lojas')
                 .select('*')
                 .eq('empresa_id', empresa_id)
                 .order('nome')
-                .execute()
             )
             
             logger.debug(f"Encontradas {len(result.data)} lojas para empresa {empresa_id}")
@@ -180,11 +253,10 @@ class EmpresaRepository:
             }
             
             # Inserir empresa
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('cad_empresas')
                 .insert(dados_insercao)
-                .execute()
             )
             
             if result.data:
@@ -211,12 +283,11 @@ class EmpresaRepository:
                     dados_atualizacao[campo] = empresa_data[campo]
             
             # Atualizar empresa
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('cad_empresas')
                 .update(dados_atualizacao)
                 .eq('id', empresa_id)
-                .execute()
             )
             
             if result.data:
@@ -240,7 +311,7 @@ class EmpresaRepository:
                 raise Exception(f"Não é possível excluir empresa com {len(lojas_ativas)} lojas ativas")
             
             # Fazer soft delete (marcar como inativo)
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('cad_empresas')
                 .update({
@@ -248,7 +319,6 @@ class EmpresaRepository:
                     'updated_at': datetime.utcnow().isoformat()
                 })
                 .eq('id', empresa_id)
-                .execute()
             )
             
             if result.data:
@@ -264,7 +334,7 @@ class EmpresaRepository:
     async def alternar_status_empresa(self, empresa_id: str, ativo: bool) -> Dict[str, Any]:
         """Alterna status ativo/inativo da empresa"""
         try:
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('cad_empresas')
                 .update({
@@ -272,7 +342,6 @@ class EmpresaRepository:
                     'updated_at': datetime.utcnow().isoformat()
                 })
                 .eq('id', empresa_id)
-                .execute()
             )
             
             if result.data:
@@ -300,7 +369,7 @@ class EmpresaRepository:
             if empresa_id:
                 query = query.neq('id', empresa_id)
             
-            result = query.execute()
+            result = await execute_query(query)
             
             existe_duplicado = len(result.data) > 0
             if existe_duplicado:
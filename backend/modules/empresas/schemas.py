@@ -134,6 +134,7 @@ class LojaListItem(BaseModel):
 
 class EmpresaFilters(BaseModel):
     """Schema para filtros de busca de empresas"""
+    q: Optional[str] = Field(None, description="Busca ranqueada por nome, CNPJ, email ou telefone (sem acentos)")
     nome: Optional[str] = Field(None, description="Filtro por nome (busca parcial)")
     cnpj: Optional[str] = Field(None, description="Filtro por CNPJ")
     ativo: Optional[bool] = Field(None, description="Filtro por status ativo")
@@ -141,6 +142,7 @@ class EmpresaFilters(BaseModel):
 
 class LojaFilters(BaseModel):
     """Schema para filtros de busca de lojas"""
+    q: Optional[str] = Field(None, description="Busca ranqueada por nome, código, email ou telefone (sem acentos)")
     nome: Optional[str] = Field(None, description="Filtro por nome (busca parcial)")
     codigo: Optional[str] = Field(None, description="Filtro por código")
     empresa_id: Optional[uuid.UUID] = Field(None, description="Filtro por empresa")
@@ -4,9 +4,15 @@ Responsabilidade: Orquestração, validações, regras de negócio.
 """
 
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
+import asyncio
 
+from core.busca import ranquear
+from core.config import get_settings
+from core.estatisticas import get_cache_estatisticas, invalidar_estatisticas
+from core.exceptions import ValidationException
+from core.paginacao import PaginaCursor, fatiar_pagina
 from .repository import EmpresaRepository
 from .schemas import (
     EmpresaCreate, EmpresaUpdate, EmpresaResponse, EmpresaComLojas,
@@ -17,6 +23,13 @@ from .schemas import (
 # Configurar logger
 logger = logging.getLogger(__name__)
 
+# Busca ranqueada (q=): campos pesquisados com seus pesos
+CAMPOS_BUSCA_EMPRESAS = {'nome': 1.0, 'email': 0.5}
+CAMPOS_DIGITOS_EMPRESAS = {'cnpj': 1.0, 'telefone': 0.8}
+
+CAMPOS_BUSCA_LOJAS = {'nome': 1.0, 'codigo': 0.9, 'email': 0.5}
+CAMPOS_DIGITOS_LOJAS = {'telefone': 0.8}
+
 
 class EmpresaService:
     """
@@ -27,10 +40,13 @@ class EmpresaService:
     
     def __init__(self, supabase_client):
         self.repository = EmpresaRepository(supabase_client)
+        # Estatísticas seguem o RLS do cliente: cache separado por loja do usuário
+        escopo = getattr(supabase_client, 'loja_id', None) or '*'
+        self._chave_estatisticas = f"empresas:{escopo}"
     
     # ===== OPERAÇÕES DE EMPRESAS =====
     
-    async def listar_empresas(self, filters: Optional[EmpresaFilters] = None, skip: int = 0, limit: int = 50) -> List[EmpresaResponse]:
+    async def listar_empresas(self, filters: Optional[EmpresaFilters] = None, skip: int = 0, limit: int = 50, cursor: Optional[str] = None) -> Union[List[EmpresaResponse], PaginaCursor[EmpresaResponse]]:
         """
         Lista empresas com filtros aplicados
         
@@ -38,13 +54,23 @@ class EmpresaService:
             filters: Filtros opcionais
             skip: Paginação - registros a pular
             limit: Paginação - limite de registros
+            cursor: Paginação keyset (None = offset; "" = primeira página)
             
         Returns:
-            List[EmpresaResponse]: Lista de empresas
+            List[EmpresaResponse]: Lista de empresas (modo offset)
+            PaginaCursor[EmpresaResponse]: Página com next_cursor (modo cursor)
         """
         try:
+            if filters and filters.q:
+                if cursor is not None:
+                    raise ValidationException("A busca por q usa paginação skip/limit", field="cursor")
+                return await self._buscar_empresas(filters, skip, limit)
+            
             # Buscar empresas
-            empresas_data = await self.repository.listar_empresas(filters, skip, limit)
+            empresas_data = await self.repository.listar_empresas(filters, skip, limit, cursor)
+            next_cursor = None
+            if cursor is not None:
+                empresas_data, next_cursor = fatiar_pagina(empresas_data, limit)
             
             # Converter para EmpresaResponse
             empresas = []
@@ -53,12 +79,22 @@ class EmpresaService:
                 empresas.append(empresa)
             
             logger.debug(f"Listadas {len(empresas)} empresas")
+            if cursor is not None:
+                return PaginaCursor[EmpresaResponse](items=empresas, next_cursor=next_cursor)
             return empresas
             
+        except ValidationException:
+            raise
         except Exception as e:
             logger.error(f"Erro ao listar empresas: {str(e)}")
             raise Exception(f"Erro ao listar empresas: {str(e)}")
     
+    async def _buscar_empresas(self, filters: EmpresaFilters, skip: int, limit: int) -> List[EmpresaResponse]:
+        """Busca ranqueada (q=) entre os candidatos devolvidos pelo banco"""
+        candidatos = await self.repository.buscar_empresas(filters, get_settings().busca_max_candidatos)
+        ranking = ranquear(candidatos, filters.q, CAMPOS_BUSCA_EMPRESAS, CAMPOS_DIGITOS_EMPRESAS)
+        return [EmpresaResponse(**empresa) for empresa in ranking[skip:skip + limit]]
+    
     async def obter_empresa(self, empresa_id: str) -> EmpresaResponse:
         """
         Obtém empresa por ID
@@ -149,6 +185,7 @@ class EmpresaService:
             
             # Criar empresa
             empresa_criada = await self.repository.criar_empresa(empresa_dict)
+            invalidar_estatisticas("empresas")
             
             logger.info(f"Empresa '{empresa_criada['nome']}' criada com sucesso")
             return EmpresaResponse(**empresa_criada)
@@ -188,6 +225,7 @@ class EmpresaService:
             
             # Atualizar empresa
             empresa_atualizada = await self.repository.atualizar_empresa(empresa_id, empresa_dict)
+            invalidar_estatisticas("empresas")
             
             logger.info(f"Empresa '{empresa_atualizada['nome']}' atualizada com sucesso")
             return EmpresaResponse(**empresa_atualizada)
@@ -214,6 +252,7 @@ class EmpresaService:
             
             # Excluir empresa (soft delete)
             sucesso = await self.repository.excluir_empresa(empresa_id)
+            invalidar_estatisticas("empresas")
             
             if sucesso:
                 logger.info(f"Empresa '{empresa_existente['nome']}' excluída com sucesso")
@@ -248,6 +287,7 @@ class EmpresaService:
             
             # Alterar status
             empresa_atualizada = await self.repository.alternar_status_empresa(empresa_id, ativo)
+            invalidar_estatisticas("empresas")
             
             status_texto = "ativada" if ativo else "desativada"
             logger.info(f"Empresa '{empresa_atualizada['nome']}' {status_texto}")
@@ -260,7 +300,7 @@ class EmpresaService:
     
     # ===== OPERAÇÕES DE LOJAS =====
     
-    async def listar_lojas(self, filters: Optional[LojaFilters] = None, skip: int = 0, limit: int = 50) -> List[LojaListItem]:
+    async def listar_lojas(self, filters: Optional[LojaFilters] = None, skip: int = 0, limit: int = 50, cursor: Optional[str] = None) -> Union[List[LojaListItem], PaginaCursor[LojaListItem]]:
         """
         Lista lojas com filtros aplicados
         
@@ -268,41 +308,62 @@ class EmpresaService:
             filters: Filtros opcionais
             skip: Paginação - registros a pular
             limit: Paginação - limite de registros
+            cursor: Paginação keyset (None = offset; "" = primeira página)
             
         Returns:
-            List[LojaListItem]: Lista de lojas
+            List[LojaListItem]: Lista de lojas (modo offset)
+            PaginaCursor[LojaListItem]: Página com next_cursor (modo cursor)
         """
         try:
+            if filters and filters.q:
+                if cursor is not None:
+                    raise ValidationException("A busca por q usa paginação skip/limit", field="cursor")
+                lojas_data = await self._buscar_lojas(filters, skip, limit)
+                return [self._item_loja(loja_data) for loja_data in lojas_data]
+            
             # Buscar lojas
-            lojas_data = await self.repository.listar_lojas(filters, skip, limit)
+            lojas_data = await self.repository.listar_lojas(filters, skip, limit, cursor)
+            next_cursor = None
+            if cursor is not None:
+                lojas_data, next_cursor = fatiar_pagina(lojas_data, limit)
             
             # Converter para LojaListItem
-            lojas = []
-            for loja_data in lojas_data:
-                # Extrair nome da empresa do JOIN
-                empresa_nome = None
-                if 'cad_empresas' in loja_data and loja_data['cad_empresas']:
-                    empresa_nome = loja_data['cad_empresas']['nome']
-                
-                loja_item = LojaListItem(
-                    id=loja_data['id'],
-                    nome=loja_data['nome'],
-                    codigo=loja_data['codigo'],
-                    empresa_id=loja_data['empresa_id'],
-                    empresa_nome=empresa_nome,
-                    gerente_id=loja_data.get('gerente_id'),
-                    ativo=loja_data['ativo'],
-                    created_at=loja_data['created_at']
-                )
-                lojas.append(loja_item)
+            lojas = [self._item_loja(loja_data) for loja_data in lojas_data]
             
             logger.debug(f"Listadas {len(lojas)} lojas")
+            if cursor is not None:
+                return PaginaCursor[LojaListItem](items=lojas, next_cursor=next_cursor)
             return lojas
             
+        except ValidationException:
+            raise
         except Exception as e:
             logger.error(f"Erro ao listar lojas: {str(e)}")
             raise Exception(f"Erro ao listar lojas: {str(e)}")
     
+    async def _buscar_lojas(self, filters: LojaFilters, skip: int, limit: int) -> List[Dict[str, Any]]:
+        """Busca ranqueada (q=) entre os candidatos devolvidos pelo banco"""
+        candidatos = await self.repository.buscar_lojas(filters, get_settings().busca_max_candidatos)
+        ranking = ranquear(candidatos, filters.q, CAMPOS_BUSCA_LOJAS, CAMPOS_DIGITOS_LOJAS)
+        return ranking[skip:skip + limit]
+    
+    def _item_loja(self, loja_data: Dict[str, Any]) -> LojaListItem:
+        # Extrair nome da empresa do JOIN
+        empresa_nome = None
+        if 'cad_empresas' in loja_data and loja_data['cad_empresas']:
+            empresa_nome = loja_data['cad_empresas']['nome']
+        
+        return LojaListItem(
+            id=loja_data['id'],
+            nome=loja_data['nome'],
+            codigo=loja_data['codigo'],
+            empresa_id=loja_data['empresa_id'],
+            empresa_nome=empresa_nome,
+            gerente_id=loja_data.get('gerente_id'),
+            ativo=loja_data['ativo'],
+            created_at=loja_data['created_at']
+        )
+    
     async def listar_lojas_por_empresa(self, empresa_id: str) -> List[LojaResponse]:
         """
         Lista lojas de uma empresa específica
@@ -336,54 +397,38 @@ class EmpresaService:
         """
         Obtém estatísticas gerais das empresas
         
+        Contagens feitas no banco (sem o limite de 1000 linhas da listagem),
+        com cache curto invalidado nas escritas de empresas e lojas.
+        
         Returns:
             Dict com estatísticas
         """
         try:
-            # Buscar todas as empresas ativas
-            empresas_ativas = await self.repository.listar_empresas(
-                EmpresaFilters(ativo=True), 
-                skip=0, 
-                limit=1000
-            )
-            
-            # Buscar todas as lojas ativas
-            lojas_ativas = await self.repository.listar_lojas(
-                LojaFilters(ativo=True), 
-                skip=0, 
-                limit=1000
-            )
-            
-            # Calcular estatísticas
-            total_empresas = len(empresas_ativas)
-            total_lojas = len(lojas_ativas)
-            media_lojas_por_empresa = round(total_lojas / total_empresas, 2) if total_empresas > 0 else 0
-            
-            # Empresas com mais lojas
-            empresas_com_lojas = {}
-            for loja in lojas_ativas:
-                empresa_id = loja['empresa_id']
-                if empresa_id not in empresas_com_lojas:
-                    empresas_com_lojas[empresa_id] = 0
-                empresas_com_lojas[empresa_id] += 1
-            
-            empresa_com_mais_lojas = max(empresas_com_lojas.values()) if empresas_com_lojas else 0
-            
-            estatisticas = {
-                "total_empresas_ativas": total_empresas,
-                "total_lojas_ativas": total_lojas,
-                "media_lojas_por_empresa": media_lojas_por_empresa,
-                "empresa_com_mais_lojas": empresa_com_mais_lojas,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            logger.debug(f"Estatísticas calculadas: {estatisticas}")
-            return estatisticas
+            return await get_cache_estatisticas().obter(self._chave_estatisticas, self._calcular_estatisticas)
             
         except Exception as e:
             logger.error(f"Erro ao calcular estatísticas: {str(e)}")
             raise Exception(f"Erro ao calcular estatísticas: {str(e)}")
     
+    async def _calcular_estatisticas(self) -> Dict[str, Any]:
+        total_empresas, lojas_por_empresa = await asyncio.gather(
+            self.repository.contar_empresas_ativas(),
+            self.repository.contar_lojas_ativas_por_empresa()
+        )
+        
+        total_lojas = sum(lojas_por_empresa.values())
+        
+        estatisticas = {
+            "total_empresas_ativas": total_empresas,
+            "total_lojas_ativas": total_lojas,
+            "media_lojas_por_empresa": round(total_lojas / total_empresas, 2) if total_empresas > 0 else 0,
+            "empresa_com_mais_lojas": max(lojas_por_empresa.values()) if lojas_por_empresa else 0,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        logger.debug(f"Estatísticas calculadas: {estatisticas}")
+        return estatisticas
+    
     # ===== VALIDAÇÕES =====
     
     async def validar_dados_empresa(self, empresa_data: EmpresaCreate) -> Dict[str, Any]:
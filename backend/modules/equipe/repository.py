@@ -1,9 +1,12 @@
 # Repository para Equipe - DADOS REAIS SUPABASE
 from modules.shared.database import get_supabase_client
+from core.database import execute_query
+from core.estatisticas import contar_por_grupo, get_cache_estatisticas, invalidar_estatisticas, nomes_por_id
 from .schemas import EquipeCreate, EquipeUpdate, EquipeResponse
 from typing import List, Optional, Dict, Any
 import logging
 from datetime import datetime
+import asyncio
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +41,7 @@ class EquipeRepository:
             # Ordenar por nome
             query = query.order("nome")
             
-            response = query.execute()
+            response = await execute_query(query)
             
             if not response.data:
                 logger.warning("⚠️ Nenhum funcionário encontrado")
@@ -73,11 +76,11 @@ class EquipeRepository:
         try:
             logger.info(f"🔍 Buscando funcionário ID: {funcionario_id}")
             
-            response = self.supabase.table(self.table_name).select("""
+            response = await execute_query(self.supabase.table(self.table_name).select("""
                 *,
                 cad_setores!setor_id(nome),
                 c_lojas!loja_id(nome)
-            """).eq("id", funcionario_id).execute()
+            """).eq("id", funcionario_id))
             
             if not response.data:
                 logger.warning(f"⚠️ Funcionário {funcionario_id} não encontrado")
@@ -117,12 +120,13 @@ class EquipeRepository:
                 if hasattr(value, '__float__'):
                     data[key] = float(value)
             
-            response = self.supabase.table(self.table_name).insert(data).execute()
+            response = await execute_query(self.supabase.table(self.table_name).insert(data))
             
             if not response.data:
                 raise Exception("Falha na inserção - dados não retornados")
             
             funcionario_criado = response.data[0]
+            invalidar_estatisticas("equipe")
             logger.info(f"✅ Funcionário {funcionario_criado['nome']} criado com ID: {funcionario_criado['id']}")
             
             # Buscar com relacionamentos para retorno completo
@@ -150,13 +154,14 @@ class EquipeRepository:
                 if hasattr(value, '__float__'):
                     data[key] = float(value)
             
-            response = self.supabase.table(self.table_name).update(data).eq("id", funcionario_id).execute()
+            response = await execute_query(self.supabase.table(self.table_name).update(data).eq("id", funcionario_id))
             
             if not response.data:
                 logger.warning(f"⚠️ Funcionário {funcionario_id} não encontrado para atualização")
                 return None
             
             funcionario_atualizado = response.data[0]
+            invalidar_estatisticas("equipe")
             logger.info(f"✅ Funcionário {funcionario_atualizado['nome']} atualizado com sucesso")
             
             # Buscar com relacionamentos para retorno completo
@@ -177,13 +182,14 @@ class EquipeRepository:
                 "updated_at": datetime.utcnow().isoformat()
             }
             
-            response = self.supabase.table(self.table_name).update(data).eq("id", funcionario_id).execute()
+            response = await execute_query(self.supabase.table(self.table_name).update(data).eq("id", funcionario_id))
             
             if not response.data:
                 logger.warning(f"⚠️ Funcionário {funcionario_id} não encontrado para exclusão")
                 return False
             
             funcionario_excluido = response.data[0]
+            invalidar_estatisticas("equipe")
             logger.info(f"✅ Funcionário {funcionario_excluido['nome']} marcado como inativo")
             return True
             
@@ -209,11 +215,12 @@ class EquipeRepository:
                 "updated_at": datetime.utcnow().isoformat()
             }
             
-            response = self.supabase.table(self.table_name).update(data).eq("id", funcionario_id).execute()
+            response = await execute_query(self.supabase.table(self.table_name).update(data).eq("id", funcionario_id))
             
             if not response.data:
                 return None
             
+            invalidar_estatisticas("equipe")
             logger.info(f"✅ Status do funcionário {funcionario_atual.nome} alterado para: {'ATIVO' if novo_status else 'INATIVO'}")
             
             # Retornar dados atualizados
@@ -224,43 +231,63 @@ class EquipeRepository:
             raise Exception(f"Erro ao alternar status: {str(e)}")
     
     async def get_stats(self) -> Dict[str, Any]:
-        """Obter estatísticas da equipe"""
+        """
+        Obter estatísticas da equipe
+        
+        Contagens agrupadas no banco (ativo, loja, setor) com cache curto,
+        sem carregar os funcionários. Os setores são gravados direto no
+        Supabase pelo frontend (sem passar por aqui para invalidar o cache),
+        então os nomes dos setores são lidos a cada chamada.
+        """
         try:
-            logger.info("📊 Calculando estatísticas da equipe")
+            stats = await get_cache_estatisticas().obter("equipe", self._calcular_stats)
             
-            funcionarios = await self.list_all()
+            por_setor_id = stats.pop("por_setor_id")
+            nomes_setores = await nomes_por_id(self.supabase, "cad_setores", por_setor_id)
             
-            total = len(funcionarios)
-            ativos = len([f for f in funcionarios if f.ativo])
-            inativos = total - ativos
-            
-            # Estatísticas por loja
-            por_loja = {}
-            for f in funcionarios:
-                loja = f.loja_nome or "Sem loja"
-                por_loja[loja] = por_loja.get(loja, 0) + 1
-            
-            # Estatísticas por setor
+            # Por setor pelo nome, como na listagem
             por_setor = {}
-            for f in funcionarios:
-                setor = f.setor_nome or "Sem setor"
-                por_setor[setor] = por_setor.get(setor, 0) + 1
-            
-            stats = {
-                "total": total,
-                "ativos": ativos,
-                "inativos": inativos,
-                "por_loja": por_loja,
-                "por_setor": por_setor,
-                "ultima_atualizacao": datetime.utcnow().isoformat()
-            }
+            for setor_id, quantidade in por_setor_id.items():
+                setor = nomes_setores.get(str(setor_id)) or "Sem setor"
+                por_setor[setor] = por_setor.get(setor, 0) + quantidade
             
-            logger.info(f"✅ Estatísticas calculadas: {total} funcionários total")
+            stats["por_setor"] = por_setor
             return stats
             
         except Exception as e:
             logger.error(f"❌ Erro ao calcular estatísticas: {e}")
             raise Exception(f"Erro ao calcular estatísticas: {str(e)}")
+    
+    async def _calcular_stats(self) -> Dict[str, Any]:
+        logger.info("📊 Calculando estatísticas da equipe")
+        
+        por_status, por_loja_id, por_setor_id = await asyncio.gather(
+            contar_por_grupo(self.supabase, self.table_name, "ativo"),
+            contar_por_grupo(self.supabase, self.table_name, "loja_id"),
+            contar_por_grupo(self.supabase, self.table_name, "setor_id")
+        )
+        nomes_lojas = await nomes_por_id(self.supabase, "c_lojas", por_loja_id)
+        
+        total = sum(por_status.values())
+        ativos = por_status.get(True, 0)
+        
+        # Estatísticas por loja (pelo nome, como na listagem)
+        por_loja = {}
+        for loja_id, quantidade in por_loja_id.items():
+            loja = nomes_lojas.get(str(loja_id)) or "Sem loja"
+            por_loja[loja] = por_loja.get(loja, 0) + quantidade
+        
+        stats = {
+            "total": total,
+            "ativos": ativos,
+            "inativos": total - ativos,
+            "por_loja": por_loja,
+            "por_setor_id": por_setor_id,
+            "ultima_atualizacao": datetime.utcnow().isoformat()
+        }
+        
+        logger.info(f"✅ Estatísticas calculadas: {total} funcionários total")
+        return stats
 
 # Função legacy para compatibilidade
 async def repo_list_equipe():
@@ -4,6 +4,7 @@ from uuid import UUID
 import logging
 import time
 
+from core.exceptions import ValidationException
 from .service import LojaService
 from .schemas import (
     LojaCreate, LojaUpdate, LojaResponse, LojaFilters, 
@@ -91,25 +92,49 @@ async def criar_loja(
 
 @router.get("/", response_model=dict)
 async def listar_lojas(
+    q: Optional[str] = Query(None, min_length=1, description="Busca por nome, código, email ou telefone (ignora acentos; resultados por relevância)"),
     nome: Optional[str] = Query(None, description="Filtro por nome"),
     codigo: Optional[str] = Query(None, description="Filtro por código"),
     empresa_id: Optional[UUID] = Query(None, description="Filtro por empresa"),
     ativo: Optional[bool] = Query(None, description="Filtro por status ativo"),
     page: int = Query(1, ge=1, description="Número da página"),
     per_page: int = Query(20, ge=1, le=100, description="Itens por página"),
+    cursor: Optional[str] = Query(None, description="Paginação por cursor: vazio para a primeira página, depois o next_cursor recebido"),
     service: LojaService = Depends(get_loja_service)
 ):
-    """Listar lojas com filtros e paginação"""
+    """Listar lojas com filtros e paginação (page/per_page ou cursor)"""
     try:
         filters = LojaFilters(
+            q=q,
             nome=nome,
             codigo=codigo,
             empresa_id=empresa_id,
             ativo=ativo,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            cursor=cursor
         )
         
+        if cursor is not None:
+            lojas, next_cursor = await service.list_lojas_page(filters)
+            
+            return {
+                "success": True,
+                "message": f"{len(lojas)} loja(s) encontrada(s)",
+                "data": {
+                    "lojas": [LojaListItem(**loja.model_dump()) for loja in lojas],
+                    "pagination": {
+                        "per_page": per_page,
+                        "next_cursor": next_cursor
+                    }
+                },
+                "fonte": "supabase",
+                "projeto": "fluyt_comercial",
+                "tabelas": ["c_lojas"],
+                "mock": False,
+                "timestamp": time.time()
+            }
+        
         lojas, total = await service.list_lojas(filters)
         
         return {
@@ -131,6 +156,8 @@ async def listar_lojas(
             "mock": False,
             "timestamp": time.time()
         }
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         logger.error(f"Erro ao listar lojas: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
@@ -2,12 +2,20 @@ from typing import List, Optional, Dict, Any
 from uuid import UUID
 import logging
 from datetime import datetime
+import asyncio
 
 from modules.shared.database import get_supabase_client
+from core.busca import aplicar_busca
+from core.database import execute_query
+from core.estatisticas import contar_por_grupo, get_cache_estatisticas, invalidar_estatisticas
+from core.paginacao import CursorKeyset, aplicar_cursor, fatiar_pagina
 from .schemas import LojaCreate, LojaUpdate, LojaResponse, LojaFilters
 
 logger = logging.getLogger(__name__)
 
+# Estatísticas que dependem de c_lojas (contagens e nomes por loja na equipe)
+ESTATISTICAS_AFETADAS = ("lojas", "empresas", "equipe")
+
 class LojaRepository:
     """Repository para operações de lojas no Supabase"""
     
@@ -34,12 +42,13 @@ class LojaRepository:
             }
             
             # Inserir no Supabase
-            response = self.supabase.table(self.table_name).insert(insert_data).execute()
+            response = await execute_query(self.supabase.table(self.table_name).insert(insert_data))
             
             if not response.data:
                 raise Exception("Erro ao criar loja no Supabase")
             
             loja_criada = response.data[0]
+            invalidar_estatisticas(*ESTATISTICAS_AFETADAS)
             logger.info(f"Loja criada com sucesso: {loja_criada['nome']} (ID: {loja_criada['id']})")
             
             return LojaResponse(**loja_criada)
@@ -51,7 +60,7 @@ class LojaRepository:
     async def get_by_id(self, loja_id: UUID) -> Optional[LojaResponse]:
         """Buscar loja por ID"""
         try:
-            response = self.supabase.table(self.table_name).select("*").eq("id", str(loja_id)).execute()
+            response = await execute_query(self.supabase.table(self.table_name).select("*").eq("id", str(loja_id)))
             
             if not response.data:
                 return None
@@ -65,7 +74,7 @@ class LojaRepository:
     async def get_by_codigo(self, codigo: str) -> Optional[LojaResponse]:
         """Buscar loja por código"""
         try:
-            response = self.supabase.table(self.table_name).select("*").eq("codigo", codigo).execute()
+            response = await execute_query(self.supabase.table(self.table_name).select("*").eq("codigo", codigo))
             
             if not response.data:
                 return None
@@ -76,6 +85,22 @@ class LojaRepository:
             logger.error(f"Erro ao buscar loja por código {codigo}: {str(e)}")
             raise Exception(f"Erro ao buscar loja por código: {str(e)}")
     
+    def _apply_filters(self, query, filters: LojaFilters):
+        """Aplica os filtros de listagem na query"""
+        if filters.nome:
+            query = query.ilike("nome", f"%{filters.nome}%")
+        
+        if filters.codigo:
+            query = query.eq("codigo", filters.codigo)
+        
+        if filters.empresa_id:
+            query = query.eq("empresa_id", str(filters.empresa_id))
+        
+        if filters.ativo is not None:
+            query = query.eq("ativo", filters.ativo)
+        
+        return query
+    
     async def list_all(self, filters: LojaFilters) -> tuple[List[LojaResponse], int]:
         """Listar lojas com filtros e paginação"""
         try:
@@ -83,17 +108,7 @@ class LojaRepository:
             query = self.supabase.table(self.table_name).select("*", count="exact")
             
             # Aplicar filtros
-            if filters.nome:
-                query = query.ilike("nome", f"%{filters.nome}%")
-            
-            if filters.codigo:
-                query = query.eq("codigo", filters.codigo)
-            
-            if filters.empresa_id:
-                query = query.eq("empresa_id", str(filters.empresa_id))
-            
-            if filters.ativo is not None:
-                query = query.eq("ativo", filters.ativo)
+            query = self._apply_filters(query, filters)
             
             # Aplicar ordenação
             query = query.order("nome", desc=False)
@@ -103,7 +118,7 @@ class LojaRepository:
             query = query.range(offset, offset + filters.per_page - 1)
             
             # Executar query
-            response = query.execute()
+            response = await execute_query(query)
             
             lojas = [LojaResponse(**loja) for loja in response.data]
             total = response.count or 0
@@ -116,16 +131,49 @@ class LojaRepository:
             logger.error(f"Erro ao listar lojas: {str(e)}")
             raise Exception(f"Erro ao listar lojas: {str(e)}")
     
+    async def list_page(self, filters: LojaFilters) -> tuple[List[LojaResponse], Optional[str]]:
+        """Listar lojas com paginação keyset (created_at, id) a partir de filters.cursor"""
+        posicao = CursorKeyset.decodificar(filters.cursor)
+        
+        try:
+            query = self._apply_filters(self.supabase.table(self.table_name).select("*"), filters)
+            query = aplicar_cursor(query, posicao, filters.per_page)
+            
+            response = await execute_query(query)
+            registros, next_cursor = fatiar_pagina(response.data, filters.per_page)
+            
+            lojas = [LojaResponse(**loja) for loja in registros]
+            logger.info(f"Listagem de lojas (cursor): {len(lojas)} encontradas")
+            
+            return lojas, next_cursor
+            
+        except Exception as e:
+            logger.error(f"Erro ao listar lojas: {str(e)}")
+            raise Exception(f"Erro ao listar lojas: {str(e)}")
+    
+    async def search(self, filters: LojaFilters, limite: int) -> List[Dict[str, Any]]:
+        """Candidatos da busca ranqueada (q=) pelas colunas normalizadas, sem ranqueamento (ver core.busca)"""
+        try:
+            query = aplicar_busca(self._apply_filters(self.supabase.table(self.table_name).select("*"), filters), filters.q)
+            if query is None:
+                return []
+            
+            response = await execute_query(query.order("created_at", desc=True).limit(limite))
+            return response.data
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar lojas: {str(e)}")
+            raise Exception(f"Erro ao buscar lojas: {str(e)}")
+    
     async def list_by_empresa(self, empresa_id: UUID) -> List[LojaResponse]:
         """Listar lojas de uma empresa específica"""
         try:
-            response = (
+            response = await execute_query(
                 self.supabase.table(self.table_name)
                 .select("*")
                 .eq("empresa_id", str(empresa_id))
                 .eq("ativo", True)
                 .order("nome")
-                .execute()
             )
             
             lojas = [LojaResponse(**loja) for loja in response.data]
@@ -166,17 +214,17 @@ class LojaRepository:
             update_data["updated_at"] = datetime.utcnow().isoformat()
             
             # Atualizar no Supabase
-            response = (
+            response = await execute_query(
                 self.supabase.table(self.table_name)
                 .update(update_data)
                 .eq("id", str(loja_id))
-                .execute()
             )
             
             if not response.data:
                 return None
             
             loja_atualizada = response.data[0]
+            invalidar_estatisticas(*ESTATISTICAS_AFETADAS)
             logger.info(f"Loja atualizada: {loja_atualizada['nome']} (ID: {loja_id})")
             
             return LojaResponse(**loja_atualizada)
@@ -188,19 +236,19 @@ class LojaRepository:
     async def delete(self, loja_id: UUID) -> bool:
         """Deletar loja (soft delete - marcar como inativo)"""
         try:
-            response = (
+            response = await execute_query(
                 self.supabase.table(self.table_name)
                 .update({
                     "ativo": False,
                     "updated_at": datetime.utcnow().isoformat()
                 })
                 .eq("id", str(loja_id))
-                .execute()
             )
             
             if not response.data:
                 return False
             
+            invalidar_estatisticas(*ESTATISTICAS_AFETADAS)
             logger.info(f"Loja desativada: ID {loja_id}")
             return True
             
@@ -216,7 +264,7 @@ class LojaRepository:
             if exclude_id:
                 query = query.neq("id", str(exclude_id))
             
-            response = query.execute()
+            response = await execute_query(query)
             
             return len(response.data) > 0
             
@@ -225,39 +273,30 @@ class LojaRepository:
             raise Exception(f"Erro ao verificar código: {str(e)}")
     
     async def get_stats(self) -> Dict[str, Any]:
-        """Obter estatísticas das lojas"""
+        """Obter estatísticas das lojas (contagens agrupadas no banco, com cache curto)"""
         try:
-            # Total de lojas
-            total_response = self.supabase.table(self.table_name).select("id", count="exact").execute()
-            total = total_response.count or 0
-            
-            # Lojas ativas
-            ativas_response = (
-                self.supabase.table(self.table_name)
-                .select("id", count="exact")
-                .eq("ativo", True)
-                .execute()
-            )
-            ativas = ativas_response.count or 0
-            
-            # Lojas por empresa
-            por_empresa_response = (
-                self.supabase.table(self.table_name)
-                .select("empresa_id", count="exact")
-                .eq("ativo", True)
-                .execute()
-            )
-            
-            stats = {
-                "total_lojas": total,
-                "lojas_ativas": ativas,
-                "lojas_inativas": total - ativas,
-                "ultima_atualizacao": datetime.utcnow().isoformat()
-            }
-            
-            logger.info(f"Stats de lojas: {stats}")
-            return stats
+            return await get_cache_estatisticas().obter("lojas", self._calcular_stats)
             
         except Exception as e:
             logger.error(f"Erro ao obter stats de lojas: {str(e)}")
-            raise Exception(f"Erro ao obter estatísticas: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Erro ao obter estatísticas: {str(e)}")
+    
+    async def _calcular_stats(self) -> Dict[str, Any]:
+        por_status, por_empresa = await asyncio.gather(
+            contar_por_grupo(self.supabase, self.table_name, "ativo"),
+            contar_por_grupo(self.supabase, self.table_name, "empresa_id", {"ativo": True})
+        )
+        
+        total = sum(por_status.values())
+        ativas = por_status.get(True, 0)
+        
+        stats = {
+            "total_lojas": total,
+            "lojas_ativas": ativas,
+            "lojas_inativas": total - ativas,
+            "lojas_ativas_por_empresa": {str(empresa_id): quantidade for empresa_id, quantidade in por_empresa.items()},
+            "ultima_atualizacao": datetime.utcnow().isoformat()
+        }
+        
+        logger.info(f"Stats de lojas: {total} lojas, {ativas} ativas")
+        return stats
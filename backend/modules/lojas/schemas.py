@@ -64,6 +64,7 @@ class LojaListItem(BaseModel):
 
 class LojaFilters(BaseModel):
     """Filtros para busca de lojas"""
+    q: Optional[str] = Field(None, description="Busca ranqueada por nome, código, email ou telefone (sem acentos)")
     nome: Optional[str] = Field(None, description="Filtro por nome (busca parcial)")
     codigo: Optional[str] = Field(None, description="Filtro por código")
     empresa_id: Optional[UUID] = Field(None, description="Filtro por empresa")
@@ -72,6 +73,7 @@ class LojaFilters(BaseModel):
     # Paginação
     page: int = Field(1, ge=1, description="Número da página")
     per_page: int = Field(20, ge=1, le=100, description="Itens por página")
+    cursor: Optional[str] = Field(None, description="Cursor keyset (vazio = primeira página)")
 
 # === SCHEMAS DE RELACIONAMENTO ===
 
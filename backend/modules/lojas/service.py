@@ -6,9 +6,17 @@ from datetime import datetime
 from .repository import LojaRepository
 from .schemas import LojaCreate, LojaUpdate, LojaResponse, LojaFilters, LojaComRelacionamentos
 from modules.shared.database import get_supabase_client
+from core.database import execute_query
+from core.exceptions import ValidationException
+from core.busca import ranquear
+from core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Busca ranqueada (q=): campos pesquisados com seus pesos
+CAMPOS_BUSCA_LOJAS = {"nome": 1.0, "codigo": 0.9, "email": 0.5}
+CAMPOS_DIGITOS_LOJAS = {"telefone": 0.8}
+
 class LojaService:
     """Service para lógica de negócio das lojas"""
     
@@ -21,7 +29,7 @@ class LojaService:
         """Criar nova loja com validações"""
         try:
             # Validar se empresa existe
-            empresa_result = self.supabase.table('cad_empresas').select('id, nome, ativo').eq('id', str(loja_data.empresa_id)).execute()
+            empresa_result = await execute_query(self.supabase.table('cad_empresas').select('id, nome, ativo').eq('id', str(loja_data.empresa_id)))
             if not empresa_result.data:
                 raise ValueError(f"Empresa {loja_data.empresa_id} não encontrada")
             
@@ -71,7 +79,7 @@ class LojaService:
                 return None
             
             # Carregar empresa
-            empresa_result = self.supabase.table('cad_empresas').select('id, nome').eq('id', str(loja.empresa_id)).execute()
+            empresa_result = await execute_query(self.supabase.table('cad_empresas').select('id, nome').eq('id', str(loja.empresa_id)))
             empresa = empresa_result.data[0] if empresa_result.data else None
             
             # Montar resposta com relacionamentos
@@ -86,18 +94,39 @@ class LojaService:
             raise Exception(f"Erro interno ao buscar loja: {str(e)}")
     
     async def list_lojas(self, filters: LojaFilters) -> tuple[List[LojaResponse], int]:
-        """Listar lojas com filtros"""
+        """Listar lojas com filtros (com q, em ordem de relevância)"""
         try:
+            if filters.q:
+                return await self.search_lojas(filters)
             return await self.repository.list_all(filters)
         except Exception as e:
             logger.error(f"Erro no service ao listar lojas: {str(e)}")
             raise Exception(f"Erro interno ao listar lojas: {str(e)}")
     
+    async def search_lojas(self, filters: LojaFilters) -> tuple[List[LojaResponse], int]:
+        """Busca ranqueada (q=) entre os candidatos do banco (page/per_page sobre o ranking, total limitado a BUSCA_MAX_CANDIDATOS)"""
+        candidatos = await self.repository.search(filters, get_settings().busca_max_candidatos)
+        ranking = ranquear(candidatos, filters.q, CAMPOS_BUSCA_LOJAS, CAMPOS_DIGITOS_LOJAS)
+        offset = (filters.page - 1) * filters.per_page
+        return [LojaResponse(**loja) for loja in ranking[offset:offset + filters.per_page]], len(ranking)
+    
+    async def list_lojas_page(self, filters: LojaFilters) -> tuple[List[LojaResponse], Optional[str]]:
+        """Listar lojas por cursor (retorna lojas e next_cursor)"""
+        try:
+            if filters.q:
+                raise ValidationException("A busca por q usa paginação page/per_page", field="cursor")
+            return await self.repository.list_page(filters)
+        except ValidationException:
+            raise
+        except Exception as e:
+            logger.error(f"Erro no service ao listar lojas: {str(e)}")
+            raise Exception(f"Erro interno ao listar lojas: {str(e)}")
+    
     async def list_lojas_by_empresa(self, empresa_id: UUID) -> List[LojaResponse]:
         """Listar lojas de uma empresa"""
         try:
             # Validar se empresa existe
-            empresa_result = self.supabase.table('cad_empresas').select('id').eq('id', str(empresa_id)).execute()
+            empresa_result = await execute_query(self.supabase.table('cad_empresas').select('id').eq('id', str(empresa_id)))
             if not empresa_result.data:
                 raise ValueError(f"Empresa {empresa_id} não encontrada")
             
@@ -120,7 +149,7 @@ class LojaService:
             
             # Validar empresa se foi alterada
             if loja_data.empresa_id and loja_data.empresa_id != loja_atual.empresa_id:
-                empresa_result = self.supabase.table('cad_empresas').select('id, ativo').eq('id', str(loja_data.empresa_id)).execute()
+                empresa_result = await execute_query(self.supabase.table('cad_empresas').select('id, ativo').eq('id', str(loja_data.empresa_id)))
                 if not empresa_result.data:
                     raise ValueError(f"Empresa {loja_data.empresa_id} não encontrada")
                 empresa = empresa_result.data[0]
@@ -0,0 +1,143 @@
+"""
+Cache em processo das tabelas de comissão compiladas.
+
+As faixas de config_regras_comissao_faixa quase nunca mudam, mas eram
+buscadas (e convertidas com pd.to_numeric) duas vezes a cada orçamento.
+Aqui guardamos a TabelaComissao já compilada por (loja_id, tipo_comissao),
+com expiração por TTL. As faixas são editadas direto no banco (nenhum
+módulo da API grava config_regras_comissao_faixa), então a invalidação é
+manual: POST /orcamentos/comissao/cache/invalidar (Admin Master) após a
+edição, ou o TTL (COMISSAO_CACHE_TTL_SECONDS).
+
+Cada invalidação avança uma geração: quem leu as faixas antes de uma
+edição concorrente não grava a tabela antiga depois dela (ver armazenar).
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+import threading
+import logging
+import time
+
+from core.config import get_settings
+from .comissao import TabelaComissao
+
+logger = logging.getLogger(__name__)
+
+ChaveCache = Tuple[str, str]
+
+
+class CacheTabelasComissao:
+    """
+    Cache de TabelaComissao por (loja_id, tipo_comissao).
+
+    Args:
+        ttl_seconds: Tempo de vida de cada entrada (0 desativa o cache)
+        relogio: Função de tempo monotônico (injetável para testes)
+    """
+
+    def __init__(self, ttl_seconds: int, relogio: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._entradas: Dict[ChaveCache, Tuple[TabelaComissao, float]] = {}
+        self._geracao = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+        self.descartes = 0
+
+    def obter(self, loja_id: str, tipo: str) -> Optional[TabelaComissao]:
+        """Retorna a tabela em cache ou None (miss ou expirada)"""
+        chave = (str(loja_id), tipo)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[1] > self._relogio():
+                self.hits += 1
+                return entrada[0]
+
+            if entrada is not None:
+                del self._entradas[chave]
+            self.misses += 1
+            return None
+
+    def geracao(self) -> int:
+        """Geração atual; ler antes de buscar as faixas no banco e repassar a armazenar"""
+        with self._lock:
+            return self._geracao
+
+    def armazenar(self, loja_id: str, tipo: str, tabela: TabelaComissao, geracao: Optional[int] = None) -> None:
+        """
+        Guarda a tabela compilada até o TTL expirar
+
+        Args:
+            geracao: Valor de geracao() lido antes da busca; se houve
+                invalidação desde então, a tabela (possivelmente antiga) não é guardada
+        """
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if geracao is not None and geracao != self._geracao:
+                self.descartes += 1
+                return
+            self._entradas[(str(loja_id), tipo)] = (tabela, self._relogio() + self.ttl_seconds)
+
+    def invalidar(self, loja_id: Optional[str] = None, tipo: Optional[str] = None) -> int:
+        """
+        Remove entradas do cache.
+
+        Args:
+            loja_id: Loja afetada (None = todas)
+            tipo: Tipo de comissão afetado (None = todos)
+
+        Returns:
+            Quantidade de entradas removidas
+        """
+        with self._lock:
+            chaves = [
+                chave for chave in self._entradas
+                if (loja_id is None or chave[0] == str(loja_id))
+                and (tipo is None or chave[1] == tipo)
+            ]
+            for chave in chaves:
+                del self._entradas[chave]
+            self._geracao += 1
+            self.invalidacoes += 1
+
+        logger.debug(f"Cache de comissão invalidado: loja={loja_id or '*'} tipo={tipo or '*'} ({len(chaves)} entradas)")
+        return len(chaves)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores do cache (expostos no /health)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entradas),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidacoes,
+                "stale_discarded": self.descartes
+            }
+
+
+# Instância global do cache
+_cache_comissao: Optional[CacheTabelasComissao] = None
+
+
+def get_cache_comissao() -> CacheTabelasComissao:
+    """Retorna o cache global, criando-o sob demanda"""
+    global _cache_comissao
+
+    if _cache_comissao is None:
+        _cache_comissao = CacheTabelasComissao(get_settings().comissao_cache_ttl_seconds)
+
+    return _cache_comissao
+
+
+def invalidar_regras_comissao(loja_id: Optional[str] = None, tipo: Optional[str] = None) -> int:
+    """
+    Hook de invalidação: chamar sempre que config_regras_comissao_faixa
+    for alterada (insert/update/delete) para a loja/tipo informados.
+    """
+    return get_cache_comissao().invalidar(loja_id, tipo)
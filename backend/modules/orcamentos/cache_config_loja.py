@@ -0,0 +1,171 @@
+"""
+Cache versionado da configuração da loja (config_loja).
+
+Cada cálculo de orçamento lia config_loja duas vezes (validação de desconto
+e cálculo de custos). O cache tem dois níveis:
+- processo: snapshot por loja com TTL, compartilhado entre requisições
+- requisição: o OrcamentoService (criado por requisição) guarda o snapshot
+  obtido e o reutiliza em todas as etapas do mesmo cálculo
+
+A versão do snapshot é um hash do conteúdo lido do banco: igual em todos os
+workers e reinícios para a mesma configuração, diferente quando ela muda,
+permitindo auditar com qual configuração o orçamento foi calculado
+(detalhes_calculo.config_snapshot.versao_config).
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import json
+import threading
+import logging
+import time
+
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Campos que mudam a cada orçamento criado (contador e seu carimbo) e não alteram o cálculo
+CAMPOS_FORA_DA_VERSAO = ('proximo_numero_orcamento', 'updated_at')
+
+# Caracteres hexadecimais do SHA-256 usados como versão
+TAMANHO_VERSAO = 12
+
+
+def versao_config(dados: Dict[str, Any]) -> str:
+    """Hash do conteúdo da config_loja (sem CAMPOS_FORA_DA_VERSAO), estável entre processos"""
+    conteudo = {campo: valor for campo, valor in dados.items() if campo not in CAMPOS_FORA_DA_VERSAO}
+    serializado = json.dumps(conteudo, sort_keys=True, default=str)
+    return hashlib.sha256(serializado.encode()).hexdigest()[:TAMANHO_VERSAO]
+
+
+class ConfigLojaSnapshot:
+    """Cópia imutável (por convenção) de uma linha de config_loja"""
+
+    def __init__(self, loja_id: str, versao: str, dados: Dict[str, Any]):
+        self.loja_id = loja_id
+        self.versao = versao
+        self.dados = dados
+
+    def __getitem__(self, campo: str) -> Any:
+        return self.dados[campo]
+
+    def get(self, campo: str, padrao: Any = None) -> Any:
+        return self.dados.get(campo, padrao)
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Snapshot para persistir em detalhes_calculo/config_snapshot"""
+        return {**self.dados, 'versao_config': self.versao}
+
+
+class CacheConfigLoja:
+    """
+    Cache de ConfigLojaSnapshot por loja_id.
+
+    Args:
+        ttl_seconds: Tempo de vida de cada snapshot (0 desativa o cache)
+        relogio: Função de tempo monotônico (injetável para testes)
+    """
+
+    def __init__(self, ttl_seconds: int, relogio: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._entradas: Dict[str, Tuple[ConfigLojaSnapshot, float]] = {}
+        self._geracao = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+        self.descartes = 0
+
+    def obter(self, loja_id: str) -> Optional[ConfigLojaSnapshot]:
+        """Retorna o snapshot em cache ou None (miss ou expirado)"""
+        chave = str(loja_id)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[1] > self._relogio():
+                self.hits += 1
+                return entrada[0]
+
+            if entrada is not None:
+                del self._entradas[chave]
+            self.misses += 1
+            return None
+
+    def geracao(self) -> int:
+        """Geração atual; ler antes de buscar config_loja no banco e repassar a armazenar"""
+        with self._lock:
+            return self._geracao
+
+    def armazenar(self, loja_id: str, dados: Dict[str, Any], geracao: Optional[int] = None) -> ConfigLojaSnapshot:
+        """
+        Registra a linha lida do banco e retorna o snapshot versionado.
+        A versão só muda se o conteúdo mudou (o contador de numeração não
+        conta como mudança).
+
+        Args:
+            geracao: Valor de geracao() lido antes da busca; se houve
+                invalidação desde então, o snapshot (possivelmente antigo)
+                é retornado mas não é guardado
+        """
+        chave = str(loja_id)
+        snapshot = ConfigLojaSnapshot(chave, versao_config(dados), dict(dados))
+        with self._lock:
+            if geracao is not None and geracao != self._geracao:
+                self.descartes += 1
+            elif self.ttl_seconds > 0:
+                self._entradas[chave] = (snapshot, self._relogio() + self.ttl_seconds)
+
+        return snapshot
+
+    def invalidar(self, loja_id: Optional[str] = None) -> int:
+        """
+        Descarta snapshots (a próxima leitura traz a versão do conteúdo atual).
+
+        Args:
+            loja_id: Loja afetada (None = todas)
+
+        Returns:
+            Quantidade de entradas removidas
+        """
+        with self._lock:
+            chaves = [chave for chave in self._entradas if loja_id is None or chave == str(loja_id)]
+            for chave in chaves:
+                del self._entradas[chave]
+            self._geracao += 1
+            self.invalidacoes += 1
+
+        logger.debug(f"Cache de config_loja invalidado: loja={loja_id or '*'} ({len(chaves)} entradas)")
+        return len(chaves)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores do cache (expostos no /health)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entradas),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidacoes,
+                "stale_discarded": self.descartes
+            }
+
+
+# Instância global do cache
+_cache_config_loja: Optional[CacheConfigLoja] = None
+
+
+def get_cache_config_loja() -> CacheConfigLoja:
+    """Retorna o cache global, criando-o sob demanda"""
+    global _cache_config_loja
+
+    if _cache_config_loja is None:
+        _cache_config_loja = CacheConfigLoja(get_settings().config_loja_cache_ttl_seconds)
+
+    return _cache_config_loja
+
+
+def invalidar_config_loja(loja_id: Optional[str] = None) -> int:
+    """Hook de invalidação: chamar sempre que config_loja for alterada"""
+    return get_cache_config_loja().invalidar(loja_id)
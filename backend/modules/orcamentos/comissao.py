@@ -0,0 +1,156 @@
+"""
+Engine vetorizado de comissão por FAIXA ÚNICA.
+
+Compila a tabela de faixas (config_regras_comissao_faixa) em arrays numpy
+ordenados e localiza a faixa de cada valor por busca binária nas fronteiras,
+permitindo calcular milhões de valores de venda de uma só vez
+(relatórios de margem, simulações).
+
+Regra de negócio (idêntica a OrcamentoService.calcular_comissao_faixa_unica_pandas):
+- Faixas avaliadas em ordem crescente de valor_minimo
+- Aplica-se a PRIMEIRA faixa com valor_minimo <= valor <= valor_maximo
+- valor_maximo nulo (NaN) = faixa aberta (infinito)
+- Valor fora de todas as faixas = comissão zero, sem faixa aplicada
+"""
+
+from typing import Any, Dict, Optional, Union, Sequence
+import numpy as np
+import pandas as pd
+
+
+class TabelaComissao:
+    """
+    Tabela de faixas de comissão pré-compilada em arrays numpy.
+
+    Atributos (todos ordenados por valor_minimo):
+        valor_minimo: limite inferior de cada faixa
+        valor_maximo: limite superior (np.inf para faixa aberta)
+        percentual: percentual aplicado sobre o valor total
+        ordem: número da faixa (coluna `ordem` da tabela)
+    """
+
+    def __init__(
+        self,
+        valor_minimo: np.ndarray,
+        valor_maximo: np.ndarray,
+        percentual: np.ndarray,
+        ordem: np.ndarray
+    ):
+        self.valor_minimo = valor_minimo
+        self.valor_maximo = valor_maximo
+        self.percentual = percentual
+        self.ordem = ordem
+
+        # Faixas sem sobreposição permitem busca binária direta;
+        # com sobreposição a "primeira faixa" exige varredura por máscara
+        self.sem_sobreposicao = bool(np.all(valor_maximo[:-1] < valor_minimo[1:]))
+
+    @classmethod
+    def from_dataframe(cls, regras_df: pd.DataFrame) -> "TabelaComissao":
+        """Compila o DataFrame retornado por OrcamentoRepository.get_regras_comissao"""
+        if regras_df.empty:
+            vazio = np.empty(0, dtype=float)
+            return cls(vazio, vazio, vazio, vazio)
+
+        regras = regras_df.sort_values('valor_minimo', kind='stable')
+        valor_minimo = pd.to_numeric(regras['valor_minimo'], errors='coerce').to_numpy(dtype=float)
+        valor_maximo = pd.to_numeric(regras['valor_maximo'], errors='coerce').to_numpy(dtype=float)
+        percentual = pd.to_numeric(regras['percentual'], errors='coerce').to_numpy(dtype=float)
+        ordem = pd.to_numeric(regras['ordem'], errors='coerce').to_numpy(dtype=float)
+
+        # valor_minimo nulo nunca casa com nenhum valor (NaN <= x é falso)
+        validas = ~np.isnan(valor_minimo)
+        valor_maximo = np.where(np.isnan(valor_maximo), np.inf, valor_maximo)
+
+        return cls(
+            valor_minimo[validas],
+            valor_maximo[validas],
+            percentual[validas],
+            ordem[validas]
+        )
+
+    @property
+    def vazia(self) -> bool:
+        return self.valor_minimo.size == 0
+
+    def localizar_faixas(self, valores: np.ndarray) -> np.ndarray:
+        """
+        Retorna o índice (na tabela ordenada) da faixa de cada valor,
+        ou -1 quando o valor não se encaixa em nenhuma faixa.
+        """
+        if self.vazia:
+            return np.full(valores.shape, -1, dtype=np.int64)
+
+        if self.sem_sobreposicao:
+            # Última faixa com valor_minimo <= valor; válida se valor <= valor_maximo
+            indices = np.searchsorted(self.valor_minimo, valores, side='right') - 1
+            candidatas = np.clip(indices, 0, None)
+            encaixa = (indices >= 0) & (valores <= self.valor_maximo[candidatas])
+            return np.where(encaixa, indices, -1)
+
+        # Sobreposição: percorre da última para a primeira faixa para que
+        # a primeira faixa compatível prevaleça
+        indices = np.full(valores.shape, -1, dtype=np.int64)
+        for i in range(self.valor_minimo.size - 1, -1, -1):
+            encaixa = (self.valor_minimo[i] <= valores) & (valores <= self.valor_maximo[i])
+            indices[encaixa] = i
+        return indices
+
+    def calcular_lote(self, valores_venda: Union[Sequence[float], np.ndarray, pd.Series]) -> pd.DataFrame:
+        """
+        Calcula a comissão de vários valores de venda de uma só vez.
+
+        Returns:
+            pd.DataFrame com colunas:
+            - valor_venda
+            - faixa_aplicada (Int64, <NA> quando nenhuma faixa se aplica)
+            - percentual (0.0 quando nenhuma faixa se aplica)
+            - comissao_total
+        """
+        valores = np.asarray(valores_venda, dtype=float)
+        indices = self.localizar_faixas(valores)
+        encontrada = indices >= 0
+        seguros = np.where(encontrada, indices, 0)
+
+        if self.vazia:
+            percentual = np.zeros(valores.shape, dtype=float)
+            ordem = np.zeros(valores.shape, dtype=float)
+        else:
+            percentual = np.where(encontrada, self.percentual[seguros], 0.0)
+            ordem = self.ordem[seguros]
+
+        faixa = pd.array(ordem, dtype='Float64').astype('Int64')
+        faixa[~encontrada] = pd.NA
+
+        return pd.DataFrame({
+            'valor_venda': valores,
+            'faixa_aplicada': faixa,
+            'percentual': percentual,
+            'comissao_total': np.where(encontrada, valores * percentual, 0.0)
+        })
+
+    def detalhar(self, valor_venda: float) -> Optional[Dict[str, Any]]:
+        """
+        Localiza a faixa de um único valor e retorna seus dados
+        (ou None se nenhuma faixa se aplica).
+        """
+        indice = int(self.localizar_faixas(np.array([valor_venda], dtype=float))[0])
+        if indice < 0:
+            return None
+
+        valor_maximo = float(self.valor_maximo[indice])
+        return {
+            'ordem': int(self.ordem[indice]),
+            'valor_minimo': float(self.valor_minimo[indice]),
+            'valor_maximo': None if np.isinf(valor_maximo) else valor_maximo,
+            'percentual': float(self.percentual[indice])
+        }
+
+
+def calcular_comissao_lote(
+    valores_venda: Union[Sequence[float], np.ndarray, pd.Series],
+    regras: Union[pd.DataFrame, TabelaComissao]
+) -> pd.DataFrame:
+    """Atalho: compila a tabela (se necessário) e calcula o lote"""
+    tabela = regras if isinstance(regras, TabelaComissao) else TabelaComissao.from_dataframe(regras)
+    return tabela.calcular_lote(valores_venda)
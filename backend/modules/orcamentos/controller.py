@@ -4,10 +4,12 @@ Define endpoints REST para operações de orçamento.
 """
 
 from fastapi import APIRouter, Depends, Query, HTTPException, status
-from typing import List, Optional, Dict, Any
-from core.auth import get_current_user, require_admin, require_vendedor_ou_superior
+from typing import List, Optional, Dict, Any, Union
+from core.auth import get_current_user, require_admin, require_gerente_ou_admin, require_vendedor_ou_superior
 from core.database import get_database
 from supabase import Client
+from core.paginacao import PaginaCursor
+from core.exportacao import resposta_exportacao
 import uuid
 
 from .schemas import (
@@ -20,7 +22,9 @@ from .schemas import (
     CalculoCustos,
     RelatorioMargem
 )
-from .services import OrcamentoService
+from modules.aprovacoes.schemas import AprovacaoResponse
+from .services import OrcamentoService, COLUNAS_EXPORTACAO_ORCAMENTOS
+from .cache_comissao import get_cache_comissao, invalidar_regras_comissao
 
 # Router para o módulo de orçamentos
 router = APIRouter()
@@ -49,9 +53,9 @@ async def criar_orcamento(
 
 
 @router.get("/",
-    response_model=List[OrcamentoListItem],
+    response_model=Union[List[OrcamentoListItem], PaginaCursor[OrcamentoListItem]],
     summary="Listar orçamentos",
-    description="Lista orçamentos da loja com filtros e paginação"
+    description="Lista orçamentos da loja com filtros e paginação (offset ou cursor)"
 )
 async def listar_orcamentos(
     # Filtros opcionais
@@ -65,6 +69,7 @@ async def listar_orcamentos(
     # Paginação
     skip: int = Query(0, ge=0, description="Registros a pular"),
     limit: int = Query(50, ge=1, le=200, description="Limite de registros"),
+    cursor: Optional[str] = Query(None, description="Paginação por cursor: vazio para a primeira página, depois o next_cursor recebido"),
     
     # Dependências
     current_user: Dict[str, Any] = Depends(get_current_user),
@@ -89,7 +94,48 @@ async def listar_orcamentos(
     )
     
     service = OrcamentoService(db)
-    return await service.listar_orcamentos(filters, current_user, skip, limit)
+    return await service.listar_orcamentos(filters, current_user, skip, limit, cursor)
+
+
+@router.get("/exportar",
+    summary="Exportar orçamentos",
+    description="Exporta orçamentos em NDJSON ou CSV (streaming), com as mesmas regras de acesso da listagem"
+)
+async def exportar_orcamentos(
+    formato: str = Query("csv", pattern="^(csv|ndjson)$", description="Formato do arquivo: csv ou ndjson"),
+    
+    # Filtros opcionais (mesmos da listagem)
+    vendedor_id: Optional[uuid.UUID] = Query(None, description="Filtro por vendedor"),
+    status_id: Optional[uuid.UUID] = Query(None, description="Filtro por status"),
+    necessita_aprovacao: Optional[bool] = Query(None, description="Apenas orçamentos pendentes de aprovação"),
+    valor_minimo: Optional[float] = Query(None, ge=0, description="Valor mínimo"),
+    valor_maximo: Optional[float] = Query(None, ge=0, description="Valor máximo"),
+    
+    # Dependências
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_database)
+):
+    """
+    Exporta orçamentos para planilha sem paginar manualmente.
+    
+    - Linhas lidas do banco em lotes e enviadas à medida que chegam
+    - **RLS aplicado:** apenas a loja do usuário (vendedor: só os próprios)
+    """
+    filters = OrcamentoFilters(
+        vendedor_id=vendedor_id,
+        status_id=status_id,
+        necessita_aprovacao=necessita_aprovacao,
+        valor_minimo=valor_minimo,
+        valor_maximo=valor_maximo
+    )
+    
+    service = OrcamentoService(db)
+    return resposta_exportacao(
+        service.exportar_orcamentos(filters, current_user),
+        formato,
+        COLUNAS_EXPORTACAO_ORCAMENTOS,
+        "orcamentos"
+    )
 
 
 @router.get("/{orcamento_id}",
@@ -158,6 +204,7 @@ async def excluir_orcamento(
 
 
 @router.post("/{orcamento_id}/solicitar-aprovacao",
+    response_model=AprovacaoResponse,
     summary="Solicitar aprovação de desconto",
     description="Solicita aprovação para desconto acima do limite do usuário"
 )
@@ -171,28 +218,34 @@ async def solicitar_aprovacao(
     Solicita aprovação para desconto superior ao limite.
     
     **Fluxo de aprovação:**
-    1. Vendedor → Gerente (até 25%)
-    2. Gerente → Admin Master (acima de 25%)
+    1. Vendedor → Gerente (até o limite de desconto do gerente)
+    2. Gerente → Admin Master (acima do limite do gerente)
+    
+    A solicitação entra na fila do nível exigido (GET /aprovacoes/pendentes);
+    uma solicitação pendente anterior do mesmo orçamento é cancelada.
     """
     service = OrcamentoService(db)
     return await service.solicitar_aprovacao(orcamento_id, solicitacao, current_user)
 
 
 @router.post("/{orcamento_id}/aprovar",
+    response_model=AprovacaoResponse,
     summary="Aprovar/Rejeitar desconto",
     description="Aprova ou rejeita uma solicitação de desconto"
 )
 async def processar_aprovacao(
     orcamento_id: uuid.UUID,
     aprovado: bool = Query(..., description="True para aprovar, False para rejeitar"),
-    justificativa: Optional[str] = Query(None, description="Justificativa da decisão"),
-    current_user: Dict[str, Any] = Depends(require_vendedor_ou_superior()),
+    justificativa: Optional[str] = Query(None, description="Justificativa da decisão (obrigatória na rejeição)"),
+    current_user: Dict[str, Any] = Depends(require_gerente_ou_admin()),
     db: Client = Depends(get_database)
 ):
     """
     Processa uma solicitação de aprovação.
     
-    **Apenas aprovadores válidos** podem usar este endpoint.
+    **Apenas aprovadores válidos** podem usar este endpoint: Gerente decide
+    solicitações de nível GERENTE, Admin Master decide qualquer nível.
+    Aprovar aplica ao orçamento o desconto e os valores calculados na solicitação.
     """
     service = OrcamentoService(db)
     return await service.processar_aprovacao(orcamento_id, aprovado, justificativa, current_user)
@@ -311,6 +364,7 @@ async def listar_status_disponiveis(
 
 
 @router.get("/{orcamento_id}/historico-aprovacoes",
+    response_model=List[AprovacaoResponse],
     summary="Histórico de aprovações",
     description="Lista histórico de aprovações de um orçamento"
 )
@@ -321,4 +375,21 @@ async def historico_aprovacoes(
 ):
     """Retorna histórico completo de aprovações de um orçamento."""
     service = OrcamentoService(db)
-    return await service.obter_historico_aprovacoes(orcamento_id, current_user)
+    return await service.historico_aprovacoes(orcamento_id, current_user)
+
+
+@router.post("/comissao/cache/invalidar",
+    summary="Invalidar cache de comissão",
+    description="Descarta faixas de comissão em cache após edição direta em config_regras_comissao_faixa (Admin Master apenas)"
+)
+async def invalidar_cache_comissao(
+    loja_id: Optional[uuid.UUID] = Query(None, description="Loja afetada (vazio = todas)"),
+    tipo_comissao: Optional[str] = Query(None, description="VENDEDOR ou GERENTE (vazio = ambos)"),
+    current_user: Dict[str, Any] = Depends(require_admin())
+):
+    """Força a recarga das faixas de comissão na próxima consulta."""
+    removidas = invalidar_regras_comissao(str(loja_id) if loja_id else None, tipo_comissao)
+    return {
+        "entradas_removidas": removidas,
+        "cache": get_cache_comissao().stats()
+    }
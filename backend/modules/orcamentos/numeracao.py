@@ -0,0 +1,148 @@
+"""
+Numeração sequencial de orçamentos por loja.
+
+O contador fica em config_loja.proximo_numero_orcamento e é reservado no
+banco com compare-and-swap (UPDATE ... WHERE proximo_numero_orcamento = lido):
+duas instâncias nunca recebem o mesmo número, sem precisar de função SQL.
+
+Para que rajadas de criação não disputem a mesma linha, cada processo
+reserva um bloco de números (NUMERACAO_BLOCO_ORCAMENTOS) e os entrega
+localmente. Números de um bloco não usados (reinício do processo) viram
+lacunas na sequência; com bloco = 1 a sequência não tem lacunas.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import logging
+import re
+
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Formato padrão de config_loja: apenas o número, sem máscara
+FORMATO_SEQUENCIAL = 'SEQUENCIAL'
+
+# Marcadores do formato: {seq}, {ano}, {mes}, com preenchimento opcional ({seq:06d})
+_MARCADOR = re.compile(r'\{(seq|ano|mes)(?::0?(\d+)d)?\}')
+_MARCADOR_SEQUENCIAL = re.compile(r'\{seq(?::0?\d+d)?\}')
+
+ReservarBloco = Callable[[str, int], Awaitable[int]]
+
+
+def formatar_numero(sequencial: int, formato: Optional[str], prefixo: Optional[str], data: Optional[datetime] = None) -> str:
+    """
+    Aplica formato e prefixo da loja ao número sequencial.
+
+    Formatos aceitos (config_loja.formato_numeracao):
+    - 'SEQUENCIAL', vazio ou sem {seq}: apenas o número (ex.: 42)
+    - modelo com os marcadores {seq}, {ano} e {mes}; o restante é texto
+      literal (ex.: '{ano}-{seq:06d}' → 2026-000042). `:0Nd` preenche com
+      zeros até N dígitos; {mes} sem preenchimento usa 2 dígitos
+
+    Args:
+        sequencial: Número reservado
+        formato: Valor de formato_numeracao
+        prefixo: Valor de prefixo_numeracao (concatenado como está)
+        data: Data de referência para {ano}/{mes} (padrão: agora)
+
+    Returns:
+        str: Número do orçamento
+    """
+    prefixo = prefixo or ''
+
+    if not formato or formato.upper() == FORMATO_SEQUENCIAL or not _MARCADOR_SEQUENCIAL.search(formato):
+        return f"{prefixo}{sequencial}"
+
+    data = data or datetime.now()
+    valores = {'seq': sequencial, 'ano': data.year, 'mes': data.month}
+
+    def substituir(marcador: re.Match) -> str:
+        nome, largura = marcador.group(1), marcador.group(2)
+        if largura is None and nome == 'mes':
+            largura = '2'
+        return str(valores[nome]).zfill(int(largura or 0))
+
+    return f"{prefixo}{_MARCADOR.sub(substituir, formato)}"
+
+
+class AlocadorNumeracao:
+    """
+    Entrega números sequenciais por loja a partir de blocos reservados no banco.
+
+    Args:
+        tamanho_bloco: Números reservados por round-trip ao banco (mínimo 1)
+    """
+
+    def __init__(self, tamanho_bloco: int):
+        self.tamanho_bloco = max(1, tamanho_bloco)
+        self._blocos: Dict[str, List[int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.reservas = 0
+        self.entregues = 0
+
+    async def proximo(self, loja_id: str, reservar: ReservarBloco) -> int:
+        """
+        Retorna o próximo número da loja, reservando novo bloco se necessário.
+
+        Args:
+            loja_id: ID da loja
+            reservar: Função (loja_id, quantidade) que reserva atomicamente
+                `quantidade` números no banco e retorna o primeiro
+
+        Returns:
+            int: Número sequencial exclusivo
+        """
+        chave = str(loja_id)
+        lock = self._locks.setdefault(chave, asyncio.Lock())
+
+        # Serializa apenas dentro do processo e só enquanto o bloco é reservado
+        async with lock:
+            bloco = self._blocos.get(chave)
+            if not bloco or bloco[0] >= bloco[1]:
+                inicio = await reservar(chave, self.tamanho_bloco)
+                bloco = self._blocos[chave] = [inicio, inicio + self.tamanho_bloco]
+                self.reservas += 1
+                logger.debug(f"Bloco de numeração reservado para loja {chave}: {inicio}..{bloco[1] - 1}")
+
+            numero = bloco[0]
+            bloco[0] += 1
+            self.entregues += 1
+            return numero
+
+    def descartar(self, loja_id: Optional[str] = None) -> None:
+        """
+        Descarta os blocos deste processo (ex.: proximo_numero_orcamento alterado manualmente).
+
+        Os números ainda não entregues do bloco viram lacunas: não voltam ao
+        banco nem a outros workers, que mantêm os próprios blocos até esgotá-los.
+
+        Args:
+            loja_id: Loja afetada (None = todas)
+        """
+        for chave in [c for c in self._blocos if loja_id is None or c == str(loja_id)]:
+            del self._blocos[chave]
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores do alocador (expostos no /health)"""
+        return {
+            "block_size": self.tamanho_bloco,
+            "lojas": len(self._blocos),
+            "reservations": self.reservas,
+            "allocated": self.entregues
+        }
+
+
+# Instância global do alocador
+_alocador_numeracao: Optional[AlocadorNumeracao] = None
+
+
+def get_alocador_numeracao() -> AlocadorNumeracao:
+    """Retorna o alocador global, criando-o sob demanda"""
+    global _alocador_numeracao
+
+    if _alocador_numeracao is None:
+        _alocador_numeracao = AlocadorNumeracao(get_settings().numeracao_bloco_orcamentos)
+
+    return _alocador_numeracao
@@ -3,6 +3,14 @@ import numpy as np
 from typing import List, Dict, Any, Optional
 import logging
 from supabase import create_client, Client
+from core.database import execute_query
+from .comissao import TabelaComissao
+from .cache_comissao import get_cache_comissao
+from .cache_config_loja import ConfigLojaSnapshot, get_cache_config_loja, invalidar_config_loja
+from .numeracao import get_alocador_numeracao
+
+# Tentativas do compare-and-swap do contador de numeração antes de desistir
+MAX_TENTATIVAS_NUMERACAO = 10
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -39,14 +47,13 @@ class OrcamentoRepository:
         """
         try:
             # Query Supabase com filtros e ordenação
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('config_regras_comissao_faixa')
                 .select('*')
                 .eq('loja_id', loja_id)
                 .eq('tipo_comissao', tipo)
                 .order('ordem')
-                .execute()
             )
             
             if result.data:
@@ -72,6 +79,82 @@ class OrcamentoRepository:
             logger.error(f"Erro ao buscar regras de comissão para loja {loja_id}, tipo {tipo}: {str(e)}")
             raise Exception(f"Erro ao buscar regras de comissão: {str(e)}")
 
+    async def get_tabela_comissao(self, loja_id: str, tipo: str) -> TabelaComissao:
+        """
+        Retorna a tabela de faixas já compilada (arrays numpy ordenados),
+        usando o cache em processo por (loja_id, tipo_comissao).
+        
+        Args:
+            loja_id (str): ID da loja
+            tipo (str): Tipo de comissão ('VENDEDOR' ou 'GERENTE')
+            
+        Returns:
+            TabelaComissao: Faixas compiladas (vazia se não houver regras)
+        """
+        cache = get_cache_comissao()
+        tabela = cache.obter(loja_id, tipo)
+        if tabela is not None:
+            return tabela
+        
+        # Geração lida antes da busca: edição concorrente descarta esta leitura
+        geracao = cache.geracao()
+        regras_df = await self.get_regras_comissao(loja_id, tipo)
+        tabela = TabelaComissao.from_dataframe(regras_df)
+        cache.armazenar(loja_id, tipo, tabela, geracao)
+        return tabela
+
+    async def get_orcamento_completo(self, orcamento_id: str, loja_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca o agregado completo do orçamento em um único round-trip
+        (embedded select do PostgREST).
+        
+        Args:
+            orcamento_id (str): ID do orçamento
+            loja_id (str): ID da loja (RLS: só da mesma loja)
+            
+        Returns:
+            Optional[Dict[str, Any]]: Linha de c_orcamentos acrescida de:
+            - ambientes: ambientes incluídos (id, nome_ambiente, valor_total, linha_produto)
+            - custos_adicionais: custos adicionais do orçamento
+            - status, cliente, vendedor: registros relacionados (ou None)
+            None se o orçamento não existir na loja
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('c_orcamentos')
+                .select('''
+                    *,
+                    c_orcamento_ambientes(
+                        incluido,
+                        c_ambientes(id, nome_ambiente, valor_total, linha_produto)
+                    ),
+                    c_orcamento_custos_adicionais(id, descricao_custo, valor_custo),
+                    status:config_status_orcamento!status_id(id, nome_status),
+                    cliente:c_clientes!cliente_id(id, nome),
+                    vendedor:cad_equipe!vendedor_id(id, nome)
+                ''')
+                .eq('id', orcamento_id)
+                .eq('loja_id', loja_id)
+            )
+            
+            if not result.data:
+                return None
+            
+            orcamento = dict(result.data[0])
+            relacionamentos = orcamento.pop('c_orcamento_ambientes', None) or []
+            orcamento['ambientes'] = [
+                item['c_ambientes'] for item in relacionamentos
+                if item.get('incluido') and item.get('c_ambientes')
+            ]
+            orcamento['custos_adicionais'] = orcamento.pop('c_orcamento_custos_adicionais', None) or []
+            
+            return orcamento
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar orçamento completo {orcamento_id}: {str(e)}")
+            raise Exception(f"Erro ao buscar orçamento: {str(e)}")
+
     async def get_config_loja(self, loja_id: str) -> Dict[str, Any]:
         """
         Busca configurações de uma loja. Se não existir, cria automaticamente com valores padrão.
@@ -88,12 +171,11 @@ class OrcamentoRepository:
         """
         try:
             # Tentar buscar configuração existente
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('config_loja')
                 .select('*')
                 .eq('loja_id', loja_id)
-                .execute()
             )
             
             if result.data:
@@ -108,6 +190,108 @@ class OrcamentoRepository:
             logger.error(f"Erro ao buscar/criar configuração da loja {loja_id}: {str(e)}")
             raise Exception(f"Erro ao buscar/criar configuração da loja: {str(e)}")
 
+    async def get_config_snapshot(self, loja_id: str) -> ConfigLojaSnapshot:
+        """
+        Retorna a configuração da loja como snapshot versionado,
+        usando o cache em processo (evita reconsultar config_loja a cada cálculo).
+        
+        Args:
+            loja_id (str): ID da loja
+            
+        Returns:
+            ConfigLojaSnapshot: Configuração + versão usada no cálculo
+        """
+        cache = get_cache_config_loja()
+        snapshot = cache.obter(loja_id)
+        if snapshot is not None:
+            return snapshot
+        
+        # Geração lida antes da busca: edição concorrente descarta esta leitura
+        geracao = cache.geracao()
+        config = await self.get_config_loja(loja_id)
+        return cache.armazenar(loja_id, config, geracao)
+
+    async def atualizar_config_loja(self, loja_id: str, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Atualiza a configuração da loja e invalida o snapshot em cache.
+        
+        Args:
+            loja_id (str): ID da loja
+            dados (Dict): Campos a atualizar
+            
+        Returns:
+            Dict[str, Any]: Configuração atualizada
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('config_loja')
+                .update(dados)
+                .eq('loja_id', loja_id)
+            )
+            
+            invalidar_config_loja(loja_id)
+            if 'proximo_numero_orcamento' in dados:
+                # Contador ajustado manualmente: descarta o bloco deste processo (outros workers esgotam os seus)
+                get_alocador_numeracao().descartar(loja_id)
+            
+            if not result.data:
+                raise Exception("Configuração da loja não encontrada")
+            return result.data[0]
+            
+        except Exception as e:
+            logger.error(f"Erro ao atualizar configuração da loja {loja_id}: {str(e)}")
+            raise Exception(f"Erro ao atualizar configuração da loja: {str(e)}")
+
+    async def reservar_numeros_orcamento(self, loja_id: str, quantidade: int = 1) -> int:
+        """
+        Reserva atomicamente `quantidade` números em config_loja.proximo_numero_orcamento.
+        
+        Usa compare-and-swap: o UPDATE só é aplicado se o contador ainda tiver
+        o valor lido; se outra instância reservou antes, relê e tenta de novo.
+        
+        Args:
+            loja_id (str): ID da loja
+            quantidade (int): Quantos números reservar
+            
+        Returns:
+            int: Primeiro número do bloco reservado
+            
+        Raises:
+            Exception: Em caso de erro ou disputa persistente pelo contador
+        """
+        try:
+            for tentativa in range(MAX_TENTATIVAS_NUMERACAO):
+                # Leitura direta (sem cache): o contador muda a cada reserva
+                config = await self.get_config_loja(loja_id)
+                lido = config.get('proximo_numero_orcamento')
+                atual = int(lido) if lido is not None else int(config.get('numero_inicial_orcamento') or 1)
+                
+                query = (
+                    self.supabase
+                    .table('config_loja')
+                    .update({'proximo_numero_orcamento': atual + quantidade})
+                    .eq('loja_id', loja_id)
+                )
+                # Loja que nunca numerou: o contador é NULL (eq nunca casaria com NULL)
+                if lido is None:
+                    query = query.is_('proximo_numero_orcamento', 'null')
+                else:
+                    query = query.eq('proximo_numero_orcamento', lido)
+                result = await execute_query(query)
+                
+                if result.data:
+                    logger.debug(f"Números {atual}..{atual + quantidade - 1} reservados para loja {loja_id}")
+                    return atual
+                
+                logger.debug(f"Contador da loja {loja_id} alterado concorrentemente (tentativa {tentativa + 1})")
+            
+            raise Exception(f"contador em disputa após {MAX_TENTATIVAS_NUMERACAO} tentativas")
+            
+        except Exception as e:
+            logger.error(f"Erro ao reservar numeração da loja {loja_id}: {str(e)}")
+            raise Exception(f"Erro ao reservar numeração do orçamento: {str(e)}")
+
     async def _criar_config_padrao(self, loja_id: str) -> Dict[str, Any]:
         """
         Cria configuração padrão para uma loja com tratamento de concorrência
@@ -130,11 +314,10 @@ class OrcamentoRepository:
             
             # Tentar inserir (pode falhar se outro processo criou simultaneamente)
             try:
-                insert_result = (
+                insert_result = await execute_query(
                     self.supabase
                     .table('config_loja')
                     .insert(config_padrao)
-                    .execute()
                 )
                 
                 logger.info(f"Config padrão criada para loja {loja_id}")
@@ -144,12 +327,11 @@ class OrcamentoRepository:
                 # Se falhou na inserção, pode ser concorrência - tentar buscar novamente
                 logger.warning(f"Falha na inserção (provável concorrência), tentando buscar novamente: {str(insert_error)}")
                 
-                result = (
+                result = await execute_query(
                     self.supabase
                     .table('config_loja')
                     .select('*')
                     .eq('loja_id', loja_id)
-                    .execute()
                 )
                 
                 if result.data:
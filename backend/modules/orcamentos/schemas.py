@@ -155,6 +155,11 @@ class OrcamentoResponse(BaseModel):
     necessita_aprovacao: bool
     aprovador_id: Optional[uuid.UUID]
     
+    # Relacionamentos (nomes para exibição)
+    cliente_nome: Optional[str] = None
+    vendedor_nome: Optional[str] = None
+    status_nome: Optional[str] = None
+    
     # Metadados
     observacoes: Optional[str]
     created_at: datetime
@@ -200,21 +205,6 @@ class CalculoCustos(BaseModel):
     detalhes_calculo: Dict[str, Any]
 
 
-class AprovacaoResponse(BaseModel):
-    """Schema para resposta de aprovação"""
-    id: uuid.UUID
-    aprovador_nome: str
-    acao: str
-    nivel_aprovacao: str
-    valor_desconto: Decimal
-    margem_resultante: Decimal
-    justificativa: Optional[str]
-    created_at: datetime
-    
-    class Config:
-        from_attributes = True
-
-
 # ===== SCHEMAS DE FILTROS =====
 
 class OrcamentoFilters(BaseModel):
@@ -2,18 +2,51 @@
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional, Union
 import logging
 from decimal import Decimal
 from datetime import datetime
 import uuid
+import time
+import asyncio
 
+from core.database import execute_query
+from core.orquestracao import executar_etapas
+from core.exceptions import BusinessRuleException, PermissionException, ResourceNotFoundException, ValidationException
+from core.paginacao import CursorKeyset, PaginaCursor, aplicar_cursor, fatiar_pagina
+from core.exportacao import iterar_em_lotes
+from core.config import get_settings
 from .repository import OrcamentoRepository
-from .schemas import OrcamentoCreate, OrcamentoUpdate, OrcamentoResponse, OrcamentoListItem, OrcamentoFilters
+from .comissao import TabelaComissao, calcular_comissao_lote
+from .cache_config_loja import ConfigLojaSnapshot
+from .numeracao import formatar_numero, get_alocador_numeracao
+from modules.aprovacoes.schemas import AprovacaoResponse
+from modules.aprovacoes.services import AprovacaoService
+from .schemas import OrcamentoCreate, OrcamentoUpdate, OrcamentoResponse, OrcamentoListItem, OrcamentoFilters, SolicitacaoAprovacao
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
+# Colunas da exportação (ordem das colunas no CSV)
+COLUNAS_EXPORTACAO_ORCAMENTOS = [
+    'id', 'numero', 'cliente_nome', 'vendedor_nome', 'status_nome',
+    'valor_final', 'necessita_aprovacao', 'created_at'
+]
+
+
+def _linha_exportacao_orcamento(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Achata os relacionamentos embutidos da listagem em colunas simples"""
+    return {
+        'id': item['id'],
+        'numero': item['numero'],
+        'cliente_nome': (item.get('c_clientes') or {}).get('nome'),
+        'vendedor_nome': (item.get('cad_equipe') or {}).get('nome'),
+        'status_nome': (item.get('config_status_orcamento') or {}).get('nome_status'),
+        'valor_final': item['valor_final'],
+        'necessita_aprovacao': item['necessita_aprovacao'],
+        'created_at': item['created_at']
+    }
+
 
 class OrcamentoService:
     """
@@ -26,6 +59,8 @@ class OrcamentoService:
     def __init__(self, supabase_client):
         self.repository = OrcamentoRepository(supabase_client)
         self.supabase = supabase_client
+        # Snapshots de config_loja lidos nesta requisição (o service é criado por requisição)
+        self._configs_loja: Dict[str, "asyncio.Future[ConfigLojaSnapshot]"] = {}
     
     # ===== MÉTODOS CRUD BÁSICOS (conectar com Controllers) =====
 
@@ -46,79 +81,91 @@ class OrcamentoService:
             
             logger.info(f"Criando orçamento para cliente {orcamento_data.cliente_id} na loja {loja_id}")
             
-            # 1. Buscar ambientes e calcular valor base
-            valor_ambientes = await self._calcular_valor_ambientes(orcamento_data.ambiente_ids, loja_id)
-            
-            # 2. Calcular valor final com desconto
+            inicio = time.perf_counter()
             desconto_decimal = float(orcamento_data.desconto_percentual) / 100
-            valor_final = valor_ambientes * (1 - desconto_decimal)
-            
-            # 3. Preparar dados para cálculo completo
-            dados_calculo = {
-                'loja_id': loja_id,
-                'vendedor_id': vendedor_id,
-                'valor_ambientes': valor_ambientes,
-                'desconto_percentual': desconto_decimal,
-                'custos_adicionais': [dict(item) for item in orcamento_data.custos_adicionais] if orcamento_data.custos_adicionais else []
-            }
             
-            # 4. Calcular orçamento completo
-            calculo_completo = await self.criar_orcamento_completo(dados_calculo)
-            
-            # 5. Gerar numeração automática
-            numero = await self._gerar_numero_orcamento(loja_id)
-            
-            # 6. Buscar status padrão
-            status_padrao = await self._get_status_padrao(loja_id)
-            
-            # 7. Preparar dados para inserção
-            orcamento_db = {
-                'numero': numero,
-                'cliente_id': str(orcamento_data.cliente_id),
-                'loja_id': loja_id,
-                'vendedor_id': vendedor_id,
-                'medidor_selecionado_id': str(orcamento_data.medidor_selecionado_id),
-                'montador_selecionado_id': str(orcamento_data.montador_selecionado_id),
-                'transportadora_selecionada_id': str(orcamento_data.transportadora_selecionada_id),
-                'valor_ambientes': valor_ambientes,
-                'desconto_percentual': desconto_decimal,
-                'valor_final': calculo_completo['valor_final'],
-                'custo_fabrica': calculo_completo['custos']['custo_fabrica'],
-                'comissao_vendedor': calculo_completo['custos']['comissao_vendedor'],
-                'comissao_gerente': calculo_completo['custos']['comissao_gerente'],
-                'custo_medidor': calculo_completo['custos']['custo_medidor'],
-                'custo_montador': calculo_completo['custos']['custo_montador'],
-                'custo_frete': calculo_completo['custos']['custo_frete'],
-                'margem_lucro': calculo_completo['margem_lucro'],
-                'config_snapshot': calculo_completo.get('config_snapshot', {}),
-                'plano_pagamento': [dict(item) for item in orcamento_data.plano_pagamento],
-                'necessita_aprovacao': calculo_completo['necessita_aprovacao'],
-                'status_id': status_padrao['id'],
-                'observacoes': orcamento_data.observacoes
-            }
-            
-            # 8. Inserir orçamento
-            orcamento_result = (
-                self.supabase
-                .table('c_orcamentos')
-                .insert(orcamento_db)
-                .execute()
-            )
-            
-            if not orcamento_result.data:
-                raise Exception("Erro ao inserir orçamento")
+            async def calcular(valor_ambientes: float) -> Dict[str, Any]:
+                # Config da loja: a mesma leitura da etapa 'config' (ver _obter_config_loja)
+                dados_calculo = {
+                    'loja_id': loja_id,
+                    'vendedor_id': vendedor_id,
+                    'valor_ambientes': valor_ambientes,
+                    'desconto_percentual': desconto_decimal,
+                    'custos_adicionais': [dict(item) for item in orcamento_data.custos_adicionais] if orcamento_data.custos_adicionais else []
+                }
+                return await self.criar_orcamento_completo(dados_calculo)
+            
+            async def inserir_orcamento(
+                valor_ambientes: float,
+                config: ConfigLojaSnapshot,
+                calculo: Dict[str, Any],
+                status: Dict[str, Any]
+            ) -> Dict[str, Any]:
+                # Número reservado só depois do cálculo e do status: falha neles não consome número
+                numero = await self._gerar_numero_orcamento(loja_id, config)
+                orcamento_db = {
+                    'numero': numero,
+                    'cliente_id': str(orcamento_data.cliente_id),
+                    'loja_id': loja_id,
+                    'vendedor_id': vendedor_id,
+                    'medidor_selecionado_id': str(orcamento_data.medidor_selecionado_id),
+                    'montador_selecionado_id': str(orcamento_data.montador_selecionado_id),
+                    'transportadora_selecionada_id': str(orcamento_data.transportadora_selecionada_id),
+                    'valor_ambientes': valor_ambientes,
+                    'desconto_percentual': desconto_decimal,
+                    'valor_final': calculo['valor_final'],
+                    'custo_fabrica': calculo['custos']['custo_fabrica'],
+                    'comissao_vendedor': calculo['custos']['comissao_vendedor'],
+                    'comissao_gerente': calculo['custos']['comissao_gerente'],
+                    'custo_medidor': calculo['custos']['custo_medidor'],
+                    'custo_montador': calculo['custos']['custo_montador'],
+                    'custo_frete': calculo['custos']['custo_frete'],
+                    'margem_lucro': calculo['margem_lucro'],
+                    'config_snapshot': calculo['detalhes_calculo']['config_snapshot'],
+                    'plano_pagamento': [dict(item) for item in orcamento_data.plano_pagamento],
+                    'necessita_aprovacao': calculo['necessita_aprovacao'],
+                    'status_id': status['id'],
+                    'observacoes': orcamento_data.observacoes
+                }
                 
-            orcamento_criado = orcamento_result.data[0]
-            orcamento_id = orcamento_criado['id']
-            
-            # 9. Inserir relacionamentos com ambientes
-            await self._inserir_ambientes_orcamento(orcamento_id, orcamento_data.ambiente_ids)
-            
-            # 10. Inserir custos adicionais se existirem
-            if orcamento_data.custos_adicionais:
-                await self._inserir_custos_adicionais(orcamento_id, orcamento_data.custos_adicionais)
-            
-            logger.info(f"Orçamento {numero} criado com sucesso: R$ {valor_final:,.2f}")
+                orcamento_result = await execute_query(
+                    self.supabase
+                    .table('c_orcamentos')
+                    .insert(orcamento_db)
+                )
+                
+                if not orcamento_result.data:
+                    raise Exception("Erro ao inserir orçamento")
+                return orcamento_result.data[0]
+            
+            async def inserir_ambientes(orcamento: Dict[str, Any]) -> None:
+                await self._inserir_ambientes_orcamento(orcamento['id'], orcamento_data.ambiente_ids)
+            
+            async def inserir_custos(orcamento: Dict[str, Any]) -> None:
+                if orcamento_data.custos_adicionais:
+                    await self._inserir_custos_adicionais(orcamento['id'], orcamento_data.custos_adicionais)
+            
+            # Etapas independentes rodam em paralelo; falha em qualquer uma cancela as demais
+            # 1. Ambientes, config e status padrão → 2. Cálculo completo
+            # 3. Numeração + inserção do orçamento → 4. ambientes e 5. custos adicionais
+            duracoes: Dict[str, float] = {}
+            resultados = await executar_etapas({
+                'valor_ambientes': (lambda: self._calcular_valor_ambientes(orcamento_data.ambiente_ids, loja_id), []),
+                'config': (lambda: self._obter_config_loja(loja_id), []),
+                'status': (lambda: self._get_status_padrao(loja_id), []),
+                'calculo': (calcular, ['valor_ambientes']),
+                'orcamento': (inserir_orcamento, ['valor_ambientes', 'config', 'calculo', 'status']),
+                'ambientes': (inserir_ambientes, ['orcamento']),
+                'custos': (inserir_custos, ['orcamento'])
+            }, duracoes)
+            
+            orcamento_id = resultados['orcamento']['id']
+            valor_final = resultados['calculo']['valor_final']
+            
+            logger.info(
+                f"Orçamento {resultados['orcamento']['numero']} criado com sucesso: R$ {valor_final:,.2f} "
+                f"em {(time.perf_counter() - inicio) * 1000:.1f} ms (etapas: {duracoes})"
+            )
             
             # 11. Retornar orçamento completo
             return await self.obter_orcamento(orcamento_id, current_user)
@@ -127,7 +174,7 @@ class OrcamentoService:
             logger.error(f"Erro ao criar orçamento: {str(e)}")
             raise Exception(f"Erro ao criar orçamento: {str(e)}")
 
-    async def listar_orcamentos(self, filters: OrcamentoFilters, current_user: Dict[str, Any], skip: int = 0, limit: int = 50) -> List[OrcamentoListItem]:
+    async def listar_orcamentos(self, filters: OrcamentoFilters, current_user: Dict[str, Any], skip: int = 0, limit: int = 50, cursor: Optional[str] = None) -> Union[List[OrcamentoListItem], PaginaCursor[OrcamentoListItem]]:
         """
         Lista orçamentos com filtros aplicados e respeitando permissões
         
@@ -136,64 +183,35 @@ class OrcamentoService:
             current_user: Usuário logado 
             skip: Paginação - registros a pular
             limit: Paginação - limite de registros
+            cursor: Paginação keyset (None = offset; "" = primeira página)
             
         Returns:
-            List[OrcamentoListItem]: Lista de orçamentos
+            List[OrcamentoListItem]: Lista de orçamentos (modo offset)
+            PaginaCursor[OrcamentoListItem]: Página com next_cursor (modo cursor)
         """
         try:
+            posicao = CursorKeyset.decodificar(cursor)
+
             loja_id = current_user['loja_id']
             perfil = current_user['perfil']
-            user_id = current_user['id']
             
-            # Construir query base
-            query = (
-                self.supabase
-                .table('c_orcamentos')
-                .select('''
-                    id,
-                    numero,
-                    valor_final,
-                    necessita_aprovacao,
-                    created_at,
-                    c_clientes!inner(nome),
-                    config_status_orcamento!inner(nome_status),
-                    cad_equipe!inner(nome)
-                ''')
-                .eq('loja_id', loja_id)
-            )
+            query = self._query_listagem(filters, current_user)
             
-            # Aplicar filtro por perfil
-            if perfil == 'VENDEDOR':
-                query = query.eq('vendedor_id', user_id)
-            # GERENTE e ADMIN_MASTER veem todos da loja
+            # Executar query com paginação (keyset ou offset)
+            if cursor is not None:
+                query = aplicar_cursor(query, posicao, limit)
+            else:
+                query = query.order('created_at', desc=True).range(skip, skip + limit - 1)
             
-            # Aplicar filtros opcionais
-            if filters.vendedor_id:
-                query = query.eq('vendedor_id', str(filters.vendedor_id))
+            result = await execute_query(query)
             
-            if filters.status_id:
-                query = query.eq('status_id', str(filters.status_id))
-                
-            if filters.necessita_aprovacao is not None:
-                query = query.eq('necessita_aprovacao', filters.necessita_aprovacao)
-                
-            if filters.valor_minimo:
-                query = query.gte('valor_final', float(filters.valor_minimo))
-                
-            if filters.valor_maximo:
-                query = query.lte('valor_final', float(filters.valor_maximo))
-            
-            # Executar query com paginação
-            result = (
-                query
-                .order('created_at', desc=True)
-                .range(skip, skip + limit - 1)
-                .execute()
-            )
+            registros, next_cursor = result.data, None
+            if cursor is not None:
+                registros, next_cursor = fatiar_pagina(registros, limit)
             
             # Converter para OrcamentoListItem
             orcamentos = []
-            for item in result.data:
+            for item in registros:
                 orcamento_item = OrcamentoListItem(
                     id=item['id'],
                     numero=item['numero'],
@@ -207,12 +225,76 @@ class OrcamentoService:
                 orcamentos.append(orcamento_item)
             
             logger.debug(f"Listados {len(orcamentos)} orçamentos para {perfil} na loja {loja_id}")
+            if cursor is not None:
+                return PaginaCursor[OrcamentoListItem](items=orcamentos, next_cursor=next_cursor)
             return orcamentos
             
+        except ValidationException:
+            raise
         except Exception as e:
             logger.error(f"Erro ao listar orçamentos: {str(e)}")
             raise Exception(f"Erro ao listar orçamentos: {str(e)}")
 
+    def _query_listagem(self, filters: OrcamentoFilters, current_user: Dict[str, Any]):
+        """Query de listagem/exportação com RLS por loja, filtro por perfil e filtros opcionais"""
+        # Construir query base
+        query = (
+            self.supabase
+            .table('c_orcamentos')
+            .select('''
+                id,
+                numero,
+                valor_final,
+                necessita_aprovacao,
+                created_at,
+                c_clientes!inner(nome),
+                config_status_orcamento!inner(nome_status),
+                cad_equipe!inner(nome)
+            ''')
+            .eq('loja_id', current_user['loja_id'])
+        )
+        
+        # Aplicar filtro por perfil
+        if current_user['perfil'] == 'VENDEDOR':
+            query = query.eq('vendedor_id', current_user['id'])
+        # GERENTE e ADMIN_MASTER veem todos da loja
+        
+        # Aplicar filtros opcionais
+        if filters.vendedor_id:
+            query = query.eq('vendedor_id', str(filters.vendedor_id))
+        
+        if filters.status_id:
+            query = query.eq('status_id', str(filters.status_id))
+            
+        if filters.necessita_aprovacao is not None:
+            query = query.eq('necessita_aprovacao', filters.necessita_aprovacao)
+            
+        if filters.valor_minimo:
+            query = query.gte('valor_final', float(filters.valor_minimo))
+            
+        if filters.valor_maximo:
+            query = query.lte('valor_final', float(filters.valor_maximo))
+        
+        return query
+
+    def exportar_orcamentos(self, filters: OrcamentoFilters, current_user: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Exporta todos os orçamentos visíveis ao usuário em lotes (streaming)
+        
+        Mesmas regras de acesso e filtros de listar_orcamentos, sem montar
+        OrcamentoListItem por linha.
+        
+        Returns:
+            Gerador assíncrono de lotes com as COLUNAS_EXPORTACAO_ORCAMENTOS
+        """
+        logger.info(f"Exportando orçamentos da loja {current_user['loja_id']}")
+        
+        return iterar_em_lotes(
+            lambda: self._query_listagem(filters, current_user),
+            get_settings().export_batch_size,
+            _linha_exportacao_orcamento
+        )
+
     async def obter_orcamento(self, orcamento_id: str, current_user: Dict[str, Any]) -> OrcamentoResponse:
         """
         Obtém orçamento por ID com dados adaptados ao perfil do usuário
@@ -228,30 +310,18 @@ class OrcamentoService:
             loja_id = current_user['loja_id']
             perfil = current_user['perfil']
             
-            # Buscar orçamento base
-            result = (
-                self.supabase
-                .table('c_orcamentos')
-                .select('*')
-                .eq('id', orcamento_id)
-                .eq('loja_id', loja_id)  # RLS: só da mesma loja
-                .execute()
-            )
+            # Buscar orçamento + ambientes + custos + status/cliente/vendedor em um único round-trip
+            orcamento = await self.repository.get_orcamento_completo(orcamento_id, loja_id)
             
-            if not result.data:
+            if not orcamento:
                 raise Exception("Orçamento não encontrado")
-                
-            orcamento = result.data[0]
             
             # Verificar permissão por perfil
             if perfil == 'VENDEDOR' and orcamento['vendedor_id'] != current_user['id']:
                 raise Exception("Acesso negado: vendedor só vê próprios orçamentos")
             
-            # Buscar ambientes relacionados
-            ambientes = await self._get_ambientes_orcamento(orcamento_id)
-            
-            # Buscar custos adicionais
-            custos_adicionais = await self._get_custos_adicionais_orcamento(orcamento_id)
+            ambientes = orcamento['ambientes']
+            custos_adicionais = orcamento['custos_adicionais']
             
             # Montar resumo financeiro (dados sensíveis apenas para Admin Master)
             resumo_financeiro = {
@@ -288,6 +358,9 @@ class OrcamentoService:
                 necessita_aprovacao=orcamento['necessita_aprovacao'],
                 aprovador_id=orcamento.get('aprovador_id'),
                 observacoes=orcamento.get('observacoes'),
+                cliente_nome=(orcamento.get('cliente') or {}).get('nome'),
+                vendedor_nome=(orcamento.get('vendedor') or {}).get('nome'),
+                status_nome=(orcamento.get('status') or {}).get('nome_status'),
                 created_at=orcamento['created_at'],
                 updated_at=orcamento['updated_at']
             )
@@ -365,16 +438,20 @@ class OrcamentoService:
             if dados_atualizacao:
                 dados_atualizacao['updated_at'] = datetime.utcnow().isoformat()
                 
-                update_result = (
+                update_result = await execute_query(
                     self.supabase
                     .table('c_orcamentos')
                     .update(dados_atualizacao)
                     .eq('id', orcamento_id)
-                    .execute()
                 )
                 
                 if not update_result.data:
                     raise Exception("Erro ao atualizar orçamento")
+                
+                # A solicitação pendente foi calculada sobre a versão anterior
+                await AprovacaoService(self.supabase).cancelar_pendentes(
+                    orcamento_id, current_user['loja_id'], 'Orçamento alterado após a solicitação'
+                )
             
             logger.info(f"Orçamento {orcamento_id} atualizado com sucesso")
             
@@ -404,7 +481,7 @@ class OrcamentoService:
             # TODO: implementar verificação de status quando necessário
             
             # Soft delete (marcar como excluído)
-            delete_result = (
+            delete_result = await execute_query(
                 self.supabase
                 .table('c_orcamentos')
                 .update({
@@ -413,7 +490,6 @@ class OrcamentoService:
                     'excluido_por': current_user['id']
                 })
                 .eq('id', orcamento_id)
-                .execute()
             )
             
             logger.info(f"Orçamento {orcamento_id} excluído com sucesso")
@@ -428,13 +504,12 @@ class OrcamentoService:
     async def _calcular_valor_ambientes(self, ambiente_ids: List[str], loja_id: str) -> float:
         """Calcula valor total dos ambientes selecionados"""
         try:
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('c_ambientes')
                 .select('valor_total')
                 .in_('id', [str(id) for id in ambiente_ids])
                 .eq('loja_id', loja_id)
-                .execute()
             )
             
             total = sum(float(item['valor_total']) for item in result.data)
@@ -445,13 +520,20 @@ class OrcamentoService:
             logger.error(f"Erro ao calcular valor dos ambientes: {str(e)}")
             raise
 
-    async def _gerar_numero_orcamento(self, loja_id: str) -> str:
-        """Gera numeração automática para orçamento"""
+    async def _gerar_numero_orcamento(self, loja_id: str, config: ConfigLojaSnapshot) -> str:
+        """
+        Gera o número do orçamento a partir do contador da loja
+        
+        Args:
+            loja_id: ID da loja
+            config: Snapshot de config_loja (formato_numeracao e prefixo_numeracao)
+            
+        Returns:
+            str: Número formatado (ex.: 'ORC-2026-000042')
+        """
         try:
-            # TODO: Implementar lógica de numeração automática baseada na config da loja
-            # Por enquanto, gerar número simples
-            import random
-            numero = f"ORC-{random.randint(1000, 9999)}"
+            sequencial = await get_alocador_numeracao().proximo(loja_id, self.repository.reservar_numeros_orcamento)
+            numero = formatar_numero(sequencial, config.get('formato_numeracao'), config.get('prefixo_numeracao'))
             logger.debug(f"Número gerado: {numero}")
             return numero
             
@@ -462,13 +544,12 @@ class OrcamentoService:
     async def _get_status_padrao(self, loja_id: str) -> Dict[str, Any]:
         """Busca status padrão da loja"""
         try:
-            result = (
+            result = await execute_query(
                 self.supabase
                 .table('config_status_orcamento')
                 .select('*')
                 .eq('loja_id', loja_id)
                 .eq('is_default', True)
-                .execute()
             )
             
             if result.data:
@@ -484,11 +565,10 @@ class OrcamentoService:
                     'is_final': False
                 }
                 
-                insert_result = (
+                insert_result = await execute_query(
                     self.supabase
                     .table('config_status_orcamento')
                     .insert(status_padrao)
-                    .execute()
                 )
                 
                 return insert_result.data[0]
@@ -509,11 +589,10 @@ class OrcamentoService:
                 for ambiente_id in ambiente_ids
             ]
             
-            (
+            await execute_query(
                 self.supabase
                 .table('c_orcamento_ambientes')
                 .insert(relacionamentos)
-                .execute()
             )
             
         except Exception as e:
@@ -532,78 +611,68 @@ class OrcamentoService:
                 for custo in custos_adicionais
             ]
             
-            (
+            await execute_query(
                 self.supabase
                 .table('c_orcamento_custos_adicionais')
                 .insert(custos_db)
-                .execute()
             )
             
         except Exception as e:
             logger.error(f"Erro ao inserir custos adicionais: {str(e)}")
             raise
 
-    async def _get_ambientes_orcamento(self, orcamento_id: str) -> List[Dict]:
-        """Busca ambientes relacionados ao orçamento"""
-        try:
-            result = (
-                self.supabase
-                .table('c_orcamento_ambientes')
-                .select('''
-                    c_ambientes!inner(
-                        id,
-                        nome_ambiente,
-                        valor_total,
-                        linha_produto
-                    )
-                ''')
-                .eq('orcamento_id', orcamento_id)
-                .eq('incluido', True)
-                .execute()
-            )
+    # ===== MÉTODOS DE APROVAÇÃO (fila em modules.aprovacoes) =====
+
+    async def solicitar_aprovacao(self, orcamento_id: str, solicitacao: SolicitacaoAprovacao, current_user: Dict[str, Any]) -> AprovacaoResponse:
+        """
+        Solicita aprovação de desconto acima do limite do vendedor
+        
+        O orçamento é recalculado com o desconto solicitado e a solicitação
+        entra na fila do nível exigido (GERENTE ou ADMIN_MASTER, conforme
+        validar_limite_desconto).
+        
+        Args:
+            orcamento_id: ID do orçamento
+            solicitacao: Desconto solicitado (%) e justificativa
+            current_user: Usuário logado
             
-            ambientes = []
-            for item in result.data:
-                ambiente = item['c_ambientes']
-                ambientes.append({
-                    'id': ambiente['id'],
-                    'nome_ambiente': ambiente['nome_ambiente'],
-                    'valor_total': ambiente['valor_total'],
-                    'linha_produto': ambiente['linha_produto']
-                })
+        Returns:
+            AprovacaoResponse: Solicitação PENDENTE
+        """
+        try:
+            loja_id = current_user['loja_id']
+            orcamento = await self.repository.get_orcamento_completo(str(orcamento_id), loja_id)
+            if not orcamento:
+                raise ResourceNotFoundException("Orçamento", str(orcamento_id))
+            if current_user['perfil'] == 'VENDEDOR' and orcamento['vendedor_id'] != current_user['user_id']:
+                raise PermissionException("Vendedor só solicita aprovação dos próprios orçamentos")
             
-            return ambientes
+            calculo = await self.criar_orcamento_completo({
+                'loja_id': loja_id,
+                'vendedor_id': orcamento['vendedor_id'],
+                'valor_ambientes': float(orcamento['valor_ambientes']),
+                'desconto_percentual': float(solicitacao.desconto_solicitado) / 100,
+                'custos_adicionais': orcamento['custos_adicionais']
+            })
+            if not calculo['necessita_aprovacao']:
+                raise ValidationException(
+                    "Desconto dentro do limite do vendedor: aplique-o editando o orçamento",
+                    field="desconto_solicitado"
+                )
             
-        except Exception as e:
-            logger.error(f"Erro ao buscar ambientes do orçamento: {str(e)}")
-            return []
-
-    async def _get_custos_adicionais_orcamento(self, orcamento_id: str) -> List[Dict]:
-        """Busca custos adicionais do orçamento"""
-        try:
-            result = (
-                self.supabase
-                .table('c_orcamento_custos_adicionais')
-                .select('*')
-                .eq('orcamento_id', orcamento_id)
-                .execute()
+            return await AprovacaoService(self.supabase).solicitar(
+                orcamento, calculo['nivel_aprovacao'], calculo, solicitacao.justificativa, current_user
             )
             
-            return result.data
-            
+        except (ValidationException, PermissionException, ResourceNotFoundException, BusinessRuleException):
+            raise
         except Exception as e:
-            logger.error(f"Erro ao buscar custos adicionais: {str(e)}")
-            return []
-
-    # ===== MÉTODOS DE APROVAÇÃO (placeholder para conexão futura) =====
+            logger.error(f"Erro ao solicitar aprovação do orçamento {orcamento_id}: {str(e)}")
+            raise Exception(f"Erro ao solicitar aprovação: {str(e)}")
 
-    async def solicitar_aprovacao(self, orcamento_id: str, solicitacao, current_user: Dict[str, Any]):
-        """TODO: Implementar lógica de solicitação de aprovação"""
-        return {"message": "Funcionalidade de aprovação em desenvolvimento"}
-
-    async def processar_aprovacao(self, orcamento_id: str, aprovado: bool, justificativa: str, current_user: Dict[str, Any]):
-        """TODO: Implementar lógica de processamento de aprovação"""
-        return {"message": "Funcionalidade de aprovação em desenvolvimento"}
+    async def processar_aprovacao(self, orcamento_id: str, aprovado: bool, justificativa: Optional[str], current_user: Dict[str, Any]) -> AprovacaoResponse:
+        """Aprova ou rejeita a solicitação pendente do orçamento (ver AprovacaoService.decidir)"""
+        return await AprovacaoService(self.supabase).decidir(str(orcamento_id), aprovado, justificativa, current_user)
 
     async def calcular_custos(self, orcamento_id: str, current_user: Dict[str, Any]):
         """TODO: Implementar retorno de custos detalhados"""
@@ -625,14 +694,25 @@ class OrcamentoService:
         """TODO: Implementar listagem de status disponíveis"""
         return {"message": "Listagem de status em desenvolvimento"}
 
-    async def historico_aprovacoes(self, orcamento_id: str, current_user: Dict[str, Any]):
-        """TODO: Implementar histórico de aprovações"""
-        return {"message": "Histórico de aprovações em desenvolvimento"}
+    async def historico_aprovacoes(self, orcamento_id: str, current_user: Dict[str, Any]) -> List[AprovacaoResponse]:
+        """
+        Histórico de solicitações de aprovação do orçamento, mais recentes primeiro
+        
+        Segue a permissão de leitura do orçamento (vendedor: só os próprios).
+        """
+        loja_id = current_user['loja_id']
+        orcamento = await self.repository.get_orcamento_completo(str(orcamento_id), loja_id)
+        if not orcamento:
+            raise ResourceNotFoundException("Orçamento", str(orcamento_id))
+        if current_user['perfil'] == 'VENDEDOR' and orcamento['vendedor_id'] != current_user['user_id']:
+            raise PermissionException("Acesso negado: vendedor só vê próprios orçamentos")
+        
+        return await AprovacaoService(self.supabase).historico(str(orcamento_id), current_user)
 
     
     # ===== ENGINE DE CÁLCULO (MANTIDO) =====
     
-    def calcular_comissao_faixa_unica_pandas(self, valor_venda: float, regras_df: pd.DataFrame) -> Dict[str, Any]:
+    def calcular_comissao_faixa_unica_pandas(self, valor_venda: float, regras_df: Union[pd.DataFrame, TabelaComissao]) -> Dict[str, Any]:
         """
         🚨 CORREÇÃO CRÍTICA: Engine de cálculo de comissão por FAIXA ÚNICA (não progressivo)
         
@@ -643,7 +723,8 @@ class OrcamentoService:
         
         Args:
             valor_venda (float): Valor da venda para calcular comissão
-            regras_df (pd.DataFrame): DataFrame com regras de comissão por faixa
+            regras_df (pd.DataFrame | TabelaComissao): Regras de comissão por faixa
+                (DataFrame do repository ou tabela já compilada do cache)
             
         Returns:
             Dict[str, Any]: Resultado do cálculo com detalhamento
@@ -653,7 +734,9 @@ class OrcamentoService:
         - R$ 40.000 → Faixa 2 (25k-50k) → 6% × R$ 40.000 = R$ 2.400,00
         - R$ 100.000 → Faixa 3 (50k+) → 8% × R$ 100.000 = R$ 8.000,00
         """
-        if regras_df.empty:
+        tabela = regras_df if isinstance(regras_df, TabelaComissao) else TabelaComissao.from_dataframe(regras_df)
+        
+        if tabela.vazia:
             logger.warning("DataFrame de regras vazio, retornando comissão zero")
             return {
                 'comissao_total': 0.0,
@@ -664,19 +747,8 @@ class OrcamentoService:
         
         logger.debug(f"🔧 CORREÇÃO: Cálculo por faixa única para valor: R$ {valor_venda:,.2f}")
         
-        # Ordenar regras por valor mínimo para processar em ordem
-        regras_ordenadas = regras_df.sort_values('valor_minimo')
-        
-        # Encontrar a faixa onde o valor se encaixa
-        faixa_aplicada = None
-        for idx, regra in regras_ordenadas.iterrows():
-            valor_min = float(regra['valor_minimo'])
-            valor_max = float(regra['valor_maximo']) if pd.notna(regra['valor_maximo']) else float('inf')
-            
-            # Verificar se valor está nesta faixa
-            if valor_min <= valor_venda <= valor_max:
-                faixa_aplicada = regra
-                break
+        # Encontrar a faixa onde o valor se encaixa (busca binária nas fronteiras)
+        faixa_aplicada = tabela.detalhar(valor_venda)
         
         if faixa_aplicada is None:
             logger.warning(f"Nenhuma faixa encontrada para valor R$ {valor_venda:,.2f}")
@@ -688,14 +760,14 @@ class OrcamentoService:
             }
         
         # Calcular comissão: percentual da faixa × valor total
-        percentual_faixa = float(faixa_aplicada['percentual'])
+        percentual_faixa = faixa_aplicada['percentual']
         comissao_total = valor_venda * percentual_faixa
         
         # Detalhar para auditoria
         detalhe_faixa = {
-            'faixa': int(faixa_aplicada['ordem']),
-            'valor_minimo': float(faixa_aplicada['valor_minimo']),
-            'valor_maximo': float(faixa_aplicada['valor_maximo']) if pd.notna(faixa_aplicada['valor_maximo']) else None,
+            'faixa': faixa_aplicada['ordem'],
+            'valor_minimo': faixa_aplicada['valor_minimo'],
+            'valor_maximo': faixa_aplicada['valor_maximo'],
             'percentual': percentual_faixa,
             'valor_total_aplicado': float(valor_venda),
             'comissao_calculada': float(comissao_total)
@@ -705,13 +777,30 @@ class OrcamentoService:
             'comissao_total': float(comissao_total),
             'detalhes_faixas': [detalhe_faixa],  # Sempre uma única faixa
             'valor_total_processado': float(valor_venda),
-            'faixa_aplicada': int(faixa_aplicada['ordem'])
+            'faixa_aplicada': faixa_aplicada['ordem']
         }
         
         logger.info(f"✅ Faixa {faixa_aplicada['ordem']}: R$ {valor_venda:,.2f} × {percentual_faixa:.1%} = R$ {comissao_total:,.2f}")
         
         return resultado
 
+    def calcular_comissao_lote(self, valores_venda, regras_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calcula comissão por faixa única para vários valores de uma só vez
+        (relatórios de margem, simulações).
+        
+        Mesmas regras de calcular_comissao_faixa_unica_pandas, incluindo
+        faixa aberta (valor_maximo = NaN), porém vetorizado com numpy.
+        
+        Args:
+            valores_venda: Sequência/array/Series de valores de venda
+            regras_df (pd.DataFrame): DataFrame com regras de comissão por faixa
+            
+        Returns:
+            pd.DataFrame: Colunas valor_venda, faixa_aplicada, percentual, comissao_total
+        """
+        return calcular_comissao_lote(valores_venda, regras_df)
+
     # Manter método antigo por compatibilidade, mas redirecionar para o correto
     def calcular_comissao_progressiva_pandas(self, valor_venda: float, regras_df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -804,8 +893,8 @@ class OrcamentoService:
             
             logger.info(f"Iniciando cálculo completo: R$ {valor_ambientes:,.2f} → R$ {valor_final:,.2f} (desconto {desconto_percentual:.1%})")
             
-            # 1. Buscar configurações da loja usando Pandas
-            config = await self.repository.get_config_loja(loja_id)
+            # 1. Buscar configurações da loja (snapshot compartilhado com a validação de desconto)
+            config = await self._obter_config_loja(loja_id)
             
             # 2. Calcular todos os custos
             custos = await self._calcular_todos_custos(
@@ -813,7 +902,7 @@ class OrcamentoService:
                 vendedor_id=vendedor_id,
                 valor_ambientes=valor_ambientes,
                 valor_final=valor_final,
-                config=config,
+                config=config.dados,
                 dados_orcamento=dados_orcamento
             )
             
@@ -834,7 +923,7 @@ class OrcamentoService:
                 'margem_lucro': margem_lucro,
                 'percentual_margem': percentual_margem,
                 'detalhes_calculo': {
-                    'config_snapshot': config,
+                    'config_snapshot': config.como_dict(),
                     'comissao_vendedor_detalhes': custos['detalhes_comissao_vendedor'],
                     'comissao_gerente_detalhes': custos['detalhes_comissao_gerente'],
                     'timestamp_calculo': datetime.utcnow().isoformat()
@@ -848,6 +937,19 @@ class OrcamentoService:
             logger.error(f"Erro no cálculo completo do orçamento: {str(e)}")
             raise Exception(f"Erro ao calcular orçamento: {str(e)}")
 
+    async def _obter_config_loja(self, loja_id: str) -> ConfigLojaSnapshot:
+        """
+        Configuração da loja lida uma única vez por requisição.
+        
+        Primeiro consulta os snapshots já usados nesta requisição; depois o
+        cache em processo (versionado) do repository. Chamadas concorrentes
+        (etapas de criar_orcamento) aguardam a mesma leitura.
+        """
+        chave = str(loja_id)
+        if chave not in self._configs_loja:
+            self._configs_loja[chave] = asyncio.ensure_future(self.repository.get_config_snapshot(chave))
+        return await self._configs_loja[chave]
+
     async def _calcular_todos_custos(
         self, 
         loja_id: str, 
@@ -871,14 +973,16 @@ class OrcamentoService:
         custos_detalhes['custo_fabrica'] = custo_fabrica
         logger.debug(f"Custo fábrica: R$ {valor_ambientes:,.2f} × {deflator:.1%} = R$ {custo_fabrica:,.2f}")
         
-        # 2. Comissão vendedor (progressiva com Pandas)
-        regras_vendedor_df = await self.repository.get_regras_comissao(loja_id, 'VENDEDOR')
-        comissao_vendedor_calc = self.calcular_comissao_faixa_unica_pandas(valor_final, regras_vendedor_df)
+        # 2. Comissão vendedor (faixas compiladas em cache, vendedor e gerente em paralelo)
+        tabela_vendedor, tabela_gerente = await asyncio.gather(
+            self.repository.get_tabela_comissao(loja_id, 'VENDEDOR'),
+            self.repository.get_tabela_comissao(loja_id, 'GERENTE')
+        )
+        comissao_vendedor_calc = self.calcular_comissao_faixa_unica_pandas(valor_final, tabela_vendedor)
         custos_detalhes['comissao_vendedor'] = comissao_vendedor_calc['comissao_total']
         
-        # 3. Comissão gerente (progressiva com Pandas) 
-        regras_gerente_df = await self.repository.get_regras_comissao(loja_id, 'GERENTE')
-        comissao_gerente_calc = self.calcular_comissao_faixa_unica_pandas(valor_final, regras_gerente_df)
+        # 3. Comissão gerente (faixas compiladas em cache)
+        comissao_gerente_calc = self.calcular_comissao_faixa_unica_pandas(valor_final, tabela_gerente)
         custos_detalhes['comissao_gerente'] = comissao_gerente_calc['comissao_total']
         
         # 4. Custo medidor
@@ -922,7 +1026,7 @@ class OrcamentoService:
             Dict com validação e necessidade de aprovação
         """
         try:
-            config = await self.repository.get_config_loja(loja_id)
+            config = await self._obter_config_loja(loja_id)
             
             limite_vendedor = float(config['limite_desconto_vendedor'])
             limite_gerente = float(config['limite_desconto_gerente'])
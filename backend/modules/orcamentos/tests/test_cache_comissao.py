@@ -0,0 +1,146 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from modules.orcamentos import repository as repository_module
+from modules.orcamentos.cache_comissao import CacheTabelasComissao, invalidar_regras_comissao
+from modules.orcamentos.comissao import TabelaComissao
+from modules.orcamentos.repository import OrcamentoRepository
+from modules.orcamentos.services import OrcamentoService
+
+REGRAS = [
+    {'id': '1', 'loja_id': 'loja-1', 'tipo_comissao': 'VENDEDOR', 'valor_minimo': 0, 'valor_maximo': 25000, 'percentual': 0.05, 'ordem': 1},
+    {'id': '2', 'loja_id': 'loja-1', 'tipo_comissao': 'VENDEDOR', 'valor_minimo': 25000.01, 'valor_maximo': None, 'percentual': 0.06, 'ordem': 2},
+]
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+class FakeQuery:
+    def __init__(self, supabase, operacao=None):
+        self.supabase = supabase
+        self.operacao = operacao
+
+    def __getattr__(self, nome):
+        def encadear(*args, **kwargs):
+            if nome == 'select':
+                return FakeQuery(self.supabase, nome)
+            return self
+        return encadear
+
+    def execute(self):
+        self.supabase.consultas.append(self.operacao)
+        if self.operacao == 'select':
+            return SimpleNamespace(data=REGRAS)
+        return SimpleNamespace(data=[REGRAS[0]])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.consultas = []
+
+    def table(self, nome):
+        return FakeQuery(self)
+
+
+@pytest.fixture
+def relogio():
+    return Relogio()
+
+
+@pytest.fixture
+def cache(monkeypatch, relogio):
+    cache = CacheTabelasComissao(ttl_seconds=60, relogio=relogio)
+    monkeypatch.setattr(repository_module, 'get_cache_comissao', lambda: cache)
+    monkeypatch.setattr('modules.orcamentos.cache_comissao._cache_comissao', cache)
+    return cache
+
+
+def test_hits_misses_e_ttl(cache, relogio):
+    tabela = TabelaComissao.from_dataframe(pd.DataFrame(REGRAS))
+
+    assert cache.obter('loja-1', 'VENDEDOR') is None
+    cache.armazenar('loja-1', 'VENDEDOR', tabela)
+    assert cache.obter('loja-1', 'VENDEDOR') is tabela
+
+    relogio.agora = 61
+    assert cache.obter('loja-1', 'VENDEDOR') is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 0)
+
+
+def test_invalidacao_por_loja_e_tipo(cache):
+    tabela = TabelaComissao.from_dataframe(pd.DataFrame())
+    for loja in ('loja-1', 'loja-2'):
+        for tipo in ('VENDEDOR', 'GERENTE'):
+            cache.armazenar(loja, tipo, tabela)
+
+    assert cache.invalidar('loja-1', 'GERENTE') == 1
+    assert cache.invalidar('loja-2') == 2
+    assert cache.obter('loja-1', 'VENDEDOR') is tabela
+    assert cache.invalidar() == 1
+
+
+@pytest.mark.asyncio
+async def test_repository_consulta_banco_apenas_no_miss(cache):
+    supabase = FakeSupabase()
+    repository = OrcamentoRepository(supabase)
+
+    primeira = await repository.get_tabela_comissao('loja-1', 'VENDEDOR')
+    segunda = await repository.get_tabela_comissao('loja-1', 'VENDEDOR')
+
+    assert primeira is segunda
+    assert supabase.consultas == ['select']
+    assert cache.stats()['hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidacao_manual_recarrega_faixas(cache):
+    supabase = FakeSupabase()
+    repository = OrcamentoRepository(supabase)
+    await repository.get_tabela_comissao('loja-1', 'VENDEDOR')
+
+    # POST /orcamentos/comissao/cache/invalidar após editar as faixas no banco
+    invalidar_regras_comissao('loja-1', 'VENDEDOR')
+    await repository.get_tabela_comissao('loja-1', 'VENDEDOR')
+
+    assert supabase.consultas == ['select', 'select']
+
+
+@pytest.mark.asyncio
+async def test_leitura_anterior_a_edicao_nao_entra_no_cache(cache, monkeypatch):
+    repository = OrcamentoRepository(FakeSupabase())
+    original = repository.get_regras_comissao
+
+    async def regras_durante_edicao(loja_id, tipo):
+        regras = await original(loja_id, tipo)
+        # A faixa é editada e o cache invalidado enquanto esta leitura está em andamento
+        invalidar_regras_comissao('loja-1', 'VENDEDOR')
+        return regras
+
+    monkeypatch.setattr(repository, 'get_regras_comissao', regras_durante_edicao)
+    await repository.get_tabela_comissao('loja-1', 'VENDEDOR')
+
+    assert cache.obter('loja-1', 'VENDEDOR') is None
+    assert cache.stats()['stale_discarded'] == 1
+
+
+@pytest.mark.asyncio
+async def test_custos_usam_tabela_em_cache(cache):
+    supabase = FakeSupabase()
+    service = OrcamentoService(supabase)
+    config = {'deflator_custo_fabrica': 0.4, 'valor_medidor_padrao': 200, 'valor_frete_percentual': 0.02}
+
+    for _ in range(3):
+        custos = await service._calcular_todos_custos('loja-1', 'v-1', 30000.0, 40000.0, config, {})
+
+    assert custos['detalhes']['comissao_vendedor'] == pytest.approx(2400.0)
+    assert supabase.consultas.count('select') == 2  # VENDEDOR + GERENTE, apenas no primeiro cálculo
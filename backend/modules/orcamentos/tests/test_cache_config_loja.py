@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+
+from modules.orcamentos import repository as repository_module
+from modules.orcamentos.cache_config_loja import CacheConfigLoja, versao_config
+from modules.orcamentos.services import OrcamentoService
+
+CONFIG = {
+    'loja_id': 'loja-1',
+    'deflator_custo_fabrica': 0.4,
+    'valor_medidor_padrao': 200.0,
+    'valor_frete_percentual': 0.02,
+    'limite_desconto_vendedor': 0.15,
+    'limite_desconto_gerente': 0.25
+}
+
+
+class FakeQuery:
+    def __init__(self, supabase, tabela):
+        self.supabase = supabase
+        self.tabela = tabela
+
+    def __getattr__(self, nome):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self.supabase.consultas.append(self.tabela)
+        if self.tabela == 'config_loja':
+            return SimpleNamespace(data=[dict(self.supabase.config)])
+        return SimpleNamespace(data=[])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.consultas = []
+        self.config = dict(CONFIG)
+
+    def table(self, nome):
+        return FakeQuery(self, nome)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CacheConfigLoja(ttl_seconds=60)
+    monkeypatch.setattr(repository_module, 'get_cache_config_loja', lambda: cache)
+    monkeypatch.setattr('modules.orcamentos.cache_config_loja._cache_config_loja', cache)
+    return cache
+
+
+def test_versao_muda_somente_quando_conteudo_muda(cache):
+    primeira = cache.armazenar('loja-1', CONFIG)
+    mesma = cache.armazenar('loja-1', dict(CONFIG))
+    alterada = cache.armazenar('loja-1', dict(CONFIG, limite_desconto_vendedor=0.10))
+    # Outro worker (cache próprio) lendo a mesma linha chega à mesma versão
+    outro_worker = CacheConfigLoja(ttl_seconds=60).armazenar('loja-1', dict(reversed(list(CONFIG.items()))))
+
+    assert primeira.versao == mesma.versao == outro_worker.versao
+    assert alterada.versao != primeira.versao
+    assert alterada.como_dict()['versao_config'] == alterada.versao
+
+
+@pytest.mark.asyncio
+async def test_orcamento_completo_le_config_uma_vez(cache):
+    supabase = FakeSupabase()
+    service = OrcamentoService(supabase)
+
+    resultado = await service.criar_orcamento_completo({
+        'loja_id': 'loja-1',
+        'vendedor_id': 'v-1',
+        'valor_ambientes': 10000.0,
+        'desconto_percentual': 0.10
+    })
+
+    assert supabase.consultas.count('config_loja') == 1
+    assert resultado['detalhes_calculo']['config_snapshot']['versao_config'] == versao_config(CONFIG)
+    assert resultado['validacao_desconto']['aprovado_automaticamente'] is True
+
+
+@pytest.mark.asyncio
+async def test_cache_compartilhado_entre_requisicoes_e_invalidado_na_edicao(cache):
+    supabase = FakeSupabase()
+
+    await OrcamentoService(supabase).validar_limite_desconto('loja-1', 'v-1', 0.2)
+    await OrcamentoService(supabase).validar_limite_desconto('loja-1', 'v-1', 0.2)
+    assert supabase.consultas.count('config_loja') == 1
+
+    supabase.config['limite_desconto_vendedor'] = 0.30
+    await OrcamentoService(supabase).repository.atualizar_config_loja('loja-1', {'limite_desconto_vendedor': 0.30})
+    service = OrcamentoService(supabase)
+    validacao = await service.validar_limite_desconto('loja-1', 'v-1', 0.2)
+
+    assert validacao['aprovado_automaticamente'] is True
+    assert (await service._obter_config_loja('loja-1')).versao == versao_config(supabase.config)
+
+
+@pytest.mark.asyncio
+async def test_leitura_anterior_a_edicao_nao_entra_no_cache(cache, monkeypatch):
+    supabase = FakeSupabase()
+    repository = OrcamentoService(supabase).repository
+    original = repository.get_config_loja
+
+    async def config_durante_edicao(loja_id):
+        config = await original(loja_id)
+        # Outra requisição altera a configuração enquanto esta leitura está em andamento
+        supabase.config['limite_desconto_vendedor'] = 0.30
+        await repository.atualizar_config_loja('loja-1', {'limite_desconto_vendedor': 0.30})
+        return config
+
+    monkeypatch.setattr(repository, 'get_config_loja', config_durante_edicao)
+    antiga = await repository.get_config_snapshot('loja-1')
+
+    assert antiga['limite_desconto_vendedor'] == 0.15
+    assert cache.obter('loja-1') is None
+    assert cache.stats()['stale_discarded'] == 1
+
+    monkeypatch.setattr(repository, 'get_config_loja', original)
+    assert (await repository.get_config_snapshot('loja-1'))['limite_desconto_vendedor'] == 0.30
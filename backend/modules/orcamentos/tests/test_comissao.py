@@ -0,0 +1,99 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.orcamentos.comissao import TabelaComissao, calcular_comissao_lote
+from modules.orcamentos.services import OrcamentoService
+
+
+def regras_prd() -> pd.DataFrame:
+    return pd.DataFrame([
+        {'id': '1', 'valor_minimo': 0.0, 'valor_maximo': 25000.0, 'percentual': 0.05, 'ordem': 1},
+        {'id': '2', 'valor_minimo': 25000.01, 'valor_maximo': 50000.0, 'percentual': 0.06, 'ordem': 2},
+        {'id': '3', 'valor_minimo': 50000.01, 'valor_maximo': np.nan, 'percentual': 0.08, 'ordem': 3},
+    ])
+
+
+def referencia_iterrows(valor_venda: float, regras_df: pd.DataFrame):
+    """Algoritmo original (iterrows) usado como oráculo"""
+    for _, regra in regras_df.sort_values('valor_minimo').iterrows():
+        valor_min = float(regra['valor_minimo'])
+        valor_max = float(regra['valor_maximo']) if pd.notna(regra['valor_maximo']) else float('inf')
+        if valor_min <= valor_venda <= valor_max:
+            return int(regra['ordem']), float(regra['percentual']), valor_venda * float(regra['percentual'])
+    return None, 0.0, 0.0
+
+
+@pytest.fixture
+def service():
+    return OrcamentoService(supabase_client=None)
+
+
+def test_exemplos_prd(service):
+    resultado = service.calcular_comissao_lote([24999.0, 40000.0, 100000.0], regras_prd())
+
+    assert resultado['faixa_aplicada'].tolist() == [1, 2, 3]
+    assert resultado['comissao_total'].tolist() == pytest.approx([1249.95, 2400.0, 8000.0])
+
+
+def test_fronteiras_e_lacunas():
+    valores = [0.0, 25000.0, 25000.005, 25000.01, 50000.0, 50000.01, -1.0]
+
+    resultado = calcular_comissao_lote(valores, regras_prd())
+
+    faixas = [None if pd.isna(f) else int(f) for f in resultado['faixa_aplicada']]
+    assert faixas == [1, 1, None, 2, 2, 3, None]
+    assert resultado.loc[2, 'comissao_total'] == 0.0
+    assert resultado.loc[6, 'percentual'] == 0.0
+
+
+@pytest.mark.parametrize("sobreposicao", [False, True])
+def test_equivalente_ao_algoritmo_original(sobreposicao):
+    rng = np.random.default_rng(42)
+    limites = np.sort(rng.uniform(0, 200000, 8))
+    linhas = []
+    for i in range(0, 8, 2):
+        maximo = limites[i + 1] + (30000 if sobreposicao else 0)
+        linhas.append({'valor_minimo': limites[i], 'valor_maximo': maximo,
+                       'percentual': rng.uniform(0.01, 0.1), 'ordem': i // 2 + 1})
+    linhas[-1]['valor_maximo'] = np.nan
+    regras = pd.DataFrame(linhas).sample(frac=1, random_state=1)
+
+    valores = np.concatenate([rng.uniform(-1000, 250000, 500), limites])
+    resultado = calcular_comissao_lote(valores, regras)
+
+    for valor, (_, linha) in zip(valores, resultado.iterrows()):
+        ordem, percentual, comissao = referencia_iterrows(valor, regras)
+        faixa = None if pd.isna(linha['faixa_aplicada']) else int(linha['faixa_aplicada'])
+        assert faixa == ordem
+        assert linha['percentual'] == pytest.approx(percentual)
+        assert linha['comissao_total'] == pytest.approx(comissao)
+
+
+def test_regras_vazias():
+    resultado = calcular_comissao_lote([1000.0, 2000.0], pd.DataFrame())
+
+    assert resultado['comissao_total'].tolist() == [0.0, 0.0]
+    assert resultado['faixa_aplicada'].isna().all()
+
+
+def test_metodo_unitario_mantem_formato(service):
+    resultado = service.calcular_comissao_faixa_unica_pandas(100000.0, regras_prd())
+
+    assert resultado['faixa_aplicada'] == 3
+    assert resultado['comissao_total'] == pytest.approx(8000.0)
+    assert resultado['detalhes_faixas'][0]['valor_maximo'] is None
+
+
+def test_um_milhao_de_valores_abaixo_de_um_segundo():
+    tabela = TabelaComissao.from_dataframe(regras_prd())
+    valores = np.random.default_rng(0).uniform(0, 150000, 1_000_000)
+
+    inicio = time.perf_counter()
+    resultado = tabela.calcular_lote(valores)
+    duracao = time.perf_counter() - inicio
+
+    assert len(resultado) == 1_000_000
+    assert duracao < 1.0
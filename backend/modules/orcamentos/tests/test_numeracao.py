@@ -0,0 +1,180 @@
+import asyncio
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from modules.orcamentos.cache_config_loja import CacheConfigLoja
+from modules.orcamentos.numeracao import AlocadorNumeracao, formatar_numero
+from modules.orcamentos.repository import OrcamentoRepository
+from modules.orcamentos.schemas import OrcamentoCreate
+from modules.orcamentos.services import OrcamentoService
+
+
+def test_formatar_numero():
+    data = datetime(2026, 3, 9)
+
+    assert formatar_numero(42, 'SEQUENCIAL', '', data) == '42'
+    assert formatar_numero(42, None, 'D-', data) == 'D-42'
+    assert formatar_numero(42, '{ano}-{seq:06d}', 'ORC-', data) == 'ORC-2026-000042'
+    assert formatar_numero(7, '{mes}-{ano}-{seq:04d}', '', data) == '03-2026-0007'
+    assert formatar_numero(1234567, '{seq:04d}', '', data) == '1234567'
+    # Texto fora dos marcadores é literal (N, YYYY e MM inclusive)
+    assert formatar_numero(42, 'NOVO-MM-{seq:05d}', 'ORC-', data) == 'ORC-NOVO-MM-00042'
+    assert formatar_numero(42, 'ORC-NOVO', '', data) == '42'
+
+
+class ContadorBanco:
+    """Contador de config_loja com latência, como o UPDATE no Supabase"""
+
+    def __init__(self, inicial=1):
+        self.valor = inicial
+        self.chamadas = 0
+
+    async def reservar(self, loja_id, quantidade):
+        self.chamadas += 1
+        inicio = self.valor
+        self.valor += quantidade
+        await asyncio.sleep(0.001)
+        return inicio
+
+
+@pytest.mark.asyncio
+async def test_alocador_entrega_numeros_unicos_em_rajada():
+    banco = ContadorBanco()
+    alocador = AlocadorNumeracao(tamanho_bloco=10)
+
+    numeros = await asyncio.gather(*[alocador.proximo('loja-1', banco.reservar) for _ in range(35)])
+
+    assert sorted(numeros) == list(range(1, 36))
+    assert banco.chamadas == 4
+    assert alocador.stats()['allocated'] == 35
+
+
+@pytest.mark.asyncio
+async def test_alocadores_de_processos_diferentes_nao_colidem():
+    banco = ContadorBanco(inicial=100)
+    processos = [AlocadorNumeracao(tamanho_bloco=5) for _ in range(3)]
+
+    numeros = await asyncio.gather(*[
+        processos[i % 3].proximo('loja-1', banco.reservar) for i in range(30)
+    ])
+
+    assert len(set(numeros)) == 30
+
+    processos[0].descartar('loja-1')
+    assert await processos[0].proximo('loja-1', banco.reservar) == banco.valor - 5
+
+
+class FakeQuery:
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.filtros = {}
+        self.update_dados = None
+
+    def select(self, *args):
+        return self
+
+    def update(self, dados):
+        self.update_dados = dados
+        return self
+
+    def eq(self, campo, valor):
+        self.filtros[campo] = valor
+        return self
+
+    def is_(self, campo, valor):
+        self.filtros[campo] = None if valor == 'null' else valor
+        return self
+
+    def execute(self):
+        linha = self.supabase.config
+        if self.update_dados is None:
+            return SimpleNamespace(data=[dict(linha)])
+
+        if self.filtros.get('proximo_numero_orcamento') != linha['proximo_numero_orcamento']:
+            return SimpleNamespace(data=[])
+        linha.update(self.update_dados)
+        return SimpleNamespace(data=[dict(linha)])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.config = {'loja_id': 'loja-1', 'proximo_numero_orcamento': 10}
+        self.concorrentes = 1
+
+    def table(self, nome):
+        # Outra instância reserva entre a leitura e o UPDATE na primeira tentativa
+        if self.concorrentes and nome == 'config_loja':
+            self.concorrentes -= 1
+            self.config['proximo_numero_orcamento'] += 5
+        return FakeQuery(self)
+
+
+@pytest.mark.asyncio
+async def test_reserva_no_banco_refaz_compare_and_swap_quando_disputada():
+    supabase = FakeSupabase()
+
+    inicio = await OrcamentoRepository(supabase).reservar_numeros_orcamento('loja-1', 3)
+
+    assert inicio == 15
+    assert supabase.config['proximo_numero_orcamento'] == 18
+
+
+@pytest.mark.asyncio
+async def test_reserva_em_loja_com_contador_nulo_comeca_pelo_numero_inicial():
+    supabase = FakeSupabase()
+    supabase.concorrentes = 0
+    supabase.config.update({'proximo_numero_orcamento': None, 'numero_inicial_orcamento': 1000})
+
+    assert await OrcamentoRepository(supabase).reservar_numeros_orcamento('loja-1', 10) == 1000
+    assert supabase.config['proximo_numero_orcamento'] == 1010
+
+
+def test_contador_nao_avanca_versao_da_config():
+    cache = CacheConfigLoja(ttl_seconds=0)
+
+    primeira = cache.armazenar('loja-1', {'deflator_custo_fabrica': 0.4, 'proximo_numero_orcamento': 1})
+    segunda = cache.armazenar('loja-1', {'deflator_custo_fabrica': 0.4, 'proximo_numero_orcamento': 11})
+
+    assert primeira.versao == segunda.versao
+
+
+@pytest.mark.asyncio
+async def test_criar_orcamento_nao_reserva_numero_se_calculo_falha():
+    service = OrcamentoService.__new__(OrcamentoService)
+    reservas = []
+
+    async def valor_ambientes(ambiente_ids, loja_id):
+        return 1000.0
+
+    async def config(loja_id):
+        return {'formato_numeracao': None, 'prefixo_numeracao': 'ORC-'}
+
+    async def status(loja_id):
+        return {'id': 'status-1'}
+
+    async def calculo(dados):
+        raise Exception("tabela de comissão ausente")
+
+    async def numero(loja_id, config):
+        reservas.append(loja_id)
+        return 'ORC-1'
+
+    service._calcular_valor_ambientes = valor_ambientes
+    service._obter_config_loja = config
+    service._get_status_padrao = status
+    service.criar_orcamento_completo = calculo
+    service._gerar_numero_orcamento = numero
+    ids = [str(uuid.uuid4()) for _ in range(5)]
+    orcamento = OrcamentoCreate(
+        cliente_id=ids[0], ambiente_ids=[ids[1]], medidor_selecionado_id=ids[2],
+        montador_selecionado_id=ids[3], transportadora_selecionada_id=ids[4],
+        plano_pagamento=[{'descricao': 'Entrada', 'valor': 1000, 'data_vencimento': datetime(2026, 3, 1), 'forma_pagamento': 'PIX'}]
+    )
+
+    with pytest.raises(Exception, match="tabela de comissão ausente"):
+        await service.criar_orcamento(orcamento, {'loja_id': 'loja-1', 'id': 'vendedor-1'})
+
+    assert reservas == []
@@ -0,0 +1,74 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from modules.orcamentos.services import OrcamentoService
+
+LOJA_ID = str(uuid.uuid4())
+VENDEDOR_ID = str(uuid.uuid4())
+AMBIENTE_ID = str(uuid.uuid4())
+
+
+def linha_orcamento():
+    return {
+        'id': str(uuid.uuid4()), 'numero': 'ORC-0001', 'cliente_id': str(uuid.uuid4()),
+        'loja_id': LOJA_ID, 'vendedor_id': VENDEDOR_ID, 'status_id': None,
+        'valor_ambientes': 10000.0, 'desconto_percentual': 0.1, 'valor_final': 9000.0,
+        'custo_fabrica': 4000.0, 'comissao_vendedor': 450.0, 'comissao_gerente': 200.0,
+        'custo_medidor': 200.0, 'custo_montador': 0.0, 'custo_frete': 180.0, 'margem_lucro': 3970.0,
+        'plano_pagamento': [], 'necessita_aprovacao': False, 'observacoes': None,
+        'created_at': '2026-01-01T10:00:00', 'updated_at': '2026-01-01T10:00:00',
+        'c_orcamento_ambientes': [
+            {'incluido': True, 'c_ambientes': {'id': AMBIENTE_ID, 'nome_ambiente': 'Cozinha', 'valor_total': 10000.0, 'linha_produto': 'Essence'}},
+            {'incluido': False, 'c_ambientes': {'id': str(uuid.uuid4()), 'nome_ambiente': 'Sala', 'valor_total': 5000.0, 'linha_produto': None}}
+        ],
+        'c_orcamento_custos_adicionais': [{'id': str(uuid.uuid4()), 'descricao_custo': 'Frete especial', 'valor_custo': 300.0}],
+        'status': None,
+        'cliente': {'id': str(uuid.uuid4()), 'nome': 'Maria Souza'},
+        'vendedor': {'id': VENDEDOR_ID, 'nome': 'João Vendedor'}
+    }
+
+
+class FakeQuery:
+    def __init__(self, supabase, tabela):
+        self.supabase = supabase
+        self.tabela = tabela
+
+    def __getattr__(self, nome):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self.supabase.consultas.append(self.tabela)
+        return SimpleNamespace(data=self.supabase.linhas)
+
+
+class FakeSupabase:
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.consultas = []
+
+    def table(self, nome):
+        return FakeQuery(self, nome)
+
+
+@pytest.mark.asyncio
+async def test_obter_orcamento_em_um_unico_round_trip():
+    supabase = FakeSupabase([linha_orcamento()])
+    usuario = {'loja_id': LOJA_ID, 'id': VENDEDOR_ID, 'perfil': 'ADMIN_MASTER'}
+
+    orcamento = await OrcamentoService(supabase).obter_orcamento('qualquer', usuario)
+
+    assert supabase.consultas == ['c_orcamentos']
+    assert [str(a.id) for a in orcamento.ambientes] == [AMBIENTE_ID]
+    assert orcamento.resumo_financeiro.total_custos_adicionais == 300
+    assert (orcamento.cliente_nome, orcamento.vendedor_nome, orcamento.status_nome) == ('Maria Souza', 'João Vendedor', None)
+
+
+@pytest.mark.asyncio
+async def test_vendedor_nao_ve_orcamento_de_outro_vendedor():
+    supabase = FakeSupabase([linha_orcamento()])
+    usuario = {'loja_id': LOJA_ID, 'id': str(uuid.uuid4()), 'perfil': 'VENDEDOR'}
+
+    with pytest.raises(Exception, match="Acesso negado"):
+        await OrcamentoService(supabase).obter_orcamento('qualquer', usuario)
@@ -1,11 +1,54 @@
+"""
+Controller (rotas) para o módulo de Logs XML.
+Acompanhamento das importações de XML processadas em segundo plano.
+"""
 
-# FastAPI routes for xml_logs
-from fastapi import APIRouter, Depends
-from .schemas import *
-from .repository import *
+from fastapi import APIRouter, Depends, Query
+from typing import List, Dict, Any
+from core.auth import get_current_user
+from core.database import get_database
+from supabase import Client
 
-router = APIRouter(prefix='/xml_logs', tags=['xml_logs'])
+from .repository import get_xml_log_repository
+from .schemas import XmlLogResponse
+from .services import XmlLogService
 
-@router.get('/', response_model=list[dict])
-async def list_xml_logs():
-    return await repo_list_xml_logs()
+# Router para o módulo de logs XML
+router = APIRouter()
+
+
+@router.get("/",
+    response_model=List[XmlLogResponse],
+    summary="Listar importações de XML",
+    description="Lista as importações de XML da loja (status, progresso, duração e erros), mais recentes primeiro"
+)
+async def listar_xml_logs(
+    skip: int = Query(0, ge=0, description="Registros a pular"),
+    limit: int = Query(50, ge=1, le=200, description="Limite de registros"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_database)
+):
+    """
+    Lista logs de importação de XML.
+    
+    **RLS aplicado:** Usuário vê apenas logs da própria loja.
+    """
+    service = XmlLogService(get_xml_log_repository(db))
+    return await service.listar_logs(current_user, skip, limit)
+
+
+@router.get("/{log_id}",
+    response_model=XmlLogResponse,
+    summary="Acompanhar importação de XML",
+    description="Status e progresso de uma importação aceita por POST /ambientes/upload-xml"
+)
+async def obter_xml_log(
+    log_id: str,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Client = Depends(get_database)
+):
+    """
+    Retorna o log de uma importação (consultar até status CONCLUIDO ou ERRO).
+    """
+    service = XmlLogService(get_xml_log_repository(db))
+    return await service.obter_log(log_id, current_user)
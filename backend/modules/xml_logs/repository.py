@@ -1,5 +1,197 @@
+"""
+Repository para os logs de importação de XML.
+Responsabilidade: Acesso a dados, queries, conversões.
 
-# Supabase access layer for xml_logs
-async def repo_list_xml_logs():
-    # TODO: call Supabase HTTP API
-    return []
+Além da tabela xml_logs no Supabase há um armazenamento em memória com a
+mesma interface (XML_LOGS_STORE=memoria), para testes e desenvolvimento local.
+"""
+
+import logging
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from supabase import Client
+from core.config import get_settings
+from core.database import execute_query
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class XmlLogRepository:
+    """
+    Repository para a tabela xml_logs no Supabase
+    
+    Responsabilidade: Acesso a dados, queries diretas no Supabase
+    """
+    
+    def __init__(self, supabase_client: Client):
+        self.supabase = supabase_client
+    
+    async def criar_log(self, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cria um log de importação
+        
+        Args:
+            dados: Campos iniciais (loja_id, nome_arquivo, status...)
+            
+        Returns:
+            Log criado
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('xml_logs')
+                .insert(dados)
+            )
+            
+            if not result.data:
+                raise Exception("Nenhum dado retornado após inserção")
+            
+            return result.data[0]
+            
+        except Exception as e:
+            logger.error(f"Erro ao criar log de XML: {str(e)}")
+            raise Exception(f"Erro ao criar log de XML: {str(e)}")
+    
+    async def atualizar_log(self, log_id: str, dados: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Atualiza campos de um log (status, progresso, resultado)
+        
+        Args:
+            log_id: ID do log
+            dados: Campos a atualizar
+            
+        Returns:
+            Log atualizado ou None se não existir
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('xml_logs')
+                .update(dados)
+                .eq('id', log_id)
+            )
+            
+            return result.data[0] if result.data else None
+            
+        except Exception as e:
+            logger.error(f"Erro ao atualizar log de XML {log_id}: {str(e)}")
+            raise Exception(f"Erro ao atualizar log de XML: {str(e)}")
+    
+    async def obter_log(self, log_id: str, loja_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca um log da loja
+        
+        Args:
+            log_id: ID do log
+            loja_id: ID da loja (RLS)
+            
+        Returns:
+            Log ou None se não existir
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('xml_logs')
+                .select('*')
+                .eq('id', log_id)
+                .eq('loja_id', loja_id)
+            )
+            
+            return result.data[0] if result.data else None
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar log de XML {log_id}: {str(e)}")
+            raise Exception(f"Erro ao buscar log de XML: {str(e)}")
+    
+    async def listar_logs(self, loja_id: str, skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Lista logs da loja, mais recentes primeiro
+        
+        Args:
+            loja_id: ID da loja (RLS)
+            skip: Paginação - registros a pular
+            limit: Paginação - limite de registros
+            
+        Returns:
+            Lista de logs
+        """
+        try:
+            result = await execute_query(
+                self.supabase
+                .table('xml_logs')
+                .select('*')
+                .eq('loja_id', loja_id)
+                .order('created_at', desc=True)
+                .limit(limit)
+                .offset(skip)
+            )
+            
+            return result.data or []
+            
+        except Exception as e:
+            logger.error(f"Erro ao listar logs de XML: {str(e)}")
+            raise Exception(f"Erro ao listar logs de XML: {str(e)}")
+
+
+class XmlLogMemoria:
+    """
+    Logs de importação em memória (mesma interface do XmlLogRepository)
+    
+    Args:
+        max_logs: Logs mantidos; ao exceder, os mais antigos saem
+    """
+    
+    def __init__(self, max_logs: int = 1000):
+        self.max_logs = max_logs
+        self._lock = threading.Lock()
+        self._logs: Dict[str, Dict[str, Any]] = {}
+    
+    async def criar_log(self, dados: Dict[str, Any]) -> Dict[str, Any]:
+        log = {'id': str(uuid.uuid4()), 'created_at': datetime.now(timezone.utc).isoformat(), **dados}
+        with self._lock:
+            self._logs[log['id']] = log
+            while len(self._logs) > self.max_logs:
+                del self._logs[next(iter(self._logs))]
+        return dict(log)
+    
+    async def atualizar_log(self, log_id: str, dados: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            log = self._logs.get(str(log_id))
+            if log is None:
+                return None
+            log.update(dados)
+            return dict(log)
+    
+    async def obter_log(self, log_id: str, loja_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            log = self._logs.get(str(log_id))
+            return dict(log) if log is not None and str(log['loja_id']) == str(loja_id) else None
+    
+    async def listar_logs(self, loja_id: str, skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            logs = [dict(log) for log in reversed(self._logs.values()) if str(log['loja_id']) == str(loja_id)]
+        return logs[skip:skip + limit]
+
+
+# Instância global do armazenamento em memória
+_logs_memoria: Optional[XmlLogMemoria] = None
+
+
+def get_xml_log_repository(supabase_client: Client):
+    """
+    Armazenamento dos logs conforme XML_LOGS_STORE ('supabase' ou 'memoria')
+    
+    Args:
+        supabase_client: Cliente da requisição (usado com 'supabase')
+    """
+    global _logs_memoria
+    
+    if get_settings().xml_logs_store == "memoria":
+        if _logs_memoria is None:
+            _logs_memoria = XmlLogMemoria()
+        return _logs_memoria
+    
+    return XmlLogRepository(supabase_client)
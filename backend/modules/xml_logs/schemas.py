@@ -1,12 +1,44 @@
+"""
+Schemas Pydantic para o módulo de Logs XML.
+Define modelos de saída do acompanhamento das importações de XML.
+"""
 
-# Pydantic models for xml_logs
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+from enum import Enum
+import uuid
+from datetime import datetime
 
-class Xml_logsBase(BaseModel):
-    pass
 
-class Xml_logsCreate(Xml_logsBase):
-    pass
+class StatusXmlLog(str, Enum):
+    """Etapas de uma importação de XML em segundo plano"""
+    PENDENTE = "PENDENTE"
+    PROCESSANDO = "PROCESSANDO"
+    CONCLUIDO = "CONCLUIDO"
+    ERRO = "ERRO"
 
-class Xml_logsResponse(Xml_logsBase):
-    id: str
+
+# ===== SCHEMAS DE SAÍDA (RESPONSE) =====
+
+class XmlLogResponse(BaseModel):
+    """Schema de resposta para log de importação de XML"""
+    id: uuid.UUID
+    loja_id: uuid.UUID
+    usuario_id: Optional[str] = None
+    nome_arquivo: str
+    status: StatusXmlLog
+    progresso: float = Field(0, ge=0, le=100, description="Percentual processado")
+    tamanho_bytes: Optional[int] = None
+    hash_arquivo: Optional[str] = None
+    ambientes_importados: Optional[int] = None
+    ambientes_reaproveitados: Optional[int] = None
+    valor_total: Optional[float] = None
+    duracao_ms: Optional[float] = None
+    erro: Optional[str] = None
+    detalhes: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    iniciado_em: Optional[datetime] = None
+    finalizado_em: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
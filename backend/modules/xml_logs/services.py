@@ -1 +1,112 @@
-# Business logic helpers for xml_logs
+"""
+Service layer para os logs de importação de XML.
+Responsabilidade: Ciclo de vida do log (pendente → processando → concluído/erro) e consultas.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from core.exceptions import ResourceNotFoundException
+from .schemas import StatusXmlLog, XmlLogResponse
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class XmlLogService:
+    """
+    Service layer para logs de XML
+    
+    Args:
+        repository: XmlLogRepository (Supabase) ou XmlLogMemoria
+    """
+    
+    def __init__(self, repository):
+        self.repository = repository
+    
+    async def criar_pendente(self, nome_arquivo: str, tamanho_bytes: int, current_user: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra um XML aceito e aguardando na fila"""
+        return await self.repository.criar_log({
+            'loja_id': current_user['loja_id'],
+            'usuario_id': current_user.get('id'),
+            'nome_arquivo': nome_arquivo,
+            'status': StatusXmlLog.PENDENTE.value,
+            'progresso': 0,
+            'tamanho_bytes': tamanho_bytes
+        })
+    
+    async def registrar_inicio(self, log_id: str) -> None:
+        await self.repository.atualizar_log(log_id, {
+            'status': StatusXmlLog.PROCESSANDO.value,
+            'iniciado_em': _agora()
+        })
+    
+    async def registrar_progresso(self, log_id: str, progresso: float) -> None:
+        await self.repository.atualizar_log(log_id, {'progresso': round(progresso, 1)})
+    
+    async def registrar_conclusao(self, log_id: str, duracao_ms: float, resultado: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Marca o log como concluído com o resumo da importação
+        
+        Args:
+            log_id: ID do log
+            duracao_ms: Tempo de processamento (sem a espera na fila)
+            resultado: Campos do resumo (ambientes_importados, valor_total...)
+        """
+        return await self.repository.atualizar_log(log_id, {
+            **resultado,
+            'status': StatusXmlLog.CONCLUIDO.value,
+            'progresso': 100,
+            'duracao_ms': duracao_ms,
+            'finalizado_em': _agora()
+        })
+    
+    async def registrar_erro(self, log_id: str, duracao_ms: float, erro: str) -> Optional[Dict[str, Any]]:
+        """Marca o log como falho com a mensagem de erro"""
+        return await self.repository.atualizar_log(log_id, {
+            'status': StatusXmlLog.ERRO.value,
+            'duracao_ms': duracao_ms,
+            'erro': erro,
+            'finalizado_em': _agora()
+        })
+    
+    async def obter_log(self, log_id: str, current_user: Dict[str, Any]) -> XmlLogResponse:
+        """
+        Busca um log da loja do usuário
+        
+        Raises:
+            ResourceNotFoundException: Log inexistente ou de outra loja
+        """
+        try:
+            log = await self.repository.obter_log(log_id, current_user['loja_id'])
+            if not log:
+                raise ResourceNotFoundException("Log de XML", log_id)
+            return XmlLogResponse(**log)
+            
+        except ResourceNotFoundException:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao buscar log de XML {log_id}: {str(e)}")
+            raise Exception(f"Erro ao buscar log de XML: {str(e)}")
+    
+    async def listar_logs(self, current_user: Dict[str, Any], skip: int = 0, limit: int = 50) -> List[XmlLogResponse]:
+        """
+        Lista logs da loja do usuário, mais recentes primeiro
+        
+        Args:
+            current_user: Usuário logado
+            skip: Paginação - registros a pular
+            limit: Paginação - limite de registros
+        """
+        try:
+            logs = await self.repository.listar_logs(current_user['loja_id'], skip, limit)
+            return [XmlLogResponse(**log) for log in logs]
+            
+        except Exception as e:
+            logger.error(f"Erro ao listar logs de XML: {str(e)}")
+            raise Exception(f"Erro ao listar logs de XML: {str(e)}")
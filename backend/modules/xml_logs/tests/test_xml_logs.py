@@ -1,4 +1,113 @@
-
 # Tests for xml_logs module
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core import jobs
+from core.config import get_settings
+from core.exceptions import ValidationException
+from core.jobs import FilaJobs
+from modules.ambientes import cache_xml, services
+from modules.ambientes.cache_xml import CacheBlocosXml
+from modules.ambientes.services import AmbienteService
+from modules.ambientes.tests.test_importacao_xml import USUARIO, XML_PROMOB, RepositorioFalso
+from modules.xml_logs.repository import XmlLogMemoria
+from modules.xml_logs.services import XmlLogService
+
+
 async def test_list_xml_logs():
     assert True
+
+
+@pytest.fixture
+def fila(monkeypatch):
+    fila = FilaJobs(workers=1, max_fila=5)
+    monkeypatch.setattr(jobs, '_fila_jobs', fila)
+    monkeypatch.setattr(cache_xml, '_cache_xml', CacheBlocosXml(max_entradas=100, ttl_seconds=600))
+    monkeypatch.setattr(get_settings(), 'jobs_progresso_intervalo_seconds', 0.01)
+    return fila
+
+
+def servico():
+    service = AmbienteService.__new__(AmbienteService)
+    service.repository = RepositorioFalso()
+    return service
+
+
+@pytest.mark.asyncio
+async def test_upload_enfileirado_registra_conclusao_no_log(fila):
+    logs = XmlLogService(XmlLogMemoria())
+
+    aceito = await servico().enfileirar_importacao(io.BytesIO(XML_PROMOB), 'projeto.xml', USUARIO, logs)
+    assert aceito.status == 'PENDENTE' and aceito.tamanho_bytes == len(XML_PROMOB)
+
+    await fila.aguardar()
+    log = await logs.obter_log(str(aceito.id), USUARIO)
+    assert log.status == 'CONCLUIDO' and log.progresso == 100 and log.erro is None
+    assert log.ambientes_importados == 2 and log.valor_total == 3868.99
+    assert log.duracao_ms is not None and log.iniciado_em is not None and log.finalizado_em is not None
+    assert [l.id for l in await logs.listar_logs(USUARIO)] == [aceito.id]
+    await fila.encerrar()
+
+
+@pytest.mark.asyncio
+async def test_xml_invalido_fica_com_erro_no_log(fila):
+    logs = XmlLogService(XmlLogMemoria())
+
+    aceito = await servico().enfileirar_importacao(io.BytesIO(b'<LISTING><AMBIENT>'), 'quebrado.xml', USUARIO, logs)
+    await fila.aguardar()
+
+    log = await logs.obter_log(str(aceito.id), USUARIO)
+    assert log.status == 'ERRO' and 'XML inválido' in log.erro
+    assert fila.stats()['failed'] == 1
+    await fila.encerrar()
+
+
+@pytest.mark.asyncio
+async def test_lote_registra_arquivos_e_erros_no_log(fila, monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(services, 'get_pool_processos', lambda: pool)
+    monkeypatch.setattr(get_settings(), 'xml_lote_max_arquivos', 2)
+    logs = XmlLogService(XmlLogMemoria())
+    service = servico()
+
+    with pytest.raises(ValidationException):
+        await service.enfileirar_importacao_lote(
+            [(io.BytesIO(XML_PROMOB), f'{n}.xml') for n in range(3)], USUARIO, logs
+        )
+
+    aceito = await service.enfileirar_importacao_lote(
+        [(io.BytesIO(XML_PROMOB), 'cozinha.xml'), (io.BytesIO(b'<LISTING><AMBIENT>'), 'quebrado.xml')], USUARIO, logs
+    )
+    assert aceito.nome_arquivo == 'cozinha.xml, quebrado.xml'
+    await fila.aguardar()
+    pool.shutdown()
+
+    log = await logs.obter_log(str(aceito.id), USUARIO)
+    assert log.status == 'CONCLUIDO' and log.erro == '1 de 2 arquivos com erro'
+    assert log.ambientes_importados == 2 and log.valor_total == 3868.99
+    cozinha, quebrado = log.detalhes['arquivos']
+    assert cozinha['arquivo'] == 'cozinha.xml' and cozinha['ambientes'] == 2 and cozinha['erro'] is None
+    assert quebrado['arquivo'] == 'quebrado.xml' and 'XML inválido' in quebrado['erro']
+    await fila.encerrar()
+
+
+@pytest.mark.asyncio
+async def test_encerramento_marca_erro_nos_logs_interrompidos_e_descartados(fila, monkeypatch):
+    logs = XmlLogService(XmlLogMemoria())
+    service = servico()
+
+    async def importacao_lenta(*args):
+        await asyncio.sleep(60)
+    monkeypatch.setattr(service, 'importar_xml', importacao_lenta)
+
+    rodando = await service.enfileirar_importacao(io.BytesIO(XML_PROMOB), 'rodando.xml', USUARIO, logs)
+    na_fila = await service.enfileirar_importacao(io.BytesIO(XML_PROMOB), 'na_fila.xml', USUARIO, logs)
+    await asyncio.sleep(0.01)
+    await fila.encerrar(timeout=0.01)
+
+    for aceito in (rodando, na_fila):
+        log = await logs.obter_log(str(aceito.id), USUARIO)
+        assert log.status == 'ERRO' and log.erro == services.MENSAGEM_INTERROMPIDO